@@ -1,53 +1,268 @@
-from fastapi import FastAPI, Request, Response
-from supabase import create_client, Client, ClientOptions
-import os
+import contextlib
+import hmac
+import ipaddress
+import json
 import logging
-import re
+import os
+import time
+from typing import AsyncIterator
+
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+from app.services.idempotency import IdempotencyConflict
+from app.services.metrics import REGISTRY, CallbackGauge
+from app.services.provision_batch import SUCCEEDED, provision_batch
+from app.services.provision_jobs import provision_jobs
+from app.services.supabase_client import supabase_client
+from app.services.tenant_archive import TenantNotFound, tenant_archive
+from app.utils.env import env_int
+from app.utils.validators import validate_username
+
+BATCH_MAX_TENANTS = env_int("PROVISION_BATCH_MAX_TENANTS", 500)
+BATCH_GROUP_SIZE = env_int("PROVISION_BATCH_GROUP_SIZE", 25)
+BATCH_CONCURRENCY = env_int("PROVISION_BATCH_CONCURRENCY", 4)
+# Bearer tokens accepted by the admin routes. The public SUPABASE_KEY never is.
+ADMIN_TOKENS = tuple(
+    token
+    for token in (os.environ.get("PROVISION_ADMIN_TOKEN"), os.environ.get("SUPABASE_SERVICE_ROLE_KEY"))
+    if token
+)
+
+# Bearer token for `/metrics`; without it only direct loopback clients may scrape.
+METRICS_TOKENS = tuple(token for token in (os.environ.get("METRICS_TOKEN"),) if token)
+FORWARDING_HEADERS = ("forwarded", "x-forwarded-for", "x-real-ip")
+
+
+def _bearer_token(request: Request) -> str:
+    scheme, _, token = request.headers.get("Authorization", "").partition(" ")
+    return token.strip() if scheme.lower() == "bearer" else ""
+
+
+def _token_allowed(request: Request, tokens: tuple) -> bool:
+    token = _bearer_token(request).encode()
+    return bool(token) and any(hmac.compare_digest(token, allowed.encode()) for allowed in tokens)
+
+
+def _direct_loopback(request: Request) -> bool:
+    """A client on this host, not a request relayed by a local reverse proxy."""
+
+    if any(header in request.headers for header in FORWARDING_HEADERS) or request.client is None:
+        return False
+    try:
+        return ipaddress.ip_address(request.client.host).is_loopback
+    except ValueError:
+        return False
+
+
+@contextlib.asynccontextmanager
+async def lifespan(_: FastAPI) -> AsyncIterator[None]:
+    """Share one admin client and run the provisioning workers when `api_app` is served on its own.
+
+    Inside the Reflex app both are started by the Reflex lifespan, since
+    Reflex does not run the lifespan of the mounted FastAPI app.
+    """
+
+    async with supabase_client.lifespan(), provision_jobs.lifespan(), tenant_archive.lifespan():
+        yield
+
+
+api_app = FastAPI(lifespan=lifespan)
+
+REGISTRY.register(
+    CallbackGauge(
+        "provision_queue_depth",
+        "Provisioning jobs waiting in this process's in-memory queue.",
+        lambda: {(): provision_jobs.stats().get("queue_depth", 0)},
+    )
+)
+REGISTRY.register(
+    CallbackGauge(
+        "supabase_executor_tasks",
+        "Blocking Supabase calls queued for or running on the executor.",
+        lambda: {
+            (state,): supabase_client.executor.stats()[key]
+            for state, key in (("queued", "queue_depth"), ("running", "running"))
+        },
+        labels=("state",),
+    )
+)
+REGISTRY.register(
+    CallbackGauge(
+        "supabase_breaker_open",
+        "1 while the Supabase circuit breaker rejects calls.",
+        lambda: {(): float(supabase_client.breaker.state == supabase_client.breaker.OPEN)},
+    )
+)
+REGISTRY.register(
+    CallbackGauge(
+        "tenant_spares_available",
+        "Pre-built spare tenant schemas last seen ready to claim.",
+        lambda: {(): supabase_client.spare_pool.available or 0},
+    )
+)
+
 
-api_app = FastAPI()
+@api_app.get("/metrics")
+async def metrics_route(request: Request) -> PlainTextResponse:
+    """Prometheus text exposition of the process metrics.
+
+    With `METRICS_TOKEN` set the scraper must send it as a bearer token;
+    without it only direct loopback clients are served.
+    """
+    if METRICS_TOKENS:
+        if not _token_allowed(request, METRICS_TOKENS):
+            return PlainTextResponse("Unauthorized", status_code=401, headers={"WWW-Authenticate": "Bearer"})
+    elif not _direct_loopback(request):
+        return PlainTextResponse("Forbidden", status_code=403)
+    return PlainTextResponse(REGISTRY.render(), media_type="text/plain; version=0.0.4")
 
 
 @api_app.post("/api/provision_org")
-async def provision_org_route(request: Request) -> Response:
-    """API endpoint to provision a new organization schema in Supabase."""
+async def provision_org_route(request: Request) -> JSONResponse:
+    """Queue provisioning of a new organization schema; answers 202 with the job id.
+
+    A repeated request with the same `Idempotency-Key` header gets the job of
+    the first one back (marked with `Idempotent-Replayed: true`).
+    """
     try:
         body = await request.json()
         boteco_username = body.get("boteco_username")
-        if not boteco_username or not re.match("^[a-zA-Z0-9_]+$", boteco_username):
-            return Response(
-                content='{"error": "Invalid boteco_username format. Use only alphanumeric characters and underscores."}',
+        if not validate_username(boteco_username):
+            return JSONResponse(
+                {
+                    "error": "Invalid boteco_username format. Use 3-30 alphanumeric characters or "
+                    "underscores, starting with a letter or digit."
+                },
                 status_code=400,
-                media_type="application/json",
             )
-        supabase_url = os.getenv("SUPABASE_URL")
-        supabase_key = os.getenv("SUPABASE_SERVICE_ROLE_KEY", os.getenv("SUPABASE_KEY"))
-        if not supabase_url or not supabase_key:
+        if not supabase_client.is_configured:
             logging.error("Supabase URL or Key not configured for provisioning.")
-            return Response(
-                content='{"error": "Server configuration error"}',
-                status_code=500,
-                media_type="application/json",
+            return JSONResponse({"error": "Server configuration error"}, status_code=500)
+
+        async def submit() -> dict:
+            job = await provision_jobs.submit(boteco_username)
+            logging.info(f"Queued provisioning job {job.id} for {boteco_username}")
+            return {"job_id": job.id, "boteco_username": boteco_username, "status": job.status}
+
+        idempotency_key = request.headers.get("Idempotency-Key") or body.get("idempotency_key")
+        accepted, replayed = await supabase_client.idempotency.run(
+            "provision_org", idempotency_key, submit
+        )
+        if accepted["boteco_username"] != boteco_username:
+            return JSONResponse(
+                {"error": "Idempotency-Key was already used for a different boteco_username."},
+                status_code=422,
             )
-        schema_name = f"org_{boteco_username}"
-        sql_command = f'CREATE SCHEMA IF NOT EXISTS "{schema_name}";'
-        supabase_admin: Client = create_client(
-            supabase_url, supabase_key, options=ClientOptions(schema="reflex")
+        status = accepted["status"]
+        if replayed:
+            job = await provision_jobs.get(accepted["job_id"])
+            status = job.status if job is not None else status
+        status_url = f"/api/provision_org/{accepted['job_id']}"
+        headers = {"Location": status_url}
+        if replayed:
+            headers["Idempotent-Replayed"] = "true"
+        return JSONResponse(
+            {"job_id": accepted["job_id"], "status": status, "status_url": status_url},
+            status_code=202,
+            headers=headers,
+        )
+    except IdempotencyConflict as e:
+        return JSONResponse({"error": str(e)}, status_code=409)
+    except Exception as e:
+        logging.exception(f"Error queueing organization provisioning: {e}")
+        return JSONResponse({"error": f"Failed to queue provisioning: {str(e)}"}, status_code=500)
+
+
+@api_app.post("/api/provision_org/batch")
+async def provision_org_batch_route(request: Request):
+    """Provision a list of organizations, streaming one NDJSON line per tenant.
+
+    Tenants are provisioned in groups of `PROVISION_BATCH_GROUP_SIZE` per
+    transaction, `PROVISION_BATCH_CONCURRENCY` groups at a time; a failed
+    tenant is reported on its line and does not stop the others. The last
+    line is a summary. Requires `Authorization: Bearer` with
+    `PROVISION_ADMIN_TOKEN` or the service role key.
+    """
+    if not _token_allowed(request, ADMIN_TOKENS):
+        return JSONResponse(
+            {"error": "Admin token required."}, status_code=401, headers={"WWW-Authenticate": "Bearer"}
+        )
+    try:
+        body = await request.json()
+    except ValueError:
+        return JSONResponse({"error": "Invalid JSON body"}, status_code=400)
+    usernames = body.get("boteco_usernames") if isinstance(body, dict) else None
+    if not isinstance(usernames, list) or not usernames or not all(isinstance(u, str) for u in usernames):
+        return JSONResponse(
+            {"error": "boteco_usernames must be a non-empty list of strings."}, status_code=400
         )
-        response = await supabase_admin.rpc(
-            "execute_sql", {"sql_command": sql_command}
-        ).execute()
-        if response.error:
-            raise Exception(f"Supabase RPC error: {response.error.message}")
-        logging.info(f"Successfully provisioned schema: {schema_name}")
-        return Response(
-            content=f'{{"message": "Schema {schema_name} provisioned successfully"}}',
-            status_code=200,
-            media_type="application/json",
+    if len(usernames) > BATCH_MAX_TENANTS:
+        return JSONResponse(
+            {"error": f"Too many tenants in one batch (max {BATCH_MAX_TENANTS})."}, status_code=413
         )
+    if not supabase_client.is_configured:
+        logging.error("Supabase URL or Key not configured for provisioning.")
+        return JSONResponse({"error": "Server configuration error"}, status_code=500)
+
+    async def lines() -> AsyncIterator[str]:
+        started = time.perf_counter()
+        succeeded = failed = 0
+        async for line in provision_batch(
+            usernames,
+            supabase_client.provision_tenant_schemas,
+            group_size=BATCH_GROUP_SIZE,
+            concurrency=BATCH_CONCURRENCY,
+        ):
+            if line["status"] == SUCCEEDED:
+                succeeded += 1
+            else:
+                failed += 1
+            yield json.dumps(line) + "\n"
+        summary = {
+            "total": len(usernames),
+            "succeeded": succeeded,
+            "failed": failed,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        logging.info(f"Batch provisioning finished: {summary}")
+        yield json.dumps({"summary": summary}) + "\n"
+
+    return StreamingResponse(lines(), media_type="application/x-ndjson")
+
+
+@api_app.post("/api/tenants/{boteco_username}/activate")
+async def activate_tenant_route(boteco_username: str, request: Request) -> JSONResponse:
+    """Make sure the tenant schema exists before it is opened, restoring it if archived.
+
+    Call it on every tenant access: it records activity (used to pick
+    dormant tenants to archive) and answers from memory for tenants seen in
+    the last minute. Requires the same admin token as the batch route.
+    """
+    if not _token_allowed(request, ADMIN_TOKENS):
+        return JSONResponse(
+            {"error": "Admin token required."}, status_code=401, headers={"WWW-Authenticate": "Bearer"}
+        )
+    if not validate_username(boteco_username):
+        return JSONResponse({"error": "Invalid boteco_username format."}, status_code=400)
+    if not tenant_archive.is_configured:
+        return JSONResponse({"error": "Tenant archive not configured"}, status_code=503)
+    try:
+        result = await tenant_archive.ensure_active(f"org_{boteco_username}")
+    except TenantNotFound:
+        return JSONResponse({"error": "Tenant not found"}, status_code=404)
     except Exception as e:
-        logging.exception(f"Error provisioning organization: {e}")
-        return Response(
-            content=f'{{"error": "Failed to provision schema: {str(e)}"}}',
-            status_code=500,
-            media_type="application/json",
-        )
\ No newline at end of file
+        logging.exception(f"Error activating tenant {boteco_username}: {e}")
+        return JSONResponse({"error": "Failed to activate tenant"}, status_code=500)
+    return JSONResponse(
+        {"schema": result.schema, "restored": result.restored, "restore_ms": result.ms or None}
+    )
+
+
+@api_app.get("/api/provision_org/{job_id}")
+async def provision_status_route(job_id: str) -> JSONResponse:
+    """Report the status and timings of a provisioning job."""
+    job = await provision_jobs.get(job_id)
+    if job is None:
+        return JSONResponse({"error": "Provisioning job not found"}, status_code=404)
+    return JSONResponse(job.to_dict())
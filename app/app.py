@@ -15,6 +15,10 @@ from app.pages.onboarding.payment import payment_step
 from app.pages.onboarding.success import success_page
 from app.pages.dashboard import dashboard
 from app.api.provision import api_app
+from app.services.provision_jobs import provision_jobs
+from app.services.supabase_client import supabase_client
+from app.services.tenant_archive import tenant_archive
+from app.states.onboarding_state import ProvisionState
 from app.pages.auth.signup import signup_page
 from app.pages.auth.signin import signin_page
 
@@ -116,6 +120,9 @@ app = clerk.wrap_app(
     # add_clerk_pages=True,
 )
 app.api = api_app
+app.register_lifespan_task(supabase_client.lifespan)
+app.register_lifespan_task(provision_jobs.lifespan)
+app.register_lifespan_task(tenant_archive.lifespan)
 app.add_page(index, route="/")
 app.add_page(pricing, route="/pricing")
 app.add_page(about, route="/about")
@@ -129,7 +136,7 @@ app.add_page(plan_step, route="/onboarding/step-3-plan")
 # app.add_page(plan_step, route="/onboarding/step-3-plan", on_load=clerk.protect)
 app.add_page(payment_step, route="/onboarding/step-4-payment")
 # app.add_page(payment_step, route="/onboarding/step-4-payment", on_load=clerk.protect)
-app.add_page(success_page, route="/onboarding/success")
+app.add_page(success_page, route="/onboarding/success", on_load=ProvisionState.poll_provisioning)
 # app.add_page(success_page, route="/onboarding/success", on_load=clerk.protect)
 app.add_page(dashboard, route="/app", on_load=clerk.protect)
 app.add_page(signup_page, route="/signup")
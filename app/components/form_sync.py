@@ -0,0 +1,54 @@
+"""How onboarding and signup inputs push their value to the state.
+
+The submit handlers read every field from ``form_data``, so syncing on
+each keystroke only buys a websocket event and a state round trip per
+character. ``FORM_SYNC_MODE`` picks the trigger wired to the field setter:
+
+- ``auto`` (default): ``blur`` for live fields, whose value the page shows
+  something for while the form is filled in (the address of a CEP), and
+  ``submit`` for the others;
+- ``change``: every keystroke (the old behaviour);
+- ``debounce``: on change, after ``FORM_SYNC_DEBOUNCE_MS`` without typing;
+- ``blur``: once when the field loses focus;
+- ``submit``: never; the value only travels in the submit payload.
+
+With ``auto`` and ``submit``, values typed on a step and left with "Voltar"
+instead of submitting are not kept; ``blur`` keeps them.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Dict
+
+from app.utils.env import env_int
+
+SYNC_MODES = ("auto", "change", "debounce", "blur", "submit")
+DEFAULT_SYNC_MODE = "auto"
+
+
+def form_sync_mode() -> str:
+    mode = os.environ.get("FORM_SYNC_MODE", DEFAULT_SYNC_MODE).strip().lower() or DEFAULT_SYNC_MODE
+    if mode not in SYNC_MODES:
+        logging.warning("Invalid FORM_SYNC_MODE=%r, using %s.", mode, DEFAULT_SYNC_MODE)
+        return DEFAULT_SYNC_MODE
+    return mode
+
+
+def sync_triggers(setter: Any, mode: str | None = None, live: bool = False) -> Dict[str, Any]:
+    """Event triggers for an uncontrolled input bound to ``setter``.
+
+    ``live`` marks fields the page reacts to before the form is submitted.
+    """
+
+    mode = mode or form_sync_mode()
+    if mode == "auto":
+        mode = "blur" if live else "submit"
+    if mode == "change":
+        return {"on_change": setter}
+    if mode == "debounce":
+        return {"on_change": setter.debounce(max(0, env_int("FORM_SYNC_DEBOUNCE_MS", 400)))}
+    if mode == "blur":
+        return {"on_blur": setter}
+    return {}
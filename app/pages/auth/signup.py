@@ -1,7 +1,8 @@
 import reflex as rx
 
 from app.states.auth_state import AuthState
-from app.states.onboarding_state import OnboardingState
+from app.states.onboarding_state import OnboardingState, PersonalState
+from app.components.form_sync import sync_triggers
 from app.components.onboarding_stepper import onboarding_stepper
 
 
@@ -9,7 +10,7 @@ def form_field(
     label: str,
     placeholder: str,
     value: rx.Var,
-    on_change: rx.event.EventHandler,
+    setter: rx.event.EventHandler,
     name: str,
     field_type: str = "text",
 ) -> rx.Component:
@@ -19,7 +20,7 @@ def form_field(
         rx.el.label(label, class_name="block text-sm font-medium text-[#8C1D2C]"),
         rx.el.input(
             placeholder=placeholder,
-            on_change=on_change,
+            **sync_triggers(setter),
             name=name,
             type=field_type,
             class_name="mt-1 block w-full px-3 py-2 bg-white border border-gray-300 rounded-md shadow-sm focus:outline-none focus:ring-[#AA3140] focus:border-[#AA3140] sm:text-sm",
@@ -54,22 +55,22 @@ def signup_page() -> rx.Component:
                         form_field(
                             "Nome",
                             "",
-                            OnboardingState.personal_first_name,
-                            OnboardingState.set_personal_first_name,
+                            PersonalState.personal_first_name,
+                            PersonalState.set_personal_first_name,
                             name="personal_first_name",
                         ),
                         form_field(
                             "Sobrenome",
                             "",
-                            OnboardingState.personal_last_name,
-                            OnboardingState.set_personal_last_name,
+                            PersonalState.personal_last_name,
+                            PersonalState.set_personal_last_name,
                             name="personal_last_name",
                         ),
                         form_field(
                             "Email",
                             "",
-                            OnboardingState.personal_email,
-                            OnboardingState.set_personal_email,
+                            PersonalState.personal_email,
+                            PersonalState.set_personal_email,
                             name="personal_email",
                             field_type="email",
                         ),
@@ -89,30 +90,30 @@ def signup_page() -> rx.Component:
                         form_field(
                             "CPF",
                             "",
-                            OnboardingState.personal_tax_number,
-                            OnboardingState.set_personal_tax_number,
+                            PersonalState.personal_tax_number,
+                            PersonalState.set_personal_tax_number,
                             name="personal_tax_number",
                         ),
                         form_field(
                             "Data de Nascimento",
                             "",
-                            OnboardingState.personal_birth_date,
-                            OnboardingState.set_personal_birth_date,
+                            PersonalState.personal_birth_date,
+                            PersonalState.set_personal_birth_date,
                             name="personal_birth_date",
                             field_type="date",
                         ),
                         form_field(
                             "CEP",
                             "",
-                            OnboardingState.personal_postal_code,
-                            OnboardingState.set_personal_postal_code,
+                            PersonalState.personal_postal_code,
+                            PersonalState.set_personal_postal_code,
                             name="personal_postal_code",
                         ),
                         form_field(
                             "Número da Casa/Apto",
                             "",
-                            OnboardingState.personal_house_number,
-                            OnboardingState.set_personal_house_number,
+                            PersonalState.personal_house_number,
+                            PersonalState.set_personal_house_number,
                             name="personal_house_number",
                         ),
                         class_name="grid grid-cols-6 gap-6 mt-6",
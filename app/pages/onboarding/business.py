@@ -1,16 +1,20 @@
 import reflex as rx
 
-from app.states.onboarding_state import OnboardingState
+from app.states.onboarding_state import OnboardingState, BusinessState
+from app.components.form_sync import sync_triggers
 from app.components.onboarding_stepper import onboarding_stepper
+from app.utils.validators import client_validators_script
 
 
 def form_field(
     label: str,
     placeholder: str,
     value: rx.Var,
-    on_change: rx.event.EventHandler,
+    setter: rx.event.EventHandler,
     field_type: str = "text",
     name: str | None = None,
+    validate: str | None = None,
+    hint: rx.Var | None = None,
 ) -> rx.Component:
     """Reusable input field for the business step."""
 
@@ -18,12 +22,17 @@ def form_field(
         rx.el.label(label, class_name="block text-sm font-medium text-[#8C1D2C]"),
         rx.el.input(
             placeholder=placeholder,
-            on_change=on_change,
+            **sync_triggers(setter, live=hint is not None),
             type=field_type,
             name=name,
             class_name="mt-1 block w-full px-3 py-2 bg-white border border-gray-300 rounded-md shadow-sm focus:outline-none focus:ring-[#AA3140] focus:border-[#AA3140] sm:text-sm",
             default_value=value,
+            custom_attrs={"data-validate": validate} if validate else {},
         ),
+        # Read-only line under the field, e.g. the address of the CEP typed.
+        rx.cond(hint, rx.el.p(hint, class_name="mt-1 text-xs text-[#8C1D2C]/70"))
+        if hint is not None
+        else rx.fragment(),
         class_name="col-span-6 sm:col-span-3",
     )
 
@@ -56,44 +65,48 @@ def business_step() -> rx.Component:
                         form_field(
                             "Nome Público do Boteco",
                             "Ex: Bar do Jonas",
-                            OnboardingState.business_public_name,
-                            OnboardingState.set_business_public_name,
+                            BusinessState.business_public_name,
+                            BusinessState.set_business_public_name,
                             name="business_public_name",
                         ),
                         form_field(
                             "Username (@)",
                             "Ex: bardojonas",
-                            OnboardingState.business_username,
-                            OnboardingState.set_business_username,
+                            BusinessState.business_username,
+                            BusinessState.set_business_username,
                             name="business_username",
+                            validate="username",
                         ),
                         form_field(
                             "CNPJ do Estabelecimento",
                             "XX.XXX.XXX/XXXX-XX",
-                            OnboardingState.business_tax_number,
-                            OnboardingState.set_business_tax_number,
+                            BusinessState.business_tax_number,
+                            BusinessState.set_business_tax_number,
                             name="business_tax_number",
+                            validate="cpf_cnpj",
                         ),
                         form_field(
                             "Categoria de Serviço",
                             "Ex: Bar, Restaurante",
-                            OnboardingState.business_service_category,
-                            OnboardingState.set_business_service_category,
+                            BusinessState.business_service_category,
+                            BusinessState.set_business_service_category,
                             name="business_service_category",
                         ),
                         form_field(
                             "País",
                             "Brasil",
-                            OnboardingState.business_country,
-                            OnboardingState.set_business_country,
+                            BusinessState.business_country,
+                            BusinessState.set_business_country,
                             name="business_country",
                         ),
                         form_field(
                             "CEP",
                             "XXXXX-XXX",
-                            OnboardingState.business_postal_code,
-                            OnboardingState.set_business_postal_code,
+                            BusinessState.business_postal_code,
+                            BusinessState.lookup_business_postal_code,
                             name="business_postal_code",
+                            validate="postal_code",
+                            hint=BusinessState.business_address,
                         ),
                         rx.el.div(
                             rx.el.label(
@@ -103,9 +116,9 @@ def business_step() -> rx.Component:
                             rx.el.input(
                                 placeholder="Ex: descontraído, música ao vivo, cerveja artesanal",
                                 name="business_vibe_tags",
-                                on_change=OnboardingState.set_business_vibe_tags,
+                                **sync_triggers(BusinessState.set_business_vibe_tags),
                                 class_name="mt-1 block w-full px-3 py-2 bg-white border border-gray-300 rounded-md shadow-sm focus:outline-none focus:ring-[#AA3140] focus:border-[#AA3140] sm:text-sm",
-                                default_value=OnboardingState.business_vibe_tags,
+                                default_value=BusinessState.business_vibe_tags,
                             ),
                             class_name="col-span-6",
                         ),
@@ -124,8 +137,9 @@ def business_step() -> rx.Component:
                         ),
                         class_name="flex justify-end mt-8",
                     ),
-                    on_submit=OnboardingState.handle_business_submit,
+                    on_submit=BusinessState.handle_business_submit,
                 ),
+                rx.script(client_validators_script(), id="boteco-validators"),
                 class_name="max-w-2xl mx-auto p-8 bg-white rounded-xl shadow-md border border-gray-200/80",
             ),
             class_name="pb-16",
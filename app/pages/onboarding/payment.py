@@ -1,5 +1,5 @@
 import reflex as rx
-from app.states.onboarding_state import OnboardingState
+from app.states.onboarding_state import OnboardingState, PlanState
 from app.components.onboarding_stepper import onboarding_stepper
 
 
@@ -29,7 +29,7 @@ def payment_step() -> rx.Component:
                             "Plano Escolhido", class_name="font-semibold text-[#8C1D2C]"
                         ),
                         rx.el.p(
-                            OnboardingState.selected_plan,
+                            PlanState.selected_plan,
                             class_name="capitalize font-bold text-lg text-[#8C1D2C]",
                         ),
                         class_name="flex justify-between items-center p-4 bg-[#FFF7E8] border border-[#F2C94C]/60 rounded-lg",
@@ -107,7 +107,7 @@ def payment_step() -> rx.Component:
                         ),
                         class_name="flex justify-end mt-8",
                     ),
-                    on_submit=OnboardingState.handle_payment_submit,
+                    on_submit=PlanState.handle_payment_submit,
                 ),
                 class_name="max-w-2xl mx-auto p-8 mt-4 bg-white rounded-xl shadow-md border border-gray-200/80",
             ),
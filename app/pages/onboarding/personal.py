@@ -1,16 +1,20 @@
 import reflex as rx
-from app.states.onboarding_state import OnboardingState
+from app.states.onboarding_state import OnboardingState, PersonalState
+from app.components.form_sync import sync_triggers
 from app.components.onboarding_stepper import onboarding_stepper
+from app.utils.validators import client_validators_script
 
 
 def form_field(
     label: str,
     placeholder: str,
     value: rx.Var,
-    on_change: rx.event.EventHandler,
+    setter: rx.event.EventHandler,
     name: str,
     field_type: str = "text",
     disabled: bool = False,
+    validate: str | None = None,
+    hint: rx.Var | None = None,
 ) -> rx.Component:
     """Generic text field for the personal step."""
 
@@ -18,13 +22,18 @@ def form_field(
         rx.el.label(label, class_name="block text-sm font-medium text-[#8C1D2C]"),
         rx.el.input(
             placeholder=placeholder,
-            on_change=on_change,
+            **sync_triggers(setter, live=hint is not None),
             name=name,
             type=field_type,
             disabled=disabled,
             class_name="mt-1 block w-full px-3 py-2 bg-white border border-gray-300 rounded-md shadow-sm focus:outline-none focus:ring-[#AA3140] focus:border-[#AA3140] sm:text-sm disabled:bg-gray-100 disabled:text-gray-500",
             default_value=value,
+            custom_attrs={"data-validate": validate} if validate else {},
         ),
+        # Read-only line under the field, e.g. the address of the CEP typed.
+        rx.cond(hint, rx.el.p(hint, class_name="mt-1 text-xs text-[#8C1D2C]/70"))
+        if hint is not None
+        else rx.fragment(),
         class_name="col-span-6 sm:col-span-3",
     )
 
@@ -57,59 +66,62 @@ def personal_step() -> rx.Component:
                         form_field(
                             "Nome",
                             "",
-                            OnboardingState.personal_first_name,
-                            OnboardingState.set_personal_first_name,
+                            PersonalState.personal_first_name,
+                            PersonalState.set_personal_first_name,
                             name="personal_first_name",
                         ),
                         form_field(
                             "Sobrenome",
                             "",
-                            OnboardingState.personal_last_name,
-                            OnboardingState.set_personal_last_name,
+                            PersonalState.personal_last_name,
+                            PersonalState.set_personal_last_name,
                             name="personal_last_name",
                         ),
                         form_field(
                             "Email",
                             "",
-                            OnboardingState.personal_email,
-                            OnboardingState.set_personal_email,
+                            PersonalState.personal_email,
+                            PersonalState.set_personal_email,
                             name="personal_email",
                             field_type="email",
                         ),
                         form_field(
                             "CPF",
                             "XXX.XXX.XXX-XX",
-                            OnboardingState.personal_tax_number,
-                            OnboardingState.set_personal_tax_number,
+                            PersonalState.personal_tax_number,
+                            PersonalState.set_personal_tax_number,
                             name="personal_tax_number",
+                            validate="cpf_cnpj",
                         ),
                         form_field(
                             "Data de Nascimento",
                             "",
-                            OnboardingState.personal_birth_date,
-                            OnboardingState.set_personal_birth_date,
+                            PersonalState.personal_birth_date,
+                            PersonalState.set_personal_birth_date,
                             name="personal_birth_date",
                             field_type="date",
                         ),
                         form_field(
                             "País",
                             "Brasil",
-                            OnboardingState.personal_country,
-                            OnboardingState.set_personal_country,
+                            PersonalState.personal_country,
+                            PersonalState.set_personal_country,
                             name="personal_country",
                         ),
                         form_field(
                             "CEP",
                             "XXXXX-XXX",
-                            OnboardingState.personal_postal_code,
-                            OnboardingState.set_personal_postal_code,
+                            PersonalState.personal_postal_code,
+                            PersonalState.lookup_personal_postal_code,
                             name="personal_postal_code",
+                            validate="postal_code",
+                            hint=PersonalState.personal_address,
                         ),
                         form_field(
                             "Número da Casa/Apto",
                             "123",
-                            OnboardingState.personal_house_number,
-                            OnboardingState.set_personal_house_number,
+                            PersonalState.personal_house_number,
+                            PersonalState.set_personal_house_number,
                             name="personal_house_number",
                         ),
                         class_name="grid grid-cols-6 gap-6 mt-6",
@@ -131,8 +143,9 @@ def personal_step() -> rx.Component:
                         ),
                         class_name="flex justify-end mt-8",
                     ),
-                    on_submit=OnboardingState.handle_personal_submit,
+                    on_submit=PersonalState.handle_personal_submit,
                 ),
+                rx.script(client_validators_script(), id="boteco-validators"),
                 class_name="max-w-2xl mx-auto p-8 bg-white rounded-xl shadow-md border border-gray-200/80",
             ),
             class_name="pb-16",
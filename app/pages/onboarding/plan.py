@@ -1,6 +1,6 @@
 import reflex as rx
 
-from app.states.onboarding_state import OnboardingState
+from app.states.onboarding_state import OnboardingState, PlanState
 from app.components.onboarding_stepper import onboarding_stepper
 
 
@@ -13,7 +13,7 @@ def plan_onboarding_card(
 ) -> rx.Component:
     """Selectable pricing card for the onboarding flow."""
 
-    is_selected = OnboardingState.selected_plan == plan_id
+    is_selected = PlanState.selected_plan == plan_id
     return rx.el.div(
         rx.el.div(
             rx.el.h3(plan_name, class_name="text-xl font-bold text-[#8C1D2C]"),
@@ -56,7 +56,7 @@ def plan_onboarding_card(
                 "relative p-6 bg-white/70 rounded-xl shadow-md border border-gray-200/80 hover:shadow-lg hover:border-gray-300 transition-all cursor-pointer",
             ),
         ),
-        on_click=lambda: OnboardingState.set_selected_plan(plan_id),
+        on_click=lambda: PlanState.set_selected_plan(plan_id),
     )
 
 
@@ -119,8 +119,8 @@ def plan_step() -> rx.Component:
                     ),
                     rx.el.button(
                         "Continuar para Pagamento",
-                        on_click=OnboardingState.handle_plan_submit,
-                        is_disabled=OnboardingState.selected_plan == "",
+                        on_click=PlanState.handle_plan_submit,
+                        is_disabled=PlanState.selected_plan == "",
                         class_name="ml-4 inline-flex justify-center py-2 px-4 border border-transparent rounded-md shadow-sm text-sm font-medium text-white bg-[#8C1D2C] hover:bg-[#AA3140] disabled:bg-gray-400 disabled:cursor-not-allowed",
                     ),
                     class_name="flex justify-center mt-12",
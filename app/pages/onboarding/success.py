@@ -1,5 +1,49 @@
 import reflex as rx
 
+from app.states.onboarding_state import ProvisionState
+
+
+def provisioning_status() -> rx.Component:
+    """Progress of the tenant provisioning job queued at checkout."""
+
+    return rx.match(
+        ProvisionState.provision_status,
+        (
+            "succeeded",
+            rx.el.p(
+                rx.icon("circle-check", class_name="h-4 w-4 mr-2"),
+                "Ambiente do seu boteco provisionado.",
+                class_name="mt-4 flex items-center justify-center text-sm text-green-700",
+            ),
+        ),
+        (
+            "failed",
+            rx.el.p(
+                rx.icon("circle-alert", class_name="h-4 w-4 mr-2"),
+                "Não conseguimos concluir a preparação do ambiente. Nossa equipe foi avisada.",
+                class_name="mt-4 flex items-center justify-center text-sm text-[#AA3140]",
+            ),
+        ),
+        (
+            "timeout",
+            rx.el.p(
+                rx.icon("clock", class_name="h-4 w-4 mr-2"),
+                "A preparação do ambiente está demorando mais que o normal. Recarregue a página em alguns minutos para acompanhar.",
+                class_name="mt-4 flex items-center justify-center text-sm text-[#B3701A]",
+            ),
+        ),
+        (
+            "",
+            rx.fragment(),
+        ),
+        rx.el.p(
+            rx.icon("loader-circle", class_name="h-4 w-4 mr-2 animate-spin"),
+            "Preparando o ambiente do seu boteco...",
+            class_name="mt-4 flex items-center justify-center text-sm text-[#8C1D2C]/80",
+        ),
+    )
+
+
 
 def success_page() -> rx.Component:
     return rx.el.main(
@@ -18,6 +62,7 @@ def success_page() -> rx.Component:
                         "Tudo foi configurado com sucesso. Agora você está pronto para gerenciar seu negócio como um profissional.",
                         class_name="mt-2 text-center text-md text-[#8C1D2C]/80",
                     ),
+                    provisioning_status(),
                     rx.el.div(
                         rx.el.a(
                             "Ir para o Dashboard",
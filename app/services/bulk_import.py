@@ -0,0 +1,303 @@
+"""Bulk import of owners and their botecos from CSV or JSONL files.
+
+Each row mirrors the onboarding forms: ``personal_*`` columns describe the
+owner and the optional ``business_*`` columns plus ``plan`` describe their
+establishment. Rows are streamed, validated with `app.utils.validators` and
+written in chunked multi-row requests, so memory stays bounded by
+``chunk_size * concurrency`` no matter how large the file is.
+
+    python -m app.services.bulk_import owners.csv --errors errors.jsonl
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import csv
+import json
+import logging
+import sys
+import time
+from dataclasses import asdict, dataclass
+from itertools import islice
+from pathlib import Path
+from typing import Any, Awaitable, Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from app.services.models import UserRow
+from app.services.supabase_client import supabase_client
+from app.utils.validators import validate_cpf_cnpj, validate_postal_code, validate_username
+
+PLANS = ("boteco", "boteco_pro", "boteco_patrao", "boteco_babadeiro")
+
+Row = Tuple[int, Dict[str, Any]]  # (line number in the source file, raw fields)
+Item = Tuple[int, Dict[str, Any]]  # (line number, payload ready for Supabase)
+
+
+@dataclass(frozen=True)
+class RowError:
+    line: int
+    message: str
+    email: str = ""
+
+
+@dataclass
+class ImportReport:
+    rows_read: int = 0
+    users_upserted: int = 0
+    botecos_upserted: int = 0
+    memberships_created: int = 0
+    errors: int = 0
+    elapsed: float = 0.0
+
+
+def _text(raw: Dict[str, Any], key: str, default: str = "") -> str:
+    value = raw.get(key)
+    return default if value is None else str(value).strip() or default
+
+
+def build_user_payload(raw: Dict[str, Any]) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Validate the owner columns of a row and build the `users` payload."""
+
+    first_name = _text(raw, "personal_first_name")
+    last_name = _text(raw, "personal_last_name")
+    email = _text(raw, "personal_email").lower()
+    tax_number = _text(raw, "personal_tax_number")
+    birth_date = _text(raw, "personal_birth_date")
+    postal_code = _text(raw, "personal_postal_code")
+    house_number = _text(raw, "personal_house_number")
+
+    if not all([first_name, last_name, email, tax_number, birth_date, postal_code, house_number]):
+        return {}, "Campos obrigatórios do responsável ausentes."
+    if not validate_cpf_cnpj(tax_number):
+        return {}, "CPF ou CNPJ inválido."
+    if not validate_postal_code(postal_code):
+        return {}, "CEP inválido."
+
+    username = _text(raw, "personal_username") or f"{first_name.lower()}.{last_name.lower()}{tax_number[:4]}"
+    return {
+        "email": email,
+        "username": username,
+        "tax_number": tax_number,
+        "first_name": first_name,
+        "last_name": last_name,
+        "birth_date": birth_date,
+        "country": _text(raw, "personal_country", "Brasil"),
+        "postal_code": postal_code,
+        "house_number": house_number,
+        "is_owner": True,
+    }, None
+
+
+def build_boteco_payload(
+    raw: Dict[str, Any], owner: UserRow
+) -> Tuple[Dict[str, Any], Optional[str]]:
+    """Validate the establishment columns of a row and build the `boteco` payload."""
+
+    public_name = _text(raw, "business_public_name")
+    username = _text(raw, "business_username")
+    service_category = _text(raw, "business_service_category")
+    tax_number = _text(raw, "business_tax_number")
+    postal_code = _text(raw, "business_postal_code")
+    plan = _text(raw, "plan")
+
+    if not all([public_name, username, service_category, postal_code, plan]):
+        return {}, "Campos obrigatórios do estabelecimento ausentes."
+    if not validate_username(username):
+        return {}, "Username do estabelecimento inválido."
+    if tax_number and not validate_cpf_cnpj(tax_number):
+        return {}, "CNPJ do estabelecimento inválido."
+    if not validate_postal_code(postal_code):
+        return {}, "CEP do estabelecimento inválido."
+    if plan not in PLANS:
+        return {}, f"Plano inválido: {plan}."
+
+    tags = raw.get("business_vibe_tags") or []
+    if isinstance(tags, str):
+        tags = tags.split(",")
+    return {
+        "public_name": public_name,
+        "username": username,
+        "service_category": service_category,
+        "vibe_tags": [str(tag).strip() for tag in tags if str(tag).strip()],
+        "establishment_tax_number": tax_number or None,
+        "country": _text(raw, "business_country", "Brasil"),
+        "postal_code": postal_code,
+        "owner_tax_number": owner.tax_number,
+        "created_by_email": owner.email,
+        "created_by_user_id": owner.id,
+    }, None
+
+
+class BulkImporter:
+    """Stream rows into `users`, `boteco` and `user_boteco` with bounded concurrency."""
+
+    def __init__(
+        self,
+        client=supabase_client,
+        chunk_size: int = 500,
+        concurrency: int = 4,
+        on_error: Optional[Callable[[RowError], None]] = None,
+    ) -> None:
+        self.client = client
+        self.chunk_size = max(1, chunk_size)
+        self.concurrency = max(1, concurrency)
+        self.on_error = on_error
+        self.report = ImportReport()
+
+    def _error(self, line: int, message: str, email: str = "") -> None:
+        self.report.errors += 1
+        if self.on_error:
+            self.on_error(RowError(line, message, email))
+
+    def iter_file(self, path: Path) -> Iterator[Row]:
+        """Stream rows from a `.csv` or `.jsonl` file; unparsable lines become errors."""
+
+        suffix = path.suffix.lower()
+        if suffix not in (".csv", ".jsonl", ".ndjson"):
+            raise ValueError(f"Formato não suportado: {path.suffix}. Use .csv ou .jsonl.")
+        with path.open(encoding="utf-8", newline="") as handle:
+            if suffix == ".csv":
+                reader = csv.DictReader(handle)
+                for raw in reader:
+                    yield reader.line_num, raw
+                return
+            for line_number, line in enumerate(handle, start=1):
+                if not line.strip():
+                    continue
+                try:
+                    raw = json.loads(line)
+                except json.JSONDecodeError as exc:
+                    self._error(line_number, f"JSON inválido: {exc.msg}")
+                    continue
+                if not isinstance(raw, dict):
+                    self._error(line_number, "Cada linha deve ser um objeto JSON.")
+                    continue
+                yield line_number, raw
+
+    async def run(self, rows: Iterable[Row]) -> ImportReport:
+        """Import every row; per-row failures are reported without stopping the batch."""
+
+        started = time.perf_counter()
+        queue: asyncio.Queue[Optional[List[Row]]] = asyncio.Queue(maxsize=self.concurrency)
+
+        async def worker() -> None:
+            while (chunk := await queue.get()) is not None:
+                try:
+                    await self._process_chunk(chunk)
+                except Exception as exc:  # pragma: no cover - defensive guard
+                    logging.exception("Bulk import chunk failed: %s", exc)
+                    for line, raw in chunk:
+                        self._error(line, f"Falha inesperada: {exc}", _text(raw, "personal_email"))
+
+        workers = [asyncio.create_task(worker()) for _ in range(self.concurrency)]
+        iterator = iter(rows)
+        try:
+            while chunk := list(islice(iterator, self.chunk_size)):
+                self.report.rows_read += len(chunk)
+                await queue.put(chunk)
+        finally:
+            for _ in workers:
+                await queue.put(None)
+            await asyncio.gather(*workers)
+        self.report.elapsed = time.perf_counter() - started
+        return self.report
+
+    async def _write_isolating(
+        self,
+        items: List[Item],
+        call: Callable[[List[Dict[str, Any]]], Awaitable[List[Any]]],
+    ) -> List[Any]:
+        """Write ``items`` in one request; on failure bisect to find the bad rows."""
+
+        if not items:
+            return []
+        try:
+            return await call([payload for _, payload in items])
+        except Exception as exc:
+            if len(items) == 1:
+                line, payload = items[0]
+                self._error(line, str(exc), payload.get("email") or payload.get("created_by_email", ""))
+                return []
+            middle = len(items) // 2
+            first = await self._write_isolating(items[:middle], call)
+            return first + await self._write_isolating(items[middle:], call)
+
+    async def _process_chunk(self, chunk: List[Row]) -> None:
+        users: List[Item] = []
+        raw_by_email: Dict[str, Tuple[int, Dict[str, Any]]] = {}
+        for line, raw in chunk:
+            user, error = build_user_payload(raw)
+            if error:
+                self._error(line, error, _text(raw, "personal_email"))
+            elif user["email"] in raw_by_email:
+                self._error(line, "Email repetido no mesmo lote.", user["email"])
+            else:
+                raw_by_email[user["email"]] = (line, raw)
+                users.append((line, user))
+
+        saved_users = await self._write_isolating(users, self.client.upsert_users)
+        self.report.users_upserted += len(saved_users)
+
+        botecos: List[Item] = []
+        plan_by_username: Dict[str, str] = {}
+        for owner in saved_users:
+            line, raw = raw_by_email[owner.email]
+            if not _text(raw, "business_username"):
+                continue
+            boteco, error = build_boteco_payload(raw, owner)
+            if error:
+                self._error(line, error, owner.email)
+            elif boteco["username"] in plan_by_username:
+                self._error(line, "Username de estabelecimento repetido no mesmo lote.", owner.email)
+            else:
+                plan_by_username[boteco["username"]] = _text(raw, "plan")
+                botecos.append((line, boteco))
+
+        saved_botecos = await self._write_isolating(botecos, self.client.upsert_botecos)
+        self.report.botecos_upserted += len(saved_botecos)
+
+        line_by_username = {boteco["username"]: line for line, boteco in botecos}
+        memberships: List[Item] = [
+            (
+                line_by_username[boteco.username],
+                {
+                    "user_id": boteco.created_by_user_id,
+                    "boteco_id": boteco.id,
+                    "assigned_role": "owner",
+                    "plan": plan_by_username[boteco.username],
+                },
+            )
+            for boteco in saved_botecos
+        ]
+        created = await self._write_isolating(memberships, self.client.ensure_memberships)
+        self.report.memberships_created += len(created)
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Importa responsáveis e botecos em lote.")
+    parser.add_argument("path", type=Path, help="Arquivo .csv ou .jsonl")
+    parser.add_argument("--chunk-size", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--errors", type=Path, help="Grava os erros por linha em JSONL (padrão: stderr)")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    error_stream = args.errors.open("w", encoding="utf-8") if args.errors else sys.stderr
+
+    def write_error(error: RowError) -> None:
+        error_stream.write(json.dumps(asdict(error), ensure_ascii=False) + "\n")
+
+    importer = BulkImporter(
+        chunk_size=args.chunk_size, concurrency=args.concurrency, on_error=write_error
+    )
+    try:
+        report = asyncio.run(importer.run(importer.iter_file(args.path)))
+    finally:
+        if args.errors:
+            error_stream.close()
+    print(json.dumps(asdict(report)))
+    return 1 if report.errors else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
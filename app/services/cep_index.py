@@ -0,0 +1,302 @@
+"""Offline CEP lookup: a sorted binary index, memory-mapped and bisected.
+
+`build_cep_index` turns a CSV dump of the postal database (one row per CEP:
+``cep``, ``logradouro``, ``bairro``, ``cidade``, ``uf``) into one file:
+
+- a 32-byte header (``BOTECEP1``, counts and section offsets);
+- every CEP as a sorted little-endian ``uint32``;
+- per CEP, a ``uint32`` offset of its record in the string heap;
+- per city/UF pair, a ``uint32`` offset of its record in the heap;
+- the heap: ``uint16`` city index + length-prefixed street and
+  neighbourhood per CEP, length-prefixed city + 2-byte UF per city.
+
+`CepIndex` maps the file read-only and bisects the CEP array in place, so a
+lookup touches a handful of pages and never parses or loads the dump. The
+page cache is shared between the app workers, and pages that were never
+looked up are never read from disk.
+
+``CEP_INDEX_PATH`` points at the file (default ``data/cep.idx``). Without
+it, lookups return ``None`` and `postal_code_exists` falls back to the
+8-digit format check.
+
+    python -m app.services.cep_index build ceps.csv --output data/cep.idx
+    python -m app.services.cep_index lookup 01001-000
+"""
+
+from __future__ import annotations
+
+import argparse
+import bisect
+import csv
+import json
+import logging
+import mmap
+import os
+import re
+import struct
+import sys
+import time
+from dataclasses import asdict, dataclass
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from app.utils.validators import validate_postal_code
+
+MAGIC = b"BOTECEP1"
+# magic, CEP count, city count, then the offsets of the CEP, record and city arrays and of the heap.
+_HEADER = struct.Struct("<8s6I")
+_U8 = struct.Struct("<B")
+_U16 = struct.Struct("<H")
+_U32 = struct.Struct("<I")
+_NON_DIGIT_RE = re.compile(r"\D", re.ASCII)
+
+# Accepted CSV header names per field, the Correios/DNE names first.
+CSV_COLUMNS = {
+    "cep": ("cep", "postal_code", "zipcode"),
+    "street": ("logradouro", "street", "endereco", "address"),
+    "neighborhood": ("bairro", "neighborhood", "district"),
+    "city": ("cidade", "localidade", "municipio", "city"),
+    "state": ("uf", "estado", "state"),
+}
+
+
+@dataclass(frozen=True)
+class CepAddress:
+    cep: str
+    street: str
+    neighborhood: str
+    city: str
+    state: str
+
+    def label(self) -> str:
+        """One line for the form: ``Rua X, Bairro - Cidade/UF``."""
+
+        place = ", ".join(part for part in (self.street, self.neighborhood) if part)
+        locality = f"{self.city}/{self.state}"
+        return f"{place} - {locality}" if place else locality
+
+
+def _cep_key(postal_code: str) -> Optional[int]:
+    digits = _NON_DIGIT_RE.sub("", postal_code or "")
+    return int(digits) if len(digits) == 8 else None
+
+
+def _short_string(value: str) -> bytes:
+    """Length-prefixed UTF-8, cut to 255 bytes on a character boundary."""
+
+    raw = value.strip().encode("utf-8")[:255].decode("utf-8", "ignore").encode("utf-8")
+    return _U8.pack(len(raw)) + raw
+
+
+def build_cep_index(rows: Iterable[Tuple[str, str, str, str, str]], output: Path) -> int:
+    """Write the index for ``(cep, street, neighborhood, city, uf)`` rows; returns the CEP count.
+
+    Rows with a malformed CEP are skipped and the first row of a repeated CEP
+    wins. The file is written next to ``output`` and renamed over it, so a
+    running app never maps a half-written index.
+    """
+
+    entries: Dict[int, Tuple[str, str, str, str]] = {}
+    for cep, street, neighborhood, city, state in rows:
+        key = _cep_key(cep)
+        if key is not None and key not in entries:
+            entries[key] = (street or "", neighborhood or "", (city or "").strip(), (state or "").strip().upper())
+
+    cities: Dict[Tuple[str, str], int] = {}
+    for _, _, city, state in entries.values():
+        cities.setdefault((city, state), len(cities))
+    if len(cities) > 0xFFFF:
+        raise ValueError(f"{len(cities)} cities do not fit the uint16 city index")
+
+    keys = sorted(entries)
+    count = len(keys)
+    ceps_offset = _HEADER.size
+    records_offset = ceps_offset + 4 * count
+    cities_offset = records_offset + 4 * count
+    heap_offset = cities_offset + 4 * len(cities)
+
+    heap = bytearray()
+    record_offsets = []
+    for key in keys:
+        street, neighborhood, city, state = entries[key]
+        record_offsets.append(len(heap))
+        heap += _U16.pack(cities[(city, state)]) + _short_string(street) + _short_string(neighborhood)
+    city_offsets = []
+    for city, state in cities:
+        city_offsets.append(len(heap))
+        heap += _short_string(city) + state.encode("ascii", "replace")[:2].ljust(2)
+
+    output = Path(output)
+    output.parent.mkdir(parents=True, exist_ok=True)
+    partial = output.with_name(output.name + ".tmp")
+    with open(partial, "wb") as handle:
+        handle.write(
+            _HEADER.pack(MAGIC, count, len(cities), ceps_offset, records_offset, cities_offset, heap_offset)
+        )
+        handle.write(struct.pack(f"<{count}I", *keys))
+        handle.write(struct.pack(f"<{count}I", *record_offsets))
+        handle.write(struct.pack(f"<{len(city_offsets)}I", *city_offsets))
+        handle.write(heap)
+        handle.flush()
+        os.fsync(handle.fileno())
+    os.replace(partial, output)
+    return count
+
+
+def read_cep_csv(path: Path, delimiter: Optional[str] = None) -> Iterable[Tuple[str, str, str, str, str]]:
+    """Rows of a CEP dump with a header line; the delimiter is sniffed when not given."""
+
+    with open(path, newline="", encoding="utf-8-sig") as handle:
+        if delimiter is None:
+            delimiter = csv.Sniffer().sniff(handle.read(64 * 1024), delimiters=",;|\t").delimiter
+            handle.seek(0)
+        reader = csv.reader(handle, delimiter=delimiter)
+        header = [name.strip().lower() for name in next(reader, [])]
+        positions = []
+        for field, aliases in CSV_COLUMNS.items():
+            matches = [header.index(alias) for alias in aliases if alias in header]
+            if not matches:
+                raise ValueError(f"{path}: no column for {field} (expected one of {', '.join(aliases)})")
+            positions.append(matches[0])
+        width = max(positions) + 1
+        for row in reader:
+            if len(row) >= width:
+                yield tuple(row[position] for position in positions)
+
+
+class CepIndex:
+    """Read-only view of an index file; safe to share between coroutines."""
+
+    def __init__(self, path: Path) -> None:
+        self.path = Path(path)
+        with open(self.path, "rb") as handle:
+            self._mmap = mmap.mmap(handle.fileno(), 0, access=mmap.ACCESS_READ)
+        try:
+            magic, count, city_count, ceps, records, cities, heap = _HEADER.unpack_from(self._mmap)
+            if magic != MAGIC or heap > len(self._mmap):
+                raise ValueError(f"{self.path} is not a CEP index")
+            self._view = memoryview(self._mmap)
+            if sys.byteorder == "little" and _U32.size == struct.calcsize("I"):
+                # Native uint32 view: bisect runs straight on the mapped pages.
+                self._ceps = self._view[ceps : ceps + 4 * count].cast("I")
+            else:  # pragma: no cover - big-endian hosts
+                self._ceps = [value for (value,) in _U32.iter_unpack(self._view[ceps : ceps + 4 * count])]
+        except Exception:
+            self.close()
+            raise
+        self._count = count
+        self._records = records
+        self._cities = cities
+        self._heap = heap
+
+    def __len__(self) -> int:
+        return self._count
+
+    def __contains__(self, postal_code: str) -> bool:
+        return self._position(postal_code) is not None
+
+    def _position(self, postal_code: str) -> Optional[int]:
+        key = _cep_key(postal_code)
+        if key is None:
+            return None
+        position = bisect.bisect_left(self._ceps, key)
+        if position < self._count and self._ceps[position] == key:
+            return position
+        return None
+
+    def _string(self, offset: int) -> Tuple[str, int]:
+        length = self._mmap[offset]
+        end = offset + 1 + length
+        return self._mmap[offset + 1 : end].decode("utf-8"), end
+
+    def lookup(self, postal_code: str) -> Optional[CepAddress]:
+        """Address of a CEP (any punctuation), or ``None`` when it does not exist."""
+
+        position = self._position(postal_code)
+        if position is None:
+            return None
+        (record,) = _U32.unpack_from(self._mmap, self._records + 4 * position)
+        offset = self._heap + record
+        (city_index,) = _U16.unpack_from(self._mmap, offset)
+        street, offset = self._string(offset + 2)
+        neighborhood, _ = self._string(offset)
+        (city_record,) = _U32.unpack_from(self._mmap, self._cities + 4 * city_index)
+        city, offset = self._string(self._heap + city_record)
+        state = self._mmap[offset : offset + 2].decode("ascii").strip()
+        return CepAddress(f"{self._ceps[position]:08d}", street, neighborhood, city, state)
+
+    def close(self) -> None:
+        for name in ("_ceps", "_view"):
+            view = getattr(self, name, None)
+            if isinstance(view, memoryview):
+                view.release()
+        self._mmap.close()
+
+
+def build_cep_lookup() -> Optional[CepIndex]:
+    path = Path(os.environ.get("CEP_INDEX_PATH", "data/cep.idx"))
+    if not path.exists():
+        logging.info("CEP index %s not found; CEPs are only checked for 8 digits.", path)
+        return None
+    try:
+        return CepIndex(path)
+    except (OSError, ValueError) as exc:
+        logging.warning("Could not open CEP index %s: %s", path, exc)
+        return None
+
+
+cep_lookup = build_cep_lookup()
+
+
+def lookup_postal_code(postal_code: str) -> Optional[CepAddress]:
+    """Address of a CEP from the local index; ``None`` if unknown or no index is installed."""
+
+    if cep_lookup is None:
+        return None
+    return cep_lookup.lookup(postal_code)
+
+
+def postal_code_exists(postal_code: str) -> bool:
+    """Whether the CEP is well formed and, when an index is installed, listed in it."""
+
+    if not validate_postal_code(postal_code):
+        return False
+    return cep_lookup is None or postal_code in cep_lookup
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Gera e consulta o índice local de CEPs.")
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="Converte um CSV de CEPs no formato do índice")
+    build.add_argument("csv", type=Path)
+    build.add_argument("--output", type=Path, default=Path(os.environ.get("CEP_INDEX_PATH", "data/cep.idx")))
+    build.add_argument("--delimiter", help="Separador do CSV (padrão: detectado)")
+    lookup = commands.add_parser("lookup", help="Consulta CEPs no índice")
+    lookup.add_argument("ceps", nargs="+")
+    lookup.add_argument("--index", type=Path, default=Path(os.environ.get("CEP_INDEX_PATH", "data/cep.idx")))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if args.command == "build":
+        started = time.perf_counter()
+        count = build_cep_index(read_cep_csv(args.csv, args.delimiter), args.output)
+        report = {
+            "output": str(args.output),
+            "ceps": count,
+            "bytes": args.output.stat().st_size,
+            "seconds": round(time.perf_counter() - started, 3),
+        }
+        print(json.dumps(report))
+        return 0
+
+    index = CepIndex(args.index)
+    try:
+        found = {cep: index.lookup(cep) for cep in args.ceps}
+    finally:
+        index.close()
+    print(json.dumps({cep: asdict(address) if address else None for cep, address in found.items()}, ensure_ascii=False))
+    return 0 if all(found.values()) else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,107 @@
+"""Bounded thread pool for running blocking client calls off the event loop."""
+
+from __future__ import annotations
+
+import asyncio
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Any, Callable, Optional, TypeVar
+
+T = TypeVar("T")
+
+
+class BlockingCallExecutor:
+    """Run synchronous callables on a fixed-size thread pool and track saturation.
+
+    Reflex event handlers share one event loop, so a blocking `.execute()` call
+    stalls every connected session. Routing those calls through this executor
+    keeps the loop free while capping how many run against the backend at once.
+    """
+
+    def __init__(self, max_workers: int, thread_name_prefix: str = "blocking-call") -> None:
+        self.max_workers = max(1, max_workers)
+        self.thread_name_prefix = thread_name_prefix
+        self._pool: Optional[ThreadPoolExecutor] = None
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._max_queue_depth = 0
+        self._submitted = 0
+        self._completed = 0
+        self._failed = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+
+    def _get_pool(self) -> ThreadPoolExecutor:
+        with self._lock:
+            if self._pool is None:
+                self._pool = ThreadPoolExecutor(
+                    max_workers=self.max_workers, thread_name_prefix=self.thread_name_prefix
+                )
+            return self._pool
+
+    async def run(self, fn: Callable[..., T], *args: Any) -> T:
+        """Run ``fn(*args)`` on a worker thread and await its result."""
+
+        submitted_at = time.perf_counter()
+
+        def task() -> T:
+            wait = time.perf_counter() - submitted_at
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+                self._total_wait += wait
+                self._max_wait = max(self._max_wait, wait)
+            ok = False
+            try:
+                result = fn(*args)
+                ok = True
+                return result
+            finally:
+                with self._lock:
+                    self._running -= 1
+                    if ok:
+                        self._completed += 1
+                    else:
+                        self._failed += 1
+
+        pool = self._get_pool()
+        with self._lock:
+            self._submitted += 1
+            self._queued += 1
+            self._max_queue_depth = max(self._max_queue_depth, self._queued)
+        future = pool.submit(task)
+        future.add_done_callback(self._on_done)
+        return await asyncio.wrap_future(future)
+
+    def _on_done(self, future: Future) -> None:
+        # A future cancelled before a worker picked it up never ran `task`.
+        if future.cancelled():
+            with self._lock:
+                self._queued -= 1
+
+    def stats(self) -> dict[str, float]:
+        """Snapshot of queue depth, wait times and throughput counters."""
+
+        with self._lock:
+            started = self._completed + self._failed + self._running
+            return {
+                "max_workers": self.max_workers,
+                "queue_depth": self._queued,
+                "max_queue_depth": self._max_queue_depth,
+                "running": self._running,
+                "submitted": self._submitted,
+                "completed": self._completed,
+                "failed": self._failed,
+                "avg_wait_ms": (self._total_wait / started * 1000) if started else 0.0,
+                "max_wait_ms": self._max_wait * 1000,
+            }
+
+    def shutdown(self, wait: bool = True) -> None:
+        """Stop the worker threads; the pool is recreated on the next call."""
+
+        with self._lock:
+            pool, self._pool = self._pool, None
+        if pool is not None:
+            pool.shutdown(wait=wait)
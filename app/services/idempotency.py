@@ -0,0 +1,195 @@
+"""Idempotency keys: run a side-effecting call once per key and replay its outcome."""
+
+from __future__ import annotations
+
+import asyncio
+import json
+import logging
+import os
+import time
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Protocol, Tuple
+
+from app.services.singleflight import SingleFlight
+from app.utils.env import env_float, env_int
+
+PENDING = "pending"
+DONE = "done"
+
+
+class IdempotencyConflict(RuntimeError):
+    """Another request with the same key is still running."""
+
+
+class IdempotencyStore(Protocol):
+    async def get(self, key: str) -> Optional[Dict[str, Any]]: ...
+
+    async def claim(self, key: str, ttl: float) -> bool: ...
+
+    async def save(self, key: str, record: Dict[str, Any], ttl: float) -> None: ...
+
+    async def release(self, key: str) -> None: ...
+
+    async def aclose(self) -> None: ...
+
+
+class InMemoryIdempotencyStore:
+    """Process-local records, for tests and single-process development.
+
+    Records expire after their ttl; beyond ``maxsize`` the oldest are dropped.
+    """
+
+    def __init__(self, maxsize: int = 10_000, clock: Callable[[], float] = time.monotonic) -> None:
+        self.maxsize = max(1, maxsize)
+        self._clock = clock
+        self._records: "OrderedDict[str, tuple[float, Dict[str, Any]]]" = OrderedDict()
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        entry = self._records.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self._clock():
+            del self._records[key]
+            return None
+        return entry[1]
+
+    async def claim(self, key: str, ttl: float) -> bool:
+        if await self.get(key) is not None:
+            return False
+        await self.save(key, {"status": PENDING}, ttl)
+        return True
+
+    async def save(self, key: str, record: Dict[str, Any], ttl: float) -> None:
+        self._records[key] = (self._clock() + ttl, record)
+        self._records.move_to_end(key)
+        while len(self._records) > self.maxsize:
+            self._records.popitem(last=False)
+
+    async def release(self, key: str) -> None:
+        self._records.pop(key, None)
+
+    def __len__(self) -> int:
+        return len(self._records)
+
+    async def aclose(self) -> None:
+        return None
+
+
+class RedisIdempotencyStore:
+    """Records in Redis, shared by every backend process.
+
+    ``claim`` is a `SET NX` of a pending marker that expires after the lock
+    ttl, so a process that dies mid-request does not block the key forever.
+    """
+
+    def __init__(self, url: str, prefix: str = "boteco:idempotency:") -> None:
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url, decode_responses=True)
+        self.prefix = prefix
+
+    async def get(self, key: str) -> Optional[Dict[str, Any]]:
+        raw = await self._redis.get(self.prefix + key)
+        return json.loads(raw) if raw else None
+
+    async def claim(self, key: str, ttl: float) -> bool:
+        marker = json.dumps({"status": PENDING})
+        return bool(await self._redis.set(self.prefix + key, marker, nx=True, px=int(ttl * 1000)))
+
+    async def save(self, key: str, record: Dict[str, Any], ttl: float) -> None:
+        await self._redis.set(self.prefix + key, json.dumps(record), px=int(ttl * 1000))
+
+    async def release(self, key: str) -> None:
+        await self._redis.delete(self.prefix + key)
+
+    async def aclose(self) -> None:
+        close = getattr(self._redis, "aclose", None) or self._redis.close
+        await close()
+
+
+def build_idempotency_store() -> IdempotencyStore:
+    """Redis store at ``IDEMPOTENCY_STORE_URL`` (or ``REFLEX_REDIS_URL``), else in memory."""
+
+    url = os.environ.get("IDEMPOTENCY_STORE_URL") or os.environ.get("REFLEX_REDIS_URL")
+    if url:
+        try:
+            return RedisIdempotencyStore(url)
+        except ImportError:
+            logging.warning("redis package not installed; idempotency keys stay in memory.")
+    return InMemoryIdempotencyStore(maxsize=env_int("IDEMPOTENCY_MAXSIZE", 10_000))
+
+
+class Idempotency:
+    """Run ``fn`` at most once per (scope, key) and replay its stored result.
+
+    Successful results are kept for ``ttl`` seconds; failures are forgotten so
+    the caller can retry with the same key. Duplicates that arrive while the
+    first call is running share it (in the same process) or wait up to
+    ``lock_ttl`` seconds for its outcome (across processes) before raising
+    `IdempotencyConflict`. Results must be JSON-serializable.
+    """
+
+    def __init__(
+        self,
+        store: IdempotencyStore,
+        ttl: float = 86_400.0,
+        lock_ttl: float = 30.0,
+        poll_interval: float = 0.05,
+    ) -> None:
+        self.store = store
+        self.ttl = ttl
+        self.lock_ttl = lock_ttl
+        self.poll_interval = poll_interval
+        self._flight = SingleFlight()
+        self.executions = 0
+        self.replays = 0
+
+    async def run(
+        self, scope: str, key: Optional[str], fn: Callable[[], Awaitable[Any]]
+    ) -> Tuple[Any, bool]:
+        """Return ``(result, replayed)``; without a key ``fn`` simply runs."""
+
+        if not key:
+            return await fn(), False
+        full_key = f"{scope}:{key}"
+        return await self._flight.do(full_key, lambda: self._run(full_key, fn))
+
+    async def _run(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Tuple[Any, bool]:
+        deadline = time.monotonic() + self.lock_ttl
+        record = await self.store.get(key)
+        while record is None or record.get("status") != DONE:
+            # Nothing stored, or the request holding the key failed and released it.
+            if record is None and await self.store.claim(key, self.lock_ttl):
+                return await self._execute(key, fn), False
+            if time.monotonic() >= deadline:
+                raise IdempotencyConflict(f"A request with idempotency key {key!r} is still running.")
+            await asyncio.sleep(self.poll_interval)
+            record = await self.store.get(key)
+        self.replays += 1
+        return record["result"], True
+
+    async def _execute(self, key: str, fn: Callable[[], Awaitable[Any]]) -> Any:
+        self.executions += 1
+        try:
+            result = await fn()
+        except BaseException:
+            await self.store.release(key)
+            raise
+        await self.store.save(key, {"status": DONE, "result": result}, self.ttl)
+        return result
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "store": type(self.store).__name__,
+            "executions": self.executions,
+            "replays": self.replays,
+            "deduplicated": self._flight.deduplicated,
+        }
+
+
+def build_idempotency() -> Idempotency:
+    return Idempotency(
+        build_idempotency_store(),
+        ttl=env_float("IDEMPOTENCY_TTL", 86_400.0),
+        lock_ttl=env_float("IDEMPOTENCY_LOCK_TTL", 30.0),
+    )
@@ -0,0 +1,141 @@
+"""In-process membership index kept fresh by Postgres LISTEN/NOTIFY."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+from collections import OrderedDict
+from typing import AsyncIterator, Awaitable, Callable, Dict, Optional
+
+CHANNEL = "user_boteco_changes"
+
+Memberships = Dict[str, str]  # boteco_id -> assigned_role
+
+
+class MembershipIndex:
+    """``user_id -> {boteco_id: role}`` answered from memory while the listener is live.
+
+    Users are loaded lazily on first lookup. While the LISTEN connection is up,
+    trigger notifications (see `sql/002_user_boteco_notify.sql`) patch the
+    warmed entries in place, so the `/app` gate and org switchers never query
+    `user_boteco` twice for the same user. Whenever the connection drops the
+    index is emptied, since changes made meanwhile were not seen.
+    """
+
+    def __init__(
+        self,
+        loader: Callable[[str], Awaitable[Memberships]],
+        dsn: Optional[str] = None,
+        maxsize: int = 50_000,
+        reconnect_delay: float = 1.0,
+    ) -> None:
+        self._loader = loader
+        self.dsn = dsn
+        self.maxsize = max(1, maxsize)
+        self.reconnect_delay = reconnect_delay
+        self._members: "OrderedDict[str, Memberships]" = OrderedDict()
+        self._changes = 0
+        self.live = False
+        self.hits = 0
+        self.loads = 0
+        self.notifications = 0
+        self.reconnects = 0
+
+    async def memberships(self, user_id: str) -> Memberships:
+        """Return the user's memberships, loading them on first use."""
+
+        if self.live and user_id in self._members:
+            self._members.move_to_end(user_id)
+            self.hits += 1
+            return dict(self._members[user_id])
+        changes_before = self._changes
+        self.loads += 1
+        loaded = await self._loader(user_id)
+        # A change notified while the query ran may or may not be in `loaded`.
+        if self.live and self._changes == changes_before:
+            self._members[user_id] = dict(loaded)
+            self._members.move_to_end(user_id)
+            while len(self._members) > self.maxsize:
+                self._members.popitem(last=False)
+        return dict(loaded)
+
+    def forget(self, user_id: Optional[str]) -> None:
+        """Drop a user after a local write, before its notification arrives."""
+
+        self._changes += 1
+        self._members.pop(str(user_id), None)
+
+    def apply(self, change: dict) -> None:
+        """Apply one trigger payload to the warmed entries."""
+
+        self.notifications += 1
+        self._changes += 1
+        op = change.get("op")
+        if op == "TRUNCATE":
+            self._members.clear()
+            return
+        entry = self._members.get(str(change.get("user_id")))
+        if entry is None:
+            return  # not warmed: the next lookup reads fresh data
+        boteco_id = str(change.get("boteco_id"))
+        if op == "INSERT":
+            entry[boteco_id] = change.get("role") or "owner"
+        elif op == "DELETE":
+            entry.pop(boteco_id, None)
+
+    def _go_offline(self) -> None:
+        self.live = False
+        self._members.clear()
+
+    async def listen(self) -> None:
+        """Follow the notification channel forever, reconnecting on failure."""
+
+        import psycopg
+
+        while True:
+            try:
+                async with await psycopg.AsyncConnection.connect(self.dsn, autocommit=True) as conn:
+                    await conn.execute(f"LISTEN {CHANNEL}")
+                    self._members.clear()
+                    self.live = True
+                    logging.info("Membership index listening on %s", CHANNEL)
+                    async for notify in conn.notifies():
+                        try:
+                            self.apply(json.loads(notify.payload))
+                        except ValueError:
+                            logging.warning("Ignoring malformed %s payload: %r", CHANNEL, notify.payload)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logging.warning("Membership index listener lost (%s); retrying.", exc)
+            finally:
+                self._go_offline()
+            self.reconnects += 1
+            await asyncio.sleep(self.reconnect_delay)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self) -> AsyncIterator[None]:
+        """Run the listener for the duration of the app when a DSN is configured."""
+
+        if not self.dsn:
+            yield
+            return
+        task = asyncio.create_task(self.listen(), name="membership-index-listener")
+        try:
+            yield
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    def stats(self) -> dict[str, object]:
+        return {
+            "live": self.live,
+            "users": len(self._members),
+            "hits": self.hits,
+            "loads": self.loads,
+            "notifications": self.notifications,
+            "reconnects": self.reconnects,
+        }
@@ -0,0 +1,289 @@
+"""In-process metrics rendered in the Prometheus text format.
+
+Updates are plain attribute and list-slot increments made from the event loop
+thread, so recording takes no lock; histograms use fixed buckets chosen up
+front, so an observation is one `bisect` and two additions. `Registry.render`
+builds the exposition text only when `/metrics` is scraped.
+"""
+
+from __future__ import annotations
+
+import contextlib
+import functools
+import inspect
+import math
+import time
+from bisect import bisect_left
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+DEFAULT_BUCKETS: Tuple[float, ...] = (
+    0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0,
+)
+
+LabelValues = Tuple[str, ...]
+Sample = Tuple[str, Dict[str, str], float]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_value(value: float) -> str:
+    if math.isinf(value):
+        return "+Inf" if value > 0 else "-Inf"
+    if float(value).is_integer():
+        return str(int(value))
+    return repr(float(value))
+
+
+class Metric:
+    """Base class: a named family of series keyed by label values."""
+
+    kind = "untyped"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        self.name = name
+        self.documentation = documentation
+        self.labels: Tuple[str, ...] = tuple(labels)
+
+    def _key(self, values: Tuple[Any, ...]) -> LabelValues:
+        # Label values are kept as given (callers pass strings) and only
+        # converted to text when rendering.
+        if len(values) != len(self.labels):
+            raise ValueError(f"{self.name} expects labels {self.labels}, got {values}")
+        return values
+
+    def _labels(self, key: LabelValues) -> Dict[str, str]:
+        return {name: str(value) for name, value in zip(self.labels, key)}
+
+    def samples(self) -> Iterator[Sample]:
+        raise NotImplementedError
+
+
+class Counter(Metric):
+    kind = "counter"
+
+    def __init__(self, name: str, documentation: str, labels: Sequence[str] = ()) -> None:
+        super().__init__(name, documentation, labels)
+        self._values: Dict[LabelValues, float] = {}
+
+    def inc(self, *labels: Any, amount: float = 1.0) -> None:
+        key = self._key(labels)
+        self._values[key] = self._values.get(key, 0.0) + amount
+
+    def value(self, *labels: Any) -> float:
+        return self._values.get(self._key(labels), 0.0)
+
+    def samples(self) -> Iterator[Sample]:
+        for key, value in list(self._values.items()):
+            yield self.name, self._labels(key), value
+
+
+class Gauge(Counter):
+    kind = "gauge"
+
+    def set(self, value: float, *labels: Any) -> None:
+        self._values[self._key(labels)] = value
+
+    def dec(self, *labels: Any, amount: float = 1.0) -> None:
+        self.inc(*labels, amount=-amount)
+
+    @contextlib.contextmanager
+    def track(self, *labels: Any) -> Iterator[None]:
+        """Count the enclosed block as in flight while it runs."""
+
+        self.inc(*labels)
+        try:
+            yield
+        finally:
+            self.dec(*labels)
+
+
+class CallbackGauge(Metric):
+    """Gauge read from ``collect()`` at scrape time, for values other objects already track."""
+
+    kind = "gauge"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        collect: Callable[[], Dict[LabelValues, float]],
+        labels: Sequence[str] = (),
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self._collect = collect
+
+    def samples(self) -> Iterator[Sample]:
+        for key, value in self._collect().items():
+            yield self.name, self._labels(self._key(tuple(key))), float(value)
+
+
+class Histogram(Metric):
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> None:
+        super().__init__(name, documentation, labels)
+        self.buckets: Tuple[float, ...] = tuple(sorted(buckets))
+        # Per series: non-cumulative bucket counts (last slot is +Inf) and the sum.
+        self._series: Dict[LabelValues, Tuple[List[int], List[float]]] = {}
+
+    def observe(self, value: float, *labels: Any) -> None:
+        key = self._key(labels)
+        series = self._series.get(key)
+        if series is None:
+            series = self._series[key] = ([0] * (len(self.buckets) + 1), [0.0])
+        series[0][bisect_left(self.buckets, value)] += 1
+        series[1][0] += value
+
+    @contextlib.contextmanager
+    def time(self, *labels: Any) -> Iterator[None]:
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - started, *labels)
+
+    def count(self, *labels: Any) -> int:
+        series = self._series.get(self._key(labels))
+        return sum(series[0]) if series else 0
+
+    def samples(self) -> Iterator[Sample]:
+        for key, (counts, total) in list(self._series.items()):
+            labels = self._labels(key)
+            cumulative = 0
+            for bound, count in zip(self.buckets + (math.inf,), counts):
+                cumulative += count
+                yield f"{self.name}_bucket", {**labels, "le": _format_value(bound)}, cumulative
+            yield f"{self.name}_sum", labels, total[0]
+            yield f"{self.name}_count", labels, cumulative
+
+
+class Registry:
+    def __init__(self) -> None:
+        self._metrics: Dict[str, Metric] = {}
+
+    def register(self, metric: Metric) -> Metric:
+        if metric.name in self._metrics:
+            raise ValueError(f"Metric {metric.name} is already registered")
+        self._metrics[metric.name] = metric
+        return metric
+
+    def counter(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Counter:
+        return self.register(Counter(name, documentation, labels))  # type: ignore[return-value]
+
+    def gauge(self, name: str, documentation: str, labels: Sequence[str] = ()) -> Gauge:
+        return self.register(Gauge(name, documentation, labels))  # type: ignore[return-value]
+
+    def histogram(
+        self,
+        name: str,
+        documentation: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ) -> Histogram:
+        return self.register(Histogram(name, documentation, labels, buckets))  # type: ignore[return-value]
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics.values():
+            lines.append(f"# HELP {metric.name} {metric.documentation}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            for name, labels, value in metric.samples():
+                if labels:
+                    rendered = ",".join(f'{key}="{_escape(val)}"' for key, val in labels.items())
+                    lines.append(f"{name}{{{rendered}}} {_format_value(value)}")
+                else:
+                    lines.append(f"{name} {_format_value(value)}")
+        return "\n".join(lines) + "\n"
+
+
+REGISTRY = Registry()
+
+SUPABASE_CALL_SECONDS = REGISTRY.histogram(
+    "supabase_call_seconds",
+    "Latency of SupabaseClient methods.",
+    ("backend", "method", "outcome"),
+)
+PROVISION_PHASE_SECONDS = REGISTRY.histogram(
+    "provision_phase_seconds",
+    "Server-side time of each tenant provisioning phase.",
+    ("phase",),
+)
+PROVISION_JOB_SECONDS = REGISTRY.histogram(
+    "provision_job_seconds",
+    "Time provisioning jobs spend queued and running.",
+    ("stage",),
+    buckets=DEFAULT_BUCKETS + (30.0, 60.0, 300.0),
+)
+PROVISION_JOBS = REGISTRY.counter(
+    "provision_jobs_total", "Finished provisioning jobs by status.", ("status",)
+)
+ONBOARDING_STEP_SUBMISSIONS = REGISTRY.counter(
+    "onboarding_step_submissions_total", "Onboarding form submissions per step.", ("step",)
+)
+ONBOARDING_STEP_FAILURES = REGISTRY.counter(
+    "onboarding_step_failures_total",
+    "Onboarding submissions rejected by validation or failed in the backend.",
+    ("step", "reason"),
+)
+ONBOARDING_EVENTS_IN_FLIGHT = REGISTRY.gauge(
+    "onboarding_events_in_flight", "Onboarding event handlers currently waiting on the backend.", ("event",)
+)
+TENANT_ARCHIVE_OPERATIONS = REGISTRY.counter(
+    "tenant_archive_operations_total",
+    "Tenant schema archives and restores by outcome.",
+    ("operation", "outcome"),
+)
+TENANT_ARCHIVE_SECONDS = REGISTRY.histogram(
+    "tenant_archive_seconds",
+    "Time to archive a dormant tenant schema or restore it on access.",
+    ("operation",),
+    buckets=DEFAULT_BUCKETS + (30.0, 60.0),
+)
+
+
+def observe_provision_timings(timings: Dict[str, float]) -> None:
+    """Record the per-phase milliseconds returned by `provision_tenant`."""
+
+    for phase, ms in timings.items():
+        PROVISION_PHASE_SECONDS.observe(ms / 1000.0, phase)
+
+
+def time_public_coroutines(cls: type, histogram: Histogram, skip: Iterable[str] = ()) -> type:
+    """Wrap every public coroutine method defined on ``cls`` to record its latency.
+
+    Series are labelled with ``self.backend_name``, the method name and
+    ``ok``/``error``. Methods already wrapped (inherited) are left alone.
+    """
+
+    skipped = set(skip)
+    for name, fn in list(vars(cls).items()):
+        if name.startswith("_") or name in skipped or not inspect.iscoroutinefunction(fn):
+            continue
+        if getattr(fn, "__timed__", False):
+            continue
+        setattr(cls, name, _timed(fn, histogram, name))
+    return cls
+
+
+def _timed(fn: Callable[..., Any], histogram: Histogram, method: str) -> Callable[..., Any]:
+    @functools.wraps(fn)
+    async def wrapper(self: Any, *args: Any, **kwargs: Any) -> Any:
+        started = time.perf_counter()
+        outcome = "error"
+        try:
+            result = await fn(self, *args, **kwargs)
+            outcome = "ok"
+            return result
+        finally:
+            histogram.observe(time.perf_counter() - started, self.backend_name, method, outcome)
+
+    wrapper.__timed__ = True  # type: ignore[attr-defined]
+    return wrapper
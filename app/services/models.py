@@ -0,0 +1,135 @@
+"""Compact row types decoded straight from Supabase responses.
+
+Each class lists exactly the columns its call sites read; ``columns()`` is the
+projection sent to PostgREST, so the response carries nothing else and every
+decoded row costs a fixed `__slots__` object instead of a dict.
+"""
+
+from __future__ import annotations
+
+from typing import Any, Dict, Iterable, List, Mapping, NamedTuple, Optional, Type, TypeVar
+
+R = TypeVar("R", bound="Row")
+
+
+class Row:
+    """Base class for `__slots__` rows."""
+
+    __slots__ = ()
+
+    def __init__(self, **fields: Any) -> None:
+        for name in self.__slots__:
+            setattr(self, name, fields.get(name))
+
+    @classmethod
+    def columns(cls) -> str:
+        """PostgREST `select` projection for this row type."""
+
+        return ",".join(cls.__slots__)
+
+    @classmethod
+    def from_dict(cls: Type[R], data: Mapping[str, Any]) -> R:
+        return cls(**data)
+
+    @classmethod
+    def decode(cls: Type[R], data: Optional[Iterable[Mapping[str, Any]]]) -> List[R]:
+        return [cls(**item) for item in data or []]
+
+    def to_dict(self) -> dict[str, Any]:
+        return {name: getattr(self, name) for name in self.__slots__}
+
+    def __eq__(self, other: object) -> bool:
+        return type(other) is type(self) and self.to_dict() == other.to_dict()  # type: ignore[union-attr]
+
+    def __repr__(self) -> str:
+        fields = ", ".join(f"{name}={getattr(self, name)!r}" for name in self.__slots__)
+        return f"{type(self).__name__}({fields})"
+
+
+class UserRow(Row):
+    """Owner profile fields used to sign in and prefill onboarding."""
+
+    __slots__ = (
+        "id",
+        "email",
+        "username",
+        "tax_number",
+        "first_name",
+        "last_name",
+        "birth_date",
+        "country",
+        "postal_code",
+        "house_number",
+    )
+
+
+class BotecoRow(Row):
+    __slots__ = ("id", "public_name", "username", "created_by_user_id")
+
+
+class MembershipRow(Row):
+    __slots__ = ("id", "user_id", "boteco_id", "assigned_role", "plan")
+
+
+class OnboardingResult(NamedTuple):
+    """Decoded payload of the `finalize_onboarding` RPC."""
+
+    boteco: BotecoRow
+    membership: MembershipRow
+    schema: str
+    spare: Optional[str] = None  # pre-built schema renamed to `schema`, if one was claimed
+    claim_ms: Optional[float] = None
+    company_id: Optional[str] = None  # shared-schema tenancy: the tenant was registered under this id
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "OnboardingResult":
+        return cls(
+            BotecoRow.from_dict(data["boteco"]),
+            MembershipRow.from_dict(data["membership"]),
+            data["schema"],
+            data.get("spare"),
+            data.get("claim_ms"),
+            data.get("company_id"),
+        )
+
+
+class TenantSchema(NamedTuple):
+    """Decoded payload of the `provision_tenant` RPC, or one entry of `provision_tenants`.
+
+    In shared-schema tenancy (`provision_shared_tenants`) ``schema`` is the
+    shared schema and ``company_id`` tells the tenant apart.
+    """
+
+    schema: str
+    created: bool
+    timings: Dict[str, float]  # milliseconds per phase
+    error: Optional[str] = None  # set when this tenant was rolled back in a batch
+    company_id: Optional[str] = None
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "TenantSchema":
+        return cls(
+            data["schema"],
+            bool(data.get("created")),
+            dict(data.get("timings") or {}),
+            data.get("error"),
+            data.get("company_id"),
+        )
+
+
+class SpareBuild(NamedTuple):
+    """Decoded payload of the `build_spare_schema` RPC."""
+
+    schema: Optional[str]  # None when the pool was full or another builder was busy
+    available: int
+    busy: bool
+    timings: Dict[str, float]
+
+    @classmethod
+    def from_dict(cls, data: Mapping[str, Any]) -> "SpareBuild":
+        return cls(
+            data.get("schema"),
+            int(data.get("available") or 0),
+            bool(data.get("busy")),
+            dict(data.get("timings") or {}),
+        )
@@ -0,0 +1,301 @@
+"""`SupabaseClient` backend that talks to Postgres directly over a psycopg pool.
+
+Selected with ``SUPABASE_BACKEND=psycopg``. It keeps the public method surface,
+lookup caches, single-flight, breaker and deadlines of the PostgREST backend
+but replaces each HTTP round trip through PostgREST with one prepared
+statement on a pooled connection. Use a direct or session-mode connection
+string: transaction-mode poolers do not keep prepared statements.
+"""
+
+from __future__ import annotations
+
+import logging
+import os
+from typing import Any, Awaitable, Callable, List, Optional, Sequence, Type
+
+import psycopg
+from psycopg import sql
+from psycopg.rows import dict_row
+from psycopg.types.json import Jsonb
+from psycopg.types.string import TextLoader
+from psycopg_pool import AsyncConnectionPool, PoolTimeout
+
+from app.services.membership_index import Memberships
+from app.services.models import (
+    BotecoRow,
+    MembershipRow,
+    R,
+    SpareBuild,
+    TenantSchema,
+    UserRow,
+)
+from app.services.shared_tenancy import SHARED_MODE
+from app.services.supabase_client import SupabaseClient
+from app.utils.env import database_url, env_float, env_int
+
+# `jsonb_populate_recordset` turns one JSON parameter into typed rows, so a
+# write is the same prepared statement whatever the batch size.
+_INSERT_ROWS = "INSERT INTO {table} ({columns}) SELECT {columns} FROM jsonb_populate_recordset(NULL::{table}, %s)"
+
+SELECT_USER_BY_EMAIL = f"SELECT {UserRow.columns()} FROM users WHERE email = %s LIMIT 1"
+SELECT_HAS_BOTECO = "SELECT 1 FROM user_boteco WHERE user_id = %s LIMIT 1"
+SELECT_MEMBERSHIPS = "SELECT boteco_id, assigned_role FROM user_boteco WHERE user_id = %s"
+SELECT_EXISTING_PAIRS = "SELECT user_id, boteco_id FROM user_boteco WHERE boteco_id = ANY(%s::uuid[])"
+DELETE_BOTECO = "DELETE FROM boteco WHERE id = %s RETURNING id"
+FINALIZE_ONBOARDING = "SELECT finalize_onboarding(%s, %s, %s) AS result"
+PROVISION_TENANT = "SELECT provision_tenant(%s) AS result"
+PROVISION_TENANTS = "SELECT provision_tenants(%s) AS result"
+PROVISION_SHARED_TENANTS = "SELECT provision_shared_tenants(%s, %s) AS result"
+BUILD_SPARE_SCHEMA = "SELECT build_spare_schema(%s) AS result"
+
+
+def _insert_sql(
+    table: str, columns: Sequence[str], returning: Type[R], on_conflict: Optional[str] = None
+) -> sql.Composed:
+    names = sql.SQL(", ").join(map(sql.Identifier, columns))
+    statement = sql.SQL(_INSERT_ROWS).format(table=sql.Identifier(table), columns=names)
+    if on_conflict:
+        updates = sql.SQL(", ").join(
+            sql.SQL("{0} = EXCLUDED.{0}").format(sql.Identifier(name))
+            for name in columns
+            if name != on_conflict
+        )
+        statement += sql.SQL(" ON CONFLICT ({}) DO UPDATE SET {}").format(
+            sql.Identifier(on_conflict), updates
+        )
+    return statement + sql.SQL(" RETURNING " + returning.columns())
+
+
+def _columns(rows: List[dict[str, Any]]) -> List[str]:
+    # Same contract as the PostgREST bulk calls: every row shares the same keys.
+    return list(rows[0])
+
+
+class PostgresClient(SupabaseClient):
+    """`SupabaseClient` over an async psycopg connection pool."""
+
+    backend_name = "psycopg"
+
+    def __init__(self, dsn: Optional[str] = None) -> None:
+        self.dsn: Optional[str] = dsn or database_url()
+        self.search_path: str = os.environ.get("PG_SEARCH_PATH", "reflex, public")
+        self._pool: Optional[AsyncConnectionPool] = None
+        super().__init__()
+
+    def _initialize_client(self) -> None:
+        if not self.dsn:
+            logging.warning("DATABASE_URL not configured. The psycopg backend is disabled.")
+        return None
+
+    @property
+    def is_configured(self) -> bool:
+        return bool(self.dsn)
+
+    async def _configure(self, conn: psycopg.AsyncConnection) -> None:
+        # Decode ids, dates and timestamps as text, the way PostgREST returns them.
+        for type_name in ("uuid", "date", "timestamptz"):
+            conn.adapters.register_loader(type_name, TextLoader)
+        await conn.execute(sql.SQL("SET search_path TO {}").format(sql.SQL(self.search_path)))
+
+    def _build_pool(self) -> AsyncConnectionPool:
+        return AsyncConnectionPool(
+            self.dsn,
+            min_size=env_int("PG_POOL_MIN_SIZE", 2),
+            max_size=env_int("PG_POOL_MAX_SIZE", 10),
+            timeout=env_float("PG_POOL_TIMEOUT", 5.0),
+            # prepare_threshold=0 prepares every statement on its first use.
+            kwargs={"autocommit": True, "prepare_threshold": 0, "row_factory": dict_row},
+            configure=self._configure,
+            open=False,
+            name="boteco",
+        )
+
+    async def _get_pool(self) -> AsyncConnectionPool:
+        """Return the shared pool, opening it lazily outside the app lifespan."""
+
+        if not self.dsn:
+            raise ConnectionError("Postgres backend not configured. Check DATABASE_URL.")
+        if self._pool is None or self._pool.closed:
+            self._pool = self._build_pool()
+            await self._pool.open()
+        return self._pool
+
+    async def aclose(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+        await super().aclose()
+
+    async def _run(
+        self,
+        work: Callable[[psycopg.AsyncConnection], Awaitable[Any]],
+        *,
+        idempotent: bool = False,
+        provisioning: bool = False,
+    ) -> Any:
+        """Run ``work`` on a pooled connection under the breaker, deadline and retries.
+
+        Connection-level failures surface as `ConnectionError` so they count as
+        transient; errors raised by the database become `ValueError`, like the
+        errors PostgREST reports in its responses.
+        """
+
+        async def attempt() -> Any:
+            pool = await self._get_pool()
+            try:
+                async with pool.connection() as conn:
+                    return await work(conn)
+            except (psycopg.OperationalError, PoolTimeout) as exc:
+                raise ConnectionError(str(exc)) from exc
+            except psycopg.Error as exc:
+                message = exc.diag.message_primary or str(exc)
+                logging.error("Postgres returned an error: %s", message)
+                raise ValueError(message) from exc
+
+        try:
+            return await self._call_resilient(attempt, idempotent=idempotent, provisioning=provisioning)
+        except Exception as exc:
+            logging.exception("Postgres request failed: %s", exc)
+            raise
+
+    async def _fetch(
+        self, query: Any, params: Sequence[Any], *, idempotent: bool = False, provisioning: bool = False
+    ) -> List[dict[str, Any]]:
+        async def work(conn: psycopg.AsyncConnection) -> List[dict[str, Any]]:
+            cursor = await conn.execute(query, params, prepare=True)
+            return await cursor.fetchall()
+
+        return await self._run(work, idempotent=idempotent, provisioning=provisioning)
+
+    async def _insert(
+        self,
+        table: str,
+        rows: List[dict[str, Any]],
+        returning: Type[R],
+        on_conflict: Optional[str] = None,
+    ) -> List[R]:
+        statement = _insert_sql(table, _columns(rows), returning, on_conflict)
+        return returning.decode(await self._fetch(statement, (Jsonb(rows),)))
+
+    async def create_user(self, user_data: dict[str, Any]) -> List[UserRow]:
+        try:
+            return await self._insert("users", [user_data], UserRow)
+        finally:
+            self.user_cache.invalidate(user_data.get("email"))
+
+    async def upsert_user(self, user_data: dict[str, Any]) -> List[UserRow]:
+        try:
+            return await self._insert("users", [user_data], UserRow, on_conflict="email")
+        finally:
+            self.user_cache.invalidate(user_data.get("email"))
+
+    async def upsert_users(self, users: List[dict[str, Any]]) -> List[UserRow]:
+        if not users:
+            return []
+        try:
+            return await self._insert("users", users, UserRow, on_conflict="email")
+        finally:
+            for user in users:
+                self.user_cache.invalidate(user.get("email"))
+
+    async def upsert_botecos(self, botecos: List[dict[str, Any]]) -> List[BotecoRow]:
+        if not botecos:
+            return []
+        return await self._insert("boteco", botecos, BotecoRow, on_conflict="username")
+
+    async def ensure_memberships(self, memberships: List[dict[str, Any]]) -> List[MembershipRow]:
+        if not memberships:
+            return []
+        boteco_ids = sorted({str(row["boteco_id"]) for row in memberships})
+        try:
+            existing = await self._fetch(SELECT_EXISTING_PAIRS, (boteco_ids,), idempotent=True)
+            seen = {(row["user_id"], row["boteco_id"]) for row in existing}
+            missing = []
+            for row in memberships:
+                pair = (str(row["user_id"]), str(row["boteco_id"]))
+                if pair not in seen:
+                    seen.add(pair)
+                    missing.append(row)
+            if not missing:
+                return []
+            return await self._insert("user_boteco", missing, MembershipRow)
+        finally:
+            for row in memberships:
+                self._invalidate_memberships(row["user_id"])
+
+    async def delete_boteco(self, boteco_id: str) -> int:
+        return len(await self._fetch(DELETE_BOTECO, (boteco_id,)))
+
+    async def create_boteco_and_associate_user(
+        self, boteco_data: dict[str, Any], user_boteco_data: dict[str, Any]
+    ) -> tuple[BotecoRow, MembershipRow]:
+        """Create a boteco and its membership in one database transaction."""
+
+        boteco_sql = _insert_sql("boteco", list(boteco_data), BotecoRow)
+        membership_columns = list(dict.fromkeys([*user_boteco_data, "boteco_id"]))
+        membership_sql = _insert_sql("user_boteco", membership_columns, MembershipRow)
+
+        async def work(conn: psycopg.AsyncConnection) -> tuple[BotecoRow, MembershipRow]:
+            async with conn.transaction():
+                cursor = await conn.execute(boteco_sql, (Jsonb([boteco_data]),), prepare=True)
+                boteco = BotecoRow.from_dict(await cursor.fetchone())
+                membership = {**user_boteco_data, "boteco_id": boteco.id}
+                cursor = await conn.execute(membership_sql, (Jsonb([membership]),), prepare=True)
+                return boteco, MembershipRow.from_dict(await cursor.fetchone())
+
+        try:
+            boteco, membership = await self._run(work)
+        finally:
+            self._invalidate_memberships(user_boteco_data.get("user_id"))
+        user_boteco_data["boteco_id"] = boteco.id
+        return boteco, membership
+
+    async def _finalize_onboarding(
+        self, boteco_data: dict[str, Any], user_boteco_data: dict[str, Any]
+    ) -> dict[str, Any]:
+        try:
+            rows = await self._fetch(
+                FINALIZE_ONBOARDING,
+                (
+                    Jsonb(boteco_data),
+                    Jsonb(user_boteco_data),
+                    self.shared_schema if self.tenancy == SHARED_MODE else None,
+                ),
+            )
+        finally:
+            self._invalidate_memberships(user_boteco_data.get("user_id"))
+        if not rows or not rows[0]["result"]:
+            raise ValueError("Falha ao finalizar o onboarding. Nenhum dado retornado.")
+        return rows[0]["result"]
+
+    async def _provision_tenant_schema(self, boteco_username: str) -> TenantSchema:
+        rows = await self._fetch(PROVISION_TENANT, (f"org_{boteco_username}",), provisioning=True)
+        if not rows or not rows[0]["result"]:
+            raise ValueError("Falha ao provisionar o schema. Nenhum dado retornado.")
+        return TenantSchema.from_dict(rows[0]["result"])
+
+    async def _provision_tenant_schemas(self, boteco_usernames: List[str]) -> List[TenantSchema]:
+        rows = await self._fetch(
+            PROVISION_TENANTS, ([f"org_{username}" for username in boteco_usernames],), provisioning=True
+        )
+        return [TenantSchema.from_dict(item) for item in (rows[0]["result"] if rows else None) or []]
+
+    async def _provision_shared_tenants(self, boteco_usernames: List[str]) -> List[TenantSchema]:
+        rows = await self._fetch(
+            PROVISION_SHARED_TENANTS, (list(boteco_usernames), self.shared_schema), provisioning=True
+        )
+        return [TenantSchema.from_dict(item) for item in (rows[0]["result"] if rows else None) or []]
+
+    async def build_spare_schema(self, target: int) -> SpareBuild:
+        rows = await self._fetch(BUILD_SPARE_SCHEMA, (target,), provisioning=True)
+        return SpareBuild.from_dict(rows[0]["result"] if rows and rows[0]["result"] else {})
+
+    async def _fetch_user_has_boteco(self, user_id: str) -> bool:
+        return bool(await self._fetch(SELECT_HAS_BOTECO, (user_id,), idempotent=True))
+
+    async def _fetch_memberships(self, user_id: str) -> Memberships:
+        rows = await self._fetch(SELECT_MEMBERSHIPS, (user_id,), idempotent=True)
+        return {row["boteco_id"]: row["assigned_role"] for row in rows}
+
+    async def _fetch_user_by_email(self, email: str) -> List[UserRow]:
+        return UserRow.decode(await self._fetch(SELECT_USER_BY_EMAIL, (email,), idempotent=True))
@@ -0,0 +1,382 @@
+"""Asynchronous tenant provisioning: a job queue drained by background workers."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import json
+import logging
+import os
+import time
+import uuid
+from collections import OrderedDict, deque
+from dataclasses import asdict, dataclass, field
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Dict, Optional, Protocol
+
+from app.services.metrics import PROVISION_JOB_SECONDS, PROVISION_JOBS, observe_provision_timings
+from app.services.models import TenantSchema
+from app.services.supabase_client import supabase_client
+from app.utils.env import env_float, env_int
+
+QUEUED = "queued"
+RUNNING = "running"
+SUCCEEDED = "succeeded"
+FAILED = "failed"
+
+
+@dataclass
+class ProvisionJob:
+    """Status record of one provisioning request.
+
+    Timestamps are wall-clock seconds so records written by one process can be
+    read by another through the shared store.
+    """
+
+    boteco_username: str
+    id: str = field(default_factory=lambda: uuid.uuid4().hex)
+    status: str = QUEUED
+    schema: Optional[str] = None
+    timings: Optional[Dict[str, float]] = None  # milliseconds per provisioning phase
+    error: Optional[str] = None
+    created_at: float = field(default_factory=time.time)
+    started_at: Optional[float] = None
+    finished_at: Optional[float] = None
+
+    @property
+    def done(self) -> bool:
+        return self.status in (SUCCEEDED, FAILED)
+
+    def to_dict(self) -> dict[str, Any]:
+        data = asdict(self)
+        data["queue_seconds"] = (
+            round(self.started_at - self.created_at, 6) if self.started_at is not None else None
+        )
+        data["run_seconds"] = (
+            round(self.finished_at - self.started_at, 6)
+            if self.started_at is not None and self.finished_at is not None
+            else None
+        )
+        return data
+
+    @classmethod
+    def from_dict(cls, data: dict[str, Any]) -> "ProvisionJob":
+        return cls(**{name: data.get(name) for name in cls.__dataclass_fields__})
+
+
+class JobStore(Protocol):
+    async def push(self, job: ProvisionJob) -> None: ...
+
+    async def pop(self, timeout: float) -> Optional[ProvisionJob]: ...
+
+    async def ack(self, job_id: str) -> None: ...
+
+    async def requeue_stale(self, visibility_timeout: float) -> int: ...
+
+    async def save(self, job: ProvisionJob) -> None: ...
+
+    async def get(self, job_id: str) -> Optional[ProvisionJob]: ...
+
+    async def aclose(self) -> None: ...
+
+
+class InMemoryJobStore:
+    """Process-local queue and records, for tests and single-process development.
+
+    Finished records beyond ``maxsize`` are dropped oldest first.
+    """
+
+    def __init__(self, maxsize: int = 10_000) -> None:
+        self.maxsize = max(1, maxsize)
+        self._jobs: "OrderedDict[str, ProvisionJob]" = OrderedDict()
+        self._ready: Deque[str] = deque()
+        self._wakeup: Optional[asyncio.Event] = None
+        self._wakeup_loop: Optional[asyncio.AbstractEventLoop] = None
+
+    def _event(self) -> asyncio.Event:
+        # Tests run each scenario on a fresh loop; an Event is bound to one.
+        loop = asyncio.get_running_loop()
+        if self._wakeup is None or self._wakeup_loop is not loop:
+            self._wakeup, self._wakeup_loop = asyncio.Event(), loop
+        return self._wakeup
+
+    async def push(self, job: ProvisionJob) -> None:
+        await self.save(job)
+        self._ready.append(job.id)
+        self._event().set()
+
+    async def pop(self, timeout: float) -> Optional[ProvisionJob]:
+        event = self._event()
+        if not self._ready:
+            event.clear()
+            with contextlib.suppress(asyncio.TimeoutError):
+                await asyncio.wait_for(event.wait(), timeout)
+        if not self._ready:
+            return None
+        return self._jobs.get(self._ready.popleft())
+
+    async def ack(self, job_id: str) -> None:
+        return None
+
+    async def requeue_stale(self, visibility_timeout: float) -> int:
+        # The queue dies with the process: there is no other worker to recover from.
+        return 0
+
+    async def save(self, job: ProvisionJob) -> None:
+        self._jobs[job.id] = job
+        self._jobs.move_to_end(job.id)
+        while len(self._jobs) > self.maxsize:
+            oldest = next(iter(self._jobs.values()))
+            if not oldest.done:
+                break
+            self._jobs.popitem(last=False)
+
+    async def get(self, job_id: str) -> Optional[ProvisionJob]:
+        return self._jobs.get(job_id)
+
+    def depth(self) -> int:
+        return len(self._ready)
+
+    async def aclose(self) -> None:
+        return None
+
+
+class RedisJobStore:
+    """Queue and records in Redis, shared by every backend process.
+
+    The queue is a list of job ids (`LPUSH`, oldest at the right). `pop`
+    moves the next id into a processing list with `BLMOVE` and stamps the
+    claim time; `ack` removes it once the job's outcome is saved. An id left
+    in the processing list longer than the visibility timeout belongs to a
+    worker that died, and `requeue_stale` puts it back at the head of the
+    queue. Each record is a JSON string that expires ``ttl`` seconds after
+    its last update.
+    """
+
+    # Move one id back from the processing list only if it is still there, so
+    # two sweepers never queue the same job twice.
+    REQUEUE_SCRIPT = """
+    if redis.call('LREM', KEYS[1], 1, ARGV[1]) == 1 then
+        redis.call('RPUSH', KEYS[2], ARGV[1])
+        redis.call('HDEL', KEYS[3], ARGV[1])
+        return 1
+    end
+    return 0
+    """
+
+    def __init__(self, url: str, prefix: str = "boteco:provision", ttl: int = 86_400) -> None:
+        import redis.asyncio as redis
+
+        self._redis = redis.from_url(url, decode_responses=True)
+        self.queue_key = f"{prefix}:queue"
+        self.processing_key = f"{prefix}:processing"
+        self.claims_key = f"{prefix}:claims"
+        self.job_prefix = f"{prefix}:job:"
+        self.ttl = ttl
+        self._requeue = self._redis.register_script(self.REQUEUE_SCRIPT)
+
+    async def push(self, job: ProvisionJob) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.set(self.job_prefix + job.id, json.dumps(asdict(job)), ex=self.ttl)
+            pipe.lpush(self.queue_key, job.id)
+            await pipe.execute()
+
+    async def pop(self, timeout: float) -> Optional[ProvisionJob]:
+        job_id = await self._redis.blmove(
+            self.queue_key, self.processing_key, max(1, int(timeout)), "RIGHT", "LEFT"
+        )
+        if job_id is None:
+            return None
+        await self._redis.hset(self.claims_key, job_id, time.time())
+        job = await self.get(job_id)
+        if job is None:
+            # The record expired while queued: nothing left to run.
+            await self.ack(job_id)
+        return job
+
+    async def ack(self, job_id: str) -> None:
+        async with self._redis.pipeline(transaction=True) as pipe:
+            pipe.lrem(self.processing_key, 1, job_id)
+            pipe.hdel(self.claims_key, job_id)
+            await pipe.execute()
+
+    async def requeue_stale(self, visibility_timeout: float) -> int:
+        now = time.time()
+        requeued = 0
+        for job_id in await self._redis.lrange(self.processing_key, 0, -1):
+            claimed = await self._redis.hget(self.claims_key, job_id)
+            if claimed is None:
+                # Claimed by a worker that died before stamping it: start the clock now.
+                await self._redis.hsetnx(self.claims_key, job_id, now)
+                continue
+            if now - float(claimed) < visibility_timeout:
+                continue
+            if await self._requeue(keys=[self.processing_key, self.queue_key, self.claims_key], args=[job_id]):
+                requeued += 1
+                logging.warning("Provisioning job %s was abandoned by its worker; queued again.", job_id)
+                job = await self.get(job_id)
+                if job is not None and not job.done:
+                    job.status, job.started_at = QUEUED, None
+                    await self.save(job)
+        return requeued
+
+    async def save(self, job: ProvisionJob) -> None:
+        await self._redis.set(self.job_prefix + job.id, json.dumps(asdict(job)), ex=self.ttl)
+
+    async def get(self, job_id: str) -> Optional[ProvisionJob]:
+        raw = await self._redis.get(self.job_prefix + job_id)
+        return ProvisionJob.from_dict(json.loads(raw)) if raw else None
+
+    async def aclose(self) -> None:
+        close = getattr(self._redis, "aclose", None) or self._redis.close
+        await close()
+
+
+def build_job_store() -> JobStore:
+    """Redis store at ``PROVISION_QUEUE_URL`` (or ``REFLEX_REDIS_URL``), else in memory."""
+
+    url = os.environ.get("PROVISION_QUEUE_URL") or os.environ.get("REFLEX_REDIS_URL")
+    if url:
+        try:
+            return RedisJobStore(url, ttl=env_int("PROVISION_JOB_TTL", 86_400))
+        except ImportError:
+            logging.warning("redis package not installed; provisioning jobs stay in memory.")
+    return InMemoryJobStore()
+
+
+class ProvisionJobs:
+    """Accept provisioning requests as jobs and run them on background workers.
+
+    ``submit`` only records and enqueues the job, so the caller answers right
+    away; ``workers`` tasks started by ``lifespan`` drain the queue and call
+    ``run(boteco_username)``, which returns the provisioned `TenantSchema`.
+    A job is acknowledged only after its outcome is saved; jobs claimed by a
+    worker that died are queued again after ``visibility_timeout`` seconds
+    (provisioning is idempotent, so a second run is safe). Keep the timeout
+    above the longest provisioning call.
+    """
+
+    def __init__(
+        self,
+        run: Callable[[str], Awaitable[TenantSchema]],
+        store: JobStore,
+        workers: int = 2,
+        poll_timeout: float = 1.0,
+        visibility_timeout: float = 900.0,
+    ) -> None:
+        self._run = run
+        self.store = store
+        self.workers = max(1, workers)
+        self.poll_timeout = poll_timeout
+        self.visibility_timeout = visibility_timeout
+        self.requeued = 0
+        self.submitted = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    async def submit(self, boteco_username: str) -> ProvisionJob:
+        job = ProvisionJob(boteco_username)
+        await self.store.push(job)
+        self.submitted += 1
+        return job
+
+    async def get(self, job_id: str) -> Optional[ProvisionJob]:
+        return await self.store.get(job_id)
+
+    async def run_once(self, timeout: Optional[float] = None) -> Optional[ProvisionJob]:
+        """Take the next job off the queue and run it; ``None`` if none arrived."""
+
+        job = await self.store.pop(self.poll_timeout if timeout is None else timeout)
+        if job is None:
+            return None
+        job.status = RUNNING
+        job.started_at = time.time()
+        PROVISION_JOB_SECONDS.observe(max(0.0, job.started_at - job.created_at), "queue")
+        await self.store.save(job)
+        try:
+            tenant = await self._run(job.boteco_username)
+            job.schema, job.timings = tenant.schema, tenant.timings
+            observe_provision_timings(tenant.timings)
+        except Exception as exc:
+            logging.exception("Provisioning job %s failed: %s", job.id, exc)
+            job.status = FAILED
+            job.error = str(exc)
+            self.failed += 1
+        else:
+            logging.info("Provisioning job %s finished: %s", job.id, job.schema)
+            job.status = SUCCEEDED
+            self.succeeded += 1
+        job.finished_at = time.time()
+        PROVISION_JOB_SECONDS.observe(job.finished_at - job.started_at, "run")
+        PROVISION_JOBS.inc(job.status)
+        await self.store.save(job)
+        await self.store.ack(job.id)
+        return job
+
+    async def worker(self) -> None:
+        """Drain the queue forever; store outages are logged and retried."""
+
+        while True:
+            try:
+                await self.run_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logging.warning("Provisioning worker error (%s); retrying.", exc)
+                await asyncio.sleep(self.poll_timeout)
+
+    async def reaper(self) -> None:
+        """Queue again the jobs of dead workers, at start-up and then periodically."""
+
+        while True:
+            try:
+                self.requeued += await self.store.requeue_stale(self.visibility_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logging.warning("Could not requeue stale provisioning jobs (%s); retrying.", exc)
+            await asyncio.sleep(max(self.poll_timeout, min(60.0, self.visibility_timeout / 4)))
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self) -> AsyncIterator[None]:
+        """Run the workers for the duration of the app."""
+
+        tasks = [
+            asyncio.create_task(self.worker(), name=f"provision-worker-{i}")
+            for i in range(self.workers)
+        ]
+        tasks.append(asyncio.create_task(self.reaper(), name="provision-reaper"))
+        try:
+            yield
+        finally:
+            for task in tasks:
+                task.cancel()
+            for task in tasks:
+                with contextlib.suppress(asyncio.CancelledError):
+                    await task
+            await self.store.aclose()
+
+    def stats(self) -> Dict[str, Any]:
+        stats: Dict[str, Any] = {
+            "store": type(self.store).__name__,
+            "workers": self.workers,
+            "submitted": self.submitted,
+            "succeeded": self.succeeded,
+            "failed": self.failed,
+            "requeued": self.requeued,
+        }
+        depth = getattr(self.store, "depth", None)
+        if depth is not None:
+            stats["queue_depth"] = depth()
+        return stats
+
+
+def build_provision_jobs() -> ProvisionJobs:
+    return ProvisionJobs(
+        supabase_client.provision_tenant_schema,
+        build_job_store(),
+        workers=env_int("PROVISION_WORKERS", 2),
+        visibility_timeout=env_float("PROVISION_JOB_VISIBILITY_TIMEOUT", 900.0),
+    )
+
+
+provision_jobs = build_provision_jobs()
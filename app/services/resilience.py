@@ -0,0 +1,145 @@
+"""Retry policy and circuit breaker for calls to remote backends."""
+
+from __future__ import annotations
+
+import asyncio
+import logging
+import random
+import time
+from collections import Counter, deque
+from dataclasses import dataclass
+from typing import Callable, Deque
+
+import httpx
+
+
+class CircuitOpenError(ConnectionError):
+    """Raised instead of calling a backend that is currently failing."""
+
+
+def is_transient(exc: BaseException) -> bool:
+    """Whether ``exc`` is a network/timeout failure worth retrying.
+
+    Errors returned by the backend itself (constraint violations, bad requests)
+    are not transient: retrying them only repeats the same answer.
+    """
+
+    return isinstance(exc, (httpx.TransportError, asyncio.TimeoutError, TimeoutError, ConnectionError))
+
+
+@dataclass(frozen=True)
+class RetryPolicy:
+    """Exponential backoff with full jitter."""
+
+    attempts: int = 3
+    base_delay: float = 0.05
+    max_delay: float = 1.0
+
+    def backoff(self, retry: int, rng: Callable[[], float] = random.random) -> float:
+        """Delay before retry number ``retry`` (1-based)."""
+
+        return rng() * min(self.max_delay, self.base_delay * 2 ** (retry - 1))
+
+
+class CircuitBreaker:
+    """Fail fast once the recent failure rate crosses a threshold.
+
+    The breaker looks at the outcome of the last ``window`` calls. When at least
+    ``min_calls`` were recorded and the failure rate reaches
+    ``failure_rate_threshold`` it opens and rejects calls for ``open_seconds``;
+    it then lets ``half_open_max_calls`` probes through and closes again on
+    success or re-opens on failure.
+    """
+
+    CLOSED = "closed"
+    OPEN = "open"
+    HALF_OPEN = "half_open"
+
+    def __init__(
+        self,
+        name: str,
+        failure_rate_threshold: float = 0.5,
+        window: int = 20,
+        min_calls: int = 10,
+        open_seconds: float = 10.0,
+        half_open_max_calls: int = 1,
+        clock: Callable[[], float] = time.monotonic,
+    ) -> None:
+        self.name = name
+        self.failure_rate_threshold = failure_rate_threshold
+        self.min_calls = max(1, min_calls)
+        self.open_seconds = open_seconds
+        self.half_open_max_calls = max(1, half_open_max_calls)
+        self._clock = clock
+        self._outcomes: Deque[bool] = deque(maxlen=max(self.min_calls, window))
+        self._opened_at = 0.0
+        self._probes = 0
+        self.state = self.CLOSED
+        self.transitions: Counter[str] = Counter()
+        self.successes = 0
+        self.failures = 0
+        self.rejected = 0
+
+    def _transition(self, state: str) -> None:
+        if state == self.state:
+            return
+        self.transitions[f"{self.state}->{state}"] += 1
+        logging.warning("Circuit breaker %s: %s -> %s", self.name, self.state, state)
+        self.state = state
+        self._probes = 0
+        if state == self.OPEN:
+            self._opened_at = self._clock()
+        else:
+            self._outcomes.clear()
+
+    def allow(self) -> bool:
+        """Return whether a call may proceed, counting it as a probe when half open."""
+
+        if self.state == self.OPEN:
+            if self._clock() - self._opened_at < self.open_seconds:
+                self.rejected += 1
+                return False
+            self._transition(self.HALF_OPEN)
+        if self.state == self.HALF_OPEN:
+            if self._probes >= self.half_open_max_calls:
+                self.rejected += 1
+                return False
+            self._probes += 1
+        return True
+
+    def release(self) -> None:
+        """Give back the probe slot of a call that ended without an outcome (cancelled)."""
+
+        if self.state == self.HALF_OPEN and self._probes:
+            self._probes -= 1
+
+    def record_success(self) -> None:
+        self.successes += 1
+        if self.state == self.HALF_OPEN:
+            self._transition(self.CLOSED)
+            return
+        self._outcomes.append(True)
+
+    def record_failure(self) -> None:
+        self.failures += 1
+        if self.state == self.HALF_OPEN:
+            self._transition(self.OPEN)
+            return
+        self._outcomes.append(False)
+        if len(self._outcomes) >= self.min_calls and self.failure_rate() >= self.failure_rate_threshold:
+            self._transition(self.OPEN)
+
+    def failure_rate(self) -> float:
+        if not self._outcomes:
+            return 0.0
+        return self._outcomes.count(False) / len(self._outcomes)
+
+    def stats(self) -> dict[str, object]:
+        return {
+            "state": self.state,
+            "failure_rate": round(self.failure_rate(), 3),
+            "successes": self.successes,
+            "failures": self.failures,
+            "rejected": self.rejected,
+            "transitions": dict(self.transitions),
+        }
@@ -0,0 +1,303 @@
+"""Parse the exported `schema.sql` dump into individual statements.
+
+The dump has no statement terminators: `CREATE TABLE` bodies end with a line
+holding a single `)` and every other statement fits on one line.
+"""
+
+from __future__ import annotations
+
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from pathlib import Path
+from typing import Iterable, List, Optional
+
+SCHEMA_SQL_PATH = Path(__file__).resolve().parents[2] / "schema.sql"
+
+_TYPE_RE = re.compile(r"^CREATE TYPE (\S+) ")
+_TABLE_RE = re.compile(r"^CREATE TABLE (\S+) \($")
+_INDEX_RE = re.compile(r"^CREATE (?:UNIQUE )?INDEX \S+ ON (\S+) ")
+_COMMENT_RE = re.compile(r"^COMMENT ON (TABLE|COLUMN) (\S+) IS ")
+_ALTER_RE = re.compile(r"^ALTER TABLE (\S+) ")
+
+
+@dataclass(frozen=True)
+class SchemaStatement:
+    """One DDL statement from the dump and the table it belongs to."""
+
+    kind: str  # "type", "table", "index", "comment" or "alter"
+    name: Optional[str]
+    sql: str
+
+
+def parse_schema_sql(text: str) -> List[SchemaStatement]:
+    """Split the dump text into typed statements."""
+
+    statements: List[SchemaStatement] = []
+    lines = iter(line.rstrip() for line in text.splitlines())
+    for line in lines:
+        if not line:
+            continue
+        if match := _TABLE_RE.match(line):
+            body = [line]
+            for body_line in lines:
+                body.append(body_line)
+                if body_line == ")":
+                    break
+            statements.append(SchemaStatement("table", match.group(1), "\n".join(body)))
+        elif match := _TYPE_RE.match(line):
+            statements.append(SchemaStatement("type", match.group(1), line))
+        elif match := _INDEX_RE.match(line):
+            statements.append(SchemaStatement("index", match.group(1), line))
+        elif match := _COMMENT_RE.match(line):
+            target = match.group(2)
+            if match.group(1) == "COLUMN":
+                target = target.rsplit(".", 1)[0]
+            statements.append(SchemaStatement("comment", target, line))
+        elif match := _ALTER_RE.match(line):
+            statements.append(SchemaStatement("alter", match.group(1), line))
+        else:
+            raise ValueError(f"Unrecognized statement in schema dump: {line[:60]!r}")
+    return statements
+
+
+@lru_cache(maxsize=None)
+def load_schema_statements(path: Path = SCHEMA_SQL_PATH) -> tuple[SchemaStatement, ...]:
+    """Parse `schema.sql` once per process."""
+
+    return tuple(parse_schema_sql(path.read_text(encoding="utf-8")))
+
+
+def table_statements(tables: Iterable[str], path: Path = SCHEMA_SQL_PATH) -> List[str]:
+    """Return CREATE TABLE and CREATE INDEX statements for ``tables``, in the order given."""
+
+    wanted = list(tables)
+    statements = load_schema_statements(path)
+    result: List[str] = []
+    for table in wanted:
+        result.extend(s.sql for s in statements if s.kind == "table" and s.name == table)
+        result.extend(s.sql for s in statements if s.kind == "index" and s.name == table)
+    return result
+
+
+# Operational tables every tenant schema `org_<username>` gets, in dump order
+# (each table only references tables listed before it or added by an ALTER).
+TENANT_TYPES = ("stock_movement_type",)
+TENANT_TABLES = (
+    "orders",
+    "tables",
+    "faturacoes",
+    "company_settings",
+    "sales",
+    "products",
+    "suppliers",
+    "reservations",
+    "stock_movements",
+    "recipes",
+    "order_items",
+    "internal_productions",
+    "recipe_ingredients",
+    "production_ingredients",
+)
+TENANT_GRANT_ROLES = ("service_role",)
+# Column that tells tenants apart in the shared-schema tenancy mode.
+SHARED_TENANT_KEY = "company_id"
+
+_REFERENCES_RE = re.compile(r"\bREFERENCES (\S+) \(")
+_KEY_RE = re.compile(r"\b(PRIMARY KEY|UNIQUE(?: NULLS(?: NOT)? DISTINCT)?) \(([^)]*)\)")
+_FOREIGN_KEY_RE = re.compile(
+    r"FOREIGN KEY\(([^)]*)\) REFERENCES (\S+) \(([^)]*)\)(?P<actions>(?: ON (?:DELETE|UPDATE) [A-Z ]+?)*)(?=,?$)"
+)
+
+# Runs with search_path already pointing at the tenant schema.
+_TENANT_GRANTS = """DO $grants$
+DECLARE
+    role_name text;
+BEGIN
+    FOR role_name IN SELECT rolname FROM pg_roles WHERE rolname = ANY(ARRAY[{roles}]) LOOP
+        EXECUTE format('GRANT USAGE ON SCHEMA %I TO %I', current_schema(), role_name);
+        EXECUTE format('GRANT ALL ON ALL TABLES IN SCHEMA %I TO %I', current_schema(), role_name);
+        EXECUTE format('GRANT ALL ON ALL SEQUENCES IN SCHEMA %I TO %I', current_schema(), role_name);
+    END LOOP;
+END
+$grants$"""
+
+
+@dataclass(frozen=True)
+class TenantTemplate:
+    """Tenant DDL compiled into one multi-statement batch per phase.
+
+    The batches are schema-unqualified: `install_tenant_template` stores them
+    in the `tenant_template` table and `provision_tenant` (see
+    `sql/003_provision_tenant.sql`) creates the schema, points search_path at
+    it and runs the phases in order inside a single transaction.
+    """
+
+    phases: tuple[tuple[str, str], ...]  # (name, sql) for "tables", "indexes", "grants"
+
+
+def _strip_foreign_refs(create_table: str, allowed: set[str]) -> str:
+    """Drop the table's FOREIGN KEY constraints that point outside ``allowed``."""
+
+    lines = create_table.split("\n")
+    items = [line.rstrip().rstrip(",") for line in lines[1:-1]]
+    kept = [
+        item
+        for item in items
+        if not (match := _REFERENCES_RE.search(item)) or match.group(1) in allowed
+    ]
+    return "\n".join([lines[0], ",\n".join(kept), lines[-1]])
+
+
+def compile_tenant_template(
+    statements: Iterable[SchemaStatement],
+    types: Iterable[str] = TENANT_TYPES,
+    tables: Iterable[str] = TENANT_TABLES,
+    grant_roles: Iterable[str] = TENANT_GRANT_ROLES,
+) -> TenantTemplate:
+    """Build the tenant template from parsed `schema.sql` statements.
+
+    Foreign keys to platform tables (`companies`, `auth.users`) are dropped:
+    those rows do not live in the tenant schema.
+    """
+
+    statements = list(statements)
+    wanted_types = set(types)
+    table_order = list(tables)
+    allowed = set(table_order)
+    by_table: dict[str, List[SchemaStatement]] = {}
+    for statement in statements:
+        by_table.setdefault(statement.name or "", []).append(statement)
+
+    table_sql = [s.sql for s in statements if s.kind == "type" and s.name in wanted_types]
+    index_sql: List[str] = []
+    for table in table_order:
+        for statement in by_table.get(table, []):
+            if statement.kind == "table":
+                table_sql.append(_strip_foreign_refs(statement.sql, allowed))
+            elif statement.kind == "index":
+                index_sql.append(statement.sql)
+    for statement in statements:
+        if statement.kind == "alter" and statement.name in allowed:
+            match = _REFERENCES_RE.search(statement.sql)
+            if match is None or match.group(1) in allowed:
+                table_sql.append(statement.sql)
+    table_sql.extend(
+        s.sql for s in statements if s.kind == "comment" and s.name in allowed
+    )
+
+    roles = ", ".join("'" + role.replace("'", "''") + "'" for role in grant_roles)
+    return TenantTemplate(
+        phases=(
+            ("tables", ";\n".join(table_sql)),
+            ("indexes", ";\n".join(index_sql)),
+            ("grants", _TENANT_GRANTS.format(roles=roles)),
+        )
+    )
+
+
+def _shared_keys(sql: str, key: str) -> str:
+    """Lead every primary/unique key and intra-tenant foreign key with ``key``.
+
+    Unique constraints on a partitioned table must include the partition
+    key, and foreign keys then have to match the referenced key. ``SET
+    NULL`` actions are limited to the referencing column so ``key`` itself
+    is never nulled.
+    """
+
+    def unique(match: re.Match) -> str:
+        columns = [column.strip() for column in match.group(2).split(",")]
+        if key not in columns:
+            columns.insert(0, key)
+        return f"{match.group(1)} ({', '.join(columns)})"
+
+    def foreign(match: re.Match) -> str:
+        actions = match.group("actions").replace("SET NULL", f"SET NULL ({match.group(1)})")
+        return (
+            f"FOREIGN KEY({key}, {match.group(1)}) REFERENCES {match.group(2)} "
+            f"({key}, {match.group(3)}){actions}"
+        )
+
+    lines = []
+    for line in sql.split("\n"):
+        stripped = line.rstrip()
+        line = _KEY_RE.sub(unique, stripped)
+        line = _FOREIGN_KEY_RE.sub(foreign, line)
+        lines.append(line)
+    return "\n".join(lines)
+
+
+def compile_shared_template(
+    statements: Iterable[SchemaStatement],
+    partitions: int,
+    key: str = SHARED_TENANT_KEY,
+    types: Iterable[str] = TENANT_TYPES,
+    tables: Iterable[str] = TENANT_TABLES,
+    grant_roles: Iterable[str] = TENANT_GRANT_ROLES,
+) -> TenantTemplate:
+    """Build the shared-schema variant of the tenant template.
+
+    Every tenant table is created once, hash-partitioned by ``key`` into
+    ``partitions`` partitions, and tenants are told apart by that column;
+    tables that lack it (`order_items`, `recipe_ingredients`, ...) get it as
+    their first column. Phases: "tables", "partitions", "indexes", "grants".
+    """
+
+    schema_template = compile_tenant_template(statements, types, tables, grant_roles)
+    phases = dict(schema_template.phases)
+    table_order = list(tables)
+    table_sql: List[str] = []
+    for statement in phases["tables"].split(";\n"):
+        if statement.startswith("CREATE TABLE "):
+            header, body = statement.split("\n", 1)
+            if not re.search(rf"^\s*{key} ", body, re.MULTILINE):
+                body = f"\t{key} UUID NOT NULL, \n{body}"
+            statement = f"{header}\n{_shared_keys(body, key)} PARTITION BY HASH ({key})"
+        elif statement.startswith("ALTER TABLE "):
+            statement = _shared_keys(statement, key)
+        table_sql.append(statement)
+    partition_sql = [
+        f"CREATE TABLE {table}_p{index} PARTITION OF {table} "
+        f"FOR VALUES WITH (MODULUS {partitions}, REMAINDER {index})"
+        for table in table_order
+        for index in range(partitions)
+    ]
+    return TenantTemplate(
+        phases=(
+            ("tables", ";\n".join(table_sql)),
+            ("partitions", ";\n".join(partition_sql)),
+            ("indexes", phases["indexes"]),
+            ("grants", phases["grants"]),
+        )
+    )
+
+
+@lru_cache(maxsize=None)
+def shared_template(partitions: int, path: Path = SCHEMA_SQL_PATH) -> TenantTemplate:
+    """The compiled shared-schema template, built once per process and partition count."""
+
+    return compile_shared_template(load_schema_statements(path), partitions)
+
+
+@lru_cache(maxsize=None)
+def tenant_template(path: Path = SCHEMA_SQL_PATH) -> TenantTemplate:
+    """The compiled tenant template, built once per process."""
+
+    return compile_tenant_template(load_schema_statements(path))
+
+
+def install_tenant_template(conn, template: Optional[TenantTemplate] = None) -> int:
+    """Replace the phases `provision_tenant` runs with ``template``; returns their count.
+
+    ``conn`` is a psycopg connection whose search_path points at the schema
+    holding `tenant_template`. Run again whenever `schema.sql` changes.
+    """
+
+    template = template or tenant_template()
+    with conn.transaction():
+        conn.execute("DELETE FROM tenant_template")
+        for position, (name, batch) in enumerate(template.phases):
+            conn.execute(
+                "INSERT INTO tenant_template (position, name, sql) VALUES (%s, %s, %s)", (position, name, batch)
+            )
+    return len(template.phases)
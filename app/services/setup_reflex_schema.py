@@ -3,6 +3,8 @@ import logging
 import psycopg
 from pathlib import Path
 
+from app.services.schema_sql import install_tenant_template
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -34,6 +36,12 @@ def setup_schema():
             with conn.cursor() as cur:
                 logger.info("Executing schema setup SQL")
                 cur.execute(sql_command)
+                cur.execute("SET search_path TO reflex, public")
+                for function_path in sorted((current_dir / "sql").glob("*.sql")):
+                    logger.info(f"Applying {function_path.name}")
+                    cur.execute(function_path.read_text(encoding="utf-8"))
+            logger.info("Installing the tenant template from schema.sql")
+            install_tenant_template(conn)
             conn.commit()
         logger.info("✅ Schema setup completed successfully!")
         logger.info("=" * 60)
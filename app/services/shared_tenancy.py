@@ -0,0 +1,78 @@
+"""Shared-schema tenancy: all tenants in one set of hash-partitioned tables.
+
+Selected with ``TENANCY_MODE=shared``. The tenant tables of `schema.sql` are
+created once in ``TENANT_SHARED_SCHEMA``, each hash-partitioned by
+``company_id`` into ``TENANT_SHARED_PARTITIONS`` partitions (see
+`compile_shared_template`), and provisioning a tenant only inserts its row
+in `shared_tenants` (`sql/008_shared_tenancy.sql`). Queries must filter on
+``company_id`` so Postgres prunes them to one partition.
+
+    python -m app.services.shared_tenancy --partitions 16
+"""
+
+from __future__ import annotations
+
+import argparse
+import logging
+import os
+import sys
+from typing import List, Optional
+
+import psycopg
+from psycopg import sql
+
+from app.services.schema_sql import shared_template
+from app.utils.env import database_url, env_int
+
+SCHEMA_MODE = "schema"
+SHARED_MODE = "shared"
+
+
+def tenancy_mode() -> str:
+    """``schema`` (one `org_<username>` schema per tenant, default) or ``shared``."""
+
+    mode = os.environ.get("TENANCY_MODE", SCHEMA_MODE).strip().lower() or SCHEMA_MODE
+    if mode not in (SCHEMA_MODE, SHARED_MODE):
+        logging.warning("Invalid TENANCY_MODE=%r, using %s.", mode, SCHEMA_MODE)
+        return SCHEMA_MODE
+    return mode
+
+
+def shared_schema_name() -> str:
+    return os.environ.get("TENANT_SHARED_SCHEMA", "tenant_shared")
+
+
+def install_shared_schema(conn: psycopg.Connection, schema: str, partitions: int) -> bool:
+    """Create the partitioned tenant tables in ``schema``; ``False`` if already installed."""
+
+    with conn.transaction():
+        if conn.execute("SELECT to_regclass(%s)", (f'"{schema}".orders',)).fetchone()[0]:
+            return False
+        conn.execute(sql.SQL("CREATE SCHEMA IF NOT EXISTS {}").format(sql.Identifier(schema)))
+        conn.execute(sql.SQL("SET LOCAL search_path TO {}, public").format(sql.Identifier(schema)))
+        for _, batch in shared_template(partitions).phases:
+            conn.execute(batch)
+    return True
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Cria as tabelas compartilhadas do modo multi-tenant por company_id.")
+    parser.add_argument("--dsn", default=database_url(), help="DSN Postgres (padrão: DATABASE_URL)")
+    parser.add_argument("--schema", default=shared_schema_name())
+    parser.add_argument("--partitions", type=int, default=env_int("TENANT_SHARED_PARTITIONS", 16))
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if not args.dsn:
+        logging.error("DATABASE_URL or --dsn is required.")
+        return 2
+    with psycopg.connect(args.dsn, autocommit=True) as conn:
+        if install_shared_schema(conn, args.schema, max(1, args.partitions)):
+            logging.info("Installed shared tenant tables in %s (%d partitions).", args.schema, args.partitions)
+        else:
+            logging.info("Shared tenant tables already installed in %s.", args.schema)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,93 @@
+-- Atomic onboarding finalization.
+--
+-- Inserts the boteco, the owner's user_boteco membership and creates the
+-- tenant schema org_<username> in a single transaction, so the onboarding
+-- flow needs one round trip and never leaves orphaned rows behind. When a
+-- pre-built spare schema is available (004_tenant_spares.sql) it is renamed
+-- to org_<username> instead; otherwise the schema starts empty and the
+-- provisioning job applies the tenant template. With `shared_schema` set
+-- (shared-schema tenancy, 008_shared_tenancy.sql) no schema is created: the
+-- tenant is registered in `shared_tenants` under the new boteco's id.
+--
+-- Apply with the search_path pointing at the schema that holds the
+-- users/boteco/user_boteco tables (e.g. `SET search_path TO reflex;`): the
+-- function pins that search_path at creation time.
+
+DROP FUNCTION IF EXISTS finalize_onboarding(jsonb, jsonb);
+
+CREATE OR REPLACE FUNCTION finalize_onboarding(
+    boteco_data jsonb, user_boteco_data jsonb, shared_schema text DEFAULT NULL
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path FROM CURRENT
+AS $$
+DECLARE
+    new_boteco boteco%ROWTYPE;
+    new_membership user_boteco%ROWTYPE;
+    tenant_schema text;
+    spare text;
+    claim_started timestamptz;
+    shared jsonb;
+BEGIN
+    IF coalesce(boteco_data->>'username', '') !~ '^[a-zA-Z0-9][a-zA-Z0-9_]{2,29}$' THEN
+        RAISE EXCEPTION 'Invalid boteco username: %', boteco_data->>'username'
+            USING ERRCODE = 'invalid_parameter_value';
+    END IF;
+
+    INSERT INTO boteco (
+        public_name, username, service_category, offered_products_services,
+        average_staff_count, social_links, has_own_digital_infra, vibe_tags,
+        establishment_tax_number, country, postal_code, owner_tax_number,
+        reference, created_by_email, created_by_user_id
+    )
+    SELECT
+        r.public_name, r.username, r.service_category, r.offered_products_services,
+        r.average_staff_count, r.social_links, coalesce(r.has_own_digital_infra, false), r.vibe_tags,
+        r.establishment_tax_number, r.country, r.postal_code, r.owner_tax_number,
+        r.reference, r.created_by_email, r.created_by_user_id
+    FROM jsonb_populate_record(NULL::boteco, boteco_data) AS r
+    RETURNING * INTO new_boteco;
+
+    INSERT INTO user_boteco (user_id, boteco_id, assigned_role, reference, plan)
+    SELECT r.user_id, new_boteco.id, coalesce(r.assigned_role, 'owner'), r.reference, r.plan
+    FROM jsonb_populate_record(NULL::user_boteco, user_boteco_data) AS r
+    RETURNING * INTO new_membership;
+
+    IF shared_schema IS NOT NULL THEN
+        shared := provision_shared_tenant(new_boteco.username, shared_schema, new_boteco.id);
+        RETURN jsonb_build_object(
+            'boteco', to_jsonb(new_boteco),
+            'membership', to_jsonb(new_membership),
+            'schema', shared_schema,
+            'company_id', shared->'company_id'
+        );
+    END IF;
+
+    tenant_schema := 'org_' || new_boteco.username;
+    claim_started := clock_timestamp();
+    spare := claim_spare_schema(tenant_schema);
+    IF spare IS NULL THEN
+        EXECUTE format('CREATE SCHEMA IF NOT EXISTS %I', tenant_schema);
+    END IF;
+
+    RETURN jsonb_build_object(
+        'boteco', to_jsonb(new_boteco),
+        'membership', to_jsonb(new_membership),
+        'schema', tenant_schema,
+        'spare', spare,
+        'claim_ms', round(extract(epoch FROM clock_timestamp() - claim_started)::numeric * 1000, 3)
+    );
+END;
+$$;
+
+REVOKE ALL ON FUNCTION finalize_onboarding(jsonb, jsonb, text) FROM PUBLIC;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+        GRANT EXECUTE ON FUNCTION finalize_onboarding(jsonb, jsonb, text) TO service_role;
+    END IF;
+END;
+$$;
@@ -0,0 +1,40 @@
+-- Push user_boteco changes to listeners on the `user_boteco_changes` channel.
+--
+-- Each row change is published as JSON {op, user_id, boteco_id, role} so
+-- in-process membership indexes can stay fresh without polling. A TRUNCATE
+-- is published as {op: "TRUNCATE"} and tells listeners to drop everything.
+
+CREATE OR REPLACE FUNCTION notify_user_boteco_change()
+RETURNS trigger
+LANGUAGE plpgsql
+AS $$
+BEGIN
+    IF TG_OP = 'TRUNCATE' THEN
+        PERFORM pg_notify('user_boteco_changes', json_build_object('op', TG_OP)::text);
+        RETURN NULL;
+    END IF;
+    IF TG_OP IN ('DELETE', 'UPDATE') THEN
+        PERFORM pg_notify('user_boteco_changes', json_build_object(
+            'op', 'DELETE', 'user_id', OLD.user_id, 'boteco_id', OLD.boteco_id,
+            'role', OLD.assigned_role
+        )::text);
+    END IF;
+    IF TG_OP IN ('INSERT', 'UPDATE') THEN
+        PERFORM pg_notify('user_boteco_changes', json_build_object(
+            'op', 'INSERT', 'user_id', NEW.user_id, 'boteco_id', NEW.boteco_id,
+            'role', NEW.assigned_role
+        )::text);
+    END IF;
+    RETURN NULL;
+END;
+$$;
+
+DROP TRIGGER IF EXISTS user_boteco_notify ON user_boteco;
+CREATE TRIGGER user_boteco_notify
+    AFTER INSERT OR UPDATE OR DELETE ON user_boteco
+    FOR EACH ROW EXECUTE FUNCTION notify_user_boteco_change();
+
+DROP TRIGGER IF EXISTS user_boteco_notify_truncate ON user_boteco;
+CREATE TRIGGER user_boteco_notify_truncate
+    AFTER TRUNCATE ON user_boteco
+    FOR EACH STATEMENT EXECUTE FUNCTION notify_user_boteco_change();
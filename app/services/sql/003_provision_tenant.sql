@@ -0,0 +1,109 @@
+-- Tenant schema provisioning in one transaction.
+--
+-- Creates org_<username>, points search_path at it and runs the compiled
+-- tenant template (see app/services/schema_sql.py: tables, indexes, grants)
+-- as one multi-statement batch per phase. Returns the time spent in each
+-- phase. Provisioned schemas are recorded in `tenant_schemas`; a schema
+-- already listed there is left untouched, so a retried job is a no-op.
+--
+-- The phases are read from `tenant_template`, written by the setup step
+-- (`install_tenant_template`, run by setup_reflex_schema) and not writable
+-- by the API roles: callers only pick the schema name, never the DDL.
+--
+-- Apply with the search_path pointing at the schema that holds the
+-- users/boteco/user_boteco tables (e.g. `SET search_path TO reflex;`).
+
+CREATE TABLE IF NOT EXISTS tenant_schemas (
+    schema_name text PRIMARY KEY,
+    provisioned_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE TABLE IF NOT EXISTS tenant_template (
+    position integer PRIMARY KEY,
+    name text NOT NULL,
+    sql text NOT NULL,
+    installed_at timestamptz NOT NULL DEFAULT now()
+);
+
+REVOKE ALL ON tenant_template FROM PUBLIC;
+
+DO $$
+DECLARE
+    role_name text;
+BEGIN
+    -- Supabase grants new tables to its API roles by default.
+    FOR role_name IN
+        SELECT rolname FROM pg_roles WHERE rolname IN ('anon', 'authenticated', 'service_role')
+    LOOP
+        EXECUTE format('REVOKE ALL ON tenant_template FROM %I', role_name);
+    END LOOP;
+END;
+$$;
+
+-- The previous signature took the DDL from the caller.
+DROP FUNCTION IF EXISTS provision_tenant(text, jsonb);
+
+CREATE OR REPLACE FUNCTION provision_tenant(tenant_schema text)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path FROM CURRENT
+AS $$
+DECLARE
+    phases jsonb;
+    phase jsonb;
+    started timestamptz;
+    timings jsonb := '{}'::jsonb;
+BEGIN
+    IF coalesce(tenant_schema, '') !~ '^org_[a-zA-Z0-9_]{3,30}$' THEN
+        RAISE EXCEPTION 'Invalid tenant schema: %', tenant_schema
+            USING ERRCODE = 'invalid_parameter_value';
+    END IF;
+
+    -- Serialize concurrent provisioning of the same tenant.
+    PERFORM pg_advisory_xact_lock(hashtext('provision_tenant:' || tenant_schema));
+
+    IF EXISTS (SELECT 1 FROM tenant_schemas WHERE schema_name = tenant_schema) THEN
+        RETURN jsonb_build_object('schema', tenant_schema, 'created', false, 'timings', timings);
+    END IF;
+
+    -- Read before search_path moves to the tenant schema.
+    SELECT jsonb_agg(jsonb_build_object('name', name, 'sql', sql) ORDER BY position)
+    INTO phases
+    FROM tenant_template;
+    IF phases IS NULL THEN
+        RAISE EXCEPTION 'Tenant template not installed'
+            USING ERRCODE = 'object_not_in_prerequisite_state',
+                  HINT = 'Run python -m app.services.setup_reflex_schema.';
+    END IF;
+
+    started := clock_timestamp();
+    EXECUTE format('CREATE SCHEMA IF NOT EXISTS %I', tenant_schema);
+    INSERT INTO tenant_schemas (schema_name) VALUES (tenant_schema);
+    -- Reverted when the function returns (SET clause above).
+    PERFORM set_config('search_path', format('%I, public', tenant_schema), true);
+    timings := timings || jsonb_build_object(
+        'schema', round(extract(epoch FROM clock_timestamp() - started)::numeric * 1000, 3)
+    );
+
+    FOR phase IN SELECT value FROM jsonb_array_elements(phases) LOOP
+        started := clock_timestamp();
+        EXECUTE phase->>'sql';
+        timings := timings || jsonb_build_object(
+            phase->>'name', round(extract(epoch FROM clock_timestamp() - started)::numeric * 1000, 3)
+        );
+    END LOOP;
+
+    RETURN jsonb_build_object('schema', tenant_schema, 'created', true, 'timings', timings);
+END;
+$$;
+
+REVOKE ALL ON FUNCTION provision_tenant(text) FROM PUBLIC;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+        GRANT EXECUTE ON FUNCTION provision_tenant(text) TO service_role;
+    END IF;
+END;
+$$;
@@ -0,0 +1,91 @@
+-- Pre-built spare tenant schemas.
+--
+-- build_spare_schema() provisions one org__spare_<suffix> schema with the
+-- tenant template while fewer than `target` spares exist. One builder runs at
+-- a time across all processes; callers that find it busy get busy=true.
+-- claim_spare_schema() renames the oldest spare to the tenant's schema, so
+-- finalize_onboarding gets a fully built schema for the cost of a catalog
+-- rename. Usernames cannot start with "_", so no tenant is named like a spare.
+--
+-- Apply after 003_provision_tenant.sql, with the same search_path.
+
+CREATE OR REPLACE FUNCTION spare_schema_count()
+RETURNS integer
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path FROM CURRENT
+AS $$
+    SELECT count(*)::integer FROM tenant_schemas WHERE schema_name LIKE 'org\_\_spare\_%';
+$$;
+
+DROP FUNCTION IF EXISTS build_spare_schema(integer, jsonb);
+
+CREATE OR REPLACE FUNCTION build_spare_schema(target integer)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path FROM CURRENT
+AS $$
+DECLARE
+    available integer;
+    built jsonb;
+BEGIN
+    IF NOT pg_try_advisory_xact_lock(hashtext('build_spare_schema')) THEN
+        RETURN jsonb_build_object('schema', NULL, 'available', spare_schema_count(), 'busy', true);
+    END IF;
+    available := spare_schema_count();
+    IF available >= target THEN
+        RETURN jsonb_build_object('schema', NULL, 'available', available, 'busy', false);
+    END IF;
+    built := provision_tenant(
+        'org__spare_' || substr(md5(random()::text || clock_timestamp()::text), 1, 12)
+    );
+    RETURN built || jsonb_build_object('available', available + 1, 'busy', false);
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION claim_spare_schema(tenant_schema text)
+RETURNS text
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path FROM CURRENT
+AS $$
+DECLARE
+    spare text;
+BEGIN
+    IF to_regnamespace(quote_ident(tenant_schema)) IS NOT NULL THEN
+        RETURN NULL;
+    END IF;
+    SELECT schema_name INTO spare
+    FROM tenant_schemas
+    WHERE schema_name LIKE 'org\_\_spare\_%'
+    ORDER BY provisioned_at
+    LIMIT 1
+    FOR UPDATE SKIP LOCKED;
+    IF spare IS NULL THEN
+        RETURN NULL;
+    END IF;
+    EXECUTE format('ALTER SCHEMA %I RENAME TO %I', spare, tenant_schema);
+    UPDATE tenant_schemas SET schema_name = tenant_schema WHERE schema_name = spare;
+    -- Migration progress follows the schema (006_tenant_migrations.sql may not be applied yet).
+    IF to_regclass('tenant_migrations') IS NOT NULL THEN
+        UPDATE tenant_migrations SET schema_name = tenant_schema WHERE schema_name = spare;
+    END IF;
+    RETURN spare;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION spare_schema_count() FROM PUBLIC;
+REVOKE ALL ON FUNCTION build_spare_schema(integer) FROM PUBLIC;
+REVOKE ALL ON FUNCTION claim_spare_schema(text) FROM PUBLIC;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+        GRANT EXECUTE ON FUNCTION spare_schema_count() TO service_role;
+        GRANT EXECUTE ON FUNCTION build_spare_schema(integer) TO service_role;
+        GRANT EXECUTE ON FUNCTION claim_spare_schema(text) TO service_role;
+    END IF;
+END;
+$$;
@@ -0,0 +1,44 @@
+-- Batch tenant provisioning: many tenants per round trip and transaction.
+--
+-- provision_tenants() calls provision_tenant() for each schema name inside
+-- its own sub-transaction (BEGIN ... EXCEPTION), so a tenant that fails is
+-- rolled back and reported with its error while the rest of the group is
+-- still committed. Returns one result object per name, in input order.
+--
+-- Apply after 003_provision_tenant.sql, with the same search_path.
+
+DROP FUNCTION IF EXISTS provision_tenants(text[], jsonb);
+
+CREATE OR REPLACE FUNCTION provision_tenants(schema_names text[])
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path FROM CURRENT
+AS $$
+DECLARE
+    tenant_schema text;
+    results jsonb := '[]'::jsonb;
+BEGIN
+    FOREACH tenant_schema IN ARRAY coalesce(schema_names, '{}'::text[]) LOOP
+        BEGIN
+            results := results || jsonb_build_array(provision_tenant(tenant_schema));
+        EXCEPTION WHEN OTHERS THEN
+            results := results || jsonb_build_array(jsonb_build_object(
+                'schema', tenant_schema, 'created', false, 'timings', '{}'::jsonb,
+                'error', SQLERRM, 'code', SQLSTATE
+            ));
+        END;
+    END LOOP;
+    RETURN results;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION provision_tenants(text[]) FROM PUBLIC;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+        GRANT EXECUTE ON FUNCTION provision_tenants(text[]) TO service_role;
+    END IF;
+END;
+$$;
@@ -0,0 +1,19 @@
+-- Progress of versioned tenant migrations (app/services/tenant_migrations.py).
+--
+-- One row per tenant schema and migration version, written in the same
+-- transaction that applies the migration to that schema. An interrupted run
+-- resumes by skipping the pairs already listed here, and two runners cannot
+-- apply the same pair twice: the second one waits on the primary key and
+-- then finds the row.
+--
+-- Apply with the search_path pointing at the shared schema (e.g. reflex).
+
+CREATE TABLE IF NOT EXISTS tenant_migrations (
+    schema_name text NOT NULL,
+    version text NOT NULL,
+    applied_at timestamptz NOT NULL DEFAULT now(),
+    duration_ms numeric,
+    PRIMARY KEY (schema_name, version)
+);
+
+CREATE INDEX IF NOT EXISTS tenant_migrations_version_idx ON tenant_migrations (version);
@@ -0,0 +1,74 @@
+-- Activity tracking and archive bookkeeping for tenant schemas.
+--
+-- `last_active_at` is bumped by touch_tenant() whenever a tenant is opened
+-- (at most once per `every` to keep the hot path free of write churn).
+-- Dormant schemas are exported to compressed binary COPY files by
+-- app/services/tenant_archive.py and dropped; their `tenant_schemas` row
+-- stays with `archived_at`/`archive_path` set, so provision_tenant() does not
+-- recreate an empty schema over the archive and the next touch restores it.
+-- Tenants never touched have no activity on record and are never dormant.
+--
+-- Apply after 003_provision_tenant.sql, with the same search_path.
+
+ALTER TABLE tenant_schemas ADD COLUMN IF NOT EXISTS last_active_at timestamptz;
+ALTER TABLE tenant_schemas ADD COLUMN IF NOT EXISTS archived_at timestamptz;
+ALTER TABLE tenant_schemas ADD COLUMN IF NOT EXISTS archive_path text;
+
+DROP INDEX IF EXISTS tenant_schemas_activity_idx;
+CREATE INDEX IF NOT EXISTS tenant_schemas_last_active_idx
+    ON tenant_schemas (last_active_at)
+    WHERE archived_at IS NULL AND last_active_at IS NOT NULL;
+
+CREATE OR REPLACE FUNCTION touch_tenant(tenant_schema text, every interval DEFAULT interval '5 minutes')
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path FROM CURRENT
+AS $$
+DECLARE
+    tenant tenant_schemas%ROWTYPE;
+BEGIN
+    UPDATE tenant_schemas
+    SET last_active_at = now()
+    WHERE schema_name = tenant_schema
+      AND (last_active_at IS NULL OR last_active_at < now() - every);
+    SELECT * INTO tenant FROM tenant_schemas WHERE schema_name = tenant_schema;
+    IF NOT FOUND THEN
+        RETURN jsonb_build_object('schema', tenant_schema, 'exists', false, 'archived', false);
+    END IF;
+    RETURN jsonb_build_object(
+        'schema', tenant_schema,
+        'exists', true,
+        'archived', tenant.archived_at IS NOT NULL,
+        'archive_path', tenant.archive_path
+    );
+END;
+$$;
+
+CREATE OR REPLACE FUNCTION dormant_tenants(idle interval, max_tenants integer)
+RETURNS SETOF text
+LANGUAGE sql
+STABLE
+SECURITY DEFINER
+SET search_path FROM CURRENT
+AS $$
+    SELECT schema_name
+    FROM tenant_schemas
+    WHERE archived_at IS NULL
+      AND schema_name NOT LIKE 'org\_\_spare\_%'
+      AND last_active_at < now() - idle
+    ORDER BY last_active_at
+    LIMIT max_tenants;
+$$;
+
+REVOKE ALL ON FUNCTION touch_tenant(text, interval) FROM PUBLIC;
+REVOKE ALL ON FUNCTION dormant_tenants(interval, integer) FROM PUBLIC;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+        GRANT EXECUTE ON FUNCTION touch_tenant(text, interval) TO service_role;
+        GRANT EXECUTE ON FUNCTION dormant_tenants(interval, integer) TO service_role;
+    END IF;
+END;
+$$;
@@ -0,0 +1,99 @@
+-- Shared-schema tenancy mode.
+--
+-- Instead of one org_<username> schema per tenant, every tenant's rows live
+-- in one set of tables hash-partitioned by company_id (compiled from
+-- schema.sql by compile_shared_template in app/services/schema_sql.py and
+-- installed with `python -m app.services.shared_tenancy`). Provisioning a
+-- tenant is then a single row in `shared_tenants` that maps the boteco
+-- username to its company_id (the boteco id when the boteco exists).
+--
+-- Apply after 001_finalize_onboarding.sql, with the same search_path.
+
+CREATE TABLE IF NOT EXISTS shared_tenants (
+    tenant_name text PRIMARY KEY,
+    company_id uuid NOT NULL UNIQUE,
+    provisioned_at timestamptz NOT NULL DEFAULT now()
+);
+
+CREATE OR REPLACE FUNCTION provision_shared_tenant(
+    boteco_username text, shared_schema text, company uuid DEFAULT NULL
+)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path FROM CURRENT
+AS $$
+DECLARE
+    started timestamptz := clock_timestamp();
+    tenant_company uuid := company;
+    created boolean;
+BEGIN
+    IF coalesce(boteco_username, '') !~ '^[a-zA-Z0-9][a-zA-Z0-9_]{2,29}$' THEN
+        RAISE EXCEPTION 'Invalid boteco username: %', boteco_username
+            USING ERRCODE = 'invalid_parameter_value';
+    END IF;
+    IF to_regclass(format('%I.orders', shared_schema)) IS NULL THEN
+        RAISE EXCEPTION 'Shared tenant schema % is not installed', shared_schema
+            USING ERRCODE = 'undefined_table';
+    END IF;
+    IF tenant_company IS NULL AND to_regclass('boteco') IS NOT NULL THEN
+        EXECUTE 'SELECT id FROM boteco WHERE username = $1' INTO tenant_company USING boteco_username;
+    END IF;
+
+    INSERT INTO shared_tenants (tenant_name, company_id)
+    VALUES (boteco_username, coalesce(tenant_company, gen_random_uuid()))
+    ON CONFLICT (tenant_name) DO NOTHING
+    RETURNING company_id INTO tenant_company;
+    created := FOUND;
+    IF NOT created THEN
+        SELECT company_id INTO tenant_company FROM shared_tenants WHERE tenant_name = boteco_username;
+    END IF;
+
+    RETURN jsonb_build_object(
+        'schema', shared_schema,
+        'company_id', tenant_company,
+        'created', created,
+        'timings', jsonb_build_object(
+            'insert', round(extract(epoch FROM clock_timestamp() - started)::numeric * 1000, 3)
+        )
+    );
+END;
+$$;
+
+-- Same contract as provision_tenants(): one result per name, in input order,
+-- each tenant in its own sub-transaction.
+CREATE OR REPLACE FUNCTION provision_shared_tenants(boteco_usernames text[], shared_schema text)
+RETURNS jsonb
+LANGUAGE plpgsql
+SECURITY DEFINER
+SET search_path FROM CURRENT
+AS $$
+DECLARE
+    boteco_username text;
+    results jsonb := '[]'::jsonb;
+BEGIN
+    FOREACH boteco_username IN ARRAY coalesce(boteco_usernames, '{}'::text[]) LOOP
+        BEGIN
+            results := results || jsonb_build_array(provision_shared_tenant(boteco_username, shared_schema));
+        EXCEPTION WHEN OTHERS THEN
+            results := results || jsonb_build_array(jsonb_build_object(
+                'schema', shared_schema, 'created', false, 'timings', '{}'::jsonb,
+                'error', SQLERRM, 'code', SQLSTATE
+            ));
+        END;
+    END LOOP;
+    RETURN results;
+END;
+$$;
+
+REVOKE ALL ON FUNCTION provision_shared_tenant(text, text, uuid) FROM PUBLIC;
+REVOKE ALL ON FUNCTION provision_shared_tenants(text[], text) FROM PUBLIC;
+
+DO $$
+BEGIN
+    IF EXISTS (SELECT 1 FROM pg_roles WHERE rolname = 'service_role') THEN
+        GRANT EXECUTE ON FUNCTION provision_shared_tenant(text, text, uuid) TO service_role;
+        GRANT EXECUTE ON FUNCTION provision_shared_tenants(text[], text) TO service_role;
+    END IF;
+END;
+$$;
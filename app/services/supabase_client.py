@@ -2,18 +2,53 @@
 
 from __future__ import annotations
 
+import asyncio
+import contextlib
 import inspect
 import logging
 import os
-from typing import Any, Awaitable, Callable, List, Optional
+from typing import Any, AsyncIterator, Awaitable, Callable, List, Optional, TypeVar
 
 import httpx
 from postgrest import APIResponse
 from supabase import Client, ClientOptions, create_client
 
+from app.services.cache import MISSING, TTLCache
+from app.services.executor import BlockingCallExecutor
+from app.services.idempotency import build_idempotency
+from app.services.membership_index import MembershipIndex, Memberships
+from app.services.metrics import SUPABASE_CALL_SECONDS, time_public_coroutines
+from app.services.models import (
+    BotecoRow,
+    MembershipRow,
+    OnboardingResult,
+    SpareBuild,
+    TenantSchema,
+    UserRow,
+)
+from app.services.resilience import CircuitBreaker, CircuitOpenError, RetryPolicy, is_transient
+from app.services.shared_tenancy import SHARED_MODE, shared_schema_name, tenancy_mode
+from app.services.singleflight import SingleFlight
+from app.services.tenant_pool import SpareSchemaPool
+from app.utils.env import database_url, env_float, env_int
+
+PROVISION_ORG_PATH = "/api/provision_org"
+
+T = TypeVar("T")
+
 
 class SupabaseClient:
-    """A helper class to interact with the Supabase backend."""
+    """A helper class to interact with the Supabase backend.
+
+    Public coroutine methods, including those overridden by subclasses, are
+    timed into the `supabase_call_seconds` histogram.
+    """
+
+    backend_name = "postgrest"
+
+    def __init_subclass__(cls, **kwargs: Any) -> None:
+        super().__init_subclass__(**kwargs)
+        time_public_coroutines(cls, SUPABASE_CALL_SECONDS, skip=("aclose",))
 
     def __init__(self) -> None:
         self.url: Optional[str] = os.environ.get("SUPABASE_URL")
@@ -21,6 +56,65 @@ class SupabaseClient:
             "SUPABASE_KEY"
         )
         self.client: Optional[Client] = self._initialize_client()
+        self.provision_base_url: str = os.environ.get(
+            "PROVISION_API_URL", "http://localhost:8000"
+        ).rstrip("/")
+        self._http_client: Optional[httpx.AsyncClient] = None
+        self.executor = BlockingCallExecutor(
+            max_workers=env_int("SUPABASE_EXECUTOR_WORKERS", 16),
+            thread_name_prefix="supabase",
+        )
+        # Only positive lookups are cached: a missing user or membership may be
+        # created by another process at any moment and must be seen right away.
+        self.user_cache = TTLCache(
+            maxsize=env_int("SUPABASE_CACHE_MAXSIZE", 10_000),
+            ttl=env_float("SUPABASE_USER_CACHE_TTL", 60.0),
+        )
+        self.membership_cache = TTLCache(
+            maxsize=env_int("SUPABASE_CACHE_MAXSIZE", 10_000),
+            ttl=env_float("SUPABASE_MEMBERSHIP_CACHE_TTL", 30.0),
+        )
+        self.singleflight = SingleFlight()
+        self.retry_policy = RetryPolicy(
+            attempts=max(1, env_int("SUPABASE_RETRY_ATTEMPTS", 3)),
+            base_delay=env_float("SUPABASE_RETRY_BASE_DELAY", 0.05),
+            max_delay=env_float("SUPABASE_RETRY_MAX_DELAY", 1.0),
+        )
+        self.call_deadline: float = env_float("SUPABASE_CALL_DEADLINE", 5.0)
+        self.breaker = CircuitBreaker(
+            "supabase",
+            failure_rate_threshold=env_float("SUPABASE_BREAKER_FAILURE_RATE", 0.5),
+            window=env_int("SUPABASE_BREAKER_WINDOW", 20),
+            min_calls=env_int("SUPABASE_BREAKER_MIN_CALLS", 10),
+            open_seconds=env_float("SUPABASE_BREAKER_OPEN_SECONDS", 10.0),
+        )
+        # Tenant DDL takes seconds per group: it gets its own deadline and
+        # breaker so a slow batch never trips the breaker guarding sign-in.
+        self.provision_deadline: float = env_float("PROVISION_CALL_DEADLINE", 600.0)
+        self.provision_breaker = CircuitBreaker(
+            "supabase-provisioning",
+            failure_rate_threshold=env_float("SUPABASE_BREAKER_FAILURE_RATE", 0.5),
+            window=env_int("SUPABASE_BREAKER_WINDOW", 20),
+            min_calls=env_int("SUPABASE_BREAKER_MIN_CALLS", 10),
+            open_seconds=env_float("SUPABASE_BREAKER_OPEN_SECONDS", 10.0),
+        )
+        self.retries = 0
+        self.deadline_exceeded = 0
+        self.membership_index = MembershipIndex(
+            self._load_memberships,
+            dsn=database_url(),
+            maxsize=env_int("MEMBERSHIP_INDEX_MAXSIZE", 50_000),
+        )
+        self.tenancy: str = tenancy_mode()
+        self.shared_schema: str = shared_schema_name()
+        # Spares are pre-built `org_*` schemas: pointless when tenants share tables.
+        self.spare_pool = SpareSchemaPool(
+            self.build_spare_schema,
+            size=env_int("TENANT_SPARE_POOL_SIZE", 0) if self.tenancy != SHARED_MODE else 0,
+            refill_per_tick=env_int("TENANT_SPARE_REFILL_PER_TICK", 1),
+            interval=env_float("TENANT_SPARE_REFILL_INTERVAL", 5.0),
+        )
+        self.idempotency = build_idempotency()
 
     def _initialize_client(self) -> Optional[Client]:
         """Create a Supabase client if credentials are present."""
@@ -34,6 +128,53 @@ class SupabaseClient:
             logging.exception("Error initializing Supabase client: %s", exc)
             return None
 
+    def _build_http_client(self) -> httpx.AsyncClient:
+        """Create the pooled keep-alive client used for internal API calls."""
+
+        limits = httpx.Limits(
+            max_connections=env_int("PROVISION_HTTP_MAX_CONNECTIONS", 20),
+            max_keepalive_connections=env_int("PROVISION_HTTP_MAX_KEEPALIVE", 10),
+            keepalive_expiry=env_float("PROVISION_HTTP_KEEPALIVE_EXPIRY", 30.0),
+        )
+        timeout = httpx.Timeout(
+            env_float("PROVISION_HTTP_TIMEOUT", 10.0),
+            connect=env_float("PROVISION_HTTP_CONNECT_TIMEOUT", 5.0),
+            pool=env_float("PROVISION_HTTP_POOL_TIMEOUT", 5.0),
+        )
+        return httpx.AsyncClient(base_url=self.provision_base_url, limits=limits, timeout=timeout)
+
+    def _get_http_client(self) -> httpx.AsyncClient:
+        """Return the shared HTTP client, opening it lazily outside the app lifespan."""
+
+        if self._http_client is None or self._http_client.is_closed:
+            self._http_client = self._build_http_client()
+        return self._http_client
+
+    async def aclose(self) -> None:
+        """Close pooled connections and worker threads held by this helper."""
+
+        if self._http_client is not None:
+            await self._http_client.aclose()
+            self._http_client = None
+        self.executor.shutdown(wait=False)
+        await self.idempotency.store.aclose()
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self) -> AsyncIterator[None]:
+        """Open the HTTP pool, membership listener and spare-schema filler for the app's lifetime."""
+
+        self._get_http_client()
+        spare_pool = self.spare_pool.lifespan() if self.is_configured else contextlib.nullcontext()
+        try:
+            async with self.membership_index.lifespan(), spare_pool:
+                yield
+        finally:
+            await self.aclose()
+
+    @property
+    def is_configured(self) -> bool:
+        return self.client is not None
+
     def _require_client(self) -> Client:
         if not self.client:
             raise ConnectionError(
@@ -41,13 +182,30 @@ class SupabaseClient:
             )
         return self.client
 
-    async def _execute(self, action: Callable[[Client], Awaitable[APIResponse] | APIResponse]) -> APIResponse:
-        """Execute an action against Supabase, supporting sync or async clients."""
+    async def _execute(
+        self,
+        action: Callable[[Client], Awaitable[APIResponse] | APIResponse],
+        *,
+        idempotent: bool = False,
+        provisioning: bool = False,
+    ) -> APIResponse:
+        """Execute an action against Supabase, supporting sync or async clients.
+
+        The action runs on the bounded executor so the synchronous supabase-py
+        `.execute()` never blocks the Reflex event loop. Calls go through the
+        circuit breaker and the per-call deadline (the provisioning ones for
+        ``provisioning`` calls); ``idempotent`` reads are also retried on
+        transient failures.
+        """
 
         client = self._require_client()
+
+        async def attempt() -> APIResponse:
+            result = await self.executor.run(action, client)
+            return await result if inspect.isawaitable(result) else result
+
         try:
-            result = action(client)
-            response = await result if inspect.isawaitable(result) else result
+            response = await self._call_resilient(attempt, idempotent=idempotent, provisioning=provisioning)
         except Exception as exc:
             logging.exception("Supabase request failed: %s", exc)
             raise
@@ -59,86 +217,430 @@ class SupabaseClient:
             raise ValueError(message)
         return response
 
-    async def create_user(self, user_data: dict[str, Any]) -> List[dict[str, Any]]:
+    async def _call_resilient(
+        self, call: Callable[[], Awaitable[T]], *, idempotent: bool, provisioning: bool = False
+    ) -> T:
+        """Run ``call`` under the breaker, the call deadline and (for reads) retries.
+
+        The deadline covers every attempt plus the backoff between them. A
+        timed-out attempt stops being awaited, but a worker thread already
+        running it finishes in the background. ``provisioning`` calls use
+        ``provision_deadline`` and ``provision_breaker`` instead.
+        """
+
+        breaker = self.provision_breaker if provisioning else self.breaker
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + (self.provision_deadline if provisioning else self.call_deadline)
+        attempts = self.retry_policy.attempts if idempotent else 1
+        for attempt in range(1, attempts + 1):
+            if not breaker.allow():
+                raise CircuitOpenError(
+                    "Supabase indisponível no momento (circuit breaker aberto). Tente novamente."
+                )
+            try:
+                result = await asyncio.wait_for(call(), timeout=max(0.0, deadline - loop.time()))
+            except asyncio.CancelledError:
+                # The caller went away (e.g. the client disconnected): no verdict on
+                # the backend, but a half-open probe must not keep its slot forever.
+                breaker.release()
+                raise
+            except Exception as exc:
+                if not is_transient(exc):
+                    # The backend answered; it is healthy even if the request was rejected.
+                    breaker.record_success()
+                    raise
+                breaker.record_failure()
+                if isinstance(exc, asyncio.TimeoutError):
+                    self.deadline_exceeded += 1
+                delay = self.retry_policy.backoff(attempt)
+                if attempt == attempts or loop.time() + delay >= deadline:
+                    raise
+                self.retries += 1
+                logging.warning("Supabase call failed (%s), retry %s in %.3fs", exc, attempt, delay)
+                await asyncio.sleep(delay)
+            else:
+                breaker.record_success()
+                return result
+        raise AssertionError("unreachable")  # pragma: no cover
+
+    def resilience_stats(self) -> dict[str, Any]:
+        """Breaker state/transitions plus retry and deadline counters."""
+
+        return {
+            "breaker": self.breaker.stats(),
+            "provision_breaker": self.provision_breaker.stats(),
+            "retries": self.retries,
+            "deadline_exceeded": self.deadline_exceeded,
+        }
+
+    async def create_user(self, user_data: dict[str, Any]) -> List[UserRow]:
         """Insert a new user profile into the public `users` table."""
 
-        response = await self._execute(
-            lambda client: client.table("users").insert(user_data).execute()
-        )
-        return response.data or []
+        try:
+            response = await self._execute(
+                lambda client: client.table("users")
+                .insert(user_data)
+                .select(UserRow.columns())
+                .execute()
+            )
+        finally:
+            self.user_cache.invalidate(user_data.get("email"))
+        return UserRow.decode(response.data)
 
-    async def upsert_user(self, user_data: dict[str, Any]) -> List[dict[str, Any]]:
+    async def upsert_user(self, user_data: dict[str, Any]) -> List[UserRow]:
         """Insert or update a user record based on email uniqueness."""
 
+        try:
+            response = await self._execute(
+                lambda client: client.table("users")
+                .upsert(user_data, on_conflict="email")
+                .select(UserRow.columns())
+                .execute()
+            )
+        finally:
+            self.user_cache.invalidate(user_data.get("email"))
+        return UserRow.decode(response.data)
+
+    async def upsert_users(self, users: List[dict[str, Any]]) -> List[UserRow]:
+        """Upsert many users in one request (rows must share the same keys)."""
+
+        if not users:
+            return []
+        try:
+            response = await self._execute(
+                lambda client: client.table("users")
+                .upsert(users, on_conflict="email")
+                .select(UserRow.columns())
+                .execute()
+            )
+        finally:
+            for user in users:
+                self.user_cache.invalidate(user.get("email"))
+        return UserRow.decode(response.data)
+
+    async def upsert_botecos(self, botecos: List[dict[str, Any]]) -> List[BotecoRow]:
+        """Upsert many botecos in one request, keyed by their unique username."""
+
+        if not botecos:
+            return []
         response = await self._execute(
-            lambda client: client.table("users").upsert(user_data, on_conflict="email").execute()
+            lambda client: client.table("boteco")
+            .upsert(botecos, on_conflict="username")
+            .select(BotecoRow.columns())
+            .execute()
         )
-        return response.data or []
+        return BotecoRow.decode(response.data)
+
+    async def ensure_memberships(self, memberships: List[dict[str, Any]]) -> List[MembershipRow]:
+        """Insert the user_boteco rows that do not exist yet, in two requests at most.
 
-    async def delete_boteco(self, boteco_id: str) -> APIResponse:
-        """Delete a boteco record (used for rollbacks)."""
+        `user_boteco` has no unique (user_id, boteco_id) constraint, so existing
+        pairs are looked up first instead of relying on an upsert.
+        """
 
-        return await self._execute(
+        if not memberships:
+            return []
+        boteco_ids = sorted({row["boteco_id"] for row in memberships})
+        try:
+            existing = await self._execute(
+                lambda client: client.table("user_boteco")
+                .select("user_id,boteco_id")
+                .in_("boteco_id", boteco_ids)
+                .execute(),
+                idempotent=True,
+            )
+            seen = {(row["user_id"], row["boteco_id"]) for row in existing.data or []}
+            missing = []
+            for row in memberships:
+                pair = (row["user_id"], row["boteco_id"])
+                if pair not in seen:
+                    seen.add(pair)
+                    missing.append(row)
+            if not missing:
+                return []
+            response = await self._execute(
+                lambda client: client.table("user_boteco")
+                .insert(missing)
+                .select(MembershipRow.columns())
+                .execute()
+            )
+        finally:
+            for row in memberships:
+                self._invalidate_memberships(row["user_id"])
+        return MembershipRow.decode(response.data)
+
+    async def delete_boteco(self, boteco_id: str) -> int:
+        """Delete a boteco record (used for rollbacks); returns the number of rows deleted."""
+
+        response = await self._execute(
             lambda client: client.table("boteco").delete().eq("id", boteco_id).execute()
         )
+        return len(response.data or [])
 
     async def create_boteco_and_associate_user(
         self, boteco_data: dict[str, Any], user_boteco_data: dict[str, Any]
-    ) -> tuple[APIResponse, APIResponse]:
+    ) -> tuple[BotecoRow, MembershipRow]:
         """Create a boteco and associate the current user with basic rollback handling."""
 
         boteco_response = await self._execute(
-            lambda client: client.table("boteco").insert(boteco_data).execute()
+            lambda client: client.table("boteco")
+            .insert(boteco_data)
+            .select(BotecoRow.columns())
+            .execute()
         )
         if not boteco_response.data:
             raise ValueError("Failed to create boteco. Nenhum dado retornado.")
 
-        boteco_id = boteco_response.data[0]["id"]
+        boteco = BotecoRow.from_dict(boteco_response.data[0])
         try:
-            user_boteco_data["boteco_id"] = boteco_id
+            user_boteco_data["boteco_id"] = boteco.id
             user_boteco_response = await self._execute(
-                lambda client: client.table("user_boteco").insert(user_boteco_data).execute()
+                lambda client: client.table("user_boteco")
+                .insert(user_boteco_data)
+                .select(MembershipRow.columns())
+                .execute()
             )
             if not user_boteco_response.data:
                 raise ValueError("Falha ao associar o usuário ao boteco recém-criado.")
-            return boteco_response, user_boteco_response
+            return boteco, MembershipRow.from_dict(user_boteco_response.data[0])
         except Exception as exc:
             logging.exception("Transaction failed, rolling back boteco creation: %s", exc)
-            await self.delete_boteco(boteco_id)
+            await self.delete_boteco(boteco.id)
             raise
+        finally:
+            self._invalidate_memberships(user_boteco_data.get("user_id"))
 
-    async def provision_schema(self, boteco_username: str) -> httpx.Response:
-        """Call the internal API to provision a new schema for the boteco."""
+    async def finalize_onboarding(
+        self,
+        boteco_data: dict[str, Any],
+        user_boteco_data: dict[str, Any],
+        idempotency_key: Optional[str] = None,
+    ) -> OnboardingResult:
+        """Create boteco, owner membership and tenant schema in one transactional RPC.
 
-        api_url = "http://localhost:8000/api/provision_org"
+        With an ``idempotency_key`` (one per checkout) a repeated submit gets
+        the stored result of the first one instead of running the RPC again.
+        """
+
+        async def finalize() -> dict[str, Any]:
+            data = await self._finalize_onboarding(boteco_data, user_boteco_data)
+            self.spare_pool.record_claim(data.get("spare"), data.get("claim_ms"))
+            return data
+
+        data, replayed = await self.idempotency.run("finalize_onboarding", idempotency_key, finalize)
+        if replayed:
+            logging.info("Replayed finalize_onboarding for idempotency key %s", idempotency_key)
+        return OnboardingResult.from_dict(data)
+
+    async def _finalize_onboarding(
+        self, boteco_data: dict[str, Any], user_boteco_data: dict[str, Any]
+    ) -> dict[str, Any]:
+        params = {"boteco_data": boteco_data, "user_boteco_data": user_boteco_data}
+        if self.tenancy == SHARED_MODE:
+            params["shared_schema"] = self.shared_schema
+        try:
+            response = await self._execute(
+                lambda client: client.rpc("finalize_onboarding", params).execute()
+            )
+        finally:
+            self._invalidate_memberships(user_boteco_data.get("user_id"))
+        if not response.data:
+            raise ValueError("Falha ao finalizar o onboarding. Nenhum dado retornado.")
+        return response.data
+
+    async def provision_schema(
+        self, boteco_username: str, idempotency_key: Optional[str] = None
+    ) -> httpx.Response:
+        """Ask the internal API to provision the boteco's schema (answers 202 with a job id)."""
+
+        client = self._get_http_client()
+        headers = {"Idempotency-Key": idempotency_key} if idempotency_key else None
         try:
-            async with httpx.AsyncClient() as client:
-                response = await client.post(api_url, json={"boteco_username": boteco_username})
-                response.raise_for_status()
-                return response
+            response = await client.post(
+                PROVISION_ORG_PATH, json={"boteco_username": boteco_username}, headers=headers
+            )
+            response.raise_for_status()
+            return response
         except httpx.HTTPError as exc:
             logging.exception("Provisioning request failed: %s", exc)
             raise
 
+    async def provision_status(self, job_id: str) -> dict[str, Any]:
+        """Fetch the status and timings of a provisioning job from the internal API."""
+
+        client = self._get_http_client()
+        response = await client.get(f"{PROVISION_ORG_PATH}/{job_id}")
+        response.raise_for_status()
+        return response.json()
+
+    def _invalidate_memberships(self, user_id: Optional[str]) -> None:
+        self.membership_cache.invalidate(user_id)
+        self.membership_index.forget(user_id)
+
+    async def provision_tenant_schema(self, boteco_username: str) -> TenantSchema:
+        """Create `org_<username>` with the full tenant template in one transactional RPC.
+
+        The RPC is a no-op for a schema that already has tables, so running a
+        job again is safe; the call itself is not retried, since a timed-out
+        attempt may still be running. In shared-schema tenancy the tenant is
+        registered in `shared_tenants` instead.
+        """
+
+        if self.tenancy == SHARED_MODE:
+            (tenant,) = await self._provision_shared_tenants([boteco_username])
+            if tenant.error:
+                raise ValueError(f"Falha ao provisionar o tenant: {tenant.error}")
+            return tenant
+        return await self._provision_tenant_schema(boteco_username)
+
+    async def provision_tenant_schemas(self, boteco_usernames: List[str]) -> List[TenantSchema]:
+        """Provision a group of tenants in one RPC and one transaction.
+
+        Each tenant runs in its own sub-transaction: a failed one comes back
+        with ``error`` set and does not roll back the others. Results follow
+        the order of ``boteco_usernames``.
+        """
+
+        if self.tenancy == SHARED_MODE:
+            return await self._provision_shared_tenants(boteco_usernames)
+        return await self._provision_tenant_schemas(boteco_usernames)
+
+    async def _provision_tenant_schema(self, boteco_username: str) -> TenantSchema:
+        params = {"tenant_schema": f"org_{boteco_username}"}
+        response = await self._execute(
+            lambda client: client.rpc("provision_tenant", params).execute(),
+            provisioning=True,
+        )
+        if not response.data:
+            raise ValueError("Falha ao provisionar o schema. Nenhum dado retornado.")
+        return TenantSchema.from_dict(response.data)
+
+    async def _provision_tenant_schemas(self, boteco_usernames: List[str]) -> List[TenantSchema]:
+        params = {"schema_names": [f"org_{username}" for username in boteco_usernames]}
+        response = await self._execute(
+            lambda client: client.rpc("provision_tenants", params).execute(),
+            provisioning=True,
+        )
+        return [TenantSchema.from_dict(item) for item in response.data or []]
+
+    async def _provision_shared_tenants(self, boteco_usernames: List[str]) -> List[TenantSchema]:
+        params = {"boteco_usernames": list(boteco_usernames), "shared_schema": self.shared_schema}
+        response = await self._execute(
+            lambda client: client.rpc("provision_shared_tenants", params).execute(),
+            provisioning=True,
+        )
+        return [TenantSchema.from_dict(item) for item in response.data or []]
+
+    async def build_spare_schema(self, target: int) -> SpareBuild:
+        """Build one spare tenant schema if fewer than ``target`` are ready."""
+
+        params = {"target": target}
+        response = await self._execute(
+            lambda client: client.rpc("build_spare_schema", params).execute(),
+            provisioning=True,
+        )
+        return SpareBuild.from_dict(response.data or {})
+
     async def check_user_has_boteco(self, user_id: str) -> bool:
-        """Check if a user is associated with any boteco."""
+        """Check if a user is associated with any boteco (cached and coalesced).
+
+        While the membership listener is live the answer comes from the
+        push-invalidated index instead of the TTL cache.
+        """
 
+        if self.membership_index.live:
+            return bool(await self.membership_index.memberships(user_id))
+        if self.membership_cache.get(user_id) is not MISSING:
+            return True
+        generation = self.membership_cache.generation
+        has_boteco = await self.singleflight.do(
+            ("user_has_boteco", user_id), lambda: self._fetch_user_has_boteco(user_id)
+        )
+        if has_boteco:
+            self.membership_cache.set(user_id, True, generation=generation)
+        return has_boteco
+
+    async def _fetch_user_has_boteco(self, user_id: str) -> bool:
+        # An existence probe: one id, no exact count over all of the user's rows.
         response = await self._execute(
             lambda client: client.table("user_boteco")
-            .select("id", count="exact")
+            .select("id")
             .eq("user_id", user_id)
             .limit(1)
-            .execute()
+            .execute(),
+            idempotent=True,
         )
-        return bool(getattr(response, "count", 0) > 0)
+        return bool(response.data)
 
-    async def get_user_by_email(self, email: str) -> List[dict[str, Any]]:
-        """Return user records that match the given email (list)."""
+    async def get_user_memberships(self, user_id: str) -> Memberships:
+        """Return ``{boteco_id: assigned_role}`` for every boteco the user belongs to."""
 
+        return await self.membership_index.memberships(user_id)
+
+    async def _load_memberships(self, user_id: str) -> Memberships:
+        return await self.singleflight.do(
+            ("memberships", user_id), lambda: self._fetch_memberships(user_id)
+        )
+
+    async def _fetch_memberships(self, user_id: str) -> Memberships:
         response = await self._execute(
-            lambda client: client.table("users").select("*").eq("email", email).limit(1).execute()
+            lambda client: client.table("user_boteco")
+            .select("boteco_id,assigned_role")
+            .eq("user_id", user_id)
+            .execute(),
+            idempotent=True,
         )
-        return response.data or []
+        return {str(row["boteco_id"]): row["assigned_role"] for row in response.data or []}
+
+    async def get_user_by_email(self, email: str) -> List[UserRow]:
+        """Return user records that match the given email (list, cached and coalesced)."""
+
+        cached = self.user_cache.get(email)
+        if cached is not MISSING:
+            return list(cached)
+        generation = self.user_cache.generation
+        users = await self.singleflight.do(
+            ("user_by_email", email), lambda: self._fetch_user_by_email(email)
+        )
+        if users:
+            self.user_cache.set(email, tuple(users), generation=generation)
+        return list(users)
+
+    async def _fetch_user_by_email(self, email: str) -> List[UserRow]:
+        response = await self._execute(
+            lambda client: client.table("users")
+            .select(UserRow.columns())
+            .eq("email", email)
+            .limit(1)
+            .execute(),
+            idempotent=True,
+        )
+        return UserRow.decode(response.data)
+
+    def cache_stats(self) -> dict[str, dict[str, Any]]:
+        """Hit/miss/eviction counters for the lookup caches and the membership index."""
+
+        return {
+            "users": self.user_cache.stats(),
+            "memberships": self.membership_cache.stats(),
+            "membership_index": self.membership_index.stats(),
+        }
+
+
+time_public_coroutines(SupabaseClient, SUPABASE_CALL_SECONDS, skip=("aclose",))
+
+
+def build_client() -> SupabaseClient:
+    """Instantiate the backend named by ``SUPABASE_BACKEND`` (`postgrest` or `psycopg`)."""
+
+    backend = os.environ.get("SUPABASE_BACKEND", "postgrest").strip().lower()
+    if backend == "psycopg":
+        from app.services.pg_backend import PostgresClient
+
+        return PostgresClient()
+    if backend != "postgrest":
+        logging.warning("Unknown SUPABASE_BACKEND=%r, using postgrest.", backend)
+    return SupabaseClient()
 
 
-supabase_client = SupabaseClient()
+supabase_client = build_client()
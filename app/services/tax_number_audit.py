@@ -0,0 +1,87 @@
+"""Data-quality sweep of stored CPF/CNPJ numbers.
+
+Streams ``users.tax_number`` and ``boteco.establishment_tax_number`` with a
+server-side cursor and checks each chunk with `validate_cpf_cnpj_batch`
+(check digits included). Rows are only read; the report lists how many
+numbers fail per column and a sample of the offending ids.
+
+    python -m app.services.tax_number_audit --chunk-size 100000 --sample 20
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import logging
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from typing import List, Optional
+
+import psycopg
+from psycopg import sql
+
+from app.utils.env import database_url
+from app.utils.validators import validate_cpf_cnpj_batch
+
+# (table, tax number column) pairs swept by default.
+AUDITED_COLUMNS = (("users", "tax_number"), ("boteco", "establishment_tax_number"))
+
+
+@dataclass
+class ColumnAudit:
+    table: str
+    column: str
+    rows: int = 0
+    invalid: int = 0
+    invalid_ids: List[str] = field(default_factory=list)
+    rows_per_second: float = 0.0
+
+
+def audit_column(
+    conn: psycopg.Connection, table: str, column: str, chunk_size: int = 100_000, sample: int = 20
+) -> ColumnAudit:
+    """Validate every non-null value of ``table.column``; NULLs are not counted."""
+
+    audit = ColumnAudit(table, column)
+    started = time.perf_counter()
+    query = sql.SQL("SELECT id::text, {column} FROM {table} WHERE {column} IS NOT NULL").format(
+        column=sql.Identifier(column), table=sql.Identifier(table)
+    )
+    with conn.transaction(), conn.cursor(name=f"audit_{table}_{column}") as cursor:
+        cursor.itersize = chunk_size
+        cursor.execute(query)
+        while rows := cursor.fetchmany(chunk_size):
+            valid = validate_cpf_cnpj_batch([value for _, value in rows])
+            audit.rows += len(rows)
+            for (row_id, _), ok in zip(rows, valid):
+                if not ok:
+                    audit.invalid += 1
+                    if len(audit.invalid_ids) < sample:
+                        audit.invalid_ids.append(row_id)
+    audit.rows_per_second = audit.rows / max(time.perf_counter() - started, 1e-9)
+    return audit
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Verifica os dígitos de CPF/CNPJ gravados no banco.")
+    parser.add_argument("--dsn", default=database_url(), help="DSN Postgres (padrão: DATABASE_URL)")
+    parser.add_argument("--chunk-size", type=int, default=100_000)
+    parser.add_argument("--sample", type=int, default=20, help="Ids inválidos listados por coluna")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if not args.dsn:
+        logging.error("DATABASE_URL or --dsn is required.")
+        return 2
+    with psycopg.connect(args.dsn) as conn:
+        audits = [
+            audit_column(conn, table, column, max(1, args.chunk_size), args.sample)
+            for table, column in AUDITED_COLUMNS
+        ]
+    print(json.dumps([asdict(audit) for audit in audits]))
+    return 1 if any(audit.invalid for audit in audits) else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
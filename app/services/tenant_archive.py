@@ -0,0 +1,527 @@
+"""Archive dormant tenant schemas to disk and restore them on their next access.
+
+`archive` exports every table of an `org_*` schema with binary ``COPY`` into
+gzip files under ``TENANT_ARCHIVE_DIR/<schema>/`` (plus a ``manifest.json``
+with the column lists and sequence values), then drops the schema. Export,
+drop and the `tenant_schemas` bookkeeping run in one transaction holding
+``EXCLUSIVE`` locks on the tables, so no write can land between the copy and
+the drop, and the schema only goes away once the files are fsynced.
+
+`ensure_active` is the access path: it bumps the tenant's ``last_active_at``
+(see `sql/007_tenant_archive.sql`) and, when the schema is archived, rebuilds
+it from the tenant template and loads the data back before returning.
+The schema is rebuilt from the tenant template plus the tenant migrations
+recorded for it in `tenant_migrations` (see `tenant_migrations.py`), so
+columns added by migrations exist before the data is copied back. Foreign
+keys are re-added and indexes built after the load, the way ``pg_restore``
+does it.
+
+Only tenants with a ``last_active_at`` are ever picked as dormant: a tenant
+whose app never reported activity is not archived by ``--idle-days``.
+
+    python -m app.services.tenant_archive archive --idle-days 90 --limit 100
+    python -m app.services.tenant_archive restore org_meubar
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import gzip
+import json
+import logging
+import os
+import re
+import shutil
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, AsyncIterator, Dict, List, Optional
+
+import psycopg
+from psycopg import sql
+from psycopg_pool import AsyncConnectionPool
+
+from app.services.cache import MISSING, TTLCache
+from app.services.metrics import TENANT_ARCHIVE_OPERATIONS, TENANT_ARCHIVE_SECONDS
+from app.services.schema_sql import tenant_template
+from app.services.singleflight import SingleFlight
+from app.services.tenant_migrations import Migration, load_migrations
+from app.utils.env import database_url, env_float
+
+ARCHIVE_FORMAT = 1
+TENANT_SCHEMA_RE = re.compile(r"^org_[a-zA-Z0-9_]{3,30}$")
+COPY_CHUNK = 256 * 1024
+
+TOUCH_TENANT = "SELECT touch_tenant(%s, make_interval(secs => %s)) AS result"
+DORMANT_TENANTS = "SELECT dormant_tenants(make_interval(secs => %s), %s) AS schema_name"
+LOCK_TENANT = "SELECT pg_advisory_xact_lock(hashtext('tenant_archive:' || %s))"
+SELECT_TENANT_FOR_UPDATE = """
+SELECT archived_at IS NOT NULL AS archived, archive_path,
+       %s::float IS NULL OR coalesce(last_active_at < now() - make_interval(secs => %s), false) AS dormant
+FROM tenant_schemas WHERE schema_name = %s FOR UPDATE
+"""
+SELECT_TABLES = """
+SELECT c.relname AS table_name,
+       array_agg(a.attname ORDER BY a.attnum) AS columns
+FROM pg_class c
+JOIN pg_attribute a ON a.attrelid = c.oid AND a.attnum > 0 AND NOT a.attisdropped AND a.attgenerated = ''
+WHERE c.relnamespace = to_regnamespace(%s) AND c.relkind = 'r'
+GROUP BY c.relname
+ORDER BY c.relname
+"""
+SELECT_SEQUENCES = "SELECT sequencename, last_value FROM pg_sequences WHERE schemaname = %s"
+SELECT_FOREIGN_KEYS = """
+SELECT c.relname AS table_name, con.conname, pg_get_constraintdef(con.oid) AS definition
+FROM pg_constraint con JOIN pg_class c ON c.oid = con.conrelid
+WHERE con.connamespace = to_regnamespace(%s) AND con.contype = 'f'
+"""
+HAS_MIGRATIONS_TABLE = "SELECT to_regclass('tenant_migrations') IS NOT NULL"
+SELECT_APPLIED_MIGRATIONS = "SELECT version FROM tenant_migrations WHERE schema_name = %s ORDER BY version"
+MARK_ARCHIVED = "UPDATE tenant_schemas SET archived_at = now(), archive_path = %s WHERE schema_name = %s"
+MARK_RESTORED = """
+UPDATE tenant_schemas SET archived_at = NULL, archive_path = NULL, last_active_at = now()
+WHERE schema_name = %s
+"""
+
+
+class TenantNotFound(LookupError):
+    """The schema is not listed in `tenant_schemas`."""
+
+
+@dataclass
+class ArchiveResult:
+    schema: str
+    archived: bool
+    path: Optional[str] = None
+    tables: int = 0
+    rows: int = 0
+    bytes: int = 0
+    ms: float = 0.0
+    reason: Optional[str] = None
+
+
+@dataclass
+class RestoreResult:
+    schema: str
+    restored: bool
+    rows: int = 0
+    ms: float = 0.0
+    timings: Dict[str, float] = field(default_factory=dict)
+
+
+def _check_schema(schema: str) -> None:
+    if not TENANT_SCHEMA_RE.match(schema or "") or schema.startswith("org__"):
+        raise ValueError(f"Invalid tenant schema: {schema!r}")
+
+
+def _fsync_dir(path: Path) -> None:
+    fd = os.open(path, os.O_RDONLY)
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+class TenantArchive:
+    """Move dormant tenant schemas out of the catalog and bring them back on demand."""
+
+    def __init__(
+        self,
+        dsn: Optional[str],
+        directory: Path,
+        search_path: Optional[str] = None,
+        lock_timeout: float = 2.0,
+        touch_every: float = 300.0,
+        active_ttl: float = 60.0,
+        compresslevel: int = 6,
+        migrations: Optional[List[Migration]] = None,
+    ) -> None:
+        self.dsn = dsn
+        self.directory = Path(directory)
+        self.search_path = search_path or os.environ.get("PG_SEARCH_PATH", "reflex, public")
+        self.lock_timeout = lock_timeout
+        self.touch_every = touch_every
+        self.compresslevel = compresslevel
+        self._migrations = migrations
+        # Schemas seen live recently; archiving only takes tenants idle for
+        # far longer than this, so skipping the touch for them is safe.
+        self._active = TTLCache(maxsize=10_000, ttl=active_ttl)
+        self._flight = SingleFlight()
+        self._pool: Optional[AsyncConnectionPool] = None
+        self.archived = 0
+        self.restored = 0
+        self.skipped = 0
+
+    @property
+    def is_configured(self) -> bool:
+        return bool(self.dsn)
+
+    async def _configure(self, conn: psycopg.AsyncConnection) -> None:
+        await conn.execute(sql.SQL("SET search_path TO {}").format(sql.SQL(self.search_path)))
+
+    async def _get_pool(self) -> AsyncConnectionPool:
+        if not self.dsn:
+            raise ConnectionError("Tenant archive not configured. Check DATABASE_URL.")
+        if self._pool is None or self._pool.closed:
+            self._pool = AsyncConnectionPool(
+                self.dsn,
+                min_size=1,
+                max_size=4,
+                kwargs={"autocommit": True},
+                configure=self._configure,
+                open=False,
+                name="tenant-archive",
+            )
+            await self._pool.open()
+        return self._pool
+
+    async def aclose(self) -> None:
+        if self._pool is not None:
+            await self._pool.close()
+            self._pool = None
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self) -> AsyncIterator[None]:
+        try:
+            yield
+        finally:
+            await self.aclose()
+
+    async def _recorded_migrations(self, conn: psycopg.AsyncConnection, schema: str) -> List[Migration]:
+        """Tenant migrations applied to ``schema`` before it was archived, in order."""
+
+        cursor = await conn.execute(HAS_MIGRATIONS_TABLE)
+        if not (await cursor.fetchone())[0]:
+            return []
+        cursor = await conn.execute(SELECT_APPLIED_MIGRATIONS, (schema,))
+        versions = [row[0] for row in await cursor.fetchall()]
+        if self._migrations is None:
+            self._migrations = load_migrations()
+        known = {migration.version: migration for migration in self._migrations}
+        missing = [version for version in versions if version not in known]
+        if missing:
+            raise ValueError(f"Tenant migrations recorded for {schema} not found: {', '.join(missing)}")
+        return [known[version] for version in versions]
+
+    async def _set_timeouts(self, conn: psycopg.AsyncConnection) -> None:
+        await conn.execute(
+            "SELECT set_config('lock_timeout', %s, true)", (f"{int(self.lock_timeout * 1000)}ms",)
+        )
+
+    async def touch(self, schema: str) -> Dict[str, Any]:
+        """Record activity for ``schema``; report whether it exists and is archived."""
+
+        pool = await self._get_pool()
+        async with pool.connection() as conn:
+            cursor = await conn.execute(TOUCH_TENANT, (schema, self.touch_every))
+            (result,) = await cursor.fetchone()
+        return result
+
+    async def ensure_active(self, schema: str) -> RestoreResult:
+        """Make sure ``schema`` exists before the caller opens it, restoring it if archived.
+
+        Raises `TenantNotFound` for a schema that was never provisioned.
+        Concurrent calls for the same archived schema share one restore.
+        """
+
+        _check_schema(schema)
+        if self._active.get(schema) is not MISSING:
+            return RestoreResult(schema, restored=False)
+        generation = self._active.generation
+        state = await self.touch(schema)
+        if not state.get("exists"):
+            raise TenantNotFound(schema)
+        result = RestoreResult(schema, restored=False)
+        if state.get("archived"):
+            result = await self._flight.do(schema, lambda: self.restore(schema))
+        self._active.set(schema, True, generation)
+        return result
+
+    async def dormant(self, idle_seconds: float, limit: int) -> List[str]:
+        """Unarchived tenants with no activity for ``idle_seconds``, oldest first."""
+
+        pool = await self._get_pool()
+        async with pool.connection() as conn:
+            cursor = await conn.execute(DORMANT_TENANTS, (idle_seconds, limit))
+            return [row[0] for row in await cursor.fetchall()]
+
+    async def archive(self, schema: str, idle_seconds: Optional[float] = None) -> ArchiveResult:
+        """Export ``schema`` to disk and drop it.
+
+        With ``idle_seconds`` the tenant is re-checked for dormancy under the
+        row lock and skipped if it was used meanwhile. Tenants whose tables
+        are busy past ``lock_timeout`` are skipped as well.
+        """
+
+        _check_schema(schema)
+        started = time.perf_counter()
+        result = ArchiveResult(schema, archived=False)
+        target = self.directory / schema
+        partial = self.directory / f".{schema}.partial"
+        pool = await self._get_pool()
+        try:
+            async with pool.connection() as conn, conn.transaction():
+                await self._export_and_drop(conn, result, idle_seconds, partial, target)
+        except psycopg.errors.LockNotAvailable:
+            result.reason = "busy"
+        finally:
+            shutil.rmtree(partial, ignore_errors=True)
+
+        result.ms = round((time.perf_counter() - started) * 1000, 3)
+        if result.reason is None:
+            result.archived = True
+            result.path = str(target.resolve())
+            self.archived += 1
+            self._active.invalidate(schema)
+            TENANT_ARCHIVE_OPERATIONS.inc("archive", "ok")
+            TENANT_ARCHIVE_SECONDS.observe(result.ms / 1000.0, "archive")
+            logging.info("Archived %s (%d rows, %d bytes) to %s", schema, result.rows, result.bytes, target)
+        else:
+            self.skipped += 1
+            TENANT_ARCHIVE_OPERATIONS.inc("archive", "skipped")
+        return result
+
+    async def _export_and_drop(
+        self,
+        conn: psycopg.AsyncConnection,
+        result: ArchiveResult,
+        idle_seconds: Optional[float],
+        partial: Path,
+        target: Path,
+    ) -> None:
+        schema = result.schema
+        await self._set_timeouts(conn)
+        await conn.execute(LOCK_TENANT, (schema,))
+        cursor = await conn.execute(SELECT_TENANT_FOR_UPDATE, (idle_seconds, idle_seconds, schema))
+        row = await cursor.fetchone()
+        if row is None:
+            raise TenantNotFound(schema)
+        archived, _, dormant = row
+        if archived or not dormant:
+            result.reason = "already archived" if archived else "active"
+            return
+
+        cursor = await conn.execute(SELECT_TABLES, (schema,))
+        tables = await cursor.fetchall()
+        if tables:
+            await conn.execute(
+                sql.SQL("LOCK TABLE {} IN EXCLUSIVE MODE").format(
+                    sql.SQL(", ").join(sql.Identifier(schema, name) for name, _ in tables)
+                )
+            )
+        cursor = await conn.execute(SELECT_SEQUENCES, (schema,))
+        sequences = {name: value for name, value in await cursor.fetchall()}
+
+        shutil.rmtree(partial, ignore_errors=True)
+        partial.mkdir(parents=True)
+        manifest: Dict[str, Any] = {"format": ARCHIVE_FORMAT, "schema": schema, "tables": [], "sequences": sequences}
+        for name, columns in tables:
+            rows, size = await self._export_table(conn, schema, name, columns, partial)
+            manifest["tables"].append({"name": name, "columns": columns, "rows": rows})
+            result.rows += rows
+            result.bytes += size
+        with open(partial / "manifest.json", "w", encoding="utf-8") as handle:
+            json.dump(manifest, handle)
+            handle.flush()
+            os.fsync(handle.fileno())
+        shutil.rmtree(target, ignore_errors=True)
+        partial.rename(target)
+        _fsync_dir(self.directory)
+        result.tables = len(tables)
+
+        try:
+            await conn.execute(sql.SQL("DROP SCHEMA {} CASCADE").format(sql.Identifier(schema)))
+            await conn.execute(MARK_ARCHIVED, (str(target.resolve()), schema))
+        except BaseException:
+            shutil.rmtree(target, ignore_errors=True)
+            raise
+
+    async def _export_table(
+        self, conn: psycopg.AsyncConnection, schema: str, table: str, columns: List[str], directory: Path
+    ) -> tuple[int, int]:
+        statement = sql.SQL("COPY {} ({}) TO STDOUT (FORMAT binary)").format(
+            sql.Identifier(schema, table), sql.SQL(", ").join(map(sql.Identifier, columns))
+        )
+        path = directory / f"{table}.copy.gz"
+        with open(path, "wb") as raw:
+            with gzip.GzipFile(fileobj=raw, mode="wb", compresslevel=self.compresslevel) as out:
+                async with conn.cursor() as cursor:
+                    async with cursor.copy(statement) as copy:
+                        async for chunk in copy:
+                            out.write(chunk)
+                    rows = cursor.rowcount
+            raw.flush()
+            os.fsync(raw.fileno())
+            size = raw.tell()
+        return rows, size
+
+    async def archive_dormant(self, idle_seconds: float, limit: int) -> List[ArchiveResult]:
+        """Archive up to ``limit`` tenants idle for ``idle_seconds``, one at a time."""
+
+        results = []
+        for schema in await self.dormant(idle_seconds, limit):
+            try:
+                results.append(await self.archive(schema, idle_seconds=idle_seconds))
+            except Exception as exc:
+                logging.exception("Archiving %s failed", schema)
+                TENANT_ARCHIVE_OPERATIONS.inc("archive", "error")
+                results.append(ArchiveResult(schema, archived=False, reason=str(exc)))
+        return results
+
+    async def restore(self, schema: str) -> RestoreResult:
+        """Rebuild ``schema`` (template plus its recorded migrations) and load its archived data."""
+
+        _check_schema(schema)
+        started = time.perf_counter()
+        result = RestoreResult(schema, restored=False)
+        pool = await self._get_pool()
+        try:
+            async with pool.connection() as conn, conn.transaction():
+                await conn.execute(LOCK_TENANT, (schema,))
+                cursor = await conn.execute(SELECT_TENANT_FOR_UPDATE, (None, None, schema))
+                row = await cursor.fetchone()
+                if row is None:
+                    raise TenantNotFound(schema)
+                archived, archive_path, _ = row
+                if not archived:
+                    return result
+                directory = Path(archive_path)
+                with open(directory / "manifest.json", encoding="utf-8") as handle:
+                    manifest = json.load(handle)
+                await conn.execute(MARK_RESTORED, (schema,))
+                migrations = await self._recorded_migrations(conn, schema)
+
+                phases = dict(tenant_template().phases)
+                mark = time.perf_counter()
+                await conn.execute(sql.SQL("CREATE SCHEMA {}").format(sql.Identifier(schema)))
+                await conn.execute(
+                    sql.SQL("SET LOCAL search_path TO {}, public").format(sql.Identifier(schema))
+                )
+                await conn.execute(phases["tables"])
+                if migrations:
+                    # Same order the live schema went through: the whole template,
+                    # then its migrations (which may touch template indexes).
+                    await conn.execute(phases["indexes"])
+                    for migration in migrations:
+                        await conn.execute(migration.sql)
+                # Load before checking references: rows can point at each
+                # other across tables (orders <-> tables).
+                cursor = await conn.execute(SELECT_FOREIGN_KEYS, (schema,))
+                foreign_keys = await cursor.fetchall()
+                for table, name, _ in foreign_keys:
+                    await conn.execute(
+                        sql.SQL("ALTER TABLE {} DROP CONSTRAINT {}").format(
+                            sql.Identifier(table), sql.Identifier(name)
+                        )
+                    )
+                result.timings["tables"] = round((time.perf_counter() - mark) * 1000, 3)
+
+                mark = time.perf_counter()
+                for table in manifest["tables"]:
+                    result.rows += await self._import_table(conn, table, directory)
+                for name, value in manifest["sequences"].items():
+                    if value is not None:
+                        await conn.execute(
+                            "SELECT setval(%s::regclass, %s)", (f'"{schema}"."{name}"', value)
+                        )
+                result.timings["data"] = round((time.perf_counter() - mark) * 1000, 3)
+
+                mark = time.perf_counter()
+                for table, name, definition in foreign_keys:
+                    await conn.execute(
+                        sql.SQL("ALTER TABLE {} ADD CONSTRAINT {} {}").format(
+                            sql.Identifier(table), sql.Identifier(name), sql.SQL(definition)
+                        )
+                    )
+                result.timings["constraints"] = round((time.perf_counter() - mark) * 1000, 3)
+
+                mark = time.perf_counter()
+                if not migrations:
+                    await conn.execute(phases["indexes"])
+                await conn.execute(phases["grants"])
+                result.timings["indexes"] = round((time.perf_counter() - mark) * 1000, 3)
+        except Exception:
+            TENANT_ARCHIVE_OPERATIONS.inc("restore", "error")
+            raise
+
+        shutil.rmtree(directory, ignore_errors=True)
+        result.restored = True
+        result.ms = round((time.perf_counter() - started) * 1000, 3)
+        self.restored += 1
+        TENANT_ARCHIVE_OPERATIONS.inc("restore", "ok")
+        TENANT_ARCHIVE_SECONDS.observe(result.ms / 1000.0, "restore")
+        logging.info("Restored %s (%d rows) in %.1f ms", schema, result.rows, result.ms)
+        return result
+
+    async def _import_table(
+        self, conn: psycopg.AsyncConnection, table: Dict[str, Any], directory: Path
+    ) -> int:
+        statement = sql.SQL("COPY {} ({}) FROM STDIN (FORMAT binary)").format(
+            sql.Identifier(table["name"]), sql.SQL(", ").join(map(sql.Identifier, table["columns"]))
+        )
+        async with conn.cursor() as cursor:
+            async with cursor.copy(statement) as copy:
+                with gzip.open(directory / f"{table['name']}.copy.gz", "rb") as source:
+                    while chunk := source.read(COPY_CHUNK):
+                        await copy.write(chunk)
+            return cursor.rowcount
+
+    def stats(self) -> Dict[str, Any]:
+        return {
+            "directory": str(self.directory),
+            "archived": self.archived,
+            "restored": self.restored,
+            "skipped": self.skipped,
+            "restores_deduplicated": self._flight.deduplicated,
+        }
+
+
+def build_tenant_archive() -> TenantArchive:
+    return TenantArchive(
+        database_url(),
+        Path(os.environ.get("TENANT_ARCHIVE_DIR", "tenant_archives")),
+        lock_timeout=env_float("TENANT_ARCHIVE_LOCK_TIMEOUT", 2.0),
+        touch_every=env_float("TENANT_TOUCH_INTERVAL", 300.0),
+    )
+
+
+tenant_archive = build_tenant_archive()
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Arquiva schemas de tenant inativos e os restaura.")
+    parser.add_argument("--dsn", default=database_url(), help="DSN Postgres (padrão: DATABASE_URL)")
+    parser.add_argument("--dir", type=Path, default=tenant_archive.directory, help="Pasta dos arquivos")
+    commands = parser.add_subparsers(dest="command", required=True)
+    archive = commands.add_parser("archive", help="Arquiva tenants inativos (ou os schemas indicados)")
+    archive.add_argument("--idle-days", type=float, default=90.0)
+    archive.add_argument("--limit", type=int, default=100)
+    archive.add_argument("--schema", action="append", default=[], help="Arquiva este schema mesmo se ativo")
+    restore = commands.add_parser("restore", help="Restaura schemas arquivados")
+    restore.add_argument("schemas", nargs="+")
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if not args.dsn:
+        logging.error("DATABASE_URL or --dsn is required.")
+        return 2
+    archiver = TenantArchive(args.dsn, args.dir, lock_timeout=tenant_archive.lock_timeout)
+
+    async def run() -> List[Dict[str, Any]]:
+        async with archiver.lifespan():
+            if args.command == "restore":
+                return [asdict(await archiver.restore(schema)) for schema in args.schemas]
+            if args.schema:
+                return [asdict(await archiver.archive(schema)) for schema in args.schema]
+            return [asdict(r) for r in await archiver.archive_dormant(args.idle_days * 86_400, args.limit)]
+
+    for line in asyncio.run(run()):
+        print(json.dumps(line))
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,308 @@
+"""Apply versioned migrations to every tenant schema (`org_*`) in parallel.
+
+Migrations are the ``.sql`` files in `app/services/sql/tenant/`, applied in
+file name order (``0001_add_orders_note.sql``, ...); the file stem is the
+version. Each (schema, version) pair runs in its own transaction with the
+tenant schema first on the search_path and bounded ``lock_timeout`` and
+``statement_timeout``, and is recorded in `tenant_migrations` in that same
+transaction. An interrupted run therefore resumes where it stopped. Schemas
+are processed by ``concurrency`` workers, one connection each; a schema
+whose locks are busy is retried a few times and otherwise reported as
+failed without stopping the others.
+
+    python -m app.services.tenant_migrations --concurrency 8 --lock-timeout 2
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any, Dict, List, Optional
+
+import psycopg
+from psycopg import sql
+
+from app.utils.env import database_url
+
+TENANT_MIGRATIONS_DIR = Path(__file__).resolve().parent / "sql" / "tenant"
+TENANT_SCHEMA_REGEX = r"^org_[a-zA-Z0-9_]+$"
+# Spares (`org__spare_*`, see 004_tenant_spares.sql) are never migrated: they
+# are built from the current template, and their name changes when claimed.
+SPARE_SCHEMA_LIKE = r"org\_\_spare\_%"
+
+
+@dataclass(frozen=True)
+class Migration:
+    version: str
+    sql: str
+
+
+def load_migrations(directory: Path = TENANT_MIGRATIONS_DIR) -> List[Migration]:
+    """Read the tenant migrations in version order."""
+
+    return [
+        Migration(path.stem, path.read_text(encoding="utf-8"))
+        for path in sorted(directory.glob("*.sql"))
+    ]
+
+
+@dataclass
+class SchemaOutcome:
+    schema: str
+    applied: List[str] = field(default_factory=list)
+    seconds: float = 0.0
+    lock_retries: int = 0
+    error: Optional[str] = None
+
+
+@dataclass
+class MigrationReport:
+    versions: List[str] = field(default_factory=list)
+    schemas: int = 0
+    migrated: int = 0
+    up_to_date: int = 0
+    failed: int = 0
+    applied: Dict[str, int] = field(default_factory=dict)
+    lock_retries: int = 0
+    elapsed: float = 0.0
+    schemas_per_second: float = 0.0
+    p50_ms: float = 0.0
+    p99_ms: float = 0.0
+    stragglers: List[Dict[str, Any]] = field(default_factory=list)
+    failures: List[Dict[str, Any]] = field(default_factory=list)
+
+
+def _percentile(ordered: List[float], pct: float) -> float:
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class TenantMigrator:
+    """Fan migrations out over tenant schemas with bounded concurrency."""
+
+    def __init__(
+        self,
+        dsn: str,
+        migrations: List[Migration],
+        concurrency: int = 8,
+        lock_timeout: float = 2.0,
+        statement_timeout: float = 300.0,
+        retries: int = 2,
+        search_path: Optional[str] = None,
+        schema_regex: str = TENANT_SCHEMA_REGEX,
+        stragglers: int = 10,
+        progress_every: int = 500,
+    ) -> None:
+        self.dsn = dsn
+        self.migrations = migrations
+        self.concurrency = max(1, concurrency)
+        self.lock_timeout = lock_timeout
+        self.statement_timeout = statement_timeout
+        self.retries = max(0, retries)
+        self.search_path = search_path or os.environ.get("PG_SEARCH_PATH", "reflex, public")
+        self.schema_regex = schema_regex
+        self.stragglers = stragglers
+        self.progress_every = progress_every
+        self._progress_table: Optional[sql.Identifier] = None
+
+    async def _connect(self) -> psycopg.AsyncConnection:
+        conn = await psycopg.AsyncConnection.connect(self.dsn, autocommit=True)
+        await conn.execute(sql.SQL("SET search_path TO {}").format(sql.SQL(self.search_path)))
+        return conn
+
+    async def discover(self, conn: psycopg.AsyncConnection) -> List[str]:
+        cursor = await conn.execute(
+            "SELECT nspname FROM pg_namespace WHERE nspname ~ %s AND nspname NOT LIKE %s ORDER BY nspname",
+            (self.schema_regex, SPARE_SCHEMA_LIKE),
+        )
+        return [row[0] for row in await cursor.fetchall()]
+
+    async def pending(
+        self, conn: psycopg.AsyncConnection, schemas: List[str]
+    ) -> Dict[str, List[Migration]]:
+        """Migrations not yet recorded for each schema, in version order."""
+
+        cursor = await conn.execute(
+            sql.SQL("SELECT schema_name, version FROM {} WHERE version = ANY(%s)").format(
+                self._progress_table
+            ),
+            ([migration.version for migration in self.migrations],),
+        )
+        done = {(schema, version) for schema, version in await cursor.fetchall()}
+        return {
+            schema: [m for m in self.migrations if (schema, m.version) not in done]
+            for schema in schemas
+        }
+
+    async def _apply(
+        self, conn: psycopg.AsyncConnection, schema: str, migration: Migration
+    ) -> bool:
+        """Apply one migration to one schema; ``False`` if another run already did."""
+
+        started = time.perf_counter()
+        async with conn.transaction():
+            await conn.execute(
+                "SELECT set_config('lock_timeout', %s, true), set_config('statement_timeout', %s, true)",
+                (f"{int(self.lock_timeout * 1000)}ms", f"{int(self.statement_timeout * 1000)}ms"),
+            )
+            cursor = await conn.execute(
+                sql.SQL(
+                    "INSERT INTO {} (schema_name, version) VALUES (%s, %s) "
+                    "ON CONFLICT DO NOTHING RETURNING 1"
+                ).format(self._progress_table),
+                (schema, migration.version),
+            )
+            if await cursor.fetchone() is None:
+                return False
+            await conn.execute(
+                sql.SQL("SET LOCAL search_path TO {}, public").format(sql.Identifier(schema))
+            )
+            await conn.execute(migration.sql)
+            await conn.execute(
+                sql.SQL("UPDATE {} SET duration_ms = %s WHERE schema_name = %s AND version = %s").format(
+                    self._progress_table
+                ),
+                (round((time.perf_counter() - started) * 1000, 3), schema, migration.version),
+            )
+        return True
+
+    async def migrate_schema(
+        self, conn: psycopg.AsyncConnection, schema: str, migrations: List[Migration]
+    ) -> SchemaOutcome:
+        outcome = SchemaOutcome(schema)
+        started = time.perf_counter()
+        for migration in migrations:
+            for attempt in range(self.retries + 1):
+                try:
+                    if await self._apply(conn, schema, migration):
+                        outcome.applied.append(migration.version)
+                    break
+                except psycopg.errors.LockNotAvailable as exc:
+                    if attempt == self.retries:
+                        outcome.error = f"{migration.version}: lock timeout ({exc})"
+                    else:
+                        outcome.lock_retries += 1
+                        await asyncio.sleep(0.1 * 2**attempt)
+                except psycopg.Error as exc:
+                    outcome.error = f"{migration.version}: {exc}"
+                    break
+            if outcome.error:
+                break
+        outcome.seconds = time.perf_counter() - started
+        return outcome
+
+    async def run(self, schemas: Optional[List[str]] = None) -> MigrationReport:
+        report = MigrationReport(versions=[m.version for m in self.migrations])
+        started = time.perf_counter()
+        control = await self._connect()
+        try:
+            cursor = await control.execute("SELECT current_schema()")
+            (current,) = await cursor.fetchone()
+            self._progress_table = sql.Identifier(current, "tenant_migrations")
+            schemas = await self.discover(control) if schemas is None else schemas
+            todo = await self.pending(control, schemas)
+        finally:
+            await control.close()
+
+        report.schemas = len(schemas)
+        queue: asyncio.Queue = asyncio.Queue()
+        for schema in schemas:
+            if todo[schema]:
+                queue.put_nowait(schema)
+            else:
+                report.up_to_date += 1
+        total = queue.qsize()
+        outcomes: List[SchemaOutcome] = []
+
+        async def worker() -> None:
+            conn = await self._connect()
+            try:
+                while True:
+                    try:
+                        schema = queue.get_nowait()
+                    except asyncio.QueueEmpty:
+                        return
+                    if conn.closed:
+                        conn = await self._connect()
+                    outcome = await self.migrate_schema(conn, schema, todo[schema])
+                    outcomes.append(outcome)
+                    if self.progress_every and len(outcomes) % self.progress_every == 0:
+                        elapsed = time.perf_counter() - started
+                        logging.info(
+                            "Migrated %d/%d schemas (%.1f schemas/s)",
+                            len(outcomes),
+                            total,
+                            len(outcomes) / elapsed,
+                        )
+            finally:
+                await conn.close()
+
+        await asyncio.gather(*(worker() for _ in range(min(self.concurrency, total))))
+
+        for outcome in outcomes:
+            report.lock_retries += outcome.lock_retries
+            for version in outcome.applied:
+                report.applied[version] = report.applied.get(version, 0) + 1
+            if outcome.error:
+                report.failed += 1
+                report.failures.append({"schema": outcome.schema, "error": outcome.error})
+            elif outcome.applied:
+                report.migrated += 1
+            else:
+                report.up_to_date += 1
+        report.elapsed = time.perf_counter() - started
+        report.schemas_per_second = len(outcomes) / report.elapsed if report.elapsed else 0.0
+        durations = sorted(outcome.seconds * 1000 for outcome in outcomes)
+        report.p50_ms = round(_percentile(durations, 50), 3)
+        report.p99_ms = round(_percentile(durations, 99), 3)
+        slowest = sorted(outcomes, key=lambda outcome: outcome.seconds, reverse=True)
+        report.stragglers = [
+            {"schema": outcome.schema, "ms": round(outcome.seconds * 1000, 3)}
+            for outcome in slowest[: self.stragglers]
+        ]
+        return report
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Aplica as migrações de tenant em todos os schemas org_*.")
+    parser.add_argument("--dsn", default=database_url(), help="DSN Postgres (padrão: DATABASE_URL)")
+    parser.add_argument("--dir", type=Path, default=TENANT_MIGRATIONS_DIR, help="Pasta das migrações")
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--lock-timeout", type=float, default=2.0, help="Segundos por lock")
+    parser.add_argument("--statement-timeout", type=float, default=300.0)
+    parser.add_argument("--retries", type=int, default=2, help="Novas tentativas após lock timeout")
+    parser.add_argument("--schema-regex", default=TENANT_SCHEMA_REGEX)
+    args = parser.parse_args(argv)
+
+    logging.basicConfig(level=logging.INFO)
+    if not args.dsn:
+        logging.error("DATABASE_URL or --dsn is required.")
+        return 2
+    migrations = load_migrations(args.dir)
+    if not migrations:
+        logging.info("No tenant migrations in %s.", args.dir)
+        return 0
+    migrator = TenantMigrator(
+        args.dsn,
+        migrations,
+        concurrency=args.concurrency,
+        lock_timeout=args.lock_timeout,
+        statement_timeout=args.statement_timeout,
+        retries=args.retries,
+        schema_regex=args.schema_regex,
+    )
+    report = asyncio.run(migrator.run())
+    print(json.dumps(asdict(report)))
+    return 1 if report.failed else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
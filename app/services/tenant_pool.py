@@ -0,0 +1,119 @@
+"""Background filler that keeps pre-built spare tenant schemas ready to claim."""
+
+from __future__ import annotations
+
+import asyncio
+import contextlib
+import logging
+from collections import deque
+from typing import Any, AsyncIterator, Awaitable, Callable, Deque, Optional
+
+from app.services.models import SpareBuild
+
+
+def _percentile(samples: Deque[float], pct: float) -> Optional[float]:
+    if not samples:
+        return None
+    ordered = sorted(samples)
+    return ordered[min(len(ordered) - 1, int(pct / 100 * len(ordered)))]
+
+
+class SpareSchemaPool:
+    """Keep ``size`` spare `org__spare_*` schemas built with the tenant template.
+
+    Every ``interval`` seconds the filler calls ``build(size)`` up to
+    ``refill_per_tick`` times; each call builds one spare in its own
+    transaction while the pool is short (see `sql/004_tenant_spares.sql`).
+    `finalize_onboarding` claims spares by renaming them, and reports each
+    claim through ``record_claim`` so hit rate and claim latency are visible.
+    """
+
+    def __init__(
+        self,
+        build: Callable[[int], Awaitable[SpareBuild]],
+        size: int = 0,
+        refill_per_tick: int = 1,
+        interval: float = 5.0,
+        history: int = 1_000,
+    ) -> None:
+        self._build = build
+        self.size = max(0, size)
+        self.refill_per_tick = max(1, refill_per_tick)
+        self.interval = interval
+        self.available: Optional[int] = None
+        self.built = 0
+        self.build_errors = 0
+        self.last_build_ms: dict[str, float] = {}
+        self.claims = 0
+        self.misses = 0
+        self._claim_ms: Deque[float] = deque(maxlen=history)
+
+    @property
+    def enabled(self) -> bool:
+        return self.size > 0
+
+    async def fill_once(self) -> int:
+        """Build up to ``refill_per_tick`` spares; return how many were built."""
+
+        built = 0
+        for _ in range(self.refill_per_tick):
+            result = await self._build(self.size)
+            self.available = result.available
+            if result.schema is None:
+                break
+            built += 1
+            self.built += 1
+            self.last_build_ms = result.timings
+            logging.info("Built spare tenant schema %s (%s available)", result.schema, result.available)
+        return built
+
+    async def run(self) -> None:
+        """Top the pool up forever; failures are logged and retried next tick."""
+
+        while True:
+            try:
+                await self.fill_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                self.build_errors += 1
+                logging.warning("Spare schema build failed (%s); retrying.", exc)
+            await asyncio.sleep(self.interval)
+
+    def record_claim(self, spare: Optional[str], claim_ms: Optional[float]) -> None:
+        if spare:
+            self.claims += 1
+            if self.available:
+                self.available -= 1
+        else:
+            self.misses += 1
+        if claim_ms is not None:
+            self._claim_ms.append(claim_ms)
+
+    @contextlib.asynccontextmanager
+    async def lifespan(self) -> AsyncIterator[None]:
+        """Run the filler for the duration of the app when a pool size is set."""
+
+        if not self.enabled:
+            yield
+            return
+        task = asyncio.create_task(self.run(), name="spare-schema-filler")
+        try:
+            yield
+        finally:
+            task.cancel()
+            with contextlib.suppress(asyncio.CancelledError):
+                await task
+
+    def stats(self) -> dict[str, Any]:
+        return {
+            "size": self.size,
+            "available": self.available,
+            "built": self.built,
+            "build_errors": self.build_errors,
+            "last_build_ms": dict(self.last_build_ms),
+            "claims": self.claims,
+            "misses": self.misses,
+            "claim_ms_p50": _percentile(self._claim_ms, 50),
+            "claim_ms_p99": _percentile(self._claim_ms, 99),
+        }
@@ -7,27 +7,34 @@ from typing import Any, Dict, Tuple
 
 import reflex as rx
 
+from app.services.cep_index import lookup_postal_code
+from app.services.models import UserRow
 from app.services.supabase_client import supabase_client
-from app.states.onboarding_state import OnboardingState
+from app.states.onboarding_state import OnboardingState, PersonalState
+
+ONBOARDING_START = "/onboarding/step-1-personal"
 
 
 class AuthState(rx.State):
     """Custom auth state to register/sign-in users into the onboarding flow."""
 
-    @staticmethod
-    def _prefill_onboarding(user: Dict[str, Any]) -> None:
-        """Populate onboarding fields from a user payload."""
-
-        OnboardingState.user_id = user.get("id")
-        OnboardingState.personal_first_name = user.get("first_name", "")
-        OnboardingState.personal_last_name = user.get("last_name", "")
-        OnboardingState.personal_email = user.get("email", "")
-        OnboardingState.personal_tax_number = user.get("tax_number", "")
-        OnboardingState.personal_birth_date = user.get("birth_date", "")
-        OnboardingState.personal_country = user.get("country", "Brasil")
-        OnboardingState.personal_postal_code = user.get("postal_code", "")
-        OnboardingState.personal_house_number = user.get("house_number", "")
-        OnboardingState.current_step = 1
+    async def _prefill_onboarding(self, user: UserRow) -> None:
+        """Populate this session's onboarding fields from a user row."""
+
+        onboarding = await self.get_state(OnboardingState)
+        personal = await self.get_state(PersonalState)
+        onboarding.user_id = user.id
+        personal.personal_first_name = user.first_name or ""
+        personal.personal_last_name = user.last_name or ""
+        personal.personal_email = user.email or ""
+        personal.personal_tax_number = user.tax_number or ""
+        personal.personal_birth_date = user.birth_date or ""
+        personal.personal_country = user.country or "Brasil"
+        personal.personal_postal_code = user.postal_code or ""
+        address = lookup_postal_code(personal.personal_postal_code)
+        personal.personal_address = address.label() if address else ""
+        personal.personal_house_number = user.house_number or ""
+        onboarding.current_step = 1
 
     @staticmethod
     def _build_user_payload(form_data: Dict[str, Any]) -> Tuple[Dict[str, Any], str | None]:
@@ -71,8 +78,8 @@ class AuthState(rx.State):
     @classmethod
     async def _perform_register(
         cls, form_data: Dict[str, Any], client=supabase_client
-    ) -> Tuple[str | None, str | None]:
-        """Shared registration logic to ease testing."""
+    ) -> Tuple[UserRow | None, str | None]:
+        """Shared registration logic to ease testing; returns the created user or an error."""
 
         user_data, error = cls._build_user_payload(form_data)
         if error:
@@ -81,25 +88,25 @@ class AuthState(rx.State):
             created = await client.create_user(user_data)
             if not created:
                 return None, "Não foi possível criar a conta. Tente novamente."
-            cls._prefill_onboarding(created[0])
-            return "/onboarding/step-1-personal", None
+            return created[0], None
         except Exception as exc:  # pragma: no cover - guarded by tests on helpers
             logging.exception("Failed to register user: %s", exc)
             return None, f"Falha ao criar conta: {exc}"
 
     @rx.event
     async def register(self, form_data: dict):
-        redirect_to, error = await self._perform_register(form_data)
+        user, error = await self._perform_register(form_data)
         if error:
             yield rx.toast.error(error)
             return
-        yield rx.redirect(redirect_to)
+        await self._prefill_onboarding(user)
+        yield rx.redirect(ONBOARDING_START)
 
     @classmethod
     async def _perform_signin(
         cls, form_data: Dict[str, Any], client=supabase_client
-    ) -> Tuple[str | None, str | None]:
-        """Shared sign-in logic used by the event handler and tests."""
+    ) -> Tuple[UserRow | None, str | None]:
+        """Shared sign-in logic used by the event handler and tests; returns the user or an error."""
 
         email = form_data.get("email", "").strip()
         if not email:
@@ -108,16 +115,16 @@ class AuthState(rx.State):
             users = await client.get_user_by_email(email)
             if not users:
                 return None, "Usuário não encontrado. Por favor registre-se."
-            cls._prefill_onboarding(users[0])
-            return "/onboarding/step-1-personal", None
+            return users[0], None
         except Exception as exc:  # pragma: no cover - guarded by tests on helpers
             logging.exception("Sign-in failed: %s", exc)
             return None, "Erro no login. Tente novamente."
 
     @rx.event
     async def signin(self, form_data: dict):
-        redirect_to, error = await self._perform_signin(form_data)
+        user, error = await self._perform_signin(form_data)
         if error:
             yield rx.toast.error(error)
             return
-        yield rx.redirect(redirect_to)
+        await self._prefill_onboarding(user)
+        yield rx.redirect(ONBOARDING_START)
@@ -1,7 +1,15 @@
+import asyncio
 import logging
+import uuid
 
 import reflex as rx
 
+from app.services.metrics import (
+    ONBOARDING_EVENTS_IN_FLIGHT,
+    ONBOARDING_STEP_FAILURES,
+    ONBOARDING_STEP_SUBMISSIONS,
+)
+from app.services.cep_index import lookup_postal_code, postal_code_exists
 from app.services.supabase_client import supabase_client
 from app.utils.validators import (
     validate_cpf_cnpj,
@@ -11,10 +19,23 @@ from app.utils.validators import (
 
 
 class OnboardingState(rx.State):
-    """State to manage the multi-step onboarding flow."""
+    """Root of the onboarding flow: only what every step reads.
+
+    The fields of each step live in their own substate (`PersonalState`,
+    `BusinessState`, `PlanState`, `ProvisionState`). Reflex loads, diffs
+    and persists an event's substate plus its parents, so a keystroke
+    setter on step 1 never touches the business, plan or provisioning
+    vars. Handlers that need another step's fields fetch it with
+    ``await self.get_state(...)``.
+    """
 
     current_step: int = 1
     is_loading: bool = False
+    user_id: str | None = None
+
+
+class PersonalState(OnboardingState):
+    """Step 1: the owner's personal details."""
 
     personal_first_name: str = ""
     personal_last_name: str = ""
@@ -24,22 +45,25 @@ class OnboardingState(rx.State):
     personal_country: str = "Brasil"
     personal_postal_code: str = ""
     personal_house_number: str = ""
-    user_id: str | None = None
+    # Street, neighbourhood and city of the CEP, from the local CEP index.
+    personal_address: str = ""
 
-    business_public_name: str = ""
-    business_username: str = ""
-    business_tax_number: str = ""
-    business_service_category: str = ""
-    business_country: str = "Brasil"
-    business_postal_code: str = ""
-    business_vibe_tags: str = ""
+    @rx.event
+    def lookup_personal_postal_code(self, value: str):
+        """Sync the CEP and show its address, or flag a CEP that does not exist."""
 
-    selected_plan: str = ""
+        self.personal_postal_code = value.strip()
+        address = lookup_postal_code(self.personal_postal_code)
+        self.personal_address = address.label() if address else ""
+        if not address and validate_postal_code(self.personal_postal_code):
+            if not postal_code_exists(self.personal_postal_code):
+                return rx.toast.error("CEP não encontrado.")
 
     @rx.event
     async def handle_personal_submit(self, form_data: dict):
         """Persist the personal details and advance the onboarding."""
 
+        ONBOARDING_STEP_SUBMISSIONS.inc("personal")
         self.personal_first_name = form_data.get("personal_first_name", "").strip()
         self.personal_last_name = form_data.get("personal_last_name", "").strip()
         self.personal_email = form_data.get("personal_email", "").strip()
@@ -61,16 +85,23 @@ class OnboardingState(rx.State):
                 self.personal_house_number,
             ]
         ):
+            ONBOARDING_STEP_FAILURES.inc("personal", "validation")
             yield rx.toast.error("Por favor, preencha todos os campos.")
             return
 
         if not validate_cpf_cnpj(self.personal_tax_number):
+            ONBOARDING_STEP_FAILURES.inc("personal", "validation")
             yield rx.toast.error("CPF ou CNPJ inválido. Verifique os números.")
             return
 
         if not validate_postal_code(self.personal_postal_code):
+            ONBOARDING_STEP_FAILURES.inc("personal", "validation")
             yield rx.toast.error("CEP inválido. Use o formato com 8 dígitos.")
             return
+        if not postal_code_exists(self.personal_postal_code):
+            ONBOARDING_STEP_FAILURES.inc("personal", "validation")
+            yield rx.toast.error("CEP não encontrado. Verifique os números.")
+            return
 
         self.is_loading = True
         yield
@@ -89,9 +120,10 @@ class OnboardingState(rx.State):
                 "house_number": self.personal_house_number,
                 "is_owner": True,
             }
-            response = await supabase_client.upsert_user(user_data)
+            with ONBOARDING_EVENTS_IN_FLIGHT.track("handle_personal_submit"):
+                response = await supabase_client.upsert_user(user_data)
             if response:
-                self.user_id = response[0].get("id")
+                self.user_id = response[0].id
                 self.current_step = 2
                 self.is_loading = False
                 yield rx.redirect("/onboarding/step-2-business")
@@ -99,9 +131,34 @@ class OnboardingState(rx.State):
             raise ValueError("Nenhum dado retornado ao salvar o usuário.")
         except Exception as exc:  # pragma: no cover - relies on external services
             logging.exception("Error during personal data submission: %s", exc)
+            ONBOARDING_STEP_FAILURES.inc("personal", "error")
             self.is_loading = False
             yield rx.toast.error(f"Erro ao salvar dados: {exc}")
 
+
+class BusinessState(OnboardingState):
+    """Step 2: the establishment."""
+
+    business_public_name: str = ""
+    business_username: str = ""
+    business_tax_number: str = ""
+    business_service_category: str = ""
+    business_country: str = "Brasil"
+    business_postal_code: str = ""
+    business_vibe_tags: str = ""
+    business_address: str = ""
+
+    @rx.event
+    def lookup_business_postal_code(self, value: str):
+        """Sync the establishment's CEP and show its address, or flag a CEP that does not exist."""
+
+        self.business_postal_code = value.strip()
+        address = lookup_postal_code(self.business_postal_code)
+        self.business_address = address.label() if address else ""
+        if not address and validate_postal_code(self.business_postal_code):
+            if not postal_code_exists(self.business_postal_code):
+                return rx.toast.error("CEP do estabelecimento não encontrado.")
+
     def _validate_business_data(self) -> bool:
         return all(
             [
@@ -118,6 +175,7 @@ class OnboardingState(rx.State):
     async def handle_business_submit(self, form_data: dict):
         """Validate business data and move to the plan selection step."""
 
+        ONBOARDING_STEP_SUBMISSIONS.inc("business")
         self.business_public_name = form_data.get("business_public_name", self.business_public_name).strip()
         self.business_username = form_data.get("business_username", self.business_username).strip()
         self.business_tax_number = form_data.get("business_tax_number", self.business_tax_number).strip()
@@ -129,57 +187,82 @@ class OnboardingState(rx.State):
         self.business_vibe_tags = form_data.get("business_vibe_tags", self.business_vibe_tags).strip()
 
         if not self._validate_business_data():
+            ONBOARDING_STEP_FAILURES.inc("business", "validation")
             yield rx.toast.error("Por favor, preencha todos os campos.")
             return
         if not validate_username(self.business_username):
+            ONBOARDING_STEP_FAILURES.inc("business", "validation")
             yield rx.toast.error(
-                "Username inválido. Use apenas letras, números e underline (min 3 caracteres)."
+                "Username inválido. Use letras, números e underline, começando com letra ou número (min 3 caracteres)."
             )
             return
         if not validate_cpf_cnpj(self.business_tax_number):
+            ONBOARDING_STEP_FAILURES.inc("business", "validation")
             yield rx.toast.error("CNPJ do estabelecimento inválido.")
             return
         if not validate_postal_code(self.business_postal_code):
+            ONBOARDING_STEP_FAILURES.inc("business", "validation")
             yield rx.toast.error("CEP do estabelecimento inválido.")
             return
+        if not postal_code_exists(self.business_postal_code):
+            ONBOARDING_STEP_FAILURES.inc("business", "validation")
+            yield rx.toast.error("CEP do estabelecimento não encontrado.")
+            return
 
         self.current_step = 3
         yield rx.redirect("/onboarding/step-3-plan")
 
+
+class PlanState(OnboardingState):
+    """Steps 3 and 4: plan selection and checkout."""
+
+    selected_plan: str = ""
+    # One key per checkout: repeated payment submits replay the first outcome.
+    checkout_key: str = ""
+
     @rx.event
     def handle_plan_submit(self):
         """Confirm the selected plan before payment."""
 
+        ONBOARDING_STEP_SUBMISSIONS.inc("plan")
         if not self.selected_plan:
+            ONBOARDING_STEP_FAILURES.inc("plan", "validation")
             return rx.toast.error("Por favor, selecione um plano.")
+        self.checkout_key = uuid.uuid4().hex
         self.current_step = 4
         return rx.redirect("/onboarding/step-4-payment")
 
     @rx.event
     async def handle_payment_submit(self, form_data: dict):
-        """Finalize onboarding, provision tenant schema, and redirect to success."""
+        """Finalize onboarding in one atomic RPC (boteco, membership, schema) and redirect."""
 
+        ONBOARDING_STEP_SUBMISSIONS.inc("payment")
         if not self.user_id:
+            ONBOARDING_STEP_FAILURES.inc("payment", "validation")
             yield rx.toast.error("ID do usuário não encontrado. Por favor, volte ao passo 1.")
             return
 
+        if not self.checkout_key:
+            self.checkout_key = uuid.uuid4().hex
         self.is_loading = True
         yield
 
-        created_boteco_id = None
         try:
+            personal = await self.get_state(PersonalState)
+            business = await self.get_state(BusinessState)
+            provision = await self.get_state(ProvisionState)
             boteco_data = {
-                "public_name": self.business_public_name,
-                "username": self.business_username,
-                "service_category": self.business_service_category,
+                "public_name": business.business_public_name,
+                "username": business.business_username,
+                "service_category": business.business_service_category,
                 "vibe_tags": [
-                    tag.strip() for tag in self.business_vibe_tags.split(",") if tag.strip()
+                    tag.strip() for tag in business.business_vibe_tags.split(",") if tag.strip()
                 ],
-                "establishment_tax_number": self.business_tax_number,
-                "country": self.business_country,
-                "postal_code": self.business_postal_code,
-                "owner_tax_number": self.personal_tax_number,
-                "created_by_email": self.personal_email,
+                "establishment_tax_number": business.business_tax_number,
+                "country": business.business_country,
+                "postal_code": business.business_postal_code,
+                "owner_tax_number": personal.personal_tax_number,
+                "created_by_email": personal.personal_email,
                 "created_by_user_id": self.user_id,
             }
             user_boteco_data = {
@@ -187,22 +270,18 @@ class OnboardingState(rx.State):
                 "assigned_role": "owner",
                 "plan": self.selected_plan,
             }
-            boteco_res, _ = await supabase_client.create_boteco_and_associate_user(
-                boteco_data, user_boteco_data
-            )
-            if boteco_res.data and len(boteco_res.data) > 0:
-                created_boteco_id = boteco_res.data[0]["id"]
-
-            try:
-                await supabase_client.provision_schema(self.business_username)
-                logging.info("Schema provisioning triggered for: %s", self.business_username)
-            except Exception as provision_error:
-                logging.exception(
-                    "Provisioning failed, rolling back DB records: %s", provision_error
+            with ONBOARDING_EVENTS_IN_FLIGHT.track("handle_payment_submit"):
+                result = await supabase_client.finalize_onboarding(
+                    boteco_data, user_boteco_data, idempotency_key=self.checkout_key
                 )
-                if created_boteco_id:
-                    await supabase_client.delete_boteco(created_boteco_id)
-                raise provision_error
+                logging.info("Onboarding finalized, tenant schema: %s", result.schema)
+                if result.spare or result.company_id:
+                    # A pre-built spare was renamed to the tenant schema, or the tenant
+                    # lives in the shared tables: nothing left to provision.
+                    provision.provision_job_id = ""
+                    provision.provision_status = "succeeded"
+                else:
+                    await provision._queue_provisioning(result.boteco.username, self.checkout_key)
 
             self.is_loading = False
             self.current_step = 1
@@ -210,5 +289,61 @@ class OnboardingState(rx.State):
             yield rx.redirect("/onboarding/success")
         except Exception as exc:  # pragma: no cover - depends on external services
             logging.exception("Error during payment/provisioning: %s", exc)
+            ONBOARDING_STEP_FAILURES.inc("payment", "error")
             self.is_loading = False
             yield rx.toast.error(f"Erro na finalização: {exc}. Tente novamente.")
+
+
+class ProvisionState(OnboardingState):
+    """Success page: progress of the tenant provisioning job."""
+
+    provision_job_id: str = ""
+    provision_status: str = ""
+    provision_error: str = ""
+
+    async def _queue_provisioning(self, boteco_username: str, idempotency_key: str) -> None:
+        """Queue the tenant provisioning job; the success page follows its progress."""
+
+        self.provision_job_id = ""
+        self.provision_error = ""
+        try:
+            response = await supabase_client.provision_schema(
+                boteco_username, idempotency_key=idempotency_key
+            )
+            job = response.json()
+            self.provision_job_id = job["job_id"]
+            self.provision_status = job["status"]
+        except Exception as exc:  # pragma: no cover - depends on external services
+            # The boteco and its schema already exist; only the follow-up job is missing.
+            logging.exception("Could not queue provisioning for %s: %s", boteco_username, exc)
+            self.provision_status = "failed"
+            self.provision_error = str(exc)
+
+    @rx.event(background=True)
+    async def poll_provisioning(self):
+        """Follow the provisioning job from the success page until it finishes.
+
+        After a minute without an answer the page stops polling and shows
+        ``timeout``; reloading it polls the job again.
+        """
+
+        async with self:
+            job_id = self.provision_job_id
+        for _ in range(60):
+            if not job_id:
+                return
+            try:
+                job = await supabase_client.provision_status(job_id)
+            except Exception as exc:  # pragma: no cover - depends on external services
+                logging.warning("Could not read provisioning job %s: %s", job_id, exc)
+            else:
+                async with self:
+                    self.provision_status = job["status"]
+                    self.provision_error = job.get("error") or ""
+                if job["status"] in ("succeeded", "failed"):
+                    return
+            await asyncio.sleep(1)
+        async with self:
+            if self.provision_job_id == job_id:
+                self.provision_status = "timeout"
+                self.provision_error = "A preparação está demorando mais que o normal."
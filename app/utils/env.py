@@ -0,0 +1,39 @@
+from __future__ import annotations
+
+import logging
+import os
+
+
+def env_int(name: str, default: int) -> int:
+    """Read an integer setting from the environment, falling back on bad values."""
+
+    raw = os.environ.get(name)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        return int(raw)
+    except ValueError:
+        logging.warning("Invalid integer for %s=%r, using %s.", name, raw, default)
+        return default
+
+
+def env_float(name: str, default: float) -> float:
+    """Read a float setting from the environment, falling back on bad values."""
+
+    raw = os.environ.get(name)
+    if raw is None or raw.strip() == "":
+        return default
+    try:
+        return float(raw)
+    except ValueError:
+        logging.warning("Invalid number for %s=%r, using %s.", name, raw, default)
+        return default
+
+
+def database_url() -> str | None:
+    """Direct Postgres DSN (`DATABASE_URL` or `REFLEX_DB_URL`) in psycopg form."""
+
+    url = os.environ.get("DATABASE_URL") or os.environ.get("REFLEX_DB_URL")
+    if url and "+psycopg" in url:
+        url = url.replace("postgresql+psycopg://", "postgresql://")
+    return url or None
@@ -1,22 +1,121 @@
+import json
+import logging
 import re
+from functools import lru_cache
+from typing import Iterable, List, Optional, Sequence
+
+# The rules below are the single definition shared by the server checks and
+# the browser: `client_validators_script()` renders `CLIENT_RULES` to JS, so
+# the patterns stay in the ECMAScript-compatible subset (ASCII classes only).
+USERNAME_PATTERN = r"^[a-zA-Z0-9][a-zA-Z0-9_]{2,29}$"
+CPF_CNPJ_DIGITS = (11, 14)
+POSTAL_CODE_DIGITS = (8,)
+# Weights of the two mod-11 check digits, by document length (CPF, CNPJ).
+CHECK_DIGIT_WEIGHTS = {
+    11: ((10, 9, 8, 7, 6, 5, 4, 3, 2), (11, 10, 9, 8, 7, 6, 5, 4, 3, 2)),
+    14: ((5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2), (6, 5, 4, 3, 2, 9, 8, 7, 6, 5, 4, 3, 2)),
+}
+
+CLIENT_RULES = {
+    "username": {
+        "pattern": USERNAME_PATTERN,
+        "message": "Use letras, números e underline, começando com letra ou número (3 a 30 caracteres).",
+    },
+    "cpf_cnpj": {
+        "digits": CPF_CNPJ_DIGITS,
+        "check_digits": CHECK_DIGIT_WEIGHTS,
+        "message": "CPF ou CNPJ inválido. Verifique os números.",
+    },
+    "postal_code": {"digits": POSTAL_CODE_DIGITS, "message": "Informe o CEP com 8 dígitos."},
+}
+
+_USERNAME_RE = re.compile(USERNAME_PATTERN)
+_NON_DIGIT_RE = re.compile(r"\D", re.ASCII)
 
 
 def validate_username(username: str) -> bool:
-    """Validate that the username contains only alphanumerics and underscores."""
+    """Validate that the username contains only alphanumerics and underscores.
+
+    A leading underscore is reserved for internal schemas such as `org__spare_*`.
+    """
 
     if not username:
         return False
-    pattern = r"^[a-zA-Z0-9_]{3,30}$"
-    return bool(re.match(pattern, username))
+    return _USERNAME_RE.fullmatch(username) is not None
+
+
+def _check_digit(digits: Sequence[int], weights: Sequence[int]) -> int:
+    remainder = sum(digit * weight for digit, weight in zip(digits, weights)) % 11
+    return 0 if remainder < 2 else 11 - remainder
+
+
+def cpf_cnpj_check_digits(base: str) -> str:
+    """The two check digits completing a 9-digit CPF or 12-digit CNPJ base."""
+
+    digits = [int(char) for char in base]
+    for weights in CHECK_DIGIT_WEIGHTS[len(digits) + 2]:
+        digits.append(_check_digit(digits, weights))
+    return "".join(map(str, digits[-2:]))
 
 
 def validate_cpf_cnpj(tax_number: str) -> bool:
-    """Validate the format of CPF (11 digits) or CNPJ (14 digits)."""
+    """Validate a CPF (11 digits) or CNPJ (14 digits), check digits included.
+
+    Punctuation is ignored; numbers made of one repeated digit are rejected.
+    """
 
     if not tax_number:
         return False
-    clean_number = re.sub(r"\D", "", tax_number)
-    return len(clean_number) in [11, 14]
+    digits = [int(char) for char in _NON_DIGIT_RE.sub("", tax_number)]
+    if len(digits) not in CPF_CNPJ_DIGITS or len(set(digits)) == 1:
+        return False
+    return all(
+        _check_digit(digits, weights) == digits[len(weights)] for weights in CHECK_DIGIT_WEIGHTS[len(digits)]
+    )
+
+
+def validate_cpf_cnpj_batch(tax_numbers: Iterable[Optional[str]], chunk_size: int = 1 << 18) -> List[bool]:
+    """`validate_cpf_cnpj` over many numbers at once, for imports and data sweeps.
+
+    With NumPy each chunk becomes a ``(rows, 14)`` digit matrix (punctuation
+    stripped, longer values rejected up front) and both check digits are
+    computed for all rows of a length with one weighted sum. Without NumPy
+    the numbers are validated one by one; either way the result is a list.
+    """
+
+    values = ["" if value is None else value for value in tax_numbers]
+    try:
+        import numpy as np
+    except ImportError:
+        logging.warning("numpy not installed; validating tax numbers one by one.")
+        return [validate_cpf_cnpj(value) for value in values]
+
+    valid: List[bool] = []
+    for start in range(0, len(values), chunk_size):
+        valid += _validate_cpf_cnpj_chunk(np, values[start : start + chunk_size]).tolist()
+    return valid
+
+
+def _validate_cpf_cnpj_chunk(np, values: List[str]):
+    width = max(CHECK_DIGIT_WEIGHTS)
+    stripped = [_NON_DIGIT_RE.sub("", value) for value in values]
+    # Only ASCII digits are left; anything longer than a CNPJ is invalid and
+    # must not widen the matrix (a single junk value would size every row).
+    raw = np.array([digits if len(digits) <= width else "" for digits in stripped], dtype=f"S{width}")
+    chars = raw.view(np.uint8).reshape(len(values), width)
+    count = (chars != 0).sum(axis=1)
+    digits = chars.astype(np.int16) - ord("0")
+
+    valid = np.zeros(len(values), dtype=bool)
+    for length, weight_pair in CHECK_DIGIT_WEIGHTS.items():
+        rows = count == length
+        matrix = digits[rows, :length]
+        ok = (matrix != matrix[:, :1]).any(axis=1)
+        for weights in weight_pair:
+            remainder = (matrix[:, : len(weights)] * np.array(weights, dtype=np.int16)).sum(axis=1) % 11
+            ok &= np.where(remainder < 2, 0, 11 - remainder) == matrix[:, len(weights)]
+        valid[rows] = ok
+    return valid
 
 
 def validate_postal_code(postal_code: str) -> bool:
@@ -24,5 +123,57 @@ def validate_postal_code(postal_code: str) -> bool:
 
     if not postal_code:
         return False
-    clean_cep = re.sub(r"\D", "", postal_code)
-    return len(clean_cep) == 8
+    return len(_NON_DIGIT_RE.sub("", postal_code)) in POSTAL_CODE_DIGITS
+
+
+_CLIENT_SCRIPT = """(() => {
+  if (window.botecoValidators) return;
+  const rules = %s;
+  const check = (name, value) => {
+    const rule = rules[name];
+    if (!value) return false;
+    if (rule.pattern) return new RegExp(rule.pattern).test(value);
+    const digits = value.replace(/\\D/g, "").split("").map(Number);
+    if (!rule.digits.includes(digits.length)) return false;
+    const weights = rule.check_digits && rule.check_digits[digits.length];
+    if (!weights) return true;
+    if (digits.every((digit) => digit === digits[0])) return false;
+    return weights.every((w) => {
+      const remainder = w.reduce((sum, weight, i) => sum + weight * digits[i], 0) %% 11;
+      return (remainder < 2 ? 0 : 11 - remainder) === digits[w.length];
+    });
+  };
+  const validate = (input) => {
+    const name = input.dataset.validate;
+    const ok = !input.value || check(name, input.value);
+    input.setCustomValidity(ok ? "" : rules[name].message);
+    return ok;
+  };
+  window.botecoValidators = { rules, check };
+  document.addEventListener("input", (event) => {
+    if (event.target.dataset && event.target.dataset.validate) event.target.setCustomValidity("");
+  }, true);
+  document.addEventListener("focusout", (event) => {
+    if (event.target.dataset && event.target.dataset.validate) validate(event.target);
+  }, true);
+  document.addEventListener("submit", (event) => {
+    const invalid = [...event.target.querySelectorAll("[data-validate]")].filter((input) => !validate(input));
+    if (invalid.length) {
+      event.preventDefault();
+      event.stopPropagation();
+      invalid[0].reportValidity();
+    }
+  }, true);
+})();
+"""
+
+
+@lru_cache(maxsize=1)
+def client_validators_script() -> str:
+    """Browser copy of the rules: inputs with ``data-validate="<rule>"`` are checked on blur and submit.
+
+    An invalid field blocks the submit before it reaches the server, which
+    still re-validates everything.
+    """
+
+    return _CLIENT_SCRIPT % json.dumps(CLIENT_RULES, ensure_ascii=False)
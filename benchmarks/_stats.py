@@ -0,0 +1,27 @@
+"""Small timing helpers shared by the benchmark scripts."""
+
+from __future__ import annotations
+
+import math
+from typing import Sequence
+
+
+def percentile(samples: Sequence[float], pct: float) -> float:
+    """Return the nearest-rank percentile of ``samples`` (``pct`` in 0-100)."""
+
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    rank = max(1, math.ceil(pct / 100 * len(ordered)))
+    return ordered[rank - 1]
+
+
+def format_latency(label: str, samples_s: Sequence[float]) -> str:
+    """Render p50/p99/max in milliseconds for a list of second-based samples."""
+
+    return (
+        f"{label:<28} n={len(samples_s):<6} "
+        f"p50={percentile(samples_s, 50) * 1000:8.3f}ms "
+        f"p99={percentile(samples_s, 99) * 1000:8.3f}ms "
+        f"max={max(samples_s, default=0.0) * 1000:8.3f}ms"
+    )
@@ -0,0 +1,129 @@
+"""Throughput and latency of the PostgREST and psycopg backends against Postgres.
+
+Creates ``users``/``boteco``/``user_boteco`` (from schema.sql) in a scratch
+schema, seeds owners and measures uncached lookups and single-row upserts.
+The psycopg backend always runs; the PostgREST backend runs when a PostgREST
+URL and key are given and that PostgREST exposes ``--schema``.
+
+    python -m benchmarks.backends --dsn postgresql://postgres@localhost:5432/postgres
+    python -m benchmarks.backends --dsn ... --postgrest-url http://localhost:3000 --key ...
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+from typing import Awaitable, Callable, List
+
+import psycopg
+from supabase import ClientOptions, create_client
+
+from app.services.pg_backend import PostgresClient
+from app.services.schema_sql import table_statements
+from app.services.supabase_client import SupabaseClient
+from benchmarks._stats import format_latency
+
+
+def _owner(index: int) -> dict:
+    return {
+        "email": f"owner{index}@boteco.pt",
+        "username": f"owner.{index}",
+        "tax_number": f"{index:011d}",
+        "first_name": "Ana",
+        "last_name": f"Silva {index}",
+        "birth_date": "1990-01-01",
+        "country": "Brasil",
+        "postal_code": "01001000",
+        "house_number": str(index % 500),
+        "is_owner": True,
+    }
+
+
+def _prepare(dsn: str, schema: str, owners: int) -> List[str]:
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        conn.execute(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE')
+        conn.execute(f'CREATE SCHEMA "{schema}"')
+        conn.execute(f'SET search_path TO "{schema}", public')
+        for statement in table_statements(["users", "boteco", "user_boteco"]):
+            conn.execute(statement)
+        with conn.cursor() as cursor:
+            cursor.executemany(
+                "INSERT INTO users (email, username, tax_number, first_name, last_name, birth_date,"
+                " country, postal_code, house_number, is_owner)"
+                " VALUES (%(email)s, %(username)s, %(tax_number)s, %(first_name)s, %(last_name)s,"
+                " %(birth_date)s, %(country)s, %(postal_code)s, %(house_number)s, %(is_owner)s)",
+                [_owner(i) for i in range(owners)],
+            )
+        rows = conn.execute("SELECT id::text FROM users").fetchall()
+    return [row[0] for row in rows]
+
+
+async def _measure(
+    call: Callable[[int], Awaitable[object]], calls: int, concurrency: int
+) -> tuple[list[float], float]:
+    samples: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await call(index)
+            samples.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    return samples, time.perf_counter() - started
+
+
+async def _run_backend(
+    label: str, client: SupabaseClient, owners: int, user_ids: List[str], calls: int, concurrency: int
+) -> None:
+    rng = random.Random(7)
+    # The `_fetch_*` primitives bypass the lookup caches: every call hits the database.
+    workloads = {
+        "get_user_by_email": lambda i: client._fetch_user_by_email(f"owner{rng.randrange(owners)}@boteco.pt"),
+        "check_user_has_boteco": lambda i: client._fetch_user_has_boteco(rng.choice(user_ids)),
+        "upsert_user": lambda i: client.upsert_user(_owner(i % owners)),
+    }
+    async with client.lifespan():
+        for name, call in workloads.items():
+            await _measure(call, min(50, calls), concurrency)  # warm connections and statements
+            samples, elapsed = await _measure(call, calls, concurrency)
+            print(f"{format_latency(f'{label} {name}', samples)} throughput={calls / elapsed:8.0f}/s")
+
+
+async def main(args: argparse.Namespace) -> None:
+    user_ids = _prepare(args.dsn, args.schema, args.owners)
+    print(f"owners={args.owners} calls={args.calls} concurrency={args.concurrency}")
+    try:
+        pg = PostgresClient(dsn=args.dsn)
+        pg.search_path = f'"{args.schema}", public'
+        await _run_backend("psycopg", pg, args.owners, user_ids, args.calls, args.concurrency)
+
+        if args.postgrest_url and args.key:
+            rest = SupabaseClient()
+            rest.client = create_client(
+                args.postgrest_url, args.key, options=ClientOptions(schema=args.schema)
+            )
+            await _run_backend("postgrest", rest, args.owners, user_ids, args.calls, args.concurrency)
+        else:
+            print("postgrest: skipped (pass --postgrest-url and --key)")
+    finally:
+        if not args.keep:
+            with psycopg.connect(args.dsn, autocommit=True) as conn:
+                conn.execute(f'DROP SCHEMA IF EXISTS "{args.schema}" CASCADE')
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", required=True, help="Postgres DSN used to seed and by the psycopg backend.")
+    parser.add_argument("--schema", default="bench_backends")
+    parser.add_argument("--owners", type=int, default=10_000)
+    parser.add_argument("--calls", type=int, default=5_000)
+    parser.add_argument("--concurrency", type=int, default=16)
+    parser.add_argument("--postgrest-url", help="Supabase/PostgREST URL serving the same database.")
+    parser.add_argument("--key", help="Service role key for --postgrest-url.")
+    parser.add_argument("--keep", action="store_true", help="Keep the scratch schema afterwards.")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,155 @@
+"""Lookup latency and resident memory of the memory-mapped CEP index.
+
+Writes a synthetic dump of ``--count`` CEPs (about the size of the national
+database) with 5,570 cities, converts it with `build_cep_index`, then runs
+each reader in a fresh interpreter so the resident memory is its own:
+
+- ``mmap``: `CepIndex` over the file, the way the app loads it;
+- ``dict``: the same CSV parsed into a ``{cep: row}`` dict, for comparison.
+
+Each reader times ``--lookups`` lookups (half of them CEPs that do not
+exist) and reports VmRSS before loading, after loading and after the
+lookups, split into anonymous and file-backed pages.
+
+    python -m benchmarks.cep_index --count 1100000 --lookups 200000
+"""
+
+from __future__ import annotations
+
+import argparse
+import csv
+import json
+import random
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+from app.services.cep_index import CepIndex, build_cep_index, read_cep_csv
+from benchmarks._stats import format_latency
+
+STREETS = ("Rua", "Avenida", "Travessa", "Alameda", "Praça", "Rodovia")
+NAMES = ("das Flores", "São João", "Sete de Setembro", "Tiradentes", "da Liberdade", "Boa Vista", "do Comércio")
+STATES = ("SP", "RJ", "MG", "BA", "RS", "PR", "PE", "CE", "PA", "SC", "GO", "AM", "ES", "PB", "RN")
+
+
+def _write_dump(path: Path, count: int) -> None:
+    rng = random.Random(3)
+    cities = [(f"Município {n}", rng.choice(STATES)) for n in range(5570)]
+    ceps = sorted(rng.sample(range(1_000_000, 100_000_000), count))
+    rng.shuffle(ceps)
+    with open(path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle, delimiter=";")
+        writer.writerow(("cep", "logradouro", "bairro", "cidade", "uf"))
+        for cep in ceps:
+            city, state = rng.choice(cities)
+            street = f"{rng.choice(STREETS)} {rng.choice(NAMES)} {rng.randrange(1, 2000)}"
+            writer.writerow((f"{cep:08d}", street, f"Bairro {rng.randrange(1, 400)}", city, state))
+
+
+def _memory() -> Dict[str, int]:
+    """VmRSS / RssAnon / RssFile in KiB (Linux)."""
+
+    fields = {}
+    with open("/proc/self/status", encoding="ascii") as status:
+        for line in status:
+            name, _, value = line.partition(":")
+            if name in ("VmRSS", "RssAnon", "RssFile"):
+                fields[name] = int(value.split()[0])
+    return fields
+
+
+def _measure(args: argparse.Namespace) -> None:
+    """Child process: load one reader, time lookups, print a JSON report."""
+
+    rng = random.Random(9)
+    with open(args.probes, encoding="ascii") as handle:
+        probes = handle.read().split()
+    report = {"before": _memory()}
+
+    started = time.perf_counter()
+    if args.measure == "mmap":
+        index = CepIndex(args.index)
+        lookup = index.lookup
+    else:
+        table = {cep: row for cep, *row in read_cep_csv(args.dump)}
+        lookup = table.get
+    report["load_seconds"] = time.perf_counter() - started
+    report["loaded"] = _memory()
+
+    samples: List[float] = []
+    found = 0
+    for cep in rng.sample(probes, len(probes)):
+        started = time.perf_counter()
+        hit = lookup(cep)
+        samples.append(time.perf_counter() - started)
+        found += hit is not None
+    report["after_lookups"] = _memory()
+    report["samples"] = samples
+    report["found"] = found
+    print(json.dumps(report))
+
+
+def _run_child(args: argparse.Namespace, measure: str, paths: Dict[str, Path]) -> Dict:
+    completed = subprocess.run(
+        [
+            sys.executable, "-m", "benchmarks.cep_index", "--measure", measure,
+            "--index", str(paths["index"]), "--dump", str(paths["dump"]), "--probes", str(paths["probes"]),
+        ],
+        capture_output=True, text=True, check=True,
+    )
+    return json.loads(completed.stdout)
+
+
+def main(args: argparse.Namespace) -> None:
+    if args.measure:
+        _measure(args)
+        return
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = {"dump": Path(tmp) / "ceps.csv", "index": Path(tmp) / "cep.idx", "probes": Path(tmp) / "probes.txt"}
+        _write_dump(paths["dump"], args.count)
+
+        started = time.perf_counter()
+        count = build_cep_index(read_cep_csv(paths["dump"]), paths["index"])
+        elapsed = time.perf_counter() - started
+        size = paths["index"].stat().st_size
+        print(
+            f"build: {count:,} CEPs in {elapsed:.2f}s  csv={paths['dump'].stat().st_size / 2**20:.1f}MiB "
+            f"index={size / 2**20:.1f}MiB ({size / count:.1f} bytes/CEP)"
+        )
+
+        rng = random.Random(1)
+        index = CepIndex(paths["index"])
+        existing = [f"{index._ceps[rng.randrange(count)]:08d}" for _ in range(args.lookups // 2)]
+        index.close()
+        missing = [f"{rng.randrange(100_000_000):08d}" for _ in range(args.lookups - len(existing))]
+        paths["probes"].write_text("\n".join(existing + missing), encoding="ascii")
+
+        for measure in ("mmap", "dict"):
+            report = _run_child(args, measure, paths)
+            samples = report["samples"]
+            print(format_latency(f"{measure} lookup", samples))
+            print(
+                f"{'':<28} {len(samples) / sum(samples):12,.0f} lookups/s  "
+                f"found={report['found']}  load={report['load_seconds'] * 1000:.1f}ms"
+            )
+            for phase in ("before", "loaded", "after_lookups"):
+                memory = report[phase]
+                print(
+                    f"{'':<28} {phase:<14} rss={memory['VmRSS'] / 1024:8.1f}MiB "
+                    f"anon={memory['RssAnon'] / 1024:8.1f}MiB file={memory['RssFile'] / 1024:8.1f}MiB"
+                )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_100_000)
+    parser.add_argument("--lookups", type=int, default=200_000)
+    parser.add_argument("--measure", choices=("mmap", "dict"), help=argparse.SUPPRESS)
+    parser.add_argument("--index", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--dump", type=Path, help=argparse.SUPPRESS)
+    parser.add_argument("--probes", type=Path, help=argparse.SUPPRESS)
+    main(parser.parse_args())
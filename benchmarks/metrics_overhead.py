@@ -0,0 +1,63 @@
+"""Cost of recording metrics: ns per counter increment, histogram observation and timed call.
+
+    python -m benchmarks.metrics_overhead --iterations 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+from app.services.metrics import Registry, _timed
+
+
+class _Client:
+    backend_name = "bench"
+
+    async def call(self) -> None:
+        return None
+
+
+def _per_op(label: str, elapsed: float, iterations: int) -> None:
+    print(f"{label:<28} {elapsed / iterations * 1e9:8.1f} ns/op")
+
+
+def main(iterations: int) -> None:
+    registry = Registry()
+    counter = registry.counter("bench_total", "Bench.", ("step",))
+    histogram = registry.histogram("bench_seconds", "Bench.", ("backend", "method", "outcome"))
+
+    started = time.perf_counter()
+    for _ in range(iterations):
+        counter.inc("payment")
+    _per_op("counter.inc", time.perf_counter() - started, iterations)
+
+    started = time.perf_counter()
+    for i in range(iterations):
+        histogram.observe((i % 1000) / 1000, "bench", "call", "ok")
+    _per_op("histogram.observe", time.perf_counter() - started, iterations)
+
+    plain = _Client.call
+    timed = _timed(plain, histogram, "call")
+    client = _Client()
+
+    async def run(fn) -> float:
+        started = time.perf_counter()
+        for _ in range(iterations):
+            await fn(client)
+        return time.perf_counter() - started
+
+    base = asyncio.run(run(plain))
+    wrapped = asyncio.run(run(timed))
+    _per_op("await method", base, iterations)
+    _per_op("await timed method", wrapped, iterations)
+    started = time.perf_counter()
+    registry.render()
+    print(f"{'render':<28} {(time.perf_counter() - started) * 1e3:8.3f} ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--iterations", type=int, default=1_000_000)
+    main(parser.parse_args().iterations)
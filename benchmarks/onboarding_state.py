@@ -0,0 +1,205 @@
+"""State traffic per onboarding event: one flat state vs per-step substates.
+
+``FlatOnboardingState`` reproduces the old single-class layout (every field
+of the four steps in one state); the split layout is the real
+``OnboardingState`` tree. Both are first filled with a complete onboarding,
+then ``--events`` keystroke setters (personal and business fields) and plan
+clicks are processed. For each event we report the bytes Reflex loads and
+writes back to the state manager (pickled substates), the JSON delta sent
+to the browser and the time to process it.
+
+With ``--redis-url`` (default ``REFLEX_REDIS_URL``) events go through
+``StateManagerRedis.modify_state`` exactly as in the app. Without it, the
+substates are kept as pickles in a dict: same load/serialize work, no
+network.
+
+    python -m benchmarks.onboarding_state --redis-url redis://localhost:6379 --events 2000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import contextlib
+import json
+import os
+import time
+import uuid
+from typing import Dict, Iterator, List, Tuple
+
+from reflex.event import Event
+from reflex.state import State
+from reflex.istate.manager.redis import StateManagerRedis  # after reflex.state: circular import
+
+from app.states.onboarding_state import BusinessState, OnboardingState, PersonalState, PlanState
+from benchmarks._stats import format_latency
+
+ROOT = {"user_id": str(uuid.uuid4()), "current_step": 3}
+PERSONAL = {
+    "personal_first_name": "Ana",
+    "personal_last_name": "Silva",
+    "personal_email": "ana@boteco.pt",
+    "personal_tax_number": "52998224725",
+    "personal_birth_date": "1990-01-01",
+    "personal_postal_code": "01001000",
+    "personal_house_number": "100",
+}
+BUSINESS = {
+    "business_public_name": "Bar da Ana",
+    "business_username": "bar_da_ana",
+    "business_tax_number": "11222333000181",
+    "business_service_category": "bar",
+    "business_postal_code": "01001000",
+    "business_vibe_tags": "samba, petiscos, chopp",
+}
+
+
+class FlatOnboardingState(State):
+    """The onboarding state before the split: every step in one class."""
+
+    current_step: int = 1
+    is_loading: bool = False
+
+    personal_first_name: str = ""
+    personal_last_name: str = ""
+    personal_email: str = ""
+    personal_tax_number: str = ""
+    personal_birth_date: str = ""
+    personal_country: str = "Brasil"
+    personal_postal_code: str = ""
+    personal_house_number: str = ""
+    user_id: str | None = None
+
+    business_public_name: str = ""
+    business_username: str = ""
+    business_tax_number: str = ""
+    business_service_category: str = ""
+    business_country: str = "Brasil"
+    business_postal_code: str = ""
+    business_vibe_tags: str = ""
+
+    selected_plan: str = ""
+    checkout_key: str = ""
+
+    provision_job_id: str = ""
+    provision_status: str = ""
+    provision_error: str = ""
+
+
+LAYOUTS = {
+    "flat": {
+        "root": FlatOnboardingState,
+        "personal": FlatOnboardingState,
+        "business": FlatOnboardingState,
+        "plan": FlatOnboardingState,
+    },
+    "split": {"root": OnboardingState, "personal": PersonalState, "business": BusinessState, "plan": PlanState},
+}
+
+
+def _events(layout: Dict[str, type], token: str, count: int) -> Iterator[Tuple[str, Event]]:
+    """Keystrokes on both forms, with a plan click every 50 events."""
+
+    def setter(step: str, field: str, value: str) -> Event:
+        return Event(token=token, name=f"{layout[step].get_full_name()}.set_{field}", payload={"value": value})
+
+    for i in range(count):
+        if i % 50 == 49:
+            yield "plan", setter("plan", "selected_plan", ("boteco_pro", "boteco_basic")[i % 2])
+        elif i % 2:
+            yield "business", setter("business", "business_public_name", "Bar da Ana"[: i % 10 + 1])
+        else:
+            yield "personal", setter("personal", "personal_first_name", "Ana Maria"[: i % 9 + 1])
+
+
+def _fill(layout: Dict[str, type], token: str) -> Iterator[Event]:
+    for step, fields in (("root", ROOT), ("personal", PERSONAL), ("business", BUSINESS)):
+        for field, value in fields.items():
+            yield Event(token=token, name=f"{layout[step].get_full_name()}.set_{field}", payload={"value": value})
+    yield Event(token=token, name=f"{layout['plan'].get_full_name()}.set_selected_plan", payload={"value": "boteco_pro"})
+
+
+def _tree(state: State) -> Iterator[State]:
+    yield state
+    for substate in state.substates.values():
+        yield from _tree(substate)
+
+
+class DictManager:
+    """Redis-less stand-in: substates stored as pickles in a dict, loaded like StateManagerRedis."""
+
+    def __init__(self) -> None:
+        self.store: Dict[str, bytes] = {}
+        self._classes = StateManagerRedis(state=State, redis=None)  # only for its class resolution
+
+    @contextlib.asynccontextmanager
+    async def modify_state(self, substate_token: str):
+        token, path = substate_token.split("_", 1)
+        flat: Dict[str, State] = {}
+        target = State.get_class_substate(path)
+        for cls in sorted(self._classes._get_required_state_classes(target, subclasses=True), key=lambda c: c.get_full_name()):
+            data = self.store.get(f"{token}_{cls.get_full_name()}")
+            state = State._deserialize(data=data) if data else cls(init_substates=False, _reflex_internal_init=True)
+            flat[state.get_full_name()] = state
+            if cls.get_parent_state() is not None:
+                parent_name, _, name = state.get_full_name().rpartition(".")
+                flat[parent_name].substates[name] = state
+                state.parent_state = flat[parent_name]
+        root = flat[State.get_full_name()]
+        yield root
+        for state in _tree(root):
+            if state._get_was_touched():
+                self.store[f"{token}_{state.get_full_name()}"] = state._serialize()
+
+
+async def _process(manager, event: Event) -> Tuple[float, int, int, int]:
+    """Seconds, bytes loaded, bytes written and delta bytes for one event."""
+
+    started = time.perf_counter()
+    async with manager.modify_state(event.substate_token) as root:
+        delta = {}
+        async for update in root._process(event):
+            delta.update(update.delta)
+        states = [(state, state._get_was_touched()) for state in _tree(root)]
+    elapsed = time.perf_counter() - started
+    written = sum(len(state._serialize()) for state, touched in states if touched)
+    loaded = sum(len(state._serialize()) for state, _ in states)
+    return elapsed, loaded, written, len(json.dumps(delta))
+
+
+async def _run(manager, name: str, events: int) -> None:
+    layout = LAYOUTS[name]
+    token = uuid.uuid4().hex
+    for event in _fill(layout, token):
+        await _process(manager, event)
+    samples: Dict[str, List[Tuple[float, int, int, int]]] = {}
+    for step, event in _events(layout, token, events):
+        samples.setdefault(step, []).append(await _process(manager, event))
+    for step, rows in samples.items():
+        loaded, written, delta = (sum(row[i] for row in rows) // len(rows) for i in (1, 2, 3))
+        print(f"{name:<6} {step:<9} loaded={loaded:>6}B written={written:>6}B delta={delta:>4}B")
+        print(format_latency(f"{name} {step}", [row[0] for row in rows]))
+
+
+async def main(args: argparse.Namespace) -> None:
+    if args.redis_url:
+        from redis.asyncio import Redis
+
+        manager = StateManagerRedis(state=State, redis=Redis.from_url(args.redis_url))
+        print(f"state manager: redis ({args.redis_url})")
+    else:
+        manager = DictManager()
+        print("state manager: in-process pickles (pass --redis-url for Redis)")
+    try:
+        for name in ("flat", "split"):
+            await _run(manager, name, args.events)
+    finally:
+        if args.redis_url:
+            await manager.close()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--redis-url", default=os.environ.get("REFLEX_REDIS_URL"))
+    parser.add_argument("--events", type=int, default=2000)
+    asyncio.run(main(parser.parse_args()))
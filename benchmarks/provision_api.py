@@ -0,0 +1,109 @@
+"""Load test ``POST /api/provision_org``: per-request admin client vs the shared one.
+
+A local keep-alive HTTP server stands in for Supabase's ``/rest/v1/rpc``.
+"legacy" is the original handler, which built an admin client with
+``create_client`` on every request and ran the synchronous RPC on the event
+loop. (The original also awaited the sync result, which fails outright; that
+await is left out so there is something to measure.) "shared" is the current
+route, which uses the lifespan-managed client and queues the RPC as a job; its
+samples run until the job status reports it finished.
+
+    python -m benchmarks.provision_api --requests 2000 --concurrency 32 --delay-ms 5
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import threading
+import time
+
+import httpx
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+from supabase import ClientOptions, create_client
+
+from app.api import provision
+from app.services.supabase_client import supabase_client
+from benchmarks._stats import format_latency
+from benchmarks.provision_client import _handle
+
+STAND_IN_KEY = "service-role-stand-in"
+RPC_BODY = b'{"schema": "org_bench", "created": true, "timings": {}}'
+
+
+def legacy_app(supabase_url: str) -> FastAPI:
+    app = FastAPI()
+
+    @app.post("/api/provision_org")
+    async def provision_org_route(request: Request) -> JSONResponse:
+        body = await request.json()
+        schema_name = f"org_{body['boteco_username']}"
+        admin = create_client(supabase_url, STAND_IN_KEY, options=ClientOptions(schema="reflex"))
+        admin.rpc("execute_sql", {"sql_command": f'CREATE SCHEMA IF NOT EXISTS "{schema_name}";'}).execute()
+        return JSONResponse({"message": f"Schema {schema_name} provisioned successfully"})
+
+    return app
+
+
+async def _wait_for_job(client: httpx.AsyncClient, status_url: str) -> None:
+    while True:
+        job = (await client.get(status_url)).json()
+        if job["status"] in ("succeeded", "failed"):
+            return
+        await asyncio.sleep(0.005)
+
+
+async def _load(app: FastAPI, requests: int, concurrency: int) -> tuple[list[float], float]:
+    samples: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+    transport = httpx.ASGITransport(app=app)
+    async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+
+        async def one(username: str) -> None:
+            async with semaphore:
+                start = time.perf_counter()
+                response = await client.post("/api/provision_org", json={"boteco_username": username})
+                response.raise_for_status()
+                if response.status_code == 202:
+                    await _wait_for_job(client, response.headers["location"])
+                samples.append(time.perf_counter() - start)
+
+        await one("warmup")
+        samples.clear()
+        started = time.perf_counter()
+        await asyncio.gather(*(one(f"bench_{i}") for i in range(requests)))
+    return samples, time.perf_counter() - started
+
+
+def start_stand_in(delay: float) -> str:
+    """Serve the stand-in on its own loop: the legacy handler blocks the main one."""
+
+    loop = asyncio.new_event_loop()
+    server = loop.run_until_complete(
+        asyncio.start_server(lambda r, w: _handle(r, w, delay, RPC_BODY), "127.0.0.1", 0, backlog=1024)
+    )
+    threading.Thread(target=loop.run_forever, name="stand-in", daemon=True).start()
+    return f"http://127.0.0.1:{server.sockets[0].getsockname()[1]}"
+
+
+async def main(supabase_url: str, requests: int, concurrency: int, delay: float) -> None:
+    supabase_client.client = create_client(
+        supabase_url, STAND_IN_KEY, options=ClientOptions(schema="reflex")
+    )
+
+    print(f"requests={requests} concurrency={concurrency} stand_in_delay={delay * 1000:.1f}ms")
+    for label, app in (("legacy", legacy_app(supabase_url)), ("shared", provision.api_app)):
+        async with provision.lifespan(app):
+            samples, elapsed = await _load(app, requests, concurrency)
+        print(f"{format_latency(label, samples)} rps={requests / elapsed:8.1f}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--requests", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=32)
+    parser.add_argument("--delay-ms", type=float, default=5.0, help="Simulated database work per RPC.")
+    args = parser.parse_args()
+    delay = args.delay_ms / 1000
+    asyncio.run(main(start_stand_in(delay), args.requests, args.concurrency, delay))
@@ -0,0 +1,99 @@
+"""Compare provisioning-call latency: per-call ``httpx.AsyncClient`` vs the pooled client.
+
+Runs a tiny keep-alive HTTP server on localhost that answers like
+``/api/provision_org`` and hits it with both client strategies.
+
+    python -m benchmarks.provision_client --calls 2000 --concurrency 8
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+
+import httpx
+
+from app.services.supabase_client import PROVISION_ORG_PATH, SupabaseClient
+from benchmarks._stats import format_latency
+
+RESPONSE_BODY = b'{"message": "Schema org_bench provisioned successfully"}'
+
+
+async def _handle(
+    reader: asyncio.StreamReader,
+    writer: asyncio.StreamWriter,
+    delay: float,
+    body: bytes = RESPONSE_BODY,
+) -> None:
+    try:
+        while True:
+            head = await reader.readuntil(b"\r\n\r\n")
+            length = 0
+            for line in head.split(b"\r\n"):
+                if line.lower().startswith(b"content-length:"):
+                    length = int(line.split(b":", 1)[1])
+            if length:
+                await reader.readexactly(length)
+            if delay:
+                await asyncio.sleep(delay)
+            writer.write(
+                b"HTTP/1.1 200 OK\r\ncontent-type: application/json\r\n"
+                + f"content-length: {len(body)}\r\n\r\n".encode()
+                + body
+            )
+            await writer.drain()
+    except (asyncio.IncompleteReadError, ConnectionResetError):
+        pass
+    finally:
+        writer.close()
+
+
+async def _per_call(base_url: str, username: str) -> None:
+    # The original implementation: a fresh client (and TCP connection) per call.
+    async with httpx.AsyncClient() as client:
+        response = await client.post(base_url + PROVISION_ORG_PATH, json={"boteco_username": username})
+        response.raise_for_status()
+
+
+async def _measure(call, calls: int, concurrency: int) -> list[float]:
+    samples: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await call(f"bench_{index}")
+            samples.append(time.perf_counter() - start)
+
+    await asyncio.gather(*(one(i) for i in range(calls)))
+    return samples
+
+
+async def main(calls: int, concurrency: int, delay: float) -> None:
+    server = await asyncio.start_server(lambda r, w: _handle(r, w, delay), "127.0.0.1", 0)
+    port = server.sockets[0].getsockname()[1]
+    base_url = f"http://127.0.0.1:{port}"
+
+    pooled = SupabaseClient()
+    pooled.provision_base_url = base_url
+    async with server, pooled.lifespan():
+        # Warm both paths so imports and the first handshake do not skew results.
+        await _per_call(base_url, "warmup")
+        await pooled.provision_schema("warmup")
+
+        per_call = await _measure(lambda u: _per_call(base_url, u), calls, concurrency)
+        pooled_samples = await _measure(pooled.provision_schema, calls, concurrency)
+
+    print(f"calls={calls} concurrency={concurrency} server_delay={delay * 1000:.1f}ms")
+    print(format_latency("per-call AsyncClient", per_call))
+    print(format_latency("pooled keep-alive client", pooled_samples))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--calls", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--delay-ms", type=float, default=0.0, help="Simulated server work per request.")
+    args = parser.parse_args()
+    asyncio.run(main(args.calls, args.concurrency, args.delay_ms / 1000))
@@ -0,0 +1,101 @@
+"""Payload size and per-row memory: `select("*")` dicts vs projected `__slots__` rows.
+
+    python -m benchmarks.row_models --rows 10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import json
+import time
+import tracemalloc
+import uuid
+from typing import Callable, List
+
+from app.services.models import BotecoRow, UserRow
+
+
+def full_user(index: int) -> dict:
+    # Every column of `users` in schema.sql, as PostgREST returns for select=*.
+    return {
+        "id": str(uuid.uuid4()),
+        "email": f"owner{index}@boteco.pt",
+        "username": f"owner.{index}",
+        "tax_number": f"{index:011d}",
+        "first_name": "Ana",
+        "last_name": f"Silva {index}",
+        "birth_date": "1990-01-01",
+        "country": "Brasil",
+        "postal_code": "01001000",
+        "house_number": str(index % 500),
+        "associated_establishment_name": f"Bar {index}",
+        "establishment_tax_number": f"{index:014d}",
+        "is_owner": True,
+        "created_at": "2026-10-16T12:00:00.000000+00:00",
+    }
+
+
+def full_boteco(index: int) -> dict:
+    return {
+        "id": str(uuid.uuid4()),
+        "public_name": f"Bar {index}",
+        "username": f"bar_{index}",
+        "service_category": "bar",
+        "offered_products_services": "Chopp, petiscos e música ao vivo",
+        "average_staff_count": 8,
+        "social_links": {"instagram": f"@bar_{index}"},
+        "has_own_digital_infra": False,
+        "vibe_tags": ["samba", "petiscos", "happy hour"],
+        "establishment_tax_number": f"{index:014d}",
+        "country": "Brasil",
+        "postal_code": "01001000",
+        "owner_tax_number": f"{index:011d}",
+        "reference": None,
+        "created_at": "2026-10-16T12:00:00.000000+00:00",
+        "created_by_email": f"owner{index}@boteco.pt",
+        "created_by_user_id": str(uuid.uuid4()),
+    }
+
+
+def project(row: dict, columns: str) -> dict:
+    return {name: row[name] for name in columns.split(",")}
+
+
+def measure(label: str, payload: bytes, decode: Callable[[bytes], List], rows: int) -> None:
+    start = time.perf_counter()
+    decode(payload)
+    elapsed = time.perf_counter() - start
+
+    tracemalloc.start()
+    decoded = decode(payload)
+    current, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del decoded
+
+    print(
+        f"{label:<26} payload={len(payload) / rows:7.1f} B/row "
+        f"memory={current / rows:7.1f} B/row decode={elapsed / rows * 1e6:6.2f} us/row"
+    )
+
+
+def main(rows: int) -> None:
+    users = [full_user(i) for i in range(rows)]
+    botecos = [full_boteco(i) for i in range(rows)]
+
+    star_users = json.dumps(users).encode()
+    projected_users = json.dumps([project(u, UserRow.columns()) for u in users]).encode()
+    star_botecos = json.dumps(botecos).encode()
+    projected_botecos = json.dumps([project(b, BotecoRow.columns()) for b in botecos]).encode()
+
+    print(f"rows={rows}")
+    measure("users select=* dicts", star_users, json.loads, rows)
+    measure("users UserRow", projected_users, lambda p: UserRow.decode(json.loads(p)), rows)
+    measure("boteco select=* dicts", star_botecos, json.loads, rows)
+    measure("boteco BotecoRow", projected_botecos, lambda p: BotecoRow.decode(json.loads(p)), rows)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--rows", type=int, default=10_000)
+    args = parser.parse_args()
+    main(args.rows)
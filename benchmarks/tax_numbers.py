@@ -0,0 +1,56 @@
+"""Throughput of CPF/CNPJ check-digit validation: one call per number vs the batch API.
+
+Builds ``--count`` numbers (valid CPFs and CNPJs, formatted or bare, about a
+quarter with a corrupted digit) and times `validate_cpf_cnpj` in a loop and
+`validate_cpf_cnpj_batch` over the whole list.
+
+    python -m benchmarks.tax_numbers --count 1000000
+"""
+
+from __future__ import annotations
+
+import argparse
+import random
+import time
+from typing import List
+
+from app.utils.validators import cpf_cnpj_check_digits, validate_cpf_cnpj, validate_cpf_cnpj_batch
+
+
+def _numbers(count: int, pool_size: int = 100_000) -> List[str]:
+    rng = random.Random(7)
+    pool = []
+    for _ in range(min(count, pool_size)):
+        base = "".join(rng.choice("0123456789") for _ in range(rng.choice((9, 12))))
+        value = base + cpf_cnpj_check_digits(base)
+        if rng.random() < 0.25:
+            value = value[:-1] + str((int(value[-1]) + 1) % 10)
+        if rng.random() < 0.5:
+            value = f"{value[:3]}.{value[3:6]}.{value[6:9]}-{value[9:]}"
+        pool.append(value)
+    return [pool[i % len(pool)] for i in range(count)]
+
+
+def _report(label: str, count: int, elapsed: float) -> None:
+    print(f"{label:<28} n={count:<9} {count / elapsed:12,.0f} numbers/s  {elapsed * 1e9 / count:8.1f} ns/number")
+
+
+def main(args: argparse.Namespace) -> None:
+    numbers = _numbers(args.count)
+
+    started = time.perf_counter()
+    single = [validate_cpf_cnpj(value) for value in numbers]
+    _report("validate_cpf_cnpj", len(numbers), time.perf_counter() - started)
+
+    started = time.perf_counter()
+    batch = validate_cpf_cnpj_batch(numbers)
+    _report("validate_cpf_cnpj_batch", len(numbers), time.perf_counter() - started)
+
+    assert batch == single
+    print(f"valid={sum(single) / len(single):.1%}")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--count", type=int, default=1_000_000)
+    main(parser.parse_args())
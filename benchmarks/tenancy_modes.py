@@ -0,0 +1,180 @@
+"""Schema-per-tenant vs shared hash-partitioned tables at growing tenant counts.
+
+For each size in ``--sizes`` both modes provision that many tenants through
+``PostgresClient.provision_tenant_schemas`` (groups of 25), then load
+``--rows`` orders per tenant and time ``--queries`` single-tenant lookups
+(``org_<name>.orders`` vs ``<shared>.orders WHERE company_id = ...``).
+Reported: provisioning throughput and p50 per group, catalog growth and
+query latency. Everything is dropped between sizes.
+
+    python -m benchmarks.tenancy_modes --dsn postgresql://postgres@localhost:5432/postgres --sizes 100,1000,10000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import random
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import psycopg
+from psycopg import sql
+
+from app.services.pg_backend import PostgresClient
+from app.services.schema_sql import install_tenant_template
+from app.services.shared_tenancy import SCHEMA_MODE, SHARED_MODE, install_shared_schema
+from benchmarks._stats import format_latency, percentile
+
+SQL_DIR = Path(__file__).resolve().parents[1] / "app" / "services" / "sql"
+PREFIX = "bench_t"
+
+
+def _prepare(dsn: str, schema: str, shared: str, partitions: int) -> None:
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        for name in (schema, shared):
+            conn.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(name)))
+        conn.execute(sql.SQL("CREATE SCHEMA {}").format(sql.Identifier(schema)))
+        conn.execute(sql.SQL("SET search_path TO {}").format(sql.Identifier(schema)))
+        for name in ("003_provision_tenant.sql", "005_provision_tenants.sql", "008_shared_tenancy.sql"):
+            conn.execute((SQL_DIR / name).read_text(encoding="utf-8"))
+        install_tenant_template(conn)
+        install_shared_schema(conn, shared, partitions)
+
+
+def _cleanup(dsn: str, schema: str, shared: str) -> None:
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        rows = conn.execute(
+            "SELECT nspname FROM pg_namespace WHERE starts_with(nspname, %s)", (f"org_{PREFIX}",)
+        ).fetchall()
+        for (name,) in rows:
+            conn.execute(sql.SQL("DROP SCHEMA {} CASCADE").format(sql.Identifier(name)))
+        for name in (schema, shared):
+            conn.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(name)))
+
+
+def _catalog(dsn: str) -> Dict[str, float]:
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        rows, size = conn.execute(
+            "SELECT (SELECT count(*) FROM pg_class), "
+            "pg_total_relation_size('pg_class') + pg_total_relation_size('pg_attribute') "
+            "+ pg_total_relation_size('pg_depend')"
+        ).fetchone()
+        return {"rows": rows, "mb": size / 1e6}
+
+
+async def _provision(client: PostgresClient, tenants: int) -> List[float]:
+    samples = []
+    for start in range(0, tenants, 25):
+        group = [f"{PREFIX}{i}" for i in range(start, min(start + 25, tenants))]
+        started = time.perf_counter()
+        results = await client.provision_tenant_schemas(group)
+        samples.append(time.perf_counter() - started)
+        failed = [r for r in results if r.error]
+        if failed:
+            raise RuntimeError(f"provisioning failed: {failed[0].error}")
+    return samples
+
+
+def _targets(dsn: str, mode: str, schema: str, shared: str, tenants: int) -> List[sql.Composable]:
+    """One query per tenant; loads the tenant's orders first."""
+
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        if mode == SHARED_MODE:
+            companies = conn.execute(
+                sql.SQL("SELECT company_id FROM {}.shared_tenants WHERE starts_with(tenant_name, %s)").format(
+                    sql.Identifier(schema)
+                ),
+                (PREFIX,),
+            ).fetchall()
+            return [
+                sql.SQL("SELECT * FROM {}.orders WHERE company_id = {}").format(
+                    sql.Identifier(shared), sql.Literal(company)
+                )
+                for (company,) in companies
+            ]
+        return [
+            sql.SQL("SELECT * FROM {}.orders").format(sql.Identifier(f"org_{PREFIX}{i}"))
+            for i in range(tenants)
+        ]
+
+
+def _load(dsn: str, mode: str, schema: str, shared: str, rows: int) -> None:
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        if mode == SHARED_MODE:
+            conn.execute(
+                sql.SQL(
+                    "INSERT INTO {}.orders (company_id, status) "
+                    "SELECT company_id, 'open' FROM {}.shared_tenants, generate_series(1, %s) "
+                    "WHERE starts_with(tenant_name, %s)"
+                ).format(sql.Identifier(shared), sql.Identifier(schema)),
+                (rows, PREFIX),
+            )
+            conn.execute(sql.SQL("ANALYZE {}.orders").format(sql.Identifier(shared)))
+            return
+        names = conn.execute(
+            "SELECT nspname FROM pg_namespace WHERE starts_with(nspname, %s)", (f"org_{PREFIX}",)
+        ).fetchall()
+        for (name,) in names:
+            conn.execute(
+                sql.SQL(
+                    "INSERT INTO {}.orders (company_id, status) "
+                    "SELECT gen_random_uuid(), 'open' FROM generate_series(1, %s)"
+                ).format(sql.Identifier(name)),
+                (rows,),
+            )
+
+
+def _query(dsn: str, targets: List[sql.Composable], count: int) -> List[float]:
+    samples = []
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        for query in random.Random(7).choices(targets, k=count):
+            started = time.perf_counter()
+            conn.execute(query).fetchall()
+            samples.append(time.perf_counter() - started)
+    return samples
+
+
+async def _run(args: argparse.Namespace, mode: str, tenants: int) -> None:
+    _prepare(args.dsn, args.schema, args.shared, args.partitions)
+    client = PostgresClient(dsn=args.dsn)
+    client.search_path = f'"{args.schema}", public'
+    client.provision_deadline = 600.0
+    client.tenancy = mode
+    client.shared_schema = args.shared
+    try:
+        before = _catalog(args.dsn)
+        async with client.lifespan():
+            started = time.perf_counter()
+            samples = await _provision(client, tenants)
+            elapsed = time.perf_counter() - started
+        after = _catalog(args.dsn)
+        _load(args.dsn, mode, args.schema, args.shared, args.rows)
+        queries = _query(args.dsn, _targets(args.dsn, mode, args.schema, args.shared, tenants), args.queries)
+        print(
+            f"{mode:<7} tenants={tenants:<6} tenants/s={tenants / elapsed:9.1f} "
+            f"p50/group={percentile(samples, 50) * 1000:8.1f}ms "
+            f"pg_class+={int(after['rows'] - before['rows']):<7} catalog+={after['mb'] - before['mb']:.1f}MB"
+        )
+        print(format_latency(f"{mode} query", queries))
+    finally:
+        _cleanup(args.dsn, args.schema, args.shared)
+
+
+async def main(args: argparse.Namespace) -> None:
+    for size in (int(value) for value in args.sizes.split(",")):
+        for mode in (SCHEMA_MODE, SHARED_MODE):
+            await _run(args, mode, size)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", required=True, help="Postgres DSN; tenants are created in this database.")
+    parser.add_argument("--schema", default="bench_tenancy", help="Scratch schema for the SQL functions.")
+    parser.add_argument("--shared", default="bench_tenancy_shared", help="Schema for the shared tables.")
+    parser.add_argument("--sizes", default="100,1000", help="Comma-separated tenant counts.")
+    parser.add_argument("--partitions", type=int, default=16)
+    parser.add_argument("--rows", type=int, default=20, help="Orders loaded per tenant.")
+    parser.add_argument("--queries", type=int, default=2000)
+    asyncio.run(main(parser.parse_args()))
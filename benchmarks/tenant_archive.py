@@ -0,0 +1,162 @@
+"""Catalog size and provisioning latency before and after archiving dormant tenants.
+
+Provisions ``--tenants`` ``org_bench_a*`` schemas with a few rows each,
+marks all but ``--active`` of them as idle for 100 days, and measures the
+system catalogs plus the latency of provisioning ``--probe`` new tenants.
+Then it archives the dormant tenants with ``TenantArchive``, vacuums the
+catalogs, measures again and restores ``--restore`` tenants through
+``ensure_active``. Everything is dropped afterwards.
+
+    python -m benchmarks.tenant_archive --dsn postgresql://postgres@localhost:5432/postgres --tenants 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import shutil
+import tempfile
+import time
+from pathlib import Path
+from typing import Dict, List
+
+import psycopg
+from psycopg import sql
+
+from app.services.pg_backend import PostgresClient
+from app.services.schema_sql import install_tenant_template
+from app.services.tenant_archive import TenantArchive
+from benchmarks._stats import format_latency
+
+SQL_DIR = Path(__file__).resolve().parents[1] / "app" / "services" / "sql"
+CATALOGS = ("pg_class", "pg_attribute", "pg_depend", "pg_type", "pg_constraint", "pg_index")
+PREFIX = "org_bench_a"
+
+
+def _prepare(dsn: str, schema: str) -> None:
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        conn.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(schema)))
+        conn.execute(sql.SQL("CREATE SCHEMA {}").format(sql.Identifier(schema)))
+        conn.execute(sql.SQL("SET search_path TO {}").format(sql.Identifier(schema)))
+        for name in ("003_provision_tenant.sql", "005_provision_tenants.sql", "007_tenant_archive.sql"):
+            conn.execute((SQL_DIR / name).read_text(encoding="utf-8"))
+        install_tenant_template(conn)
+
+
+def _drop_tenants(dsn: str, prefix: str) -> None:
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        rows = conn.execute(
+            "SELECT nspname FROM pg_namespace WHERE starts_with(nspname, %s)", (prefix,)
+        ).fetchall()
+        for (name,) in rows:
+            conn.execute(sql.SQL("DROP SCHEMA {} CASCADE").format(sql.Identifier(name)))
+
+
+def _catalog(dsn: str) -> Dict[str, float]:
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        for name in CATALOGS:
+            conn.execute(sql.SQL("VACUUM {}").format(sql.Identifier(name)))
+        stats: Dict[str, float] = {}
+        for name in CATALOGS:
+            rows, size = conn.execute(
+                sql.SQL("SELECT count(*), pg_total_relation_size({}) FROM {}").format(
+                    sql.Literal(name), sql.Identifier(name)
+                )
+            ).fetchone()
+            stats[f"{name}_rows"] = rows
+            stats["catalog_mb"] = stats.get("catalog_mb", 0.0) + size / 1e6
+        return stats
+
+
+def _fill(dsn: str, schema: str, tenants: int, active: int) -> None:
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        for i in range(tenants):
+            tenant = sql.Identifier(f"{PREFIX}{i}")
+            conn.execute(
+                sql.SQL(
+                    "INSERT INTO {}.stock_movements (product_id, movement_type, quantity, company_id) "
+                    "SELECT gen_random_uuid(), 'sale', n, gen_random_uuid() FROM generate_series(1, 50) AS n"
+                ).format(tenant)
+            )
+        conn.execute(
+            sql.SQL(
+                "UPDATE {}.tenant_schemas SET last_active_at = now() - interval '100 days' "
+                "WHERE starts_with(schema_name, %s) AND schema_name <> ALL(%s)"
+            ).format(sql.Identifier(schema)),
+            (PREFIX, [f"{PREFIX}{i}" for i in range(active)]),
+        )
+
+
+async def _provision(client: PostgresClient, tenants: int) -> None:
+    groups = [
+        [f"bench_a{i}" for i in range(start, min(start + 25, tenants))]
+        for start in range(0, tenants, 25)
+    ]
+    for group in groups:
+        await client.provision_tenant_schemas(group)
+
+
+async def _probe(client: PostgresClient, label: str, count: int) -> List[float]:
+    samples = []
+    for i in range(count):
+        started = time.perf_counter()
+        await client.provision_tenant_schema(f"bench_p{label}{i}")
+        samples.append(time.perf_counter() - started)
+    return samples
+
+
+def _print_catalog(label: str, stats: Dict[str, float]) -> None:
+    rows = " ".join(f"{name}={int(stats[f'{name}_rows'])}" for name in CATALOGS[:3])
+    print(f"{label:<28} {rows} catalog={stats['catalog_mb']:.1f}MB")
+
+
+async def main(args: argparse.Namespace) -> None:
+    _prepare(args.dsn, args.schema)
+    client = PostgresClient(dsn=args.dsn)
+    client.search_path = f'"{args.schema}", public'
+    client.provision_deadline = 600.0
+    directory = Path(tempfile.mkdtemp(prefix="tenant-archive-bench-"))
+    archive = TenantArchive(args.dsn, directory, search_path=f'"{args.schema}", public')
+    try:
+        async with client.lifespan(), archive.lifespan():
+            await _provision(client, args.tenants)
+            _fill(args.dsn, args.schema, args.tenants, args.active)
+            print(f"tenants={args.tenants} active={args.active} probe={args.probe}")
+
+            _print_catalog("before", _catalog(args.dsn))
+            print(format_latency("provision before", await _probe(client, "b", args.probe)))
+
+            started = time.perf_counter()
+            results = await archive.archive_dormant(100 * 86_400 - 3_600, args.tenants)
+            elapsed = time.perf_counter() - started
+            archived = [r for r in results if r.archived]
+            print(
+                f"{'archive':<28} archived={len(archived)} schemas/s={len(archived) / elapsed:.1f} "
+                f"on disk={sum(r.bytes for r in archived) / 1e6:.2f}MB"
+            )
+
+            _print_catalog("after", _catalog(args.dsn))
+            print(format_latency("provision after", await _probe(client, "a", args.probe)))
+
+            samples = []
+            for result in archived[: args.restore]:
+                started = time.perf_counter()
+                await archive.ensure_active(result.schema)
+                samples.append(time.perf_counter() - started)
+            print(format_latency("restore on access", samples))
+    finally:
+        shutil.rmtree(directory, ignore_errors=True)
+        _drop_tenants(args.dsn, "org_bench_")
+        with psycopg.connect(args.dsn, autocommit=True) as conn:
+            conn.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(args.schema)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", required=True, help="Postgres DSN; tenants are created in this database.")
+    parser.add_argument("--schema", default="bench_archive", help="Scratch schema for the SQL functions.")
+    parser.add_argument("--tenants", type=int, default=1000)
+    parser.add_argument("--active", type=int, default=50, help="Tenants left active (not archived).")
+    parser.add_argument("--probe", type=int, default=50, help="New tenants provisioned per measurement.")
+    parser.add_argument("--restore", type=int, default=20, help="Archived tenants restored at the end.")
+    asyncio.run(main(parser.parse_args()))
@@ -0,0 +1,109 @@
+"""Fan a migration out over hundreds of scratch tenant schemas and report schemas/second.
+
+Creates ``--schemas`` ``org_migbench_*`` schemas with a small ``orders``
+table, then applies two migrations with ``TenantMigrator`` at concurrency 1
+and at ``--concurrency`` (progress is reset in between). A third run is
+interrupted half way and resumed to show that finished schemas are skipped.
+Everything is dropped afterwards.
+
+    python -m benchmarks.tenant_migrations --dsn postgresql://postgres@localhost:5432/postgres --schemas 500
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+from pathlib import Path
+
+import psycopg
+from psycopg import sql
+
+from app.services.tenant_migrations import Migration, TenantMigrator
+
+SQL_DIR = Path(__file__).resolve().parents[1] / "app" / "services" / "sql"
+PREFIX = "org_migbench_"
+MIGRATIONS = [
+    Migration("0001_add_note", "ALTER TABLE orders ADD COLUMN IF NOT EXISTS note text;"),
+    Migration("0002_note_index", "CREATE INDEX IF NOT EXISTS orders_note_idx ON orders (note);"),
+]
+
+
+def _setup(dsn: str, control: str, schemas: int) -> None:
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        conn.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(control)))
+        conn.execute(sql.SQL("CREATE SCHEMA {}").format(sql.Identifier(control)))
+        conn.execute(sql.SQL("SET search_path TO {}").format(sql.Identifier(control)))
+        conn.execute((SQL_DIR / "006_tenant_migrations.sql").read_text(encoding="utf-8"))
+        for i in range(schemas):
+            name = sql.Identifier(f"{PREFIX}{i:05d}")
+            conn.execute(sql.SQL("CREATE SCHEMA {}").format(name))
+            conn.execute(sql.SQL("CREATE TABLE {}.orders (id int PRIMARY KEY)").format(name))
+
+
+def _reset(dsn: str, control: str, schemas: int) -> None:
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        conn.execute(sql.SQL("TRUNCATE {}.tenant_migrations").format(sql.Identifier(control)))
+        for i in range(schemas):
+            name = sql.Identifier(f"{PREFIX}{i:05d}")
+            conn.execute(sql.SQL("DROP INDEX IF EXISTS {}.orders_note_idx").format(name))
+            conn.execute(sql.SQL("ALTER TABLE {}.orders DROP COLUMN IF EXISTS note").format(name))
+
+
+def _teardown(dsn: str, control: str, schemas: int) -> None:
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        for i in range(schemas):
+            conn.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(f"{PREFIX}{i:05d}")))
+        conn.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(control)))
+
+
+def _migrator(args: argparse.Namespace, concurrency: int) -> TenantMigrator:
+    return TenantMigrator(
+        args.dsn,
+        MIGRATIONS,
+        concurrency=concurrency,
+        search_path=f'"{args.control_schema}"',
+        schema_regex=f"^{PREFIX}",
+        stragglers=3,
+        progress_every=0,
+    )
+
+
+def _print(label: str, report) -> None:
+    print(
+        f"{label:<16} schemas/s={report.schemas_per_second:8.1f} migrated={report.migrated:5d} "
+        f"up_to_date={report.up_to_date:5d} failed={report.failed} "
+        f"p50={report.p50_ms:.2f}ms p99={report.p99_ms:.2f}ms stragglers={report.stragglers}"
+    )
+
+
+async def _interrupted(args: argparse.Namespace) -> None:
+    task = asyncio.create_task(_migrator(args, args.concurrency).run())
+    await asyncio.sleep(args.interrupt_after)
+    task.cancel()
+    try:
+        await task
+    except asyncio.CancelledError:
+        pass
+
+
+def main(args: argparse.Namespace) -> None:
+    _setup(args.dsn, args.control_schema, args.schemas)
+    try:
+        _print("concurrency=1", asyncio.run(_migrator(args, 1).run()))
+        _reset(args.dsn, args.control_schema, args.schemas)
+        _print(f"concurrency={args.concurrency}", asyncio.run(_migrator(args, args.concurrency).run()))
+        _reset(args.dsn, args.control_schema, args.schemas)
+        asyncio.run(_interrupted(args))
+        _print("resumed", asyncio.run(_migrator(args, args.concurrency).run()))
+    finally:
+        _teardown(args.dsn, args.control_schema, args.schemas)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", required=True)
+    parser.add_argument("--schemas", type=int, default=500)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--control-schema", default="bench_migrations")
+    parser.add_argument("--interrupt-after", type=float, default=0.3, help="Seconds before cancelling the third run.")
+    main(parser.parse_args())
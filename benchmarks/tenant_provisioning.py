@@ -0,0 +1,171 @@
+"""Provision many tenant schemas against a local Postgres and report tenants/second.
+
+"statements" sends every DDL statement of the template as its own round trip
+inside one transaction per tenant. "batched" is the current path:
+``PostgresClient.provision_tenant_schema``, one ``provision_tenant`` call per
+tenant that runs each phase as a single multi-statement batch. "grouped" is
+the batch endpoint's path: ``provision_tenant_schemas`` with ``--group-size``
+tenants per ``provision_tenants`` call and transaction. The SQL
+functions are installed in a scratch schema; every ``org_bench_*`` schema is
+dropped afterwards unless ``--keep`` is given.
+
+    python -m benchmarks.tenant_provisioning --dsn postgresql://postgres@localhost:5432/postgres --tenants 1000
+"""
+
+from __future__ import annotations
+
+import argparse
+import asyncio
+import time
+from collections import defaultdict
+from pathlib import Path
+from typing import Awaitable, Callable, Dict, List
+
+import psycopg
+from psycopg import sql
+
+from app.services.pg_backend import PostgresClient
+from app.services.schema_sql import install_tenant_template, tenant_template
+from benchmarks._stats import format_latency, percentile
+
+SQL_DIR = Path(__file__).resolve().parents[1] / "app" / "services" / "sql"
+
+
+def _prepare(dsn: str, schema: str) -> None:
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        conn.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(schema)))
+        conn.execute(sql.SQL("CREATE SCHEMA {}").format(sql.Identifier(schema)))
+        conn.execute(sql.SQL("SET search_path TO {}").format(sql.Identifier(schema)))
+        for name in ("003_provision_tenant.sql", "005_provision_tenants.sql"):
+            conn.execute((SQL_DIR / name).read_text(encoding="utf-8"))
+        install_tenant_template(conn)
+
+
+def _drop_tenants(dsn: str, prefix: str) -> None:
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        rows = conn.execute(
+            "SELECT nspname FROM pg_namespace WHERE starts_with(nspname, %s)", (prefix,)
+        ).fetchall()
+        for (name,) in rows:
+            conn.execute(sql.SQL("DROP SCHEMA {} CASCADE").format(sql.Identifier(name)))
+
+
+def _statements() -> List[str]:
+    statements: List[str] = []
+    for name, batch in tenant_template().phases:
+        statements.extend([batch] if name == "grants" else batch.split(";\n"))
+    return statements
+
+
+async def _measure(
+    call: Callable[[int], Awaitable[object]], tenants: int, concurrency: int
+) -> tuple[list[float], float]:
+    samples: list[float] = []
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def one(index: int) -> None:
+        async with semaphore:
+            start = time.perf_counter()
+            await call(index)
+            samples.append(time.perf_counter() - start)
+
+    started = time.perf_counter()
+    await asyncio.gather(*(one(i) for i in range(tenants)))
+    return samples, time.perf_counter() - started
+
+
+async def _run_statements(dsn: str, tenants: int, concurrency: int) -> None:
+    statements = _statements()
+    connections = [await psycopg.AsyncConnection.connect(dsn) for _ in range(concurrency)]
+    idle: asyncio.Queue = asyncio.Queue()
+    for conn in connections:
+        idle.put_nowait(conn)
+
+    async def provision(index: int) -> None:
+        conn = await idle.get()
+        schema = sql.Identifier(f"org_bench_s{index}")
+        try:
+            async with conn.transaction():
+                await conn.execute(sql.SQL("CREATE SCHEMA {}").format(schema))
+                await conn.execute(sql.SQL("SET LOCAL search_path TO {}, public").format(schema))
+                for statement in statements:
+                    await conn.execute(statement)
+        finally:
+            idle.put_nowait(conn)
+
+    try:
+        samples, elapsed = await _measure(provision, tenants, concurrency)
+    finally:
+        for conn in connections:
+            await conn.close()
+    print(f"{format_latency('statements', samples)} tenants/s={tenants / elapsed:8.1f}")
+    print(f"{'':<28} round trips per tenant={len(statements) + 2}")
+
+
+async def _run_batched(dsn: str, schema: str, tenants: int, concurrency: int) -> None:
+    client = PostgresClient(dsn=dsn)
+    client.search_path = f'"{schema}", public'
+    client.provision_deadline = 60.0
+    phases: Dict[str, List[float]] = defaultdict(list)
+
+    async def provision(index: int) -> None:
+        result = await client.provision_tenant_schema(f"bench_b{index}")
+        for name, ms in result.timings.items():
+            phases[name].append(ms)
+
+    async with client.lifespan():
+        samples, elapsed = await _measure(provision, tenants, concurrency)
+    print(f"{format_latency('batched', samples)} tenants/s={tenants / elapsed:8.1f}")
+    print(
+        f"{'':<28} server-side p50 per phase: "
+        + " ".join(f"{name}={percentile(values, 50):.3f}ms" for name, values in phases.items())
+    )
+
+
+async def _run_grouped(dsn: str, schema: str, tenants: int, concurrency: int, group_size: int) -> None:
+    client = PostgresClient(dsn=dsn)
+    client.search_path = f'"{schema}", public'
+    client.provision_deadline = 600.0
+    groups = [
+        [f"bench_g{i}" for i in range(start, min(start + group_size, tenants))]
+        for start in range(0, tenants, group_size)
+    ]
+    failed = 0
+
+    async def provision(index: int) -> None:
+        nonlocal failed
+        results = await client.provision_tenant_schemas(groups[index])
+        failed += sum(1 for result in results if result.error)
+
+    async with client.lifespan():
+        samples, elapsed = await _measure(provision, len(groups), concurrency)
+    print(f"{format_latency('grouped', samples)} tenants/s={tenants / elapsed:8.1f}")
+    print(f"{'':<28} group size={group_size} groups={len(groups)} failed tenants={failed}")
+
+
+async def main(args: argparse.Namespace) -> None:
+    _prepare(args.dsn, args.schema)
+    print(f"tenants={args.tenants} concurrency={args.concurrency} statements={len(_statements())}")
+    try:
+        if not args.skip_statements:
+            await _run_statements(args.dsn, args.tenants, args.concurrency)
+            _drop_tenants(args.dsn, "org_bench_s")
+        await _run_batched(args.dsn, args.schema, args.tenants, args.concurrency)
+        await _run_grouped(args.dsn, args.schema, args.tenants, args.concurrency, args.group_size)
+    finally:
+        if not args.keep:
+            _drop_tenants(args.dsn, "org_bench_")
+            with psycopg.connect(args.dsn, autocommit=True) as conn:
+                conn.execute(sql.SQL("DROP SCHEMA IF EXISTS {} CASCADE").format(sql.Identifier(args.schema)))
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--dsn", required=True, help="Postgres DSN; tenants are created in this database.")
+    parser.add_argument("--schema", default="bench_provisioning", help="Scratch schema for the SQL functions.")
+    parser.add_argument("--tenants", type=int, default=1000)
+    parser.add_argument("--concurrency", type=int, default=8)
+    parser.add_argument("--group-size", type=int, default=25, help="Tenants per grouped transaction.")
+    parser.add_argument("--skip-statements", action="store_true", help="Only run the batched path.")
+    parser.add_argument("--keep", action="store_true", help="Keep the tenant schemas afterwards.")
+    asyncio.run(main(parser.parse_args()))
@@ -1,9 +1,50 @@
 from __future__ import annotations
 
+import os
 import sys
+import uuid
 from pathlib import Path
 
+import pytest
+
 
 ROOT = Path(__file__).resolve().parents[1]
 if str(ROOT) not in sys.path:
     sys.path.insert(0, str(ROOT))
+
+SQL_DIR = ROOT / "app" / "services" / "sql"
+
+
+@pytest.fixture
+def pg_conn():
+    """Autocommit psycopg connection whose search_path is a throwaway schema.
+
+    Database tests run only when TEST_DATABASE_URL points at a local Postgres.
+    """
+
+    dsn = os.environ.get("TEST_DATABASE_URL")
+    if not dsn:
+        pytest.skip("TEST_DATABASE_URL not set")
+    psycopg = pytest.importorskip("psycopg")
+    schema = f"test_{uuid.uuid4().hex[:12]}"
+    with psycopg.connect(dsn, autocommit=True) as conn:
+        conn.execute(f'CREATE SCHEMA "{schema}"')
+        conn.execute(f'SET search_path TO "{schema}", public')
+        try:
+            yield conn
+        finally:
+            conn.execute(f'DROP SCHEMA "{schema}" CASCADE')
+
+
+@pytest.fixture
+def onboarding_db(pg_conn):
+    """`users`, `boteco` and `user_boteco` from schema.sql plus the SQL functions and tenant template."""
+
+    from app.services.schema_sql import install_tenant_template, table_statements
+
+    for statement in table_statements(["users", "boteco", "user_boteco"]):
+        pg_conn.execute(statement)
+    for sql_file in sorted(SQL_DIR.glob("*.sql")):
+        pg_conn.execute(sql_file.read_text(encoding="utf-8"))
+    install_tenant_template(pg_conn)
+    return pg_conn
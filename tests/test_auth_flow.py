@@ -1,22 +1,34 @@
 import asyncio
+from types import SimpleNamespace
 
-from app.states.auth_state import AuthState
-from app.states.onboarding_state import OnboardingState
+import reflex as rx
 
+from app.services.models import UserRow
+from app.states.auth_state import ONBOARDING_START, AuthState
+from app.states.onboarding_state import OnboardingState, PersonalState
 
-def reset_onboarding_state() -> None:
-    OnboardingState.current_step = 1
-    OnboardingState.is_loading = False
-    OnboardingState.personal_first_name = ""
-    OnboardingState.personal_last_name = ""
-    OnboardingState.personal_email = ""
-    OnboardingState.personal_tax_number = ""
-    OnboardingState.personal_birth_date = ""
-    OnboardingState.personal_country = "Brasil"
-    OnboardingState.personal_postal_code = ""
-    OnboardingState.personal_house_number = ""
-    OnboardingState.user_id = None
-    OnboardingState.selected_plan = ""
+
+class Session:
+    """One browser session: its own OnboardingState and PersonalState instances."""
+
+    _prefill_onboarding = AuthState._prefill_onboarding
+
+    def __init__(self) -> None:
+        self.states = {
+            OnboardingState: SimpleNamespace(current_step=0, user_id=None),
+            PersonalState: SimpleNamespace(),
+        }
+
+    async def get_state(self, state_cls):
+        return self.states[state_cls]
+
+    @property
+    def personal(self):
+        return self.states[PersonalState]
+
+    @property
+    def onboarding(self):
+        return self.states[OnboardingState]
 
 
 class DummyClient:
@@ -24,41 +36,51 @@ class DummyClient:
         self.users = users or []
 
     async def create_user(self, data):
-        return [{"id": "user-1", **data}]
+        return [UserRow(id="user-1", **data)]
 
     async def get_user_by_email(self, email):
-        return [user for user in self.users if user.get("email") == email]
+        return [UserRow.from_dict(user) for user in self.users if user.get("email") == email]
 
 
-def test_register_prefills_onboarding_and_redirects():
-    reset_onboarding_state()
-    client = DummyClient()
-    redirect, error = asyncio.run(
-        AuthState._perform_register(
-            {
-                "personal_first_name": "Ana",
-                "personal_last_name": "Silva",
-                "personal_email": "ana@boteco.pt",
-                "password": "segura123",
-                "personal_tax_number": "12345678901",
-                "personal_postal_code": "12345678",
-                "personal_house_number": "100",
-            },
-            client=client,
-        )
+def _sign_in(session: Session, event: str, form_data: dict, client) -> list:
+    """Run the `register`/`signin` handler for one session; returns what it yielded."""
+
+    perform = "_perform_register" if event == "register" else "_perform_signin"
+    setattr(session, perform, lambda form: getattr(AuthState, perform)(form, client=client))
+
+    async def scenario():
+        return [update async for update in getattr(AuthState, event).fn(session, form_data)]
+
+    return asyncio.run(scenario())
+
+
+def test_register_prefills_onboarding():
+    session = Session()
+    updates = _sign_in(
+        session,
+        "register",
+        {
+            "personal_first_name": "Ana",
+            "personal_last_name": "Silva",
+            "personal_email": "ana@boteco.pt",
+            "password": "segura123",
+            "personal_tax_number": "12345678901",
+            "personal_postal_code": "12345678",
+            "personal_house_number": "100",
+        },
+        DummyClient(),
     )
 
-    assert error is None
-    assert redirect == "/onboarding/step-1-personal"
-    assert OnboardingState.personal_first_name == "Ana"
-    assert OnboardingState.personal_last_name == "Silva"
-    assert OnboardingState.personal_email == "ana@boteco.pt"
-    assert OnboardingState.user_id == "user-1"
-    assert OnboardingState.current_step == 1
+    assert len(updates) == 1 and ONBOARDING_START in str(updates[0])
+    assert session.personal.personal_first_name == "Ana"
+    assert session.personal.personal_last_name == "Silva"
+    assert session.personal.personal_email == "ana@boteco.pt"
+    assert session.onboarding.user_id == "user-1"
+    assert session.onboarding.current_step == 1
 
 
-def test_signin_loads_user_and_redirects():
-    reset_onboarding_state()
+def test_signin_loads_user():
+    session = Session()
     client = DummyClient(
         users=[
             {
@@ -72,26 +94,31 @@ def test_signin_loads_user_and_redirects():
         ]
     )
 
-    redirect, error = asyncio.run(
-        AuthState._perform_signin({"email": "bruno@boteco.pt"}, client=client)
-    )
+    updates = _sign_in(session, "signin", {"email": "bruno@boteco.pt"}, client)
 
-    assert error is None
-    assert redirect == "/onboarding/step-1-personal"
-    assert OnboardingState.user_id == "existing-1"
-    assert OnboardingState.personal_first_name == "Bruno"
-    assert OnboardingState.personal_last_name == "Souza"
-    assert OnboardingState.personal_email == "bruno@boteco.pt"
+    assert len(updates) == 1 and ONBOARDING_START in str(updates[0])
+    assert session.onboarding.user_id == "existing-1"
+    assert session.personal.personal_first_name == "Bruno"
+    assert session.personal.personal_last_name == "Souza"
+    assert session.personal.personal_email == "bruno@boteco.pt"
 
 
 def test_signin_handles_missing_user():
-    reset_onboarding_state()
-    client = DummyClient(users=[])
+    session = Session()
 
-    redirect, error = asyncio.run(
-        AuthState._perform_signin({"email": "missing@boteco.pt"}, client=client)
-    )
+    updates = _sign_in(session, "signin", {"email": "missing@boteco.pt"}, DummyClient())
+
+    assert "Usuário não encontrado" in str(updates[0])
+    assert session.onboarding.user_id is None
+
+
+def test_prefill_does_not_leak_into_other_sessions():
+    client = DummyClient(users=[{"id": "existing-1", "first_name": "Bruno", "email": "bruno@boteco.pt"}])
+    first, second = Session(), Session()
+
+    _sign_in(first, "signin", {"email": "bruno@boteco.pt"}, client)
 
-    assert redirect is None
-    assert error == "Usuário não encontrado. Por favor registre-se."
-    assert OnboardingState.user_id is None
+    assert first.personal.personal_first_name == "Bruno"
+    assert not hasattr(second.personal, "personal_first_name") and second.onboarding.user_id is None
+    for state_cls, name in ((PersonalState, "personal_first_name"), (OnboardingState, "user_id")):
+        assert isinstance(getattr(state_cls, name), rx.Var), name
@@ -0,0 +1,123 @@
+import asyncio
+import itertools
+import json
+
+from app.services.bulk_import import BulkImporter
+from app.services.models import BotecoRow, MembershipRow, UserRow
+from app.utils.validators import cpf_cnpj_check_digits
+
+
+class DummyBulkClient:
+    """Echoes bulk writes back with generated ids, like PostgREST would."""
+
+    def __init__(self, reject_emails=()):
+        self.reject_emails = set(reject_emails)
+        self.requests: list[tuple[str, int]] = []
+        self.ids = itertools.count(1)
+        self.memberships: set[tuple[str, str]] = set()
+
+    async def upsert_users(self, users):
+        self.requests.append(("users", len(users)))
+        if any(user["email"] in self.reject_emails for user in users):
+            raise ValueError("duplicate key value violates unique constraint")
+        return [UserRow(id=f"u-{next(self.ids)}", **user) for user in users]
+
+    async def upsert_botecos(self, botecos):
+        self.requests.append(("boteco", len(botecos)))
+        return [BotecoRow(id=f"b-{next(self.ids)}", **boteco) for boteco in botecos]
+
+    async def ensure_memberships(self, memberships):
+        self.requests.append(("user_boteco", len(memberships)))
+        created = [m for m in memberships if (m["user_id"], m["boteco_id"]) not in self.memberships]
+        self.memberships.update((m["user_id"], m["boteco_id"]) for m in created)
+        return MembershipRow.decode(created)
+
+
+def owner_row(index: int, **overrides):
+    row = {
+        "personal_first_name": "Ana",
+        "personal_last_name": f"Silva{index}",
+        "personal_email": f"ana{index}@boteco.pt",
+        "personal_tax_number": f"{index:09d}" + cpf_cnpj_check_digits(f"{index:09d}"),
+        "personal_birth_date": "1990-01-01",
+        "personal_postal_code": "01001-000",
+        "personal_house_number": "10",
+        "business_public_name": f"Bar {index}",
+        "business_username": f"bar_{index}",
+        "business_service_category": "bar",
+        "business_postal_code": "01001000",
+        "business_vibe_tags": "samba, petiscos",
+        "plan": "boteco_pro",
+    }
+    row.update(overrides)
+    return row
+
+
+def test_import_writes_in_chunks_and_reports_row_errors(tmp_path):
+    path = tmp_path / "owners.jsonl"
+    lines = [json.dumps(owner_row(i)) for i in range(1, 11)]
+    lines[2] = json.dumps(owner_row(3, personal_postal_code="123"))
+    lines[5] = "{not json"
+    lines[7] = json.dumps(owner_row(8, plan="gratis"))
+    path.write_text("\n".join(lines) + "\n", encoding="utf-8")
+
+    errors = []
+    client = DummyBulkClient()
+    importer = BulkImporter(client=client, chunk_size=4, concurrency=2, on_error=errors.append)
+    report = asyncio.run(importer.run(importer.iter_file(path)))
+
+    assert sorted((e.line, e.message) for e in errors) == [
+        (3, "CEP inválido."),
+        (6, "JSON inválido: Expecting property name enclosed in double quotes"),
+        (8, "Plano inválido: gratis."),
+    ]
+    assert (report.rows_read, report.errors) == (9, 3)
+    assert (report.users_upserted, report.botecos_upserted, report.memberships_created) == (8, 7, 7)
+    assert sorted(client.requests) == sorted(
+        [("users", 3), ("users", 4), ("users", 1)]
+        + [("boteco", 3), ("boteco", 3), ("boteco", 1)]
+        + [("user_boteco", 3), ("user_boteco", 3), ("user_boteco", 1)]
+    )
+
+
+def test_failed_chunk_is_bisected_so_only_the_bad_row_fails(tmp_path):
+    path = tmp_path / "owners.csv"
+    header = list(owner_row(1))
+    with path.open("w", encoding="utf-8") as handle:
+        handle.write(",".join(header) + "\n")
+        for i in range(1, 9):
+            handle.write(",".join(f'"{value}"' for value in owner_row(i).values()) + "\n")
+
+    errors = []
+    client = DummyBulkClient(reject_emails={"ana5@boteco.pt"})
+    importer = BulkImporter(client=client, chunk_size=8, on_error=errors.append)
+    report = asyncio.run(importer.run(importer.iter_file(path)))
+
+    assert [(e.line, e.email) for e in errors] == [(6, "ana5@boteco.pt")]
+    assert report.users_upserted == 7 and report.memberships_created == 7
+
+
+def test_rows_are_streamed_with_bounded_memory():
+    produced = 0
+    client = DummyBulkClient()
+    peak_outstanding = 0
+
+    def rows():
+        nonlocal produced
+        for i in range(1, 20_001):
+            produced += 1
+            yield i, owner_row(i, business_username="")
+
+    async def upsert_users(users):
+        nonlocal peak_outstanding
+        peak_outstanding = max(peak_outstanding, produced - importer.report.users_upserted)
+        await asyncio.sleep(0)
+        return await DummyBulkClient.upsert_users(client, users)
+
+    client.upsert_users = upsert_users
+    importer = BulkImporter(client=client, chunk_size=100, concurrency=4)
+    report = asyncio.run(importer.run(rows()))
+
+    assert report.users_upserted == 20_000
+    # At most the queue, the workers and the chunk being read are held at once.
+    assert peak_outstanding <= 100 * (2 * 4 + 1)
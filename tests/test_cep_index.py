@@ -0,0 +1,86 @@
+import random
+from types import SimpleNamespace
+
+import pytest
+
+from app.services import cep_index
+from app.services.cep_index import CepAddress, CepIndex, build_cep_index, read_cep_csv
+from app.states.onboarding_state import PersonalState
+
+DUMP = """cep;logradouro;bairro;cidade;uf
+01001-000;Praça da Sé;Sé;São Paulo;SP
+20040002;Rua da Assembleia;Centro;Rio de Janeiro;rj
+01001000;Duplicada;Sé;São Paulo;SP
+1234;Curto;;Nenhures;XX
+69900-970;;;Rio Branco;AC
+99999999;%s;Último;Chuí;RS
+""" % ("Avenida " + "ã" * 200)
+
+
+@pytest.fixture()
+def index(tmp_path):
+    dump = tmp_path / "ceps.csv"
+    dump.write_text(DUMP, encoding="utf-8")
+    path = tmp_path / "cep.idx"
+    assert build_cep_index(read_cep_csv(dump), path) == 4
+    index = CepIndex(path)
+    yield index
+    index.close()
+
+
+def test_lookup_reads_addresses_from_the_index(index):
+    assert len(index) == 4
+    assert index.lookup("01001-000") == CepAddress("01001000", "Praça da Sé", "Sé", "São Paulo", "SP")
+    assert index.lookup("20040-002").label() == "Rua da Assembleia, Centro - Rio de Janeiro/RJ"
+    assert index.lookup("69900970").label() == "Rio Branco/AC"
+
+    last = index.lookup("99999-999")
+    assert last.street.startswith("Avenida ã") and len(last.street.encode("utf-8")) <= 255
+
+    for missing in ("01001-001", "00000000", "1234", "", "0100100０"):
+        assert index.lookup(missing) is None
+        assert missing not in index
+    assert "20040002" in index
+
+
+def test_bisection_matches_a_dict(tmp_path):
+    rng = random.Random(5)
+    rows = {f"{rng.randrange(10**8):08d}": f"Rua {n}" for n in range(5000)}
+    rows.update({"00000000": "Primeira", "99999999": "Última"})
+    path = tmp_path / "cep.idx"
+    build_cep_index(((cep, street, "", "Cidade", "SP") for cep, street in rows.items()), path)
+
+    index = CepIndex(path)
+    try:
+        probes = list(rows) + [f"{rng.randrange(10**8):08d}" for _ in range(5000)]
+        assert {cep: getattr(index.lookup(cep), "street", None) for cep in probes} == {
+            cep: rows.get(cep) for cep in probes
+        }
+    finally:
+        index.close()
+
+
+def test_rejects_files_that_are_not_an_index(tmp_path):
+    path = tmp_path / "ceps.csv"
+    path.write_text(DUMP, encoding="utf-8")
+    with pytest.raises(ValueError):
+        CepIndex(path)
+
+
+def test_onboarding_fills_the_address_and_rejects_unknown_ceps(index, monkeypatch):
+    state = SimpleNamespace(personal_postal_code="", personal_address="")
+    lookup = PersonalState.lookup_personal_postal_code.fn
+
+    monkeypatch.setattr(cep_index, "cep_lookup", None)
+    assert lookup(state, "01001-001") is None
+    assert state.personal_address == "" and cep_index.postal_code_exists("01001-001")
+
+    monkeypatch.setattr(cep_index, "cep_lookup", index)
+    assert lookup(state, " 01001-000 ") is None
+    assert state.personal_postal_code == "01001-000"
+    assert state.personal_address == "Praça da Sé, Sé - São Paulo/SP"
+
+    assert lookup(state, "01001-001") is not None  # toast: CEP não encontrado
+    assert state.personal_address == ""
+    assert lookup(state, "0100") is None  # incomplete: the format check reports it
+    assert not cep_index.postal_code_exists("01001-001")
@@ -0,0 +1,87 @@
+import json
+import random
+import shutil
+import subprocess
+
+import pytest
+
+from app.utils.validators import (
+    CLIENT_RULES,
+    client_validators_script,
+    cpf_cnpj_check_digits,
+    validate_cpf_cnpj,
+    validate_postal_code,
+    validate_username,
+)
+
+SERVER = {"username": validate_username, "cpf_cnpj": validate_cpf_cnpj, "postal_code": validate_postal_code}
+
+# Runs the generated script with just enough of a DOM for it to register,
+# then answers every [rule, value] pair read from stdin.
+HARNESS = """
+globalThis.window = globalThis;
+globalThis.document = { addEventListener() {} };
+%s
+const cases = JSON.parse(require("fs").readFileSync(0, "utf8"));
+process.stdout.write(JSON.stringify(cases.map(([rule, value]) => window.botecoValidators.check(rule, value))));
+"""
+
+ALPHABET = "abcXYZ019_-./ \n\t()" + "éÇ٣１" + "\U0001f37a"
+
+
+def corpus(size: int = 20000):
+    rng = random.Random(2024)
+    edges = ["", "abc\n", "_abc", "a" * 30, "a" * 31, "٣" * 8, "1" * 11 + "\n"]
+    cases = [(rule, value) for value in edges for rule in CLIENT_RULES]
+    for _ in range(size):
+        shape = rng.random()
+        if shape < 0.3:
+            value = "".join(rng.choice(ALPHABET) for _ in range(rng.randint(0, 34)))
+        elif shape < 0.45:
+            # Real CPFs/CNPJs, formatted or not, some with one digit changed.
+            base = "".join(rng.choice("0123456789") for _ in range(rng.choice((9, 12))))
+            value = base + cpf_cnpj_check_digits(base)
+            if rng.random() < 0.3:
+                position = rng.randrange(len(value))
+                value = value[:position] + str((int(value[position]) + 1) % 10) + value[position + 1 :]
+            if rng.random() < 0.5:
+                value = "-".join((value[:3], value[3:6], value[6:]))
+        elif shape < 0.8:
+            # Digit runs around the valid lengths, with and without punctuation.
+            length = rng.choice((7, 8, 8, 9, 10, 11, 11, 13, 14, 14, 15))
+            digits = "".join(rng.choice("0123456789") for _ in range(length))
+            value = "".join(ch + rng.choice(("",) * 12 + (".", "-", "/", " ", "٣")) for ch in digits)
+        else:
+            head = rng.choice("abz09_")
+            value = head + "".join(rng.choice("abcXYZ019_") for _ in range(rng.randint(0, 32)))
+        cases.append((rng.choice(list(CLIENT_RULES)), value))
+    return cases
+
+
+def test_every_client_rule_has_a_server_validator():
+    assert set(CLIENT_RULES) == set(SERVER)
+
+
+def test_client_and_server_validators_agree():
+    node = shutil.which("node")
+    if not node:
+        pytest.skip("node not installed")
+    cases = corpus()
+    completed = subprocess.run(
+        [node, "-e", HARNESS % client_validators_script()],
+        input=json.dumps(cases),
+        capture_output=True,
+        text=True,
+        check=True,
+        timeout=60,
+    )
+    client = json.loads(completed.stdout)
+
+    mismatches = [
+        (rule, value, verdict)
+        for (rule, value), verdict in zip(cases, client)
+        if SERVER[rule](value) != verdict
+    ]
+    assert len(client) == len(cases)
+    assert not mismatches, mismatches[:10]
+    assert 0.1 < sum(client) / len(client) < 0.9  # the corpus exercises both outcomes
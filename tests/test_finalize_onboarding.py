@@ -0,0 +1,86 @@
+import json
+
+import pytest
+
+psycopg = pytest.importorskip("psycopg")
+
+
+def _insert_user(conn, email="ana@boteco.pt") -> str:
+    row = conn.execute(
+        """
+        INSERT INTO users (email, username, tax_number, first_name, last_name, birth_date,
+                           country, postal_code, house_number, is_owner)
+        VALUES (%s, 'ana.silva1234', '12345678901', 'Ana', 'Silva', '1990-01-01',
+                'Brasil', '01001000', '10', true)
+        RETURNING id
+        """,
+        (email,),
+    ).fetchone()
+    return str(row[0])
+
+
+def _payloads(user_id: str, username: str, plan: str = "boteco_pro"):
+    boteco = {
+        "public_name": "Bar da Ana",
+        "username": username,
+        "service_category": "bar",
+        "vibe_tags": ["samba", "petiscos"],
+        "establishment_tax_number": "12345678000199",
+        "country": "Brasil",
+        "postal_code": "01001000",
+        "owner_tax_number": "12345678901",
+        "created_by_email": "ana@boteco.pt",
+        "created_by_user_id": user_id,
+    }
+    membership = {"user_id": user_id, "assigned_role": "owner", "plan": plan}
+    return json.dumps(boteco), json.dumps(membership)
+
+
+def _schema_exists(conn, name: str) -> bool:
+    return conn.execute("SELECT 1 FROM pg_namespace WHERE nspname = %s", (name,)).fetchone() is not None
+
+
+def test_finalize_onboarding_creates_everything_in_one_call(onboarding_db):
+    conn = onboarding_db
+    username = f"bar_{conn.info.backend_pid}"
+    user_id = _insert_user(conn)
+    try:
+        (result,) = conn.execute(
+            "SELECT finalize_onboarding(%s::jsonb, %s::jsonb)", _payloads(user_id, username)
+        ).fetchone()
+
+        assert result["schema"] == f"org_{username}"
+        assert result["boteco"]["vibe_tags"] == ["samba", "petiscos"]
+        assert result["membership"]["boteco_id"] == result["boteco"]["id"]
+        assert result["membership"]["assigned_role"] == "owner"
+        assert _schema_exists(conn, f"org_{username}")
+        assert conn.execute("SELECT count(*) FROM user_boteco").fetchone()[0] == 1
+    finally:
+        conn.execute(f'DROP SCHEMA IF EXISTS "org_{username}"')
+
+
+def test_finalize_onboarding_leaves_no_orphans_on_failure(onboarding_db):
+    conn = onboarding_db
+    username = f"bar_{conn.info.backend_pid}"
+    user_id = _insert_user(conn)
+
+    # An invalid plan violates user_boteco_plan_check after the boteco insert.
+    with pytest.raises(psycopg.errors.CheckViolation):
+        conn.execute(
+            "SELECT finalize_onboarding(%s::jsonb, %s::jsonb)",
+            _payloads(user_id, username, plan="gratis"),
+        )
+
+    assert conn.execute("SELECT count(*) FROM boteco").fetchone()[0] == 0
+    assert not _schema_exists(conn, f"org_{username}")
+
+
+def test_finalize_onboarding_rejects_unsafe_usernames(onboarding_db):
+    conn = onboarding_db
+    user_id = _insert_user(conn)
+
+    with pytest.raises(psycopg.errors.InvalidParameterValue):
+        conn.execute(
+            "SELECT finalize_onboarding(%s::jsonb, %s::jsonb)",
+            _payloads(user_id, 'x"; DROP SCHEMA public; --'),
+        )
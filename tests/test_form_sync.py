@@ -0,0 +1,81 @@
+from app.pages.auth.signup import signup_page
+from app.pages.onboarding.business import business_step
+from app.pages.onboarding.personal import personal_step
+
+# What a user types to complete signup and the first two onboarding steps.
+TYPED = {
+    "personal_first_name": "Ana",
+    "personal_last_name": "Silva",
+    "personal_email": "ana.silva@boteco.pt",
+    "password": "segura123",
+    "personal_tax_number": "529.982.247-25",
+    "personal_birth_date": "1990-01-01",
+    "personal_country": "Brasil",
+    "personal_postal_code": "01001-000",
+    "personal_house_number": "100",
+    "business_public_name": "Bar da Ana",
+    "business_username": "bar_da_ana",
+    "business_tax_number": "11.222.333/0001-81",
+    "business_service_category": "bar",
+    "business_country": "Brasil",
+    "business_postal_code": "01001-000",
+    "business_vibe_tags": "samba, petiscos, chopp",
+}
+FORMS = {"signup": signup_page, "personal": personal_step, "business": business_step}
+
+
+def _inputs(component):
+    if getattr(component, "tag", None) == "input":
+        yield component
+    for child in getattr(component, "children", []):
+        yield from _inputs(child)
+
+
+def events_per_form(page) -> int:
+    """Websocket events sent while typing every field once and submitting."""
+
+    events = 1  # the submit
+    for field in _inputs(page()):
+        triggers = field.event_triggers
+        if "on_change" in triggers:
+            debounced = "debounce" in str(triggers["on_change"])
+            events += 1 if debounced else len(TYPED.get(field.name._var_value, ""))
+        elif "on_blur" in triggers:
+            events += 1
+    return events
+
+
+def _count(monkeypatch, mode):
+    monkeypatch.setenv("FORM_SYNC_MODE", mode)
+    return {name: events_per_form(page) for name, page in FORMS.items()}
+
+
+def test_default_sync_cuts_events_per_onboarding_tenfold(monkeypatch):
+    change = _count(monkeypatch, "change")
+    auto = _count(monkeypatch, "auto")
+
+    # Only the CEP fields (which show the address) sync before the submit.
+    for name in FORMS:
+        assert auto[name] * 10 <= change[name], name
+    assert sum(auto.values()) * 10 <= sum(change.values())
+    assert auto == {"signup": 1, "personal": 2, "business": 2}
+    monkeypatch.delenv("FORM_SYNC_MODE")
+    assert {name: events_per_form(page) for name, page in FORMS.items()} == auto
+
+
+def test_blur_sync_sends_one_event_per_field(monkeypatch):
+    change = _count(monkeypatch, "change")
+    blur = _count(monkeypatch, "blur")
+
+    for name in FORMS:
+        assert blur[name] * 5 <= change[name], name
+    assert _count(monkeypatch, "debounce") == blur
+    assert _count(monkeypatch, "submit") == {name: 1 for name in FORMS}
+
+
+def test_every_field_syncs_once(monkeypatch):
+    monkeypatch.setenv("FORM_SYNC_MODE", "blur")
+    for page in FORMS.values():
+        for field in _inputs(page()):
+            if field.name._var_value != "password":
+                assert list(field.event_triggers) == ["on_blur"], field.name
@@ -0,0 +1,110 @@
+import asyncio
+
+import pytest
+
+from app.services.idempotency import Idempotency, IdempotencyConflict, InMemoryIdempotencyStore
+
+
+def test_result_is_stored_and_replayed():
+    idempotency = Idempotency(InMemoryIdempotencyStore())
+    calls: list[int] = []
+
+    async def work() -> dict:
+        calls.append(1)
+        return {"job_id": f"job-{len(calls)}"}
+
+    async def scenario():
+        return [await idempotency.run("provision_org", "k-1", work) for _ in range(3)]
+
+    results = asyncio.run(scenario())
+
+    assert results == [({"job_id": "job-1"}, False)] + [({"job_id": "job-1"}, True)] * 2
+    assert len(calls) == 1
+    assert idempotency.stats()["replays"] == 2
+
+
+def test_keys_are_scoped_and_optional():
+    idempotency = Idempotency(InMemoryIdempotencyStore())
+    calls: list[str] = []
+
+    async def work(name: str) -> str:
+        calls.append(name)
+        return name
+
+    async def scenario() -> None:
+        await idempotency.run("a", "k", lambda: work("a"))
+        await idempotency.run("b", "k", lambda: work("b"))
+        await idempotency.run("a", None, lambda: work("none"))
+        await idempotency.run("a", None, lambda: work("none"))
+
+    asyncio.run(scenario())
+    assert calls == ["a", "b", "none", "none"]
+
+
+def test_failures_are_not_stored():
+    idempotency = Idempotency(InMemoryIdempotencyStore())
+    attempts: list[int] = []
+
+    async def flaky() -> str:
+        attempts.append(1)
+        if len(attempts) == 1:
+            raise ValueError("unique violation")
+        return "ok"
+
+    async def scenario():
+        with pytest.raises(ValueError):
+            await idempotency.run("s", "k", flaky)
+        return await idempotency.run("s", "k", flaky)
+
+    assert asyncio.run(scenario()) == ("ok", False)
+    assert len(attempts) == 2
+
+
+def test_other_processes_wait_for_the_running_request():
+    store = InMemoryIdempotencyStore()
+    first, second = Idempotency(store), Idempotency(store, poll_interval=0.01)
+
+    async def scenario():
+        release = asyncio.Event()
+
+        async def slow() -> str:
+            await release.wait()
+            return "done"
+
+        async def never() -> str:
+            raise AssertionError("the second process must not run the work")
+
+        running = asyncio.create_task(first.run("s", "k", slow))
+        await asyncio.sleep(0.01)
+        waiting = asyncio.create_task(second.run("s", "k", never))
+        await asyncio.sleep(0.03)
+        assert not waiting.done()
+        release.set()
+        return await running, await waiting
+
+    assert asyncio.run(scenario()) == (("done", False), ("done", True))
+
+
+def test_conflict_when_the_running_request_outlasts_the_lock():
+    store = InMemoryIdempotencyStore()
+    idempotency = Idempotency(store, lock_ttl=0.05, poll_interval=0.01)
+
+    async def scenario() -> None:
+        assert await store.claim("s:k", ttl=10)
+        await idempotency.run("s", "k", lambda: asyncio.sleep(0))
+
+    with pytest.raises(IdempotencyConflict):
+        asyncio.run(scenario())
+
+
+def test_records_expire():
+    now = [0.0]
+    store = InMemoryIdempotencyStore(clock=lambda: now[0])
+
+    async def scenario():
+        await store.save("k", {"status": "done", "result": 1}, ttl=10)
+        kept = await store.get("k")
+        now[0] = 11.0
+        return kept, await store.get("k")
+
+    assert asyncio.run(scenario()) == ({"status": "done", "result": 1}, None)
@@ -0,0 +1,169 @@
+import asyncio
+import json
+import os
+
+from app.services.membership_index import MembershipIndex
+
+
+class CountingLoader:
+    def __init__(self, data=None) -> None:
+        self.data = data or {}
+        self.calls = 0
+
+    async def __call__(self, user_id: str):
+        self.calls += 1
+        return dict(self.data.get(user_id, {}))
+
+
+def test_index_only_stores_users_while_live():
+    loader = CountingLoader({"u1": {"b1": "owner"}})
+    index = MembershipIndex(loader)
+
+    async def scenario():
+        assert await index.memberships("u1") == {"b1": "owner"}
+        assert await index.memberships("u1") == {"b1": "owner"}
+        assert loader.calls == 2  # offline: every lookup reads through
+
+        index.live = True
+        await index.memberships("u1")
+        await index.memberships("u1")
+        assert loader.calls == 3
+
+    asyncio.run(scenario())
+    assert index.stats()["hits"] == 1
+
+
+def test_index_applies_notifications_to_warmed_users():
+    loader = CountingLoader({"u1": {"b1": "owner"}})
+    index = MembershipIndex(loader)
+    index.live = True
+
+    async def scenario():
+        await index.memberships("u1")
+        index.apply({"op": "INSERT", "user_id": "u1", "boteco_id": "b2", "role": "manager"})
+        index.apply({"op": "DELETE", "user_id": "u1", "boteco_id": "b1"})
+        index.apply({"op": "INSERT", "user_id": "u2", "boteco_id": "b3", "role": "owner"})
+        assert await index.memberships("u1") == {"b2": "manager"}
+        assert loader.calls == 1
+        assert index.stats()["users"] == 1  # u2 was never warmed
+
+        index.apply({"op": "TRUNCATE"})
+        await index.memberships("u1")
+        assert loader.calls == 2
+
+    asyncio.run(scenario())
+
+
+def test_index_drops_loads_that_raced_with_a_notification():
+    index = MembershipIndex(None)
+    index.live = True
+
+    async def racing_loader(user_id):
+        # The row lands while the query is in flight.
+        index.apply({"op": "INSERT", "user_id": user_id, "boteco_id": "b1", "role": "owner"})
+        return {}
+
+    index._loader = racing_loader
+    assert asyncio.run(index.memberships("u1")) == {}
+    assert index.stats()["users"] == 0
+
+
+def test_index_evicts_least_recently_used_user():
+    index = MembershipIndex(CountingLoader(), maxsize=2)
+    index.live = True
+
+    async def scenario():
+        for user_id in ("u1", "u2", "u1", "u3"):
+            await index.memberships(user_id)
+
+    asyncio.run(scenario())
+    assert list(index._members) == ["u1", "u3"]
+
+
+def _insert_user(conn) -> str:
+    (user_id,) = conn.execute(
+        """
+        INSERT INTO users (email, username, tax_number, first_name, last_name, birth_date,
+                           country, postal_code, house_number, is_owner)
+        VALUES ('ana@boteco.pt', 'ana.silva1234', '12345678901', 'Ana', 'Silva', '1990-01-01',
+                'Brasil', '01001000', '10', true)
+        RETURNING id
+        """
+    ).fetchone()
+    return str(user_id)
+
+
+def _insert_boteco(conn, user_id: str) -> str:
+    (boteco_id,) = conn.execute(
+        """
+        INSERT INTO boteco (public_name, username, service_category, country, postal_code,
+                            owner_tax_number, created_by_email, created_by_user_id)
+        VALUES ('Bar da Ana', %s, 'bar', 'Brasil', '01001000', '12345678901',
+                'ana@boteco.pt', %s)
+        RETURNING id
+        """,
+        (f"bar_{conn.info.backend_pid}", user_id),
+    ).fetchone()
+    return str(boteco_id)
+
+
+def test_listener_keeps_index_fresh_from_postgres(onboarding_db):
+    conn = onboarding_db
+    user_id = _insert_user(conn)
+    boteco_id = _insert_boteco(conn, user_id)
+
+    async def load(uid):
+        rows = conn.execute(
+            "SELECT boteco_id, assigned_role FROM user_boteco WHERE user_id = %s", (uid,)
+        ).fetchall()
+        return {str(boteco): role for boteco, role in rows}
+
+    index = MembershipIndex(load, dsn=os.environ["TEST_DATABASE_URL"], reconnect_delay=0.05)
+
+    async def wait_for(predicate, timeout=5.0):
+        loop = asyncio.get_running_loop()
+        deadline = loop.time() + timeout
+        while not predicate():
+            assert loop.time() < deadline, "timed out waiting for the listener"
+            await asyncio.sleep(0.01)
+
+    async def scenario():
+        async with index.lifespan():
+            await wait_for(lambda: index.live)
+            assert await index.memberships(user_id) == {}
+
+            conn.execute(
+                "INSERT INTO user_boteco (user_id, boteco_id, assigned_role, plan) "
+                "VALUES (%s, %s, 'owner', 'boteco')",
+                (user_id, boteco_id),
+            )
+            await wait_for(lambda: index._members.get(user_id))
+            assert await index.memberships(user_id) == {boteco_id: "owner"}
+
+            conn.execute("DELETE FROM user_boteco WHERE user_id = %s", (user_id,))
+            await wait_for(lambda: not index._members.get(user_id))
+            assert await index.memberships(user_id) == {}
+        assert not index.live
+
+    asyncio.run(scenario())
+    assert index.loads == 1
+    assert index.notifications >= 2
+
+
+def test_notify_trigger_payload(onboarding_db):
+    conn = onboarding_db
+    user_id = _insert_user(conn)
+    boteco_id = _insert_boteco(conn, user_id)
+    conn.execute("LISTEN user_boteco_changes")
+    conn.execute(
+        "INSERT INTO user_boteco (user_id, boteco_id, assigned_role, plan) "
+        "VALUES (%s, %s, 'owner', 'boteco')",
+        (user_id, boteco_id),
+    )
+    notify = next(conn.notifies(timeout=5))
+    assert json.loads(notify.payload) == {
+        "op": "INSERT",
+        "user_id": user_id,
+        "boteco_id": boteco_id,
+        "role": "owner",
+    }
@@ -0,0 +1,131 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.api import provision
+from app.services.metrics import (
+    SUPABASE_CALL_SECONDS,
+    CallbackGauge,
+    Registry,
+    time_public_coroutines,
+)
+from app.services.supabase_client import SupabaseClient
+
+
+def test_histogram_renders_cumulative_buckets():
+    registry = Registry()
+    latency = registry.histogram("op_seconds", "Op latency.", ("op",), buckets=(0.1, 1.0))
+    for value in (0.05, 0.1, 0.5, 3.0):
+        latency.observe(value, "read")
+
+    text = registry.render()
+
+    assert "# TYPE op_seconds histogram" in text
+    assert 'op_seconds_bucket{op="read",le="0.1"} 2' in text
+    assert 'op_seconds_bucket{op="read",le="1"} 3' in text
+    assert 'op_seconds_bucket{op="read",le="+Inf"} 4' in text
+    assert 'op_seconds_count{op="read"} 4' in text
+    assert 'op_seconds_sum{op="read"} 3.65' in text
+
+
+def test_counters_gauges_and_callbacks():
+    registry = Registry()
+    steps = registry.counter("steps_total", "Steps.", ("step",))
+    in_flight = registry.gauge("in_flight", "In flight.", ("event",))
+    registry.register(CallbackGauge("depth", "Depth.", lambda: {(): 7}))
+
+    steps.inc("personal")
+    steps.inc("personal")
+    with in_flight.track("submit"):
+        assert in_flight.value("submit") == 1
+    text = registry.render()
+
+    assert 'steps_total{step="personal"} 2' in text
+    assert 'in_flight{event="submit"} 0' in text
+    assert "depth 7" in text
+    with pytest.raises(ValueError):
+        steps.inc()
+    with pytest.raises(ValueError):
+        registry.counter("steps_total", "Again.")
+
+
+def test_label_values_are_escaped():
+    registry = Registry()
+    registry.counter("errors_total", "Errors.", ("message",)).inc('say "hi"\n')
+
+    assert 'errors_total{message="say \\"hi\\"\\n"} 1' in registry.render()
+
+
+def test_client_methods_are_timed_per_backend_and_outcome():
+    class Fake(SupabaseClient):
+        backend_name = "fake"
+
+        def __init__(self) -> None:
+            pass
+
+        async def get_user_by_email(self, email: str):
+            if not email:
+                raise ValueError("missing")
+            return []
+
+    async def scenario() -> None:
+        client = Fake()
+        await client.get_user_by_email("ana@boteco.pt")
+        with pytest.raises(ValueError):
+            await client.get_user_by_email("")
+
+    asyncio.run(scenario())
+
+    assert SUPABASE_CALL_SECONDS.count("fake", "get_user_by_email", "ok") == 1
+    assert SUPABASE_CALL_SECONDS.count("fake", "get_user_by_email", "error") == 1
+    # Wrapping twice (e.g. an inherited method) does not double count.
+    assert time_public_coroutines(Fake, SUPABASE_CALL_SECONDS) is Fake
+    asyncio.run(Fake().get_user_by_email("bia@boteco.pt"))
+    assert SUPABASE_CALL_SECONDS.count("fake", "get_user_by_email", "ok") == 2
+
+
+def test_metrics_route_exposes_the_registry(monkeypatch):
+    admin = SimpleNamespace(
+        rpc=lambda name, params: SimpleNamespace(
+            execute=lambda: SimpleNamespace(
+                data={"schema": params["tenant_schema"], "created": True, "timings": {"tables": 2.0}},
+                error=None,
+            )
+        )
+    )
+    monkeypatch.setattr(provision.supabase_client, "client", admin)
+
+    async def scenario() -> httpx.Response:
+        await provision.supabase_client.provision_tenant_schema("bar_metrics")
+        transport = httpx.ASGITransport(app=provision.api_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+            return await client.get("/metrics")
+
+    response = asyncio.run(scenario())
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain; version=0.0.4")
+    series = 'backend="postgrest",method="provision_tenant_schema",outcome="ok"'
+    assert f"supabase_call_seconds_count{{{series}}}" in response.text
+    assert "# TYPE provision_phase_seconds histogram" in response.text
+    assert "provision_queue_depth " in response.text
+    assert 'supabase_executor_tasks{state="queued"}' in response.text
+
+
+def test_metrics_route_is_restricted(monkeypatch):
+    async def scrape(client_host: str, headers: dict) -> int:
+        transport = httpx.ASGITransport(app=provision.api_app, client=(client_host, 4000))
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+            return (await client.get("/metrics", headers=headers)).status_code
+
+    monkeypatch.setattr(provision, "METRICS_TOKENS", ())
+    assert asyncio.run(scrape("127.0.0.1", {})) == 200
+    assert asyncio.run(scrape("10.0.0.7", {})) == 403
+    assert asyncio.run(scrape("127.0.0.1", {"X-Forwarded-For": "203.0.113.9"})) == 403  # local proxy
+
+    monkeypatch.setattr(provision, "METRICS_TOKENS", ("scrape-secret",))
+    assert asyncio.run(scrape("10.0.0.7", {"Authorization": "Bearer scrape-secret"})) == 200
+    assert asyncio.run(scrape("127.0.0.1", {})) == 401
+    assert asyncio.run(scrape("10.0.0.7", {"Authorization": "Bearer wrong"})) == 401
@@ -0,0 +1,59 @@
+import asyncio
+from types import SimpleNamespace
+
+from reflex.state import State
+from reflex.istate.manager.redis import StateManagerRedis
+
+from app.states import onboarding_state
+from app.states.onboarding_state import (
+    BusinessState,
+    OnboardingState,
+    PersonalState,
+    PlanState,
+    ProvisionState,
+)
+
+
+def test_step_events_load_only_their_substate():
+    manager = StateManagerRedis(state=State, redis=None)
+
+    for step in (PersonalState, BusinessState, PlanState, ProvisionState):
+        required = manager._get_required_state_classes(step, subclasses=True)
+        assert required == {State, OnboardingState, step}, step
+
+
+def test_root_keeps_only_shared_fields():
+    assert set(OnboardingState.base_vars) == {"current_step", "is_loading", "user_id"}
+    assert "personal_first_name" not in BusinessState.base_vars
+    assert "business_username" in BusinessState.base_vars
+    assert {"selected_plan", "checkout_key"} <= set(PlanState.base_vars)
+
+
+class PollingSession(SimpleNamespace):
+    """Stand-in for a background event's state: `async with self` is a no-op."""
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc_info):
+        return False
+
+
+def test_polling_gives_up_with_a_terminal_status(monkeypatch):
+    polls = []
+
+    async def provision_status(job_id):
+        polls.append(job_id)
+        return {"status": "running"}
+
+    async def no_sleep(_):
+        return None
+
+    monkeypatch.setattr(onboarding_state.supabase_client, "provision_status", provision_status)
+    monkeypatch.setattr(onboarding_state.asyncio, "sleep", no_sleep)
+    session = PollingSession(provision_job_id="job-1", provision_status="queued", provision_error="")
+
+    asyncio.run(ProvisionState.poll_provisioning.fn(session))
+
+    assert len(polls) == 60
+    assert session.provision_status == "timeout" and session.provision_error
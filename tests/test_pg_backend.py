@@ -0,0 +1,150 @@
+import asyncio
+import os
+
+import pytest
+
+pytest.importorskip("psycopg_pool")
+
+from app.services import supabase_client as supabase_module  # noqa: E402
+from app.services.models import BotecoRow, UserRow  # noqa: E402
+from app.services.pg_backend import PostgresClient  # noqa: E402
+
+
+def _user(email: str = "ana@boteco.pt", suffix: str = "1") -> dict:
+    return {
+        "email": email,
+        "username": f"ana.silva{suffix}",
+        "tax_number": f"1234567890{suffix}",
+        "first_name": "Ana",
+        "last_name": "Silva",
+        "birth_date": "1990-01-01",
+        "country": "Brasil",
+        "postal_code": "01001000",
+        "house_number": "10",
+        "is_owner": True,
+    }
+
+
+def _boteco(owner: UserRow, username: str) -> dict:
+    return {
+        "public_name": "Bar da Ana",
+        "username": username,
+        "service_category": "bar",
+        "vibe_tags": ["samba"],
+        "country": "Brasil",
+        "postal_code": "01001000",
+        "owner_tax_number": owner.tax_number,
+        "created_by_email": owner.email,
+        "created_by_user_id": owner.id,
+    }
+
+
+@pytest.fixture
+def pg_client(onboarding_db):
+    (schema,) = onboarding_db.execute("SELECT current_schema()").fetchone()
+    client = PostgresClient(dsn=os.environ["TEST_DATABASE_URL"])
+    client.search_path = f'"{schema}", public'
+    return client
+
+
+def test_build_client_selects_backend(monkeypatch):
+    monkeypatch.setenv("SUPABASE_BACKEND", "psycopg")
+    monkeypatch.setenv("DATABASE_URL", "postgresql+psycopg://app@db.internal/boteco")
+    client = supabase_module.build_client()
+    assert isinstance(client, PostgresClient)
+    assert client.dsn == "postgresql://app@db.internal/boteco"
+
+    monkeypatch.setenv("SUPABASE_BACKEND", "postgrest")
+    assert type(supabase_module.build_client()) is supabase_module.SupabaseClient
+
+
+def test_users_round_trip(pg_client):
+    async def scenario():
+        async with pg_client.lifespan():
+            (created,) = await pg_client.create_user(_user())
+            assert isinstance(created, UserRow) and isinstance(created.id, str)
+            assert created.birth_date == "1990-01-01"
+
+            (updated,) = await pg_client.upsert_user({**_user(), "first_name": "Ana Maria"})
+            assert updated.id == created.id and updated.first_name == "Ana Maria"
+
+            assert await pg_client.get_user_by_email("ana@boteco.pt") == [updated]
+            assert await pg_client.get_user_by_email("nobody@boteco.pt") == []
+
+            with pytest.raises(ValueError):
+                # Same username as the first user: violates users_username_key.
+                await pg_client.create_user({**_user("bia@boteco.pt"), "tax_number": "999"})
+
+            bulk = await pg_client.upsert_users(
+                [_user(f"owner{i}@boteco.pt", suffix=str(i + 2)) for i in range(3)]
+            )
+            assert sorted(user.email for user in bulk) == [
+                "owner0@boteco.pt",
+                "owner1@boteco.pt",
+                "owner2@boteco.pt",
+            ]
+        assert pg_client._pool is None
+
+    asyncio.run(scenario())
+    assert pg_client.breaker.state == "closed"
+
+
+def test_memberships_and_onboarding(pg_client):
+    async def scenario():
+        async with pg_client.lifespan():
+            (owner,) = await pg_client.create_user(_user())
+            assert await pg_client.check_user_has_boteco(owner.id) is False
+
+            boteco, membership = await pg_client.create_boteco_and_associate_user(
+                _boteco(owner, "bar_um"), {"user_id": owner.id, "assigned_role": "owner", "plan": "boteco"}
+            )
+            assert isinstance(boteco, BotecoRow)
+            assert membership.boteco_id == boteco.id
+            assert await pg_client.check_user_has_boteco(owner.id) is True
+
+            result = await pg_client.finalize_onboarding(
+                {**_boteco(owner, "bar_dois"), "owner_tax_number": "55"},
+                {"user_id": owner.id, "plan": "boteco_pro"},
+            )
+            assert result.schema == "org_bar_dois"
+            assert await pg_client.get_user_memberships(owner.id) == {
+                boteco.id: "owner",
+                result.boteco.id: "owner",
+            }
+
+            again = await pg_client.ensure_memberships(
+                [{"user_id": owner.id, "boteco_id": boteco.id, "assigned_role": "owner", "plan": "boteco"}]
+            )
+            assert again == []
+
+            assert await pg_client.delete_boteco(boteco.id) == 1
+            assert await pg_client.delete_boteco(boteco.id) == 0
+            assert list(await pg_client.get_user_memberships(owner.id)) == [result.boteco.id]
+
+    try:
+        asyncio.run(scenario())
+    finally:
+        pg_client_conn = pg_client.dsn
+        import psycopg
+
+        with psycopg.connect(pg_client_conn, autocommit=True) as conn:
+            conn.execute('DROP SCHEMA IF EXISTS "org_bar_dois"')
+
+
+def test_provision_tenant_schema(pg_client):
+    async def scenario():
+        async with pg_client.lifespan():
+            first = await pg_client.provision_tenant_schema("bar_tres")
+            again = await pg_client.provision_tenant_schema("bar_tres")
+            return first, again
+
+    try:
+        first, again = asyncio.run(scenario())
+        assert first.schema == "org_bar_tres" and first.created
+        assert set(first.timings) == {"schema", "tables", "indexes", "grants"}
+        assert not again.created
+    finally:
+        import psycopg
+
+        with psycopg.connect(pg_client.dsn, autocommit=True) as conn:
+            conn.execute('DROP SCHEMA IF EXISTS "org_bar_tres" CASCADE')
@@ -0,0 +1,189 @@
+import asyncio
+from types import SimpleNamespace
+
+import httpx
+
+from app.api import provision
+
+
+class FakeAdmin:
+    """Sync supabase-py stand-in: `.execute()` returns the response, never a coroutine."""
+
+    def __init__(self) -> None:
+        self.rpcs: list[tuple[str, dict]] = []
+
+    def rpc(self, name: str, params: dict):
+        self.rpcs.append((name, params))
+        data = {"schema": params["tenant_schema"], "created": True, "timings": {"tables": 1.5}}
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=data, error=None))
+
+
+def _post(payloads: list[dict]) -> list[httpx.Response]:
+    async def scenario() -> list[httpx.Response]:
+        transport = httpx.ASGITransport(app=provision.api_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+            return await asyncio.gather(
+                *(client.post("/api/provision_org", json=payload) for payload in payloads)
+            )
+
+    return asyncio.run(scenario())
+
+
+def _provision_and_wait(payloads: list[dict]) -> tuple[list[httpx.Response], list[dict]]:
+    """POST each payload with the workers running, then poll every job until it finishes."""
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=provision.api_app)
+        async with provision.lifespan(provision.api_app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+                accepted = await asyncio.gather(
+                    *(client.post("/api/provision_org", json=payload) for payload in payloads)
+                )
+                jobs = []
+                for response in accepted:
+                    for _ in range(200):
+                        job = (await client.get(response.headers["location"])).json()
+                        if job["status"] in ("succeeded", "failed"):
+                            break
+                        await asyncio.sleep(0.01)
+                    jobs.append(job)
+        return accepted, jobs
+
+    return asyncio.run(scenario())
+
+
+def test_requests_share_the_admin_client(monkeypatch):
+    admin = FakeAdmin()
+    monkeypatch.setattr(provision.supabase_client, "client", admin)
+
+    accepted, jobs = _provision_and_wait([{"boteco_username": f"bar_{i}"} for i in range(5)])
+
+    assert [r.status_code for r in accepted] == [202] * 5
+    assert accepted[0].json()["status"] == "queued"
+    assert [job["status"] for job in jobs] == ["succeeded"] * 5
+    assert jobs[0]["schema"] == "org_bar_0"
+    assert jobs[0]["timings"] == {"tables": 1.5}
+    assert jobs[0]["queue_seconds"] >= 0 and jobs[0]["run_seconds"] >= 0
+    assert len(admin.rpcs) == 5
+    assert {name for name, _ in admin.rpcs} == {"provision_tenant"}
+    assert sorted(params["tenant_schema"] for _, params in admin.rpcs) == [f"org_bar_{i}" for i in range(5)]
+
+
+def test_failed_jobs_report_the_error(monkeypatch):
+    admin = FakeAdmin()
+    admin.rpc = lambda name, params: SimpleNamespace(
+        execute=lambda: SimpleNamespace(data=None, error=SimpleNamespace(message="permission denied"))
+    )
+    monkeypatch.setattr(provision.supabase_client, "client", admin)
+
+    _, (job,) = _provision_and_wait([{"boteco_username": "bar_da_ana"}])
+
+    assert job["status"] == "failed"
+    assert job["error"] == "permission denied"
+    assert job["schema"] is None
+
+
+def test_unknown_job_is_404():
+    async def scenario() -> httpx.Response:
+        transport = httpx.ASGITransport(app=provision.api_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+            return await client.get("/api/provision_org/does-not-exist")
+
+    assert asyncio.run(scenario()).status_code == 404
+
+
+def test_rejects_invalid_usernames(monkeypatch):
+    admin = FakeAdmin()
+    monkeypatch.setattr(provision.supabase_client, "client", admin)
+
+    (response,) = _post([{"boteco_username": 'bar"; DROP SCHEMA reflex; --'}])
+
+    assert response.status_code == 400
+    assert admin.rpcs == []
+
+
+def test_reports_missing_configuration(monkeypatch):
+    monkeypatch.setattr(provision.supabase_client, "client", None)
+
+    (response,) = _post([{"boteco_username": "bar_da_ana"}])
+
+    assert response.status_code == 500
+    assert response.json() == {"error": "Server configuration error"}
+
+
+def test_idempotency_key_returns_the_first_job(monkeypatch):
+    admin = FakeAdmin()
+    monkeypatch.setattr(provision.supabase_client, "client", admin)
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=provision.api_app)
+        async with provision.lifespan(provision.api_app):
+            async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+
+                def post(username: str, key: str):
+                    return client.post(
+                        "/api/provision_org",
+                        json={"boteco_username": username},
+                        headers={"Idempotency-Key": key},
+                    )
+
+                first, again = await asyncio.gather(
+                    post("bar_da_ana", "checkout-7"), post("bar_da_ana", "checkout-7")
+                )
+                for _ in range(200):
+                    if (await client.get(first.headers["location"])).json()["status"] == "succeeded":
+                        break
+                    await asyncio.sleep(0.01)
+                replay = await post("bar_da_ana", "checkout-7")
+                mismatch = await post("bar_do_ze", "checkout-7")
+        return first, again, replay, mismatch
+
+    first, again, replay, mismatch = asyncio.run(scenario())
+
+    assert first.json()["job_id"] == again.json()["job_id"] == replay.json()["job_id"]
+    assert replay.status_code == 202
+    assert replay.headers["idempotent-replayed"] == "true"
+    assert replay.json()["status"] == "succeeded"
+    assert mismatch.status_code == 422
+    assert len(admin.rpcs) == 1
+
+
+def test_activate_restores_archived_tenants(monkeypatch):
+    calls = []
+
+    class FakeArchive:
+        is_configured = True
+
+        async def ensure_active(self, schema):
+            calls.append(schema)
+            if schema == "org_sumiu":
+                raise provision.TenantNotFound(schema)
+            if schema == "org_quebrado":
+                raise RuntimeError("could not read /var/lib/boteco/archive/org_quebrado")
+            return SimpleNamespace(schema=schema, restored=True, ms=12.5)
+
+    monkeypatch.setattr(provision, "tenant_archive", FakeArchive())
+    monkeypatch.setattr(provision, "ADMIN_TOKENS", ("admin-secret",))
+    admin = {"Authorization": "Bearer admin-secret"}
+
+    async def scenario():
+        transport = httpx.ASGITransport(app=provision.api_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+            return await asyncio.gather(
+                client.post("/api/tenants/bar_da_ana/activate", headers=admin),
+                client.post("/api/tenants/sumiu/activate", headers=admin),
+                client.post("/api/tenants/_spare/activate", headers=admin),
+                client.post("/api/tenants/quebrado/activate", headers=admin),
+                client.post("/api/tenants/bar_da_ana/activate"),
+                client.post("/api/tenants/sumiu/activate", headers={"Authorization": "Bearer errado"}),
+            )
+
+    restored, missing, invalid, broken, anonymous, wrong_token = asyncio.run(scenario())
+
+    assert restored.status_code == 200
+    assert restored.json() == {"schema": "org_bar_da_ana", "restored": True, "restore_ms": 12.5}
+    assert missing.status_code == 404
+    assert invalid.status_code == 400
+    assert broken.status_code == 500 and broken.json() == {"error": "Failed to activate tenant"}
+    assert anonymous.status_code == wrong_token.status_code == 401
+    assert sorted(calls) == ["org_bar_da_ana", "org_quebrado", "org_sumiu"]
@@ -0,0 +1,180 @@
+import asyncio
+import json
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.api import provision
+from app.services.models import TenantSchema
+from app.services.provision_batch import provision_batch
+from app.services.schema_sql import TENANT_TABLES
+
+
+class FakeGroups:
+    def __init__(self, fail_group_with: str = "", rollback: str = "") -> None:
+        self.groups: list[list[str]] = []
+        self.running = 0
+        self.peak = 0
+        self.fail_group_with = fail_group_with
+        self.rollback = rollback
+
+    async def __call__(self, usernames: list[str]) -> list[TenantSchema]:
+        self.groups.append(usernames)
+        self.running += 1
+        self.peak = max(self.peak, self.running)
+        try:
+            await asyncio.sleep(0.01)
+            if self.fail_group_with in usernames:
+                raise RuntimeError("connection reset")
+            return [
+                TenantSchema(f"org_{u}", u != self.rollback, {"tables": 1.0}, "boom" if u == self.rollback else None)
+                for u in usernames
+            ]
+        finally:
+            self.running -= 1
+
+
+def _collect(usernames, groups, **kwargs) -> list[dict]:
+    async def scenario():
+        return [line async for line in provision_batch(usernames, groups, **kwargs)]
+
+    return asyncio.run(scenario())
+
+
+def test_batch_groups_tenants_with_bounded_parallelism():
+    groups = FakeGroups()
+    usernames = [f"bar_{i}" for i in range(10)]
+
+    lines = _collect(usernames, groups, group_size=3, concurrency=2)
+
+    assert [len(group) for group in groups.groups] == [3, 3, 3, 1]
+    assert groups.peak == 2
+    assert sorted(line["boteco_username"] for line in lines) == sorted(usernames)
+    assert {line["status"] for line in lines} == {"succeeded"}
+    assert lines[0]["timings"] == {"tables": 1.0}
+
+
+def test_batch_failures_stay_with_their_tenant():
+    groups = FakeGroups(fail_group_with="bar_3", rollback="bar_1")
+    usernames = ["bar_0", "bar_1", "_bad", "bar_3", "bar_4", "bar_5"]
+
+    lines = {line["boteco_username"]: line for line in _collect(usernames, groups, group_size=2)}
+
+    assert lines["_bad"]["status"] == "failed" and lines["_bad"]["error"]
+    assert lines["bar_1"] == {
+        "boteco_username": "bar_1",
+        "schema": "org_bar_1",
+        "status": "failed",
+        "created": False,
+        "timings": {"tables": 1.0},
+        "error": "boom",
+    }
+    # Groups are [bar_0, bar_1], [bar_3, bar_4], [bar_5]; the second one fails as a whole.
+    assert lines["bar_3"]["error"] == lines["bar_4"]["error"] == "connection reset"
+    assert [lines[u]["status"] for u in ("bar_0", "bar_5")] == ["succeeded"] * 2
+
+
+def test_timed_out_groups_are_reported_as_failed():
+    async def slow_group(usernames: list[str]) -> list[TenantSchema]:
+        await asyncio.sleep(1)
+        return [TenantSchema(f"org_{u}", True, {}) for u in usernames]
+
+    async def group_with_deadline(usernames: list[str]) -> list[TenantSchema]:
+        return await asyncio.wait_for(slow_group(usernames), timeout=0.02)
+
+    lines = _collect([f"bar_{i}" for i in range(6)], group_with_deadline, group_size=2)
+
+    assert len(lines) == 6
+    assert {(line["status"], line["error"]) for line in lines} == {("failed", "TimeoutError")}
+
+
+class FakeAdmin:
+    def __init__(self) -> None:
+        self.rpcs: list[tuple[str, dict]] = []
+
+    def rpc(self, name: str, params: dict):
+        self.rpcs.append((name, params))
+        data = [
+            {"schema": schema, "created": True, "timings": {}}
+            if schema != "org_bar_2"
+            else {"schema": schema, "created": False, "timings": {}, "error": "duplicate"}
+            for schema in params["schema_names"]
+        ]
+        return SimpleNamespace(execute=lambda: SimpleNamespace(data=data, error=None))
+
+
+def _post_batch(payload, token: str = "admin-secret") -> httpx.Response:
+    async def scenario() -> httpx.Response:
+        transport = httpx.ASGITransport(app=provision.api_app)
+        async with httpx.AsyncClient(transport=transport, base_url="http://api") as client:
+            headers = {"Authorization": f"Bearer {token}"} if token else {}
+            return await client.post("/api/provision_org/batch", json=payload, headers=headers)
+
+    return asyncio.run(scenario())
+
+
+@pytest.fixture(autouse=True)
+def admin_token(monkeypatch):
+    monkeypatch.setattr(provision, "ADMIN_TOKENS", ("admin-secret",))
+
+
+def test_batch_route_streams_ndjson(monkeypatch):
+    admin = FakeAdmin()
+    monkeypatch.setattr(provision.supabase_client, "client", admin)
+    monkeypatch.setattr(provision, "BATCH_GROUP_SIZE", 2)
+
+    response = _post_batch({"boteco_usernames": [f"bar_{i}" for i in range(5)]})
+
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("application/x-ndjson")
+    lines = [json.loads(line) for line in response.text.splitlines()]
+    assert lines[-1]["summary"]["total"] == 5
+    assert (lines[-1]["summary"]["succeeded"], lines[-1]["summary"]["failed"]) == (4, 1)
+    assert {line["boteco_username"] for line in lines[:-1]} == {f"bar_{i}" for i in range(5)}
+    assert [name for name, _ in admin.rpcs] == ["provision_tenants"] * 3
+
+
+def test_batch_route_rejects_bad_payloads(monkeypatch):
+    monkeypatch.setattr(provision, "BATCH_MAX_TENANTS", 2)
+
+    assert _post_batch({"boteco_usernames": []}).status_code == 400
+    assert _post_batch({"boteco_usernames": [1, 2]}).status_code == 400
+    assert _post_batch({"boteco_usernames": ["a_1", "b_2", "c_3"]}).status_code == 413
+
+
+def test_batch_route_requires_an_admin_token(monkeypatch):
+    admin = FakeAdmin()
+    monkeypatch.setattr(provision.supabase_client, "client", admin)
+    payload = {"boteco_usernames": ["bar_0"]}
+
+    assert _post_batch(payload, token="").status_code == 401
+    assert _post_batch(payload, token="admin-secre").status_code == 401
+    monkeypatch.setattr(provision, "ADMIN_TOKENS", ())
+    assert _post_batch(payload).status_code == 401  # no token configured: route closed
+    assert admin.rpcs == []
+
+
+def test_provision_tenants_isolates_failures(onboarding_db):
+    conn = onboarding_db
+    good = [f"org_bar_{conn.info.backend_pid}_{i}" for i in range(2)]
+    try:
+        (results,) = conn.execute(
+            "SELECT provision_tenants(%s)", ([good[0], "org_x; DROP", good[1]],)
+        ).fetchone()
+
+        assert [r["schema"] for r in results] == [good[0], "org_x; DROP", good[1]]
+        assert [r.get("error") is None for r in results] == [True, False, True]
+        assert results[1]["code"] == "22023"
+        for schema in good:
+            rows = conn.execute("SELECT tablename FROM pg_tables WHERE schemaname = %s", (schema,))
+            assert {row[0] for row in rows.fetchall()} == set(TENANT_TABLES)
+    finally:
+        for schema in good:
+            conn.execute(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE')
+
+
+def test_provision_tenants_empty_group(onboarding_db):
+    pytest.importorskip("psycopg")
+    (results,) = onboarding_db.execute("SELECT provision_tenants(%s::text[])", ([],)).fetchone()
+    assert results == []
@@ -0,0 +1,225 @@
+import asyncio
+import time
+
+import pytest
+
+from app.services.models import TenantSchema
+from app.services.provision_jobs import (
+    FAILED,
+    QUEUED,
+    RUNNING,
+    SUCCEEDED,
+    InMemoryJobStore,
+    ProvisionJob,
+    ProvisionJobs,
+    RedisJobStore,
+)
+
+
+def make_jobs(run=None, **kwargs) -> ProvisionJobs:
+    async def provision(username: str) -> str:
+        return TenantSchema(f"org_{username}", True, {"tables": 1.0})
+
+    return ProvisionJobs(run or provision, InMemoryJobStore(**kwargs), poll_timeout=0.01)
+
+
+def test_submit_only_queues_the_job():
+    calls = []
+
+    async def provision(username: str) -> str:
+        calls.append(username)
+        return TenantSchema(f"org_{username}", True, {"tables": 1.0})
+
+    jobs = make_jobs(provision)
+
+    async def scenario():
+        job = await jobs.submit("bar_do_ze")
+        assert (await jobs.get(job.id)).status == QUEUED
+        assert calls == []
+        assert jobs.stats()["queue_depth"] == 1
+
+        finished = await jobs.run_once()
+        assert finished.id == job.id
+        assert finished.status == SUCCEEDED and finished.schema == "org_bar_do_ze"
+        assert finished.timings == {"tables": 1.0}
+        assert finished.created_at <= finished.started_at <= finished.finished_at
+        assert await jobs.run_once() is None
+
+    asyncio.run(scenario())
+    assert calls == ["bar_do_ze"]
+
+
+def test_failures_are_recorded_on_the_job():
+    async def provision(username: str) -> str:
+        raise ValueError("permission denied")
+
+    jobs = make_jobs(provision)
+
+    async def scenario():
+        job = await jobs.submit("bar_da_ana")
+        await jobs.run_once()
+        return await jobs.get(job.id)
+
+    job = asyncio.run(scenario())
+    assert job.status == FAILED and job.error == "permission denied"
+    assert jobs.stats()["failed"] == 1
+
+
+def test_workers_drain_the_queue_in_order():
+    order = []
+
+    async def provision(username: str) -> str:
+        order.append(username)
+        return TenantSchema(f"org_{username}", True, {"tables": 1.0})
+
+    jobs = make_jobs(provision)
+    jobs.workers = 1
+
+    async def scenario():
+        async with jobs.lifespan():
+            submitted = [await jobs.submit(f"bar_{i}") for i in range(5)]
+            for _ in range(100):
+                if all([(await jobs.get(job.id)).done for job in submitted]):
+                    break
+                await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert order == [f"bar_{i}" for i in range(5)]
+
+
+def test_store_keeps_unfinished_jobs_past_maxsize():
+    jobs = make_jobs(maxsize=2)
+
+    async def scenario():
+        first = await jobs.submit("bar_0")
+        await jobs.run_once()
+        pending = [await jobs.submit(f"bar_{i}") for i in (1, 2)]
+        assert await jobs.get(first.id) is None  # finished and oldest: dropped
+        assert all([await jobs.get(job.id) for job in pending])
+
+    asyncio.run(scenario())
+
+
+def test_job_round_trips_through_dict():
+    job = ProvisionJob("bar_do_ze", started_at=10.0, created_at=9.5, finished_at=10.25)
+    data = job.to_dict()
+    assert data["queue_seconds"] == 0.5 and data["run_seconds"] == 0.25
+    assert ProvisionJob.from_dict(data) == job
+
+
+class FakeRedis:
+    """The list, hash and string commands `RedisJobStore` uses, in memory."""
+
+    def __init__(self) -> None:
+        self.data: dict = {}
+
+    def pipeline(self, transaction: bool = True) -> "FakePipeline":
+        return FakePipeline(self)
+
+    def register_script(self, script: str):
+        # Same steps as `RedisJobStore.REQUEUE_SCRIPT`.
+        async def requeue(keys, args):
+            if await self.lrem(keys[0], 1, args[0]):
+                await self.rpush(keys[1], args[0])
+                await self.hdel(keys[2], args[0])
+                return 1
+            return 0
+
+        return requeue
+
+    async def set(self, key, value, ex=None):
+        self.data[key] = value
+
+    async def get(self, key):
+        return self.data.get(key)
+
+    async def lpush(self, key, value):
+        self.data.setdefault(key, []).insert(0, value)
+
+    async def rpush(self, key, value):
+        self.data.setdefault(key, []).append(value)
+
+    async def lrem(self, key, count, value):
+        items = self.data.get(key, [])
+        if value in items:
+            items.remove(value)
+            return 1
+        return 0
+
+    async def lrange(self, key, start, end):
+        return list(self.data.get(key, []))
+
+    async def blmove(self, source, destination, timeout, src, dest):
+        items = self.data.get(source)
+        if not items:
+            return None
+        value = items.pop()
+        self.data.setdefault(destination, []).insert(0, value)
+        return value
+
+    async def hset(self, key, field, value):
+        self.data.setdefault(key, {})[field] = str(value)
+
+    async def hsetnx(self, key, field, value):
+        self.data.setdefault(key, {}).setdefault(field, str(value))
+
+    async def hget(self, key, field):
+        return self.data.get(key, {}).get(field)
+
+    async def hdel(self, key, field):
+        self.data.get(key, {}).pop(field, None)
+
+    async def aclose(self):
+        return None
+
+
+class FakePipeline:
+    def __init__(self, redis: FakeRedis) -> None:
+        self.redis = redis
+        self.commands = []
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    def __getattr__(self, name):
+        return lambda *args, **kwargs: self.commands.append((name, args, kwargs))
+
+    async def execute(self):
+        return [await getattr(self.redis, name)(*args, **kwargs) for name, args, kwargs in self.commands]
+
+
+def test_redis_store_requeues_jobs_of_dead_workers(monkeypatch):
+    redis = pytest.importorskip("redis.asyncio")
+    fake = FakeRedis()
+    monkeypatch.setattr(redis, "from_url", lambda url, **kwargs: fake)
+    store = RedisJobStore("redis://unused")
+    runs = []
+
+    async def provision(username: str) -> str:
+        runs.append(username)
+        return TenantSchema(f"org_{username}", True, {"tables": 1.0})
+
+    jobs = ProvisionJobs(provision, store, poll_timeout=0.01, visibility_timeout=30)
+
+    async def scenario():
+        job = await jobs.submit("bar_do_ze")
+        claimed = await store.pop(1)  # a worker takes the job and dies before running it
+        claimed.status = RUNNING
+        await store.save(claimed)
+        assert fake.data[store.processing_key] == [job.id] and not fake.data[store.queue_key]
+
+        assert await store.requeue_stale(30) == 0  # still within its visibility timeout
+        fake.data[store.claims_key][job.id] = str(time.time() - 60)
+        assert await store.requeue_stale(30) == 1
+        assert await store.requeue_stale(30) == 0
+        assert (await jobs.get(job.id)).status == QUEUED
+
+        finished = await jobs.run_once()
+        assert finished.id == job.id and finished.status == SUCCEEDED
+        assert fake.data[store.processing_key] == [] and fake.data[store.claims_key] == {}
+
+    asyncio.run(scenario())
+    assert runs == ["bar_do_ze"]
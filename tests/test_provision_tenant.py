@@ -0,0 +1,125 @@
+import re
+
+import pytest
+
+from app.services.schema_sql import (
+    TENANT_TABLES,
+    compile_tenant_template,
+    parse_schema_sql,
+    tenant_template,
+)
+
+SAMPLE_DUMP = """CREATE TYPE mood AS ENUM ('calm', 'busy')
+
+CREATE TABLE companies (
+\tid UUID NOT NULL,
+\tCONSTRAINT companies_pkey PRIMARY KEY (id)
+)
+
+CREATE TABLE products (
+\tid UUID NOT NULL,
+\tcompany_id UUID NOT NULL,
+\tCONSTRAINT products_pkey PRIMARY KEY (id),
+\tCONSTRAINT products_company_id_fkey FOREIGN KEY(company_id) REFERENCES companies (id)
+)
+
+CREATE INDEX idx_products_company_id ON products (company_id)
+CREATE TABLE recipes (
+\tid UUID NOT NULL,
+\tproduct_id UUID NOT NULL,
+\tCONSTRAINT recipes_product_id_fkey FOREIGN KEY(product_id) REFERENCES products (id),
+\tCONSTRAINT recipes_pkey PRIMARY KEY (id)
+)
+
+COMMENT ON COLUMN recipes.product_id IS 'Produto final'
+ALTER TABLE products ADD CONSTRAINT products_company_fkey2 FOREIGN KEY(company_id) REFERENCES companies (id)
+"""
+
+
+def test_template_keeps_only_tenant_tables_and_references():
+    template = compile_tenant_template(
+        parse_schema_sql(SAMPLE_DUMP), types=["mood"], tables=["products", "recipes"], grant_roles=["app"]
+    )
+    phases = dict(template.phases)
+
+    assert list(phases) == ["tables", "indexes", "grants"]
+    assert "CREATE TYPE mood" in phases["tables"]
+    assert "companies" not in phases["tables"]
+    assert "REFERENCES products (id)" in phases["tables"]
+    assert "COMMENT ON COLUMN recipes.product_id" in phases["tables"]
+    # Dropping the last constraint must not leave a dangling comma.
+    assert "PRIMARY KEY (id)\n)" in phases["tables"]
+    assert phases["indexes"] == "CREATE INDEX idx_products_company_id ON products (company_id)"
+    assert "ARRAY['app']" in phases["grants"]
+
+
+def test_schema_template_covers_every_operational_table():
+    tables_sql = dict(tenant_template().phases)["tables"]
+
+    created = re.findall(r"^CREATE TABLE (\S+) \($", tables_sql, flags=re.M)
+    assert created == list(TENANT_TABLES)
+    referenced = set(re.findall(r"REFERENCES (\S+) \(", tables_sql))
+    assert referenced <= set(TENANT_TABLES)
+
+
+def _provision(conn, schema: str):
+    (result,) = conn.execute("SELECT provision_tenant(%s)", (schema,)).fetchone()
+    return result
+
+
+def _tenant_tables(conn, schema: str) -> set:
+    rows = conn.execute("SELECT tablename FROM pg_tables WHERE schemaname = %s", (schema,))
+    return {row[0] for row in rows.fetchall()}
+
+
+def test_provision_tenant_applies_the_template_once(onboarding_db):
+    conn = onboarding_db
+    schema = f"org_bar_{conn.info.backend_pid}"
+    search_path = conn.execute("SHOW search_path").fetchone()[0]
+    try:
+        result = _provision(conn, schema)
+
+        assert result["schema"] == schema and result["created"] is True
+        assert set(result["timings"]) == {"schema", "tables", "indexes", "grants"}
+        assert _tenant_tables(conn, schema) == set(TENANT_TABLES)
+        assert conn.execute("SHOW search_path").fetchone()[0] == search_path
+
+        again = _provision(conn, schema)
+        assert again["created"] is False and again["timings"] == {}
+    finally:
+        conn.execute(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE')
+
+
+def test_provision_tenant_rolls_back_on_failure(onboarding_db):
+    psycopg = pytest.importorskip("psycopg")
+
+    conn = onboarding_db
+    schema = f"org_bar_{conn.info.backend_pid}"
+    conn.execute("INSERT INTO tenant_template (position, name, sql) VALUES (99, 'broken', 'SELECT 1/0')")
+
+    with pytest.raises(psycopg.errors.DivisionByZero):
+        _provision(conn, schema)
+
+    assert conn.execute("SELECT 1 FROM pg_namespace WHERE nspname = %s", (schema,)).fetchone() is None
+
+
+def test_provision_tenant_rejects_unsafe_names(onboarding_db):
+    psycopg = pytest.importorskip("psycopg")
+
+    with pytest.raises(psycopg.errors.InvalidParameterValue):
+        _provision(onboarding_db, 'org_x"; DROP SCHEMA public; --')
+
+
+def test_provision_tenant_runs_only_the_installed_template(onboarding_db):
+    psycopg = pytest.importorskip("psycopg")
+
+    conn = onboarding_db
+    schema = f"org_bar_{conn.info.backend_pid}"
+    old_signatures = ("provision_tenant(text, jsonb)", "provision_tenants(text[], jsonb)", "build_spare_schema(integer, jsonb)")
+    for signature in old_signatures:
+        assert conn.execute("SELECT to_regprocedure(%s)", (signature,)).fetchone()[0] is None, signature
+
+    conn.execute("DELETE FROM tenant_template")
+    with pytest.raises(psycopg.errors.ObjectNotInPrerequisiteState):
+        _provision(conn, schema)
+    assert conn.execute("SELECT 1 FROM pg_namespace WHERE nspname = %s", (schema,)).fetchone() is None
@@ -0,0 +1,134 @@
+import asyncio
+import os
+
+import pytest
+
+from app.services.pg_backend import PostgresClient
+from app.services.schema_sql import compile_shared_template, parse_schema_sql
+from app.services.shared_tenancy import SHARED_MODE, install_shared_schema
+
+SAMPLE_DUMP = """CREATE TABLE orders (
+\tid UUID NOT NULL,
+\tcompany_id UUID NOT NULL,
+\ttable_id UUID,
+\tCONSTRAINT orders_pkey PRIMARY KEY (id)
+)
+
+CREATE TABLE order_items (
+\tid UUID NOT NULL,
+\torder_id UUID NOT NULL,
+\tCONSTRAINT order_items_pkey PRIMARY KEY (id),
+\tCONSTRAINT order_items_order_id_fkey FOREIGN KEY(order_id) REFERENCES orders (id) ON DELETE CASCADE
+)
+
+CREATE INDEX idx_order_items_order_id ON order_items (order_id)
+ALTER TABLE orders ADD CONSTRAINT orders_item_fkey FOREIGN KEY(table_id) REFERENCES order_items (id) ON DELETE SET NULL
+"""
+
+
+def test_shared_template_partitions_by_company():
+    template = compile_shared_template(
+        parse_schema_sql(SAMPLE_DUMP), partitions=3, types=(), tables=("orders", "order_items")
+    )
+    phases = dict(template.phases)
+
+    assert [name for name, _ in template.phases] == ["tables", "partitions", "indexes", "grants"]
+    orders, items, alter = phases["tables"].split(";\n")
+    assert "PRIMARY KEY (company_id, id)" in orders and orders.endswith("PARTITION BY HASH (company_id)")
+    assert items.splitlines()[1] == "\tcompany_id UUID NOT NULL,"
+    assert (
+        "FOREIGN KEY(company_id, order_id) REFERENCES orders (company_id, id) ON DELETE CASCADE" in items
+    )
+    assert alter.endswith(
+        "FOREIGN KEY(company_id, table_id) REFERENCES order_items (company_id, id) ON DELETE SET NULL (table_id)"
+    )
+    assert phases["partitions"].split(";\n")[-1] == (
+        "CREATE TABLE order_items_p2 PARTITION OF order_items FOR VALUES WITH (MODULUS 3, REMAINDER 2)"
+    )
+    assert phases["indexes"] == "CREATE INDEX idx_order_items_order_id ON order_items (order_id)"
+
+
+@pytest.fixture
+def shared_client(onboarding_db, monkeypatch):
+    """A psycopg client in shared tenancy with the partitioned tables in `tshared_<pid>`."""
+
+    conn = onboarding_db
+    (schema,) = conn.execute("SELECT current_schema()").fetchone()
+    shared = f"tshared_{conn.info.backend_pid}"
+    assert install_shared_schema(conn, shared, partitions=4)
+    assert not install_shared_schema(conn, shared, partitions=4)
+    monkeypatch.setenv("TENANCY_MODE", SHARED_MODE)
+    monkeypatch.setenv("TENANT_SHARED_SCHEMA", shared)
+    client = PostgresClient(dsn=os.environ["TEST_DATABASE_URL"])
+    client.search_path = f'"{schema}", public'
+    try:
+        yield conn, client, shared
+    finally:
+        conn.execute(f'DROP SCHEMA "{shared}" CASCADE')
+
+
+def test_shared_provisioning_is_a_row_insert(shared_client):
+    conn, client, shared = shared_client
+    classes_before = conn.execute("SELECT count(*) FROM pg_class").fetchone()[0]
+
+    async def scenario():
+        async with client.lifespan():
+            batch = await client.provision_tenant_schemas(["bar_um", "-bad", "bar_dois"])
+            again = await client.provision_tenant_schema("bar_um")
+            return batch, again
+
+    (first, bad, second), again = asyncio.run(scenario())
+
+    assert client.spare_pool.size == 0
+    assert first.schema == second.schema == shared and first.created and second.created
+    assert set(first.timings) == {"insert"}
+    assert bad.error and not bad.created
+    assert not again.created and again.company_id == first.company_id
+    assert conn.execute("SELECT count(*) FROM pg_class").fetchone()[0] == classes_before
+
+    conn.execute(
+        f'INSERT INTO "{shared}".orders (company_id, status) VALUES (%s, %s)', (first.company_id, "open")
+    )
+    plan = "\n".join(
+        row[0]
+        for row in conn.execute(
+            f'EXPLAIN SELECT * FROM "{shared}".orders WHERE company_id = %s', (first.company_id,)
+        ).fetchall()
+    )
+    assert plan.count(" on orders_p") == 1
+
+
+def test_finalize_onboarding_registers_shared_tenant(shared_client):
+    conn, client, shared = shared_client
+    owner = conn.execute(
+        """
+        INSERT INTO users (email, username, tax_number, first_name, last_name, birth_date,
+                           country, postal_code, house_number, is_owner)
+        VALUES ('ana@boteco.pt', 'ana.silva', '12345678901', 'Ana', 'Silva', '1990-01-01',
+                'Brasil', '01001000', '10', true)
+        RETURNING id
+        """
+    ).fetchone()[0]
+    boteco = {
+        "public_name": "Bar da Ana",
+        "username": "bar_partilhado",
+        "service_category": "bar",
+        "country": "Brasil",
+        "postal_code": "01001000",
+        "owner_tax_number": "12345678901",
+        "created_by_email": "ana@boteco.pt",
+        "created_by_user_id": str(owner),
+    }
+
+    async def scenario():
+        async with client.lifespan():
+            return await client.finalize_onboarding(boteco, {"user_id": str(owner), "plan": "boteco_pro"})
+
+    result = asyncio.run(scenario())
+
+    assert result.schema == shared and result.spare is None
+    assert result.company_id == result.boteco.id
+    assert conn.execute("SELECT to_regnamespace('org_bar_partilhado')").fetchone()[0] is None
+    assert conn.execute(
+        "SELECT company_id::text FROM shared_tenants WHERE tenant_name = 'bar_partilhado'"
+    ).fetchone() == (result.boteco.id,)
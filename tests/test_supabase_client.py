@@ -0,0 +1,392 @@
+import asyncio
+import time
+from types import SimpleNamespace
+
+import httpx
+import pytest
+
+from app.services.models import UserRow
+from app.services.resilience import CircuitOpenError, RetryPolicy
+from app.services.supabase_client import SupabaseClient
+
+
+class FakeQuery:
+    """Chainable stand-in for the supabase-py query builder."""
+
+    def __init__(self, backend: "FakeSupabase", table: str) -> None:
+        self.backend = backend
+        self.table_name = table
+        self.ops: list[tuple] = []
+
+    def __getattr__(self, name):
+        def record(*args, **kwargs):
+            self.ops.append((name, args, kwargs))
+            return self
+
+        return record
+
+    def execute(self):
+        self.backend.calls.append((self.table_name, self.ops))
+        if self.backend.delay:
+            time.sleep(self.backend.delay)  # a blocking network call
+        if self.backend.error is not None:
+            raise self.backend.error
+        data = self.backend.responses.get(self.table_name, [])
+        return SimpleNamespace(data=data, count=None, error=None)
+
+
+class FakeSupabase:
+    def __init__(self, responses=None, delay: float = 0.0) -> None:
+        self.responses = responses or {}
+        self.delay = delay
+        self.error: Exception | None = None
+        self.calls: list[tuple] = []
+
+    def table(self, name: str) -> FakeQuery:
+        return FakeQuery(self, name)
+
+    def rpc(self, name: str, params: dict) -> FakeQuery:
+        query = FakeQuery(self, f"rpc:{name}")
+        query.ops.append(("rpc", (params,), {}))
+        return query
+
+
+def make_client(fake: FakeSupabase) -> SupabaseClient:
+    client = SupabaseClient()
+    client.client = fake
+    return client
+
+
+def test_provision_schema_reuses_pooled_client():
+    requests: list[httpx.Request] = []
+
+    def handler(request: httpx.Request) -> httpx.Response:
+        requests.append(request)
+        return httpx.Response(200, json={"message": "ok"})
+
+    async def scenario() -> None:
+        client = SupabaseClient()
+        client.provision_base_url = "http://provision.internal:9000"
+        client._http_client = httpx.AsyncClient(
+            base_url=client.provision_base_url, transport=httpx.MockTransport(handler)
+        )
+        pooled = client._http_client
+        async with client.lifespan():
+            await client.provision_schema("bar_do_ze")
+            await client.provision_schema("bar_da_ana")
+            assert client._http_client is pooled
+        assert client._http_client is None
+        assert pooled.is_closed
+
+    asyncio.run(scenario())
+
+    assert [str(r.url) for r in requests] == [
+        "http://provision.internal:9000/api/provision_org",
+        "http://provision.internal:9000/api/provision_org",
+    ]
+
+
+def test_blocking_queries_do_not_stall_the_event_loop():
+    fake = FakeSupabase(
+        responses={"users": [{"id": "u-1", "email": "ana@boteco.pt"}], "user_boteco": [{"id": "m-1"}]},
+        delay=0.2,
+    )
+    client = make_client(fake)
+
+    async def other_session(ticks: list[float], stop: asyncio.Event) -> None:
+        while not stop.is_set():
+            ticks.append(time.perf_counter())
+            await asyncio.sleep(0.01)
+
+    async def scenario() -> tuple[list[float], float]:
+        ticks: list[float] = []
+        stop = asyncio.Event()
+        heartbeat = asyncio.create_task(other_session(ticks, stop))
+        start = time.perf_counter()
+        await asyncio.gather(
+            client.get_user_by_email("ana@boteco.pt"),
+            client.check_user_has_boteco("u-1"),
+            client.upsert_user({"email": "ana@boteco.pt"}),
+            client.create_user({"email": "bia@boteco.pt"}),
+        )
+        elapsed = time.perf_counter() - start
+        stop.set()
+        await heartbeat
+        return ticks, elapsed
+
+    ticks, elapsed = asyncio.run(scenario())
+    client.executor.shutdown()
+
+    gaps = [b - a for a, b in zip(ticks, ticks[1:])]
+    assert len(fake.calls) == 4
+    assert elapsed < 0.6, "blocking calls should overlap on the executor"
+    assert len(ticks) >= 10
+    assert max(gaps) < 0.1, "the heartbeat session was starved by a blocking call"
+    stats = client.executor.stats()
+    assert stats["completed"] == 4 and stats["queue_depth"] == 0
+
+
+def test_finalize_onboarding_is_a_single_rpc_round_trip():
+    payload = {
+        "boteco": {"id": "b-1", "username": "bar_da_ana"},
+        "membership": {"id": "m-1", "boteco_id": "b-1"},
+        "schema": "org_bar_da_ana",
+    }
+    fake = FakeSupabase(responses={"rpc:finalize_onboarding": payload})
+    client = make_client(fake)
+
+    result = asyncio.run(
+        client.finalize_onboarding({"username": "bar_da_ana"}, {"user_id": "u-1", "plan": "boteco"})
+    )
+
+    assert result.schema == "org_bar_da_ana"
+    assert (result.boteco.id, result.membership.boteco_id) == ("b-1", "b-1")
+    assert [table for table, _ in fake.calls] == ["rpc:finalize_onboarding"]
+
+
+def test_repeated_finalize_with_the_same_key_replays_the_first_result():
+    payload = {
+        "boteco": {"id": "b-1", "username": "bar_da_ana"},
+        "membership": {"id": "m-1", "boteco_id": "b-1"},
+        "schema": "org_bar_da_ana",
+    }
+    fake = FakeSupabase(responses={"rpc:finalize_onboarding": payload}, delay=0.05)
+    client = make_client(fake)
+    args = ({"username": "bar_da_ana"}, {"user_id": "u-1", "plan": "boteco"})
+
+    async def scenario():
+        # A double click: both submits arrive while the first is still running.
+        first = await asyncio.gather(
+            client.finalize_onboarding(*args, idempotency_key="checkout-1"),
+            client.finalize_onboarding(*args, idempotency_key="checkout-1"),
+        )
+        # A reconnect replaying the event after it finished.
+        return first + [await client.finalize_onboarding(*args, idempotency_key="checkout-1")]
+
+    results = asyncio.run(scenario())
+
+    assert {result.schema for result in results} == {"org_bar_da_ana"}
+    assert [table for table, _ in fake.calls] == ["rpc:finalize_onboarding"]
+    assert client.idempotency.stats()["executions"] == 1
+
+
+def test_user_lookups_are_cached_until_a_write_invalidates_them():
+    fake = FakeSupabase(responses={"users": [{"id": "u-1", "email": "ana@boteco.pt"}]})
+    client = make_client(fake)
+
+    async def scenario() -> None:
+        first = await client.get_user_by_email("ana@boteco.pt")
+        second = await client.get_user_by_email("ana@boteco.pt")
+        assert first == second == [UserRow(id="u-1", email="ana@boteco.pt")]
+        await client.upsert_user({"email": "ana@boteco.pt", "first_name": "Ana"})
+        await client.get_user_by_email("ana@boteco.pt")
+
+    asyncio.run(scenario())
+
+    assert [table for table, _ in fake.calls] == ["users", "users", "users"]
+    stats = client.cache_stats()["users"]
+    assert (stats["hits"], stats["misses"], stats["invalidations"]) == (1, 2, 1)
+
+
+def test_membership_gate_caches_only_positive_answers():
+    fake = FakeSupabase(responses={"user_boteco": []})
+    client = make_client(fake)
+
+    async def scenario() -> list[bool]:
+        answers = [await client.check_user_has_boteco("u-1")]
+        answers.append(await client.check_user_has_boteco("u-1"))
+        fake.responses["user_boteco"] = [{"id": "m-1"}]
+        answers.append(await client.check_user_has_boteco("u-1"))
+        answers.append(await client.check_user_has_boteco("u-1"))
+        return answers
+
+    assert asyncio.run(scenario()) == [False, False, True, True]
+    assert len(fake.calls) == 3
+
+
+def test_concurrent_identical_lookups_share_one_backend_call():
+    fake = FakeSupabase(
+        responses={"users": [{"id": "u-1", "email": "ana@boteco.pt"}], "user_boteco": [{"id": "m-1"}]},
+        delay=0.05,
+    )
+    client = make_client(fake)
+
+    async def scenario():
+        users = await asyncio.gather(
+            *(client.get_user_by_email("ana@boteco.pt") for _ in range(1000))
+        )
+        gates = await asyncio.gather(*(client.check_user_has_boteco("u-1") for _ in range(1000)))
+        return users, gates
+
+    users, gates = asyncio.run(scenario())
+
+    assert all(result == [UserRow(id="u-1", email="ana@boteco.pt")] for result in users)
+    assert all(gates)
+    assert [table for table, _ in fake.calls] == ["users", "user_boteco"]
+    stats = client.singleflight.stats()
+    assert stats["deduplicated"] == 1998 and stats["in_flight"] == 0
+
+
+def test_single_flight_shares_failures_and_then_retries():
+    fake = FakeSupabase(delay=0.02)
+    fake.error = httpx.ConnectError("PostgREST unavailable")
+    client = make_client(fake)
+
+    async def scenario():
+        return await asyncio.gather(
+            *(client.get_user_by_email("ana@boteco.pt") for _ in range(50)), return_exceptions=True
+        )
+
+    results = asyncio.run(scenario())
+    assert all(isinstance(result, httpx.ConnectError) for result in results)
+    # One shared execution, retried by the policy, for all 50 callers.
+    assert len(fake.calls) == client.retry_policy.attempts
+
+    fake.error = None
+    assert asyncio.run(client.get_user_by_email("ana@boteco.pt")) == []
+    assert len(fake.calls) == client.retry_policy.attempts + 1
+
+
+class FlakyFake(FakeSupabase):
+    """Fails the first ``failures`` executes with a transport error."""
+
+    def __init__(self, failures: int, **kwargs) -> None:
+        super().__init__(**kwargs)
+        self.failures = failures
+
+    def table(self, name: str) -> FakeQuery:
+        self.error = httpx.ReadTimeout("slow backend") if self.failures > 0 else None
+        self.failures -= 1
+        return super().table(name)
+
+
+def test_idempotent_reads_are_retried_but_writes_are_not():
+    fake = FlakyFake(failures=2, responses={"users": [{"id": "u-1", "email": "ana@boteco.pt"}]})
+    client = make_client(fake)
+    client.retry_policy = RetryPolicy(attempts=3, base_delay=0.001)
+
+    assert asyncio.run(client.get_user_by_email("ana@boteco.pt"))[0].id == "u-1"
+    assert len(fake.calls) == 3 and client.retries == 2
+
+    fake.failures = 1
+    with pytest.raises(httpx.ReadTimeout):
+        asyncio.run(client.create_user({"email": "bia@boteco.pt"}))
+    assert len(fake.calls) == 4
+
+
+def test_breaker_opens_fails_fast_and_recovers():
+    fake = FakeSupabase(responses={"users": []})
+    fake.error = httpx.ConnectError("down")
+    client = make_client(fake)
+    client.retry_policy = RetryPolicy(attempts=1)
+    clock = [0.0]
+    client.breaker._clock = lambda: clock[0]
+    client.breaker.min_calls = 4
+    client.breaker.open_seconds = 5
+
+    async def lookup():
+        return await client.get_user_by_email("ana@boteco.pt")
+
+    for _ in range(4):
+        with pytest.raises(httpx.ConnectError):
+            asyncio.run(lookup())
+    assert client.breaker.state == "open"
+
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(lookup())
+    assert len(fake.calls) == 4
+
+    clock[0] = 6
+    fake.error = None
+    assert asyncio.run(lookup()) == []
+    stats = client.resilience_stats()["breaker"]
+    assert stats["state"] == "closed"
+    assert stats["transitions"] == {"closed->open": 1, "open->half_open": 1, "half_open->closed": 1}
+
+
+def test_call_deadline_bounds_a_hung_backend():
+    fake = FakeSupabase(responses={"users": []}, delay=0.5)
+    client = make_client(fake)
+    client.call_deadline = 0.05
+
+    started = time.perf_counter()
+    with pytest.raises(asyncio.TimeoutError):
+        asyncio.run(client.get_user_by_email("ana@boteco.pt"))
+    assert time.perf_counter() - started < 0.3
+    assert client.deadline_exceeded == 1
+    client.executor.shutdown()
+
+
+def test_lookups_request_explicit_projections():
+    fake = FakeSupabase(responses={"users": [], "user_boteco": []})
+    client = make_client(fake)
+
+    asyncio.run(client.get_user_by_email("ana@boteco.pt"))
+    asyncio.run(client.check_user_has_boteco("u-1"))
+
+    selects = [args for _, ops in fake.calls for name, args, _ in ops if name == "select"]
+    assert selects == [(UserRow.columns(),), ("id",)]
+    assert "*" not in UserRow.columns()
+
+
+def test_cancelled_half_open_probe_releases_its_slot():
+    fake = FakeSupabase(responses={"users": []}, delay=0.3)
+    fake.error = httpx.ConnectError("down")
+    client = make_client(fake)
+    client.retry_policy = RetryPolicy(attempts=1)
+    clock = [0.0]
+    client.breaker._clock = lambda: clock[0]
+    client.breaker.min_calls = 1
+    client.breaker.open_seconds = 5
+
+    with pytest.raises(httpx.ConnectError):
+        asyncio.run(client.get_user_by_email("ana@boteco.pt"))
+    assert client.breaker.state == "open"
+
+    async def cancelled_probe():
+        task = asyncio.create_task(client.create_user({"email": "ana@boteco.pt"}))
+        await asyncio.sleep(0.05)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    clock[0] = 6
+    fake.error = None
+    asyncio.run(cancelled_probe())
+    assert client.breaker.state == "half_open"
+
+    fake.delay = 0
+    assert asyncio.run(client.get_user_by_email("bia@boteco.pt")) == []
+    assert client.breaker.state == "closed"
+    client.executor.shutdown()
+
+
+def test_provisioning_has_its_own_deadline_and_breaker():
+    fake = FakeSupabase(responses={"users": [], "rpc:provision_tenants": []}, delay=0.2)
+    client = make_client(fake)
+    client.provision_deadline = 0.02
+    client.provision_breaker.min_calls = 3
+
+    for _ in range(3):
+        with pytest.raises(asyncio.TimeoutError):
+            asyncio.run(client.provision_tenant_schemas(["bar_0", "bar_1"]))
+    with pytest.raises(CircuitOpenError):
+        asyncio.run(client.provision_tenant_schemas(["bar_0", "bar_1"]))
+
+    assert [name for name, _ in fake.calls] == ["rpc:provision_tenants"] * 3  # DDL is never retried
+    assert client.provision_breaker.state == "open"
+    assert client.breaker.state == "closed" and client.breaker.failures == 0
+
+    fake.delay = 0
+    assert asyncio.run(client.get_user_by_email("ana@boteco.pt")) == []
+    client.executor.shutdown()
+
+
+def test_delete_boteco_returns_the_deleted_row_count():
+    fake = FakeSupabase(responses={"boteco": [{"id": "b-1"}]})
+    client = make_client(fake)
+
+    assert asyncio.run(client.delete_boteco("b-1")) == 1
+    fake.responses["boteco"] = []
+    assert asyncio.run(client.delete_boteco("b-1")) == 0
+    assert [op[0] for op in fake.calls[0][1]] == ["delete", "eq"]
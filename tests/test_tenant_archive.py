@@ -0,0 +1,189 @@
+import asyncio
+import os
+import uuid
+
+import pytest
+
+from app.services.tenant_archive import TenantArchive, TenantNotFound
+
+psycopg = pytest.importorskip("psycopg")
+
+
+@pytest.fixture
+def tenant(onboarding_db):
+    """One provisioned `org_arch<pid>` tenant with rows that reference each other."""
+
+    conn = onboarding_db
+    schema = f"org_arch{conn.info.backend_pid}"
+    conn.execute("SELECT provision_tenant(%s)", (schema,))
+    company, table_id, order_id = uuid.uuid4(), uuid.uuid4(), uuid.uuid4()
+    conn.execute(
+        f'INSERT INTO "{schema}".tables (id, company_id, number, name) VALUES (%s, %s, 1, %s)',
+        (table_id, company, "Mesa 1"),
+    )
+    conn.execute(
+        f'INSERT INTO "{schema}".orders (id, company_id, table_id, notes) VALUES (%s, %s, %s, %s)',
+        (order_id, company, table_id, "sem cebola"),
+    )
+    conn.execute(f'UPDATE "{schema}".tables SET current_order_id = %s', (order_id,))
+    conn.execute(
+        f'INSERT INTO "{schema}".stock_movements (product_id, movement_type, quantity, company_id) '
+        f"SELECT gen_random_uuid(), 'sale', n, %s FROM generate_series(1, 3) AS n",
+        (company,),
+    )
+    try:
+        yield conn, schema
+    finally:
+        conn.execute(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE')
+
+
+def _archive(conn, tmp_path) -> TenantArchive:
+    search_path = conn.execute("SHOW search_path").fetchone()[0]
+    return TenantArchive(os.environ["TEST_DATABASE_URL"], tmp_path, search_path=search_path)
+
+
+def _exists(conn, schema: str) -> bool:
+    return conn.execute("SELECT to_regnamespace(%s) IS NOT NULL", (schema,)).fetchone()[0]
+
+
+def test_archive_and_restore_on_access(tenant, tmp_path):
+    conn, schema = tenant
+    conn.execute(
+        "UPDATE tenant_schemas SET last_active_at = now() - interval '100 days' WHERE schema_name = %s",
+        (schema,),
+    )
+    archive = _archive(conn, tmp_path)
+
+    async def scenario():
+        async with archive.lifespan():
+            dormant = await archive.dormant(90 * 86_400, 10)
+            archived = await archive.archive_dormant(90 * 86_400, 10)
+            gone = not _exists(conn, schema)
+            first, second = await asyncio.gather(
+                archive.ensure_active(schema), archive.ensure_active(schema)
+            )
+            again = await archive.ensure_active(schema)
+            return dormant, archived, gone, first, second, again
+
+    dormant, archived, gone, first, second, again = asyncio.run(scenario())
+    assert dormant == [schema]
+    assert [r.archived for r in archived] == [True] and archived[0].rows == 5 and gone
+    assert (tmp_path / schema / "manifest.json").exists() is False  # removed after restore
+    assert first.restored and second.restored and first.rows == 5
+    assert archive.stats()["restores_deduplicated"] == 1
+    assert not again.restored
+
+    row = conn.execute(
+        "SELECT archived_at, archive_path, last_active_at > now() - interval '1 minute' "
+        "FROM tenant_schemas WHERE schema_name = %s",
+        (schema,),
+    ).fetchone()
+    assert row == (None, None, True)
+    order = conn.execute(
+        f'SELECT o.notes, t.name FROM "{schema}".orders o JOIN "{schema}".tables t ON t.current_order_id = o.id'
+    ).fetchone()
+    assert order == ("sem cebola", "Mesa 1")
+    # Foreign keys, indexes and sequences came back with the data.
+    fks = conn.execute(
+        "SELECT count(*) FROM pg_constraint WHERE connamespace = to_regnamespace(%s) AND contype = 'f'",
+        (schema,),
+    ).fetchone()[0]
+    assert fks >= 2
+    assert conn.execute(
+        "SELECT count(*) FROM pg_indexes WHERE schemaname = %s AND indexname = 'stock_movements_company_id_idx'",
+        (schema,),
+    ).fetchone()[0] == 1
+    conn.execute(
+        f'INSERT INTO "{schema}".stock_movements (product_id, movement_type, quantity, company_id) '
+        "VALUES (gen_random_uuid(), 'sale', 1, gen_random_uuid())"
+    )
+    assert conn.execute(f'SELECT max(id) FROM "{schema}".stock_movements').fetchone()[0] == 4
+
+
+def test_archive_skips_active_and_unknown_tenants(tenant, tmp_path):
+    conn, schema = tenant
+    archive = _archive(conn, tmp_path)
+
+    async def scenario():
+        async with archive.lifespan():
+            skipped = await archive.archive(schema, idle_seconds=86_400)
+            with pytest.raises(TenantNotFound):
+                await archive.ensure_active("org_neverprovisioned")
+            with pytest.raises(ValueError):
+                await archive.ensure_active("org__spare_abc")
+            return skipped, await archive.dormant(86_400, 10)
+
+    skipped, dormant = asyncio.run(scenario())
+    assert not skipped.archived and skipped.reason == "active"
+    assert dormant == [] and _exists(conn, schema)
+    assert list(tmp_path.iterdir()) == []
+
+
+def test_archive_skips_busy_tenant(tenant, tmp_path):
+    conn, schema = tenant
+    archive = _archive(conn, tmp_path)
+    archive.lock_timeout = 0.2
+
+    async def attempt():
+        async with archive.lifespan():
+            return await archive.archive(schema)
+
+    with psycopg.connect(os.environ["TEST_DATABASE_URL"]) as writer:
+        writer.execute(f'UPDATE "{schema}".orders SET notes = %s', ("editando",))
+        busy = asyncio.run(attempt())
+        writer.rollback()
+    done = asyncio.run(attempt())
+
+    assert not busy.archived and busy.reason == "busy"
+    assert done.archived and not _exists(conn, schema)
+    assert sorted(p.name for p in (tmp_path / schema).iterdir())[0] == "company_settings.copy.gz"
+
+
+def test_restore_replays_the_tenant_migrations(tenant, tmp_path):
+    from app.services.tenant_migrations import Migration, TenantMigrator
+
+    conn, schema = tenant
+    migrations = [
+        Migration("0001_orders_tip", "ALTER TABLE orders ADD COLUMN IF NOT EXISTS tip numeric;"),
+        Migration("0002_orders_tip_idx", "CREATE INDEX IF NOT EXISTS orders_tip_idx ON orders (tip);"),
+    ]
+    search_path = conn.execute("SHOW search_path").fetchone()[0]
+    migrator = TenantMigrator(
+        os.environ["TEST_DATABASE_URL"], migrations, search_path=search_path, schema_regex=f"^{schema}$"
+    )
+    assert asyncio.run(migrator.run()).migrated == 1
+    conn.execute(f'UPDATE "{schema}".orders SET tip = 4.5')
+    archive = TenantArchive(
+        os.environ["TEST_DATABASE_URL"], tmp_path, search_path=search_path, migrations=migrations
+    )
+
+    async def scenario():
+        async with archive.lifespan():
+            archived = await archive.archive(schema)
+            return archived, await archive.ensure_active(schema)
+
+    archived, restored = asyncio.run(scenario())
+
+    assert archived.archived and restored.restored and restored.rows == 5
+    assert conn.execute(f'SELECT tip FROM "{schema}".orders').fetchone()[0] == 4.5
+    assert conn.execute(
+        "SELECT count(*) FROM pg_indexes WHERE schemaname = %s AND indexname = 'orders_tip_idx'", (schema,)
+    ).fetchone()[0] == 1
+    assert asyncio.run(migrator.run()).up_to_date == 1
+
+
+def test_tenants_without_recorded_activity_are_never_dormant(tenant, tmp_path):
+    conn, schema = tenant
+    conn.execute(
+        "UPDATE tenant_schemas SET provisioned_at = now() - interval '400 days', last_active_at = NULL "
+        "WHERE schema_name = %s",
+        (schema,),
+    )
+    archive = _archive(conn, tmp_path)
+
+    async def scenario():
+        async with archive.lifespan():
+            return await archive.dormant(90 * 86_400, 10), await archive.archive(schema, idle_seconds=90 * 86_400)
+
+    dormant, skipped = asyncio.run(scenario())
+    assert dormant == [] and skipped.reason == "active" and _exists(conn, schema)
@@ -0,0 +1,141 @@
+import asyncio
+import os
+
+import pytest
+
+from app.services.tenant_migrations import Migration, TenantMigrator, load_migrations
+
+psycopg = pytest.importorskip("psycopg")
+
+ADD_NOTE = Migration("0001_add_note", "ALTER TABLE orders ADD COLUMN IF NOT EXISTS note text;")
+ADD_INDEX = Migration("0002_note_index", "CREATE INDEX IF NOT EXISTS orders_note_idx ON orders (note);")
+
+
+@pytest.fixture
+def tenants(onboarding_db):
+    """Twelve `org_mig<pid>_*` schemas with an `orders` table; dropped afterwards."""
+
+    conn = onboarding_db
+    prefix = f"org_mig{conn.info.backend_pid}_"
+    names = [f"{prefix}{i:02d}" for i in range(12)]
+    for name in names:
+        conn.execute(f'CREATE SCHEMA "{name}"')
+        conn.execute(f'CREATE TABLE "{name}".orders (id int PRIMARY KEY)')
+    try:
+        yield conn, prefix, names
+    finally:
+        for name in names:
+            conn.execute(f'DROP SCHEMA IF EXISTS "{name}" CASCADE')
+
+
+def _migrator(conn, prefix: str, migrations, **kwargs) -> TenantMigrator:
+    search_path = conn.execute("SHOW search_path").fetchone()[0]
+    return TenantMigrator(
+        os.environ["TEST_DATABASE_URL"],
+        migrations,
+        search_path=search_path,
+        schema_regex=f"^{prefix}",
+        **kwargs,
+    )
+
+
+def _columns(conn, schema: str) -> set:
+    rows = conn.execute(
+        "SELECT column_name FROM information_schema.columns WHERE table_schema = %s AND table_name = 'orders'",
+        (schema,),
+    ).fetchall()
+    return {row[0] for row in rows}
+
+
+def test_migrations_fan_out_and_resume(tenants):
+    conn, prefix, names = tenants
+
+    first = asyncio.run(_migrator(conn, prefix, [ADD_NOTE], concurrency=4).run())
+    assert (first.schemas, first.migrated, first.failed) == (12, 12, 0)
+    assert first.applied == {"0001_add_note": 12}
+    assert first.schemas_per_second > 0 and len(first.stragglers) == 10
+    assert all(_columns(conn, name) == {"id", "note"} for name in names)
+
+    second = asyncio.run(_migrator(conn, prefix, [ADD_NOTE, ADD_INDEX], concurrency=4).run())
+    assert (second.migrated, second.up_to_date) == (12, 0)
+    assert second.applied == {"0002_note_index": 12}
+
+    again = asyncio.run(_migrator(conn, prefix, [ADD_NOTE, ADD_INDEX]).run())
+    assert (again.migrated, again.up_to_date, again.applied) == (0, 12, {})
+    recorded = conn.execute(
+        "SELECT count(*) FROM tenant_migrations WHERE starts_with(schema_name, %s)", (prefix,)
+    ).fetchone()[0]
+    assert recorded == 24
+
+
+def test_a_failing_schema_does_not_stop_the_others(tenants):
+    conn, prefix, names = tenants
+    conn.execute(f'DROP TABLE "{names[3]}".orders')
+
+    report = asyncio.run(_migrator(conn, prefix, [ADD_NOTE, ADD_INDEX]).run())
+
+    assert (report.migrated, report.failed) == (11, 1)
+    assert report.failures[0]["schema"] == names[3]
+    assert report.failures[0]["error"].startswith("0001_add_note")
+    # The failed pair was rolled back and is retried on the next run.
+    assert conn.execute(
+        "SELECT count(*) FROM tenant_migrations WHERE schema_name = %s", (names[3],)
+    ).fetchone()[0] == 0
+
+
+def test_busy_schema_times_out_and_is_reported(tenants):
+    conn, prefix, names = tenants
+    blocker = psycopg.connect(os.environ["TEST_DATABASE_URL"])
+    try:
+        blocker.execute(f'LOCK TABLE "{names[0]}".orders IN ACCESS EXCLUSIVE MODE')
+        migrator = _migrator(conn, prefix, [ADD_NOTE], lock_timeout=0.05, retries=1)
+
+        report = asyncio.run(migrator.run())
+    finally:
+        blocker.rollback()
+        blocker.close()
+
+    assert (report.migrated, report.failed, report.lock_retries) == (11, 1, 1)
+    assert "lock timeout" in report.failures[0]["error"]
+
+    resumed = asyncio.run(_migrator(conn, prefix, [ADD_NOTE]).run())
+    assert (resumed.migrated, resumed.up_to_date) == (1, 11)
+
+
+def test_load_migrations_orders_by_version(tmp_path):
+    (tmp_path / "0002_b.sql").write_text("SELECT 2;")
+    (tmp_path / "0001_a.sql").write_text("SELECT 1;")
+    (tmp_path / "notes.txt").write_text("ignored")
+
+    assert [m.version for m in load_migrations(tmp_path)] == ["0001_a", "0002_b"]
+
+
+def test_spares_are_skipped_and_claims_keep_their_progress(onboarding_db):
+    conn = onboarding_db
+    tenant = f"org_claim{conn.info.backend_pid}"
+    add_note = Migration("0001_add_note", "ALTER TABLE orders ADD COLUMN note text;")  # not idempotent
+    migrator = _migrator(conn, "", [add_note])
+    migrator.schema_regex = rf"^org_(_spare_|claim{conn.info.backend_pid}$)"
+    try:
+        (built,) = conn.execute("SELECT build_spare_schema(1)").fetchone()
+        spare = built["schema"]
+        assert asyncio.run(migrator.run()).schemas == 0
+
+        # A spare migrated before spares were skipped keeps its row through the claim.
+        conn.execute(f'ALTER TABLE "{spare}".orders ADD COLUMN note text')
+        conn.execute(
+            "INSERT INTO tenant_migrations (schema_name, version) VALUES (%s, '0001_add_note')", (spare,)
+        )
+        assert conn.execute("SELECT claim_spare_schema(%s)", (tenant,)).fetchone()[0] == spare
+        assert conn.execute(
+            "SELECT array_agg(version) FROM tenant_migrations WHERE schema_name = %s", (tenant,)
+        ).fetchone()[0] == ["0001_add_note"]
+
+        report = asyncio.run(migrator.run())
+        assert (report.schemas, report.up_to_date, report.failed) == (1, 1, 0)
+    finally:
+        conn.execute(f'DROP SCHEMA IF EXISTS "{tenant}" CASCADE')
+        for (name,) in conn.execute(
+            "SELECT schema_name FROM tenant_schemas WHERE schema_name LIKE 'org\\_\\_spare\\_%'"
+        ).fetchall():
+            conn.execute(f'DROP SCHEMA IF EXISTS "{name}" CASCADE')
@@ -0,0 +1,145 @@
+import asyncio
+
+import pytest
+
+from app.services.models import SpareBuild
+from app.services.schema_sql import TENANT_TABLES
+from app.services.tenant_pool import SpareSchemaPool
+
+
+class FakeBuilder:
+    def __init__(self, available: int = 0) -> None:
+        self.available = available
+        self.calls = 0
+
+    async def __call__(self, target: int) -> SpareBuild:
+        self.calls += 1
+        if self.available >= target:
+            return SpareBuild(None, self.available, False, {})
+        self.available += 1
+        return SpareBuild(f"org__spare_{self.calls}", self.available, False, {"tables": 1.0})
+
+
+def test_fill_once_stops_when_the_pool_is_full():
+    builder = FakeBuilder(available=1)
+    pool = SpareSchemaPool(builder, size=3, refill_per_tick=5)
+
+    assert asyncio.run(pool.fill_once()) == 2
+    assert builder.calls == 3
+    assert pool.stats()["available"] == 3 and pool.stats()["built"] == 2
+    assert pool.stats()["last_build_ms"] == {"tables": 1.0}
+
+
+def test_record_claim_tracks_hits_misses_and_latency():
+    pool = SpareSchemaPool(FakeBuilder(), size=2)
+    pool.available = 2
+
+    pool.record_claim("org__spare_1", 0.5)
+    pool.record_claim(None, 0.1)
+    stats = pool.stats()
+
+    assert (stats["claims"], stats["misses"], stats["available"]) == (1, 1, 1)
+    assert stats["claim_ms_p50"] == 0.5 and stats["claim_ms_p99"] == 0.5
+
+
+def test_lifespan_is_idle_without_a_pool_size():
+    builder = FakeBuilder()
+    pool = SpareSchemaPool(builder, size=0, interval=0.01)
+
+    async def scenario() -> None:
+        async with pool.lifespan():
+            await asyncio.sleep(0.05)
+
+    asyncio.run(scenario())
+    assert builder.calls == 0
+
+
+def test_lifespan_refills_in_the_background():
+    builder = FakeBuilder()
+    pool = SpareSchemaPool(builder, size=2, interval=0.01)
+
+    async def scenario() -> None:
+        async with pool.lifespan():
+            for _ in range(100):
+                if builder.available == 2:
+                    break
+                await asyncio.sleep(0.01)
+
+    asyncio.run(scenario())
+    assert pool.built == 2 and pool.build_errors == 0
+
+
+def _build(conn, target: int):
+    (result,) = conn.execute("SELECT build_spare_schema(%s)", (target,)).fetchone()
+    return result
+
+
+def _drop_spares(conn) -> None:
+    for (name,) in conn.execute(
+        "SELECT schema_name FROM tenant_schemas WHERE schema_name LIKE 'org\\_\\_spare\\_%'"
+    ).fetchall():
+        conn.execute(f'DROP SCHEMA IF EXISTS "{name}" CASCADE')
+
+
+def test_build_spare_schema_fills_up_to_target(onboarding_db):
+    conn = onboarding_db
+    try:
+        first = _build(conn, 1)
+        full = _build(conn, 1)
+
+        assert first["schema"].startswith("org__spare_") and first["available"] == 1
+        assert first["busy"] is False and "tables" in first["timings"]
+        assert full["schema"] is None and full["available"] == 1
+    finally:
+        _drop_spares(conn)
+
+
+def test_finalize_onboarding_claims_a_spare(onboarding_db):
+    from tests.test_finalize_onboarding import _insert_user, _payloads
+
+    conn = onboarding_db
+    username = f"bar_{conn.info.backend_pid}"
+    schema = f"org_{username}"
+    try:
+        spare = _build(conn, 1)["schema"]
+        (result,) = conn.execute(
+            "SELECT finalize_onboarding(%s::jsonb, %s::jsonb)", _payloads(_insert_user(conn), username)
+        ).fetchone()
+
+        assert result["schema"] == schema and result["spare"] == spare
+        assert result["claim_ms"] >= 0
+        rows = conn.execute("SELECT tablename FROM pg_tables WHERE schemaname = %s", (schema,))
+        assert {row[0] for row in rows.fetchall()} == set(TENANT_TABLES)
+        assert conn.execute("SELECT spare_schema_count()").fetchone()[0] == 0
+        assert conn.execute(
+            "SELECT 1 FROM tenant_schemas WHERE schema_name = %s", (schema,)
+        ).fetchone() is not None
+    finally:
+        _drop_spares(conn)
+        conn.execute(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE')
+
+
+def test_claim_spare_schema_keeps_an_existing_schema(onboarding_db):
+    conn = onboarding_db
+    schema = f"org_bar_{conn.info.backend_pid}"
+    try:
+        _build(conn, 1)
+        conn.execute(f'CREATE SCHEMA "{schema}"')
+
+        assert conn.execute("SELECT claim_spare_schema(%s)", (schema,)).fetchone()[0] is None
+        assert conn.execute("SELECT spare_schema_count()").fetchone()[0] == 1
+    finally:
+        _drop_spares(conn)
+        conn.execute(f'DROP SCHEMA IF EXISTS "{schema}" CASCADE')
+
+
+def test_finalize_onboarding_rejects_leading_underscore(onboarding_db):
+    psycopg = pytest.importorskip("psycopg")
+    from tests.test_finalize_onboarding import _insert_user, _payloads
+
+    conn = onboarding_db
+    with pytest.raises(psycopg.errors.InvalidParameterValue):
+        conn.execute(
+            "SELECT finalize_onboarding(%s::jsonb, %s::jsonb)",
+            _payloads(_insert_user(conn), "_spare_x"),
+        )
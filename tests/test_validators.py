@@ -0,0 +1,82 @@
+import random
+import sys
+
+import pytest
+
+from app.utils.validators import cpf_cnpj_check_digits, validate_cpf_cnpj, validate_cpf_cnpj_batch
+
+
+def test_cpf_cnpj_check_digits():
+    assert validate_cpf_cnpj("529.982.247-25")
+    assert validate_cpf_cnpj("11.222.333/0001-81")
+    assert validate_cpf_cnpj("11222333000181")
+    assert cpf_cnpj_check_digits("529982247") == "25"
+    assert cpf_cnpj_check_digits("112223330001") == "81"
+
+    assert not validate_cpf_cnpj("529.982.247-26")  # wrong second digit
+    assert not validate_cpf_cnpj("11.222.333/0001-91")  # wrong first digit
+    assert not validate_cpf_cnpj("111.111.111-11")  # passes mod 11, still rejected
+    assert not validate_cpf_cnpj("5299822472")
+    assert not validate_cpf_cnpj("")
+
+
+def documents(count: int):
+    rng = random.Random(11)
+    values = [None, "", "٣" * 11, "0" * 14, "x" * 40 + "52998224725"]
+    for _ in range(count):
+        base = "".join(rng.choice("0123456789") for _ in range(rng.choice((8, 9, 12, 13))))
+        value = base + cpf_cnpj_check_digits(base) if len(base) in (9, 12) else base + "00"
+        if rng.random() < 0.3:
+            position = rng.randrange(len(value))
+            value = value[:position] + rng.choice("0123456789 .-/é") + value[position + 1 :]
+        values.append(value)
+    return values
+
+
+def test_batch_matches_single_validation():
+    pytest.importorskip("numpy")
+    values = documents(20000)
+
+    batch = validate_cpf_cnpj_batch(values, chunk_size=4096)
+
+    assert batch == [validate_cpf_cnpj(value) for value in values]
+    assert 0.3 < sum(batch) / len(batch) < 0.9
+
+
+def test_batch_rejects_long_values_without_widening_the_matrix():
+    pytest.importorskip("numpy")
+    junk = "1" * 2000
+
+    assert validate_cpf_cnpj_batch(["529.982.247-25", junk, "11.222.333/0001-81", None, "5299822472"]) == [
+        True, False, True, False, False,
+    ]
+
+
+def test_batch_without_numpy(monkeypatch):
+    monkeypatch.setitem(sys.modules, "numpy", None)
+    values = documents(200)
+
+    assert validate_cpf_cnpj_batch(values) == [validate_cpf_cnpj(value) for value in values]
+
+
+def test_tax_number_audit_reports_invalid_rows(onboarding_db):
+    from app.services.tax_number_audit import audit_column
+
+    conn = onboarding_db
+    ids = {}
+    for email, tax_number in (("a@b.pt", "529.982.247-25"), ("b@b.pt", "12345678901"), ("c@b.pt", "11222333000181")):
+        ids[tax_number] = conn.execute(
+            """
+            INSERT INTO users (email, username, tax_number, first_name, last_name, birth_date,
+                               country, postal_code, house_number, is_owner)
+            VALUES (%s, %s, %s, 'Ana', 'Silva', '1990-01-01', 'Brasil', '01001000', '10', true)
+            RETURNING id::text
+            """,
+            (email, email.split("@")[0], tax_number),
+        ).fetchone()[0]
+
+    audit = audit_column(conn, "users", "tax_number", chunk_size=2)
+    assert (audit.rows, audit.invalid, audit.invalid_ids) == (3, 1, [ids["12345678901"]])
+
+    empty = audit_column(conn, "boteco", "establishment_tax_number")
+    assert (empty.rows, empty.invalid) == (0, 0)